@@ -6,6 +6,7 @@ import streamlit as st
 from datetime import datetime, timezone
 from menu import menu
 from utils import general_UI as utils_gen_UI
+from utils import optics_store as utils_optics_store
 
 ######### Page configuration ######################################################################
 
@@ -65,7 +66,9 @@ if 'id' not in st.session_state:
         os.makedirs(session_path)
 
     # Copy the content of the Resource folder to the session folder. Also copy SimSS and ZimT executable from the SIMsalabim folder.
-    shutil.copytree(resource_path,session_path,dirs_exist_ok=True)
+    # The nk and spectrum files are not copied, these are read from the shared store. The session only gets (empty) folders for uploaded files.
+    shutil.copytree(resource_path,session_path,dirs_exist_ok=True,ignore=shutil.ignore_patterns(*utils_optics_store.OPTICS_FOLDER_NAMES))
+    utils_optics_store.init_session_optics(session_path)
 
     # Copy simss/zimt executables if they exist
     simss_exec = os.path.join(simss_path, 'simss')
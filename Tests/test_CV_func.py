@@ -8,6 +8,7 @@ if here not in sys.path:
     sys.path.insert(0, here)
 
 import utils.CV_func as cv_func
+import utils.run_metrics as utils_run_metrics
 
 
 class DummyToast:
@@ -21,6 +22,9 @@ class DummyToast:
         return False
 
 
+started_packages = []
+
+
 @pytest.fixture(autouse=True)
 def isolate_session_state(monkeypatch, tmp_path):
     # Ensure a fresh streamlit session_state and harmless toast context
@@ -31,8 +35,11 @@ def isolate_session_state(monkeypatch, tmp_path):
     repo_root = tmp_path
     stats = repo_root / "Statistics"
     stats.mkdir()
-    # Patch file paths used in the module (it writes to 'Statistics/log_file.txt')
+    # Patch file paths used in the module (the run metrics are written to 'Statistics/run_metrics.jsonl')
     monkeypatch.chdir(repo_root)
+    # Packaging the results is tested in test_general_UI, only record that it has been started
+    started_packages.clear()
+    monkeypatch.setattr(cv_func.utils_gen_UI, 'start_results_package', lambda *a: started_packages.append(a[2:]))
     yield
 
 
@@ -79,8 +86,8 @@ def test_run_CV_tvg_failure(monkeypatch, tmp_path):
     # Should have recorded a streamlit error and produced a log entry
     assert errors and "tVG generation failed" in errors[0]
 
-    log = (tmp_path / "Statistics" / "log_file.txt").read_text()
-    assert 'id123 CV FAILED' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('id123', 'CV', 'FAILED') in log
 
 
 @pytest.mark.parametrize("result_code", [0, 95])
@@ -136,8 +143,9 @@ def test_run_CV_success_creates_files_and_sets_state(monkeypatch, tmp_path, resu
         assert f"{key} = {cv_obj[key]}" in written
 
     # Log file should record success
-    log = (tmp_path / "Statistics" / "log_file.txt").read_text()
-    assert 'ID123 CV SUCCESS' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID123', 'CV', 'SUCCESS') in log
+    assert started_packages == [('zimt', 'CV')]
 
 
 def test_run_CV_removes_existing_file(monkeypatch, tmp_path):
@@ -182,5 +190,5 @@ def test_run_CV_other_error_logs(monkeypatch, tmp_path):
 
     # Should have recorded an error and log should show ERROR
     assert errors and 'Sim failed' in errors[0]
-    log = (tmp_path / "Statistics" / "log_file.txt").read_text()
-    assert 'ID-ERROR CV ERROR' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID-ERROR', 'CV', 'ERROR') in log
@@ -0,0 +1,67 @@
+import os
+import sys
+import numpy as np
+import pandas as pd
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.column_stats as cs
+
+
+@pytest.fixture(autouse=True)
+def clear_streamlit():
+    import streamlit as st
+    st.session_state.clear()
+    yield
+
+
+def test_compute_column_stats_all_rows():
+    df = pd.DataFrame({'x': [0.0, 1.0, 2.0], 'J': [-3.0, 0.0, 2.0], 'label': ['a', 'b', 'c']})
+    stats = cs.compute_column_stats(df)
+
+    assert stats['columns'] == ['x', 'J']
+    assert cs.get_stat(stats, 'min', ['J']) == -3.0
+    assert cs.get_stat(stats, 'max', ['J']) == 2.0
+    assert cs.get_stat(stats, 'min_pos', ['x']) == 1.0
+    assert cs.get_stat(stats, 'abs_min', ['J']) == 0.0
+    assert cs.get_stat(stats, 'abs_max', ['J']) == 3.0
+    # Combined over columns
+    assert cs.get_stat(stats, 'min', ['x', 'J']) == -3.0
+    assert cs.get_stat(stats, 'max', ['x', 'J']) == 2.0
+
+
+def test_compute_column_stats_grouped_by_voltage():
+    df = pd.DataFrame({'Vext': [0.5, 0.0, 0.5, 0.0], 'n': [4.0, 1.0, 3.0, -2.0]})
+    stats = cs.compute_column_stats(df, 'Vext')
+
+    assert cs.get_stat(stats, 'min', ['n'], 0.0) == -2.0
+    assert cs.get_stat(stats, 'max', ['n'], 0.5) == 4.0
+    assert cs.get_stat(stats, 'min_pos', ['n'], 0.0) == 1.0
+    assert cs.get_stat(stats, 'sum', ['n'], 0.5) == 7.0
+
+
+def test_get_stat_default_when_undefined():
+    df = pd.DataFrame({'y': [-1.0, 0.0, np.nan]})
+    stats = cs.compute_column_stats(df)
+
+    assert cs.get_stat(stats, 'min_pos', ['y'], default=0) == 0
+    assert cs.get_stat(stats, 'min', ['y']) == -1.0
+    assert cs.get_stat(stats, 'min', []) != cs.get_stat(stats, 'min', [])  # NaN default
+
+
+def test_get_file_column_stats_cached_until_file_changes(tmp_path):
+    f = tmp_path / 'JV.dat'
+    f.write_text('Vext Jext\n0 1\n')
+    df = pd.DataFrame({'Vext': [0.0], 'Jext': [1.0]})
+
+    first = cs.get_file_column_stats(str(f), df)
+    assert cs.get_file_column_stats(str(f), pd.DataFrame({'Vext': [5.0], 'Jext': [9.0]})) is first
+
+    f.write_text('Vext Jext\n0 1\n1 2\n')
+    new = cs.get_file_column_stats(str(f), pd.DataFrame({'Vext': [0.0, 1.0], 'Jext': [1.0, 2.0]}))
+    assert new is not first
+    assert cs.get_stat(new, 'max', ['Vext']) == 1.0
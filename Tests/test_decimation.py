@@ -0,0 +1,53 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.decimation as dec
+
+
+def test_lttb_small_series_unchanged():
+    x = np.arange(10)
+    assert list(dec.lttb_indices(x, x ** 2, 100)) == list(range(10))
+
+
+def test_lttb_keeps_endpoints_and_spike():
+    x = np.arange(100000, dtype=float)
+    y = np.sin(x / 5000)
+    y[42424] = 50  # single spike must survive the decimation
+    idx = dec.lttb_indices(x, y, 500)
+
+    assert len(idx) == 500
+    assert idx[0] == 0 and idx[-1] == len(x) - 1
+    assert np.all(np.diff(idx) > 0)
+    assert 42424 in idx
+
+
+def test_minmax_keeps_extremes_of_each_bucket():
+    y = np.array([0, 5, 1, 2, -3, 4, 9, 1], dtype=float)
+    idx = dec.minmax_indices(y, 4)
+
+    # buckets [0:4] and [4:8]: min/max are index 0,1 and 4,6
+    assert set([0, 1, 4, 6]).issubset(idx)
+    assert idx[-1] == len(y) - 1
+
+
+def test_scale_values_log_handles_zero_and_negative():
+    out = dec.scale_values([0, -10, 100], 'log')
+    assert out.tolist() == pytest.approx([1, 1, 2])
+
+
+def test_decimate_indices_union_over_series():
+    x = np.linspace(0, 1, 20000)
+    y1 = x.copy()
+    y2 = np.zeros_like(x)
+    y2[1234] = 1
+    idx = dec.decimate_indices(x, [y1, y2], point_budget=100)
+
+    assert 1234 in idx
+    assert len(idx) <= 200
@@ -0,0 +1,96 @@
+import os
+import sys
+import copy
+import shutil
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.device_model as dm
+
+
+def make_file():
+    return [['Description', ['comm', 'SimSS Simulation Setup:']],
+            ['General', ['par', 'T', '295', 'temperature'], ['comm', 'a comment']],
+            ['Layers', ['par', 'l1', 'L1.txt', 'layer 1']],
+            ['User interface', ['par', 'varFile', 'Var.dat', 'var file'], ['par', 'T', '1', 'same name, other section']]]
+
+
+def test_parameter_file_indexes_sections_and_parameters():
+    dev_par_file = dm.ParameterFile(make_file())
+
+    assert dev_par_file.section('Layers')[0] == 'Layers'
+    assert dev_par_file.section('Optics') is None
+    assert dev_par_file.param('varFile')[2] == 'Var.dat'
+    # Without section the first occurrence is returned
+    assert dev_par_file.param('T')[2] == '295'
+    assert dev_par_file.param('T', 'User interface')[2] == '1'
+    assert dev_par_file.param('nope') is None
+
+    # Values changed in place are visible, added parameters after a rebuild of the index
+    dev_par_file.param('T', 'General')[2] = '300'
+    dev_par_file.section('Layers').append(['par', 'l2', 'L2.txt', 'layer 2'])
+    assert dm.get_value(dev_par_file, 'T', 'General', float) == 300.0
+    assert dm.get_value(dev_par_file, 'l2', 'Layers') == 'L2.txt'
+
+    # Still a list, which compares and copies like the original
+    assert dev_par_file == dm.ParameterFile(copy.deepcopy(list(dev_par_file)))
+    assert copy.deepcopy(dev_par_file).param('l2')[2] == 'L2.txt'
+
+
+def test_lookup_functions_on_plain_lists_match_indexed_lookup():
+    plain = make_file()
+    indexed = dm.ParameterFile(make_file())
+
+    for name, section in [('T', None), ('T', 'User interface'), ('l1', 'Layers'), ('nope', None), ('varFile', 'General')]:
+        assert dm.get_param(plain, name, section) == dm.get_param(indexed, name, section)
+    assert dm.get_section(plain, 'General') == dm.get_section(indexed, 'General')
+    assert dm.get_value(plain, 'nope', default='none') == 'none'
+
+
+def test_load_device_parameters_returns_indexed_model(tmp_path):
+    resources = os.path.join(here, 'Resources')
+    for name in os.listdir(resources):
+        if name.endswith('.txt'):
+            shutil.copy(os.path.join(resources, name), tmp_path)
+
+    dev_par, layers = dm.load_device_parameters(str(tmp_path), 'simulation_setup_simss.txt', resources)
+
+    assert isinstance(dev_par, dm.DeviceParameters)
+    assert all(isinstance(dev_par_file, dm.ParameterFile) for dev_par_file in dev_par.values())
+    assert dev_par.param('simulation_setup_simss.txt', 'l1', 'Layers')[2] == layers[1][2]
+    assert dev_par.param('missing.txt', 'T') is None
+
+    # Files added later are indexed as well
+    dev_par['new.txt'] = make_file()
+    assert dev_par.param('new.txt', 'varFile')[2] == 'Var.dat'
+
+
+def test_load_device_parameters_is_cached_until_files_change(tmp_path, monkeypatch):
+    import streamlit as st
+    st.session_state.clear()
+    resources = os.path.join(here, 'Resources')
+    for name in os.listdir(resources):
+        if name.endswith('.txt'):
+            shutil.copy(os.path.join(resources, name), tmp_path)
+
+    loads = []
+    real_load = dm.utils_devpar.load_device_parameters
+    monkeypatch.setattr(dm.utils_devpar, 'load_device_parameters', lambda *a, **k: (loads.append(a), real_load(*a, **k))[1])
+
+    dev_par, layers = dm.load_device_parameters(str(tmp_path), 'simulation_setup_simss.txt', resources)
+    again, _ = dm.load_device_parameters(str(tmp_path), 'simulation_setup_simss.txt', resources)
+    assert again is dev_par and len(loads) == 1
+
+    # A changed layer file, other available layers or a reset load the files again
+    with open(tmp_path / layers[1][2], 'a', encoding='utf-8') as fp:
+        fp.write('\n')
+    dm.load_device_parameters(str(tmp_path), 'simulation_setup_simss.txt', resources)
+    dm.load_device_parameters(str(tmp_path), 'simulation_setup_simss.txt', resources)
+    assert len(loads) == 2
+    dm.load_device_parameters(str(tmp_path), 'simulation_setup_simss.txt', resources, availLayers=['L1_parameters.txt'])
+    assert len(loads) == 3
+    dm.load_device_parameters(str(tmp_path), 'simulation_setup_simss.txt', resources, True, availLayers=['L1_parameters.txt'])
+    assert len(loads) == 4
@@ -24,6 +24,8 @@ def tmp_cwd(monkeypatch, tmp_path):
     st.session_state['resource_path'] = str(tmp_path / 'Resources')
     st.session_state['simss_devpar_file'] = 'simulation_setup_simss.txt'
     st.session_state['zimt_devpar_file'] = 'simulation_setup_zimt.txt'
+    # no shared nk/spectrum files, only the ones in the session folder
+    monkeypatch.setattr(dpui.utils_optics_catalog.utils_optics_store, 'SHARED_OPTICS_PATH', str(tmp_path / 'shared'))
     yield
 
 
@@ -226,8 +228,8 @@ def test_verify_devpar_extra_parameters(tmp_path):
 
     uploaded = 'paramA = 1\nparamB = 2\nparamExtra = 99'
     valid, msg = dpui.verify_devpar_file(uploaded, 'simss', [], [])
-    # Extra params are ignored in your current implementation
-    assert valid == 0
+    # Parameters that are not in the standard file are rejected
+    assert valid == 1 and 'Line 3: unexpected parameter "paramExtra"' in msg
 
 def test_verify_devpar_malformed_lines(tmp_path):
     res = tmp_path / "Resources"
@@ -389,9 +391,8 @@ def test_verify_devpar_extra_parameters(tmp_path):
     ])
 
     valid, msg = dpui.verify_devpar_file(uploaded, "simss", [], [])
-    # The implementation actually allows extra parameters - it validates uploaded file has standard params
-    # Extra params are ignored as long as required ones match
-    assert valid == 0
+    # Parameters that are not in the standard file are rejected, the standard ones match
+    assert valid == 1 and msg.endswith('Line 3: unexpected parameter "paramC"')
 
 
 def test_store_file_names_missing_keys(monkeypatch):
@@ -483,3 +484,94 @@ def test_read_exp_file_bad_float_does_not_crash(tmp_path):
                             skip_keys=set(),
                             int_keys=set(),
                             string_keys=set())
+
+
+def test_write_pars_txt_only_writes_changed_files(tmp_path, monkeypatch):
+    session = tmp_path / 'session'
+    session.mkdir()
+    writes = []
+    real_write = dpui.write_file_atomic
+    monkeypatch.setattr(dpui, 'write_file_atomic', lambda path, content: (writes.append(os.path.basename(path)), real_write(path, content)))
+
+    dev_par = {
+        'setup.txt': [['Description'], ['Layers', ['par', 'l1', 'L1.txt', 'layer 1']]],
+        'L1.txt': [['Description'], ['General', ['par', 'L', '1e-7', 'thickness'], ['par', 'eps_r', '3', 'permittivity']]],
+    }
+    layers = [['par', 'setup', 'setup.txt', 'setup.txt'], ['par', 'l1', 'L1.txt', 'layer 1']]
+
+    changed = dpui.write_pars_txt(dev_par, layers, str(session), 'setup.txt')
+    assert sorted(writes) == ['L1.txt', 'setup.txt']
+    assert changed['L1.txt'] == {('General', 'L'), ('General', 'eps_r')}
+
+    # Nothing changed, nothing is written
+    writes.clear()
+    assert dpui.write_pars_txt(dev_par, layers, str(session), 'setup.txt') == {}
+    assert writes == []
+
+    # Only the layer with the changed parameter is written
+    dev_par['L1.txt'][1][1][2] = '2e-7'
+    changed = dpui.write_pars_txt(dev_par, layers, str(session), 'setup.txt')
+    assert writes == ['L1.txt'] and changed == {'L1.txt': {('General', 'L')}}
+    assert 'L = 2e-7' in (session / 'L1.txt').read_text()
+
+    # A file that changed on disk is written again, even when the parameters did not change
+    writes.clear()
+    (session / 'setup.txt').write_text('changed on disk')
+    dpui.write_pars_txt(dev_par, layers, str(session), 'setup.txt')
+    assert writes == ['setup.txt']
+    assert 'l1 = L1.txt' in (session / 'setup.txt').read_text()
+
+
+def test_write_pars_txt_skips_unchanged_files_without_snapshot(tmp_path, monkeypatch):
+    import streamlit as st
+    session = tmp_path / 'session'
+    session.mkdir()
+    dev_par = {'setup.txt': [['Description'], ['General', ['par', 'T', '295', 'temperature']]]}
+    layers = [['par', 'setup', 'setup.txt', 'setup.txt']]
+    dpui.write_pars_txt(dev_par, layers, str(session), 'setup.txt')
+
+    # New session state (e.g. after a reload), the content on disk is the same
+    st.session_state.clear()
+    monkeypatch.setattr(dpui, 'write_file_atomic', lambda *a: pytest.fail('unchanged file written'))
+    assert dpui.write_pars_txt(dev_par, layers, str(session), 'setup.txt') == {}
+
+
+def test_create_nk_spectrum_file_array_is_cached_until_folder_changes(tmp_path, monkeypatch):
+    session = tmp_path / 'session'
+    (session / 'Data_nk').mkdir(parents=True)
+    (session / 'Data_spectrum').mkdir()
+    (session / 'Data_nk' / 'a.txt').write_text('x')
+
+    nk, spectrum = dpui.create_nk_spectrum_file_array(str(session))
+    assert nk == ['--none--', os.path.join('Data_nk', 'a.txt')] and spectrum == ['--none--']
+
+    walks = []
+    real_scandir = os.scandir
+    monkeypatch.setattr(dpui.utils_optics_catalog.os, 'scandir', lambda path: (walks.append(path), real_scandir(path))[1])
+    nk.append('changed by the caller')
+    assert dpui.create_nk_spectrum_file_array(str(session))[0] == ['--none--', os.path.join('Data_nk', 'a.txt')]
+    assert walks == []
+
+    # Uploading a file changes the folder
+    (session / 'Data_spectrum' / 'b.txt').write_text('x')
+    assert dpui.create_nk_spectrum_file_array(str(session))[1] == ['--none--', os.path.join('Data_spectrum', 'b.txt')]
+    assert len(walks) == 1
+
+
+def test_uploads_are_parsed_in_memory(tmp_path):
+    # Use the real parser on bytes, as they come from the file uploader
+    with open(os.path.join(here, 'Resources', 'simulation_setup_simss.txt'), 'rb') as fp:
+        data = fp.read()
+
+    layers = dpui.getLayersFromSetup(data)
+    assert layers and all(layer.endswith('.txt') for layer in layers)
+    assert dpui.devpar_read_from_upload(data) == dpui.devpar_read_from_upload(data.decode('utf-8'))
+
+    import streamlit as st
+    st.session_state['resource_path'] = os.path.join(here, 'Resources')
+    st.session_state['simss_devpar_file'] = 'simulation_setup_simss.txt'
+    valid, msg = dpui.verify_devpar_file(data, 'simss', [], [])
+    assert valid in (0, 2)
+
+    # Nothing is written to the temporary folder
+    assert os.listdir(tmp_path / 'Simulations' / 'tmp') == []
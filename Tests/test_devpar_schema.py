@@ -0,0 +1,119 @@
+import os
+import sys
+import time
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.devpar_schema as schema_mod
+
+RESOURCES = os.path.join(here, 'Resources')
+
+
+def read_resource(name):
+    with open(os.path.join(RESOURCES, name), encoding='utf-8') as fp:
+        return fp.read()
+
+
+def test_schema_is_compiled_once_per_file():
+    path = os.path.join(RESOURCES, 'simulation_setup_simss.txt')
+    schema = schema_mod.get_schema(path)
+
+    assert schema is schema_mod.get_schema(path)
+    assert schema.version == '5.36'
+    # Layers are not part of the fixed order
+    assert not any(rule.name.startswith('l') and rule.section == 'Layers' for rule in schema.rules)
+    kinds = {rule.name: rule.kind for rule in schema.rules}
+    assert kinds['T'] == 'number' and kinds['nkTCO'] == 'nk' and kinds['spectrum'] == 'spectrum' and kinds['varFile'] == 'text'
+
+
+def test_standard_files_are_valid():
+    for name in ['simulation_setup_simss.txt', 'simulation_setup_zimt.txt', 'L1_parameters.txt', 'L2_parameters.txt', 'L3_parameters.txt']:
+        reference = 'L1_parameters.txt' if name.startswith('L') else name
+        errors, missing, layers = schema_mod.validate_devpar(read_resource(name), schema_mod.get_schema(os.path.join(RESOURCES, reference)))
+        assert errors == [], name
+    errors, missing, layers = schema_mod.validate_devpar(read_resource('simulation_setup_simss.txt'),
+                                                         schema_mod.get_schema(os.path.join(RESOURCES, 'simulation_setup_simss.txt')),
+                                                         {'nk': ['Data_nk/nk_SiO2.txt'], 'spectrum': []})
+    assert layers == ['L1_parameters.txt', 'L2_parameters.txt', 'L3_parameters.txt']
+    assert missing == ['Data_nk/nk_ITO.txt', 'Data_nk/nk_Au.txt', 'Data_spectrum/AM15G.txt']
+
+
+def test_validate_reports_all_errors_with_line_numbers():
+    schema = schema_mod.get_schema(os.path.join(RESOURCES, 'simulation_setup_simss.txt'))
+    lines = read_resource('simulation_setup_simss.txt').splitlines()
+
+    def replace(start, new):
+        nr = next(i for i, line in enumerate(lines) if line.startswith(start))
+        lines[nr] = new
+        return nr + 1
+
+    line_version = replace('** version', '** version: 4.0')
+    line_T = replace('T =', 'T = hot')
+    line_np = replace('NP =', 'NP = 2.5')
+    line_convvar = replace('convVar =', 'convVar = 7')
+    line_typo = replace('tolCurr =', 'tolCur = 1E-3')
+    line_format = replace('tolDens =', 'tolDens 1E-5')
+    replace('W_L =', 'W_L = sfb')
+    # Layers can be added freely
+    lines.insert(lines.index('l3 = L3_parameters.txt             * parameter file for layer 3') + 1, 'l4 = L4.txt')
+
+    errors, missing, layers = schema_mod.validate_devpar('\n'.join(lines), schema)
+
+    assert layers[-1] == 'L4.txt'
+    assert len(errors) == 6
+    # The version is reported because the parameters differ
+    assert errors[0].startswith(f'Line {line_version}: file is for version 4.0')
+    assert errors[1] == f'Line {line_T}: parameter "T" must be a number, received "hot"'
+    assert errors[2].startswith(f'Line {line_np + 1}: parameter "NP" must be an integer')
+    assert errors[3].startswith(f'Line {line_typo + 1}: expected parameter "tolCurr"')
+    assert errors[4] == f'Line {line_format + 1}: "tolDens 1E-5" is not according to the format'
+    assert errors[5] == f'Line {line_convvar + 1}: parameter "convVar" must be at most 4, received "7"'
+
+
+def test_file_of_another_version_with_the_same_parameters_is_valid():
+    schema = schema_mod.get_schema(os.path.join(RESOURCES, 'simulation_setup_simss.txt'))
+    text = read_resource('simulation_setup_simss.txt').replace('** version: 5.36', '** version: 5.20')
+
+    errors, _, _ = schema_mod.validate_devpar(text, schema)
+    assert errors == []
+
+
+def test_ranges_are_read_from_the_descriptions():
+    assert schema_mod.get_parameter_range('couplePC', '4', '>= 0, coupling between Poisson equation and continuity equations') == (0, None, False)
+    assert schema_mod.get_parameter_range('maxAcc', '0.95', '<2, max. acceleration parameter') == (None, 2, False)
+    assert schema_mod.get_parameter_range('P0', '0', '0<=P0<1, fraction of quenched excitons') == (0, 1, False)
+    assert schema_mod.get_parameter_range('convVar', '1', 'integer 1-4, selects which variable') == (1, 4, True)
+    assert schema_mod.get_parameter_range('NP', '250', 'integer, number of grid points, must be at least 5 per layer.') == (5, None, True)
+    assert schema_mod.get_parameter_range('failureMode', '2', 'how treat failed (t,V,G) points: 0: stop, 1: ignore, 2: skip') == (0, 2, True)
+    assert schema_mod.get_parameter_range('Vscan', '1', 'integer, 1 for forward sweep direction, -1 for reverse sweep') == (-1, 1, True)
+    assert schema_mod.get_parameter_range('leftElec', '-1', 'left electrode is the cathode (-1) or the anode (1)') == (-1, 1, True)
+    # Not a closed list of options, or bounds that are not stated in the description
+    assert schema_mod.get_parameter_range('ignoreNegDens', '1', 'whether(1) or not(<>1) to ignore negative densities') == (None, None, False)
+    assert schema_mod.get_parameter_range('T', '295', 'K, absolute temperature') == (0, None, False)
+    assert schema_mod.get_parameter_range('N_D', '0', 'm^-3, ionised n-doping') == (None, None, False)
+
+def test_validate_recovers_after_missing_and_added_parameters():
+    schema = schema_mod.DevparSchema([schema_mod.ParameterRule(name, None, i + 1, 'number') for i, name in enumerate(['a', 'b', 'c', 'd'])])
+
+    errors, _, _ = schema_mod.validate_devpar('a = 1\nc = 3\nd = 4', schema)
+    assert errors == ['Line 2: expected parameter "b" (line 2) and received parameter "c"']
+
+    errors, _, _ = schema_mod.validate_devpar('a = 1\nx = 0\nb = 2\nc = 3\nd = 4', schema)
+    assert errors == ['Line 2: expected parameter "b" (line 2) and received parameter "x"']
+
+    errors, _, _ = schema_mod.validate_devpar('a = 1\nb = 2', schema)
+    assert errors == ['End of file: missing parameter "c" (line 3)', 'End of file: missing parameter "d" (line 4)']
+
+
+def test_validate_many_layer_files_is_fast():
+    schema = schema_mod.get_schema(os.path.join(RESOURCES, 'L1_parameters.txt'))
+    text = read_resource('L2_parameters.txt')
+
+    start = time.perf_counter()
+    for _ in range(100):
+        errors, _, _ = schema_mod.validate_devpar(text, schema)
+    assert errors == []
+    assert time.perf_counter() - start < 1
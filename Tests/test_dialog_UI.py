@@ -10,6 +10,11 @@ if here not in sys.path:
 import utils.dialog_UI as dialog
 
 
+def read_resource(name):
+    with open(os.path.join(here, 'Resources', name), 'rb') as fp:
+        return fp.read()
+
+
 class DummyUploadFile:
     def __init__(self, name, data=b'hello'):
         self.name = name
@@ -25,6 +30,8 @@ def setup_session(monkeypatch, tmp_path):
     st.session_state.clear()
     # default availableLayerFiles needed by some dialogs (list must be long enough so insert(-3) works)
     st.session_state['availableLayerFiles'] = ['a', 'b', 'c', 'd', 'e']
+    # standard files to validate uploaded setup and layer files
+    st.session_state['resource_path'] = os.path.join(here, 'Resources')
     # monkeypatch rerun to avoid stopping tests
     monkeypatch.setattr(st, 'rerun', lambda : None)
     yield
@@ -84,7 +91,7 @@ def test_uploadFileDialog_simulation_setup_requires_all_layers(monkeypatch, tmp_
     layers = [['par', 'setup', 'setup.txt']]
 
     # Should not throw and should report missing layers via st.write
-    dialog.uploadFileDialog(str(session), dev_par, layers, 'setup.txt', 'other.txt', 'Steady State JV')
+    dialog.uploadFileDialog(str(session), dev_par, layers, 'simulation_setup_simss.txt', 'simulation_setup_zimt.txt', 'Steady State JV')
     assert any('Missing layer parameter files' or 'Missing layer' in str(x) for x in written)
 
 
@@ -96,11 +103,10 @@ def test_uploadFileDialog_simulation_setup_all_uploaded_calls_upload(monkeypatch
     import streamlit as st
     monkeypatch.setattr(st, 'selectbox', lambda *a, **k: 'Simulation setup')
 
-    file_content = 'L1_parameters.txt\nL2_parameters.txt'
-    uploadedFile = DummyUploadFile('setup.txt', data=file_content.encode('utf8'))
+    uploadedFile = DummyUploadFile('setup.txt', data=read_resource('simulation_setup_simss.txt'))
 
     # uploadedFiles list contains both files
-    uploadedLayers = [DummyUploadFile('L1_parameters.txt'), DummyUploadFile('L2_parameters.txt')]
+    uploadedLayers = [DummyUploadFile('L1_parameters.txt', read_resource('L1_parameters.txt')), DummyUploadFile('L2_parameters.txt', read_resource('L2_parameters.txt'))]
 
     # file_uploader must return uploadedFile for the first and uploadedLayers for the second
     callcount = {'n':0}
@@ -116,15 +122,37 @@ def test_uploadFileDialog_simulation_setup_all_uploaded_calls_upload(monkeypatch
     monkeypatch.setattr(dialog.utils_upload_UI, 'upload_devpar_file', lambda f, files, *a, **k: called.update({'f': f.name, 'count': len(files)}))
 
     # patch button to True to simulate submit
-    monkeypatch.setattr(st, 'button', lambda *a, **k: True)
+    disabled = []
+    monkeypatch.setattr(st, 'button', lambda *a, **k: disabled.append(k['disabled']) or True)
 
     dev_par = {}
     layers = [['par', 'setup', 'setup.txt']]
 
-    dialog.uploadFileDialog(str(session), dev_par, layers, 'setup.txt', 'other.txt', 'Steady State JV')
+    dialog.uploadFileDialog(str(session), dev_par, layers, 'simulation_setup_simss.txt', 'simulation_setup_zimt.txt', 'Steady State JV')
 
     assert called.get('f') == 'setup.txt'
     assert called.get('count') == 2
+    assert disabled == [False]
+
+
+def test_uploadFileDialog_invalid_layer_file_disables_submit(monkeypatch, tmp_path):
+    session = tmp_path / 'session'
+    session.mkdir()
+
+    import streamlit as st
+    monkeypatch.setattr(st, 'selectbox', lambda *a, **k: 'Layer parameters')
+    layer = read_resource('L1_parameters.txt').replace(b'eps_r = 5 ', b'eps_r = x ').replace(b'mu_n = 1E-6', b'mu_N = 1E-6')
+    monkeypatch.setattr(st, 'file_uploader', lambda *a, **k: DummyUploadFile('new.txt', layer))
+
+    errors, disabled = [], []
+    monkeypatch.setattr(st, 'error', lambda msg: errors.append(msg))
+    monkeypatch.setattr(st, 'button', lambda *a, **k: disabled.append(k['disabled']) or False)
+
+    dialog.uploadFileDialog(str(session), {}, [], 'simulation_setup_simss.txt', 'simulation_setup_zimt.txt', 'JV')
+
+    # All errors are reported at once
+    assert len(errors) == 1 and '"eps_r" must be a number' in errors[0] and 'expected parameter "mu_n"' in errors[0]
+    assert disabled == [True]
 
 
 def test_uploadFileDialog_layer_parameters_overwrite_warning(monkeypatch, tmp_path):
@@ -475,3 +503,22 @@ def test_removeLayerDialog_nonexistent_selected_layer(monkeypatch):
     # Layer should be removed successfully
     assert len(layers_o) == 1, "Layer should be removed"
     assert "A.txt" not in [l[2] for l in layers_o]
+
+
+def test_uploadFileDialog_invalid_nk_file_disables_submit(monkeypatch, tmp_path):
+    session = tmp_path / 'session'
+    session.mkdir()
+
+    import streamlit as st
+    monkeypatch.setattr(st, 'selectbox', lambda *a, **k: 'n,k values')
+    uploaded = [DummyUploadFile('nk_ok.txt', b'lambda n k\n300E-9 1.5 0.1\n'), DummyUploadFile('nk_bad.txt', b'lambda n k\n300E-9 1.5\n')]
+    monkeypatch.setattr(st, 'file_uploader', lambda *a, **k: uploaded)
+
+    errors, disabled = [], []
+    monkeypatch.setattr(st, 'error', lambda msg: errors.append(msg))
+    monkeypatch.setattr(st, 'button', lambda *a, **k: disabled.append(k['disabled']) or False)
+
+    dialog.uploadFileDialog(str(session), {}, [], 'simulation_setup_simss.txt', 'simulation_setup_zimt.txt', 'JV')
+
+    assert len(errors) == 1 and errors[0].startswith('nk_bad.txt')
+    assert disabled == [True]
@@ -0,0 +1,123 @@
+import os
+import sys
+import time
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.file_serving as fs
+
+
+@pytest.fixture(autouse=True)
+def clear_streamlit(monkeypatch, tmp_path):
+    import streamlit as st
+    st.session_state.clear()
+    monkeypatch.chdir(tmp_path)
+    # Set, so the value set by get_routes is undone after each test
+    monkeypatch.setenv(fs.STREAM_VARIABLE, '')
+    yield
+
+
+def test_publish_file_links_file_into_static_folder(tmp_path):
+    src = tmp_path / 'results.zip'
+    src.write_bytes(b'zipdata')
+
+    url = fs.publish_file(str(src), 'tok')
+
+    published = tmp_path / 'static' / 'downloads' / 'tok' / 'results.zip'
+    assert url == 'app/static/downloads/tok/results.zip'
+    assert published.read_bytes() == b'zipdata'
+    assert os.path.samefile(src, published)
+
+    # A new archive with the same name replaces the published file
+    src.unlink()
+    src.write_bytes(b'new')
+    fs.publish_file(str(src), 'tok')
+    assert published.read_bytes() == b'new'
+
+
+def test_publish_file_removes_expired_sessions(tmp_path):
+    src = tmp_path / 'a.dat'
+    src.write_text('a')
+    fs.publish_file(str(src), 'old')
+    old_dir = tmp_path / 'static' / 'downloads' / 'old'
+    expired = time.time() - fs.PUBLISH_TTL - 10
+    os.utime(old_dir, (expired, expired))
+
+    fs.publish_file(str(src), 'new')
+
+    assert not old_dir.exists()
+    assert (tmp_path / 'static' / 'downloads' / 'new' / 'a.dat').exists()
+
+
+def test_show_download_links_large_files_and_sends_small_files(monkeypatch, tmp_path):
+    import streamlit as st
+    links, buttons = [], []
+    monkeypatch.setattr(st, 'get_option', lambda name: True)
+    monkeypatch.setattr(st, 'markdown', lambda body, **k: links.append(body))
+    monkeypatch.setattr(st, 'download_button', lambda **k: buttons.append(k))
+    monkeypatch.setattr(fs, 'LINK_THRESHOLD', 10)
+
+    small = tmp_path / 'small.dat'
+    small.write_text('1234')
+    large = tmp_path / 'large.zip'
+    large.write_bytes(b'x' * 100)
+
+    fs.show_download('Download', str(small), 'small.dat')
+    fs.show_download('Download', str(large), 'result.zip', mime='application/zip')
+
+    assert len(buttons) == 1 and buttons[0]['data']() == b'1234'
+    assert len(links) == 1
+    assert 'download="result.zip"' in links[0]
+    assert 'app/static/downloads/' + st.session_state['downloadToken'] + '/large.zip' in links[0]
+
+    # Without static serving every file is sent with the download button
+    monkeypatch.setattr(st, 'get_option', lambda name: False)
+    fs.show_download('Download', str(large), 'result.zip')
+    assert len(buttons) == 2 and len(links) == 1
+
+
+def test_show_download_uses_streaming_endpoint_and_refuses_oversized_files(monkeypatch, tmp_path):
+    import streamlit as st
+    links, buttons, warnings = [], [], []
+    monkeypatch.setattr(st, 'get_option', lambda name: True)
+    monkeypatch.setattr(st, 'markdown', lambda body, **k: links.append(body))
+    monkeypatch.setattr(st, 'download_button', lambda **k: buttons.append(k))
+    monkeypatch.setattr(st, 'warning', lambda body: warnings.append(body))
+    monkeypatch.setattr(fs, 'LINK_THRESHOLD', 10)
+    monkeypatch.setattr(fs, 'MAX_STATIC_FILE_SIZE', 50)
+
+    large = tmp_path / 'large.zip'
+    large.write_bytes(b'x' * 100)
+
+    # Too large for the static file endpoint and never loaded into memory
+    fs.show_download('Download', str(large), 'result.zip')
+    assert len(warnings) == 1 and not links and not buttons
+
+    fs.get_routes()
+    fs.show_download('Download', str(large), 'result.zip')
+    assert len(links) == 1 and 'href="api/downloads/' + st.session_state['downloadToken'] + '/large.zip"' in links[0]
+
+
+@pytest.mark.filterwarnings('ignore:Using `httpx` with `starlette.testclient`')
+def test_streaming_endpoint_supports_range_requests(tmp_path):
+    from starlette.applications import Starlette
+    from starlette.testclient import TestClient
+    src = tmp_path / 'results.zip'
+    src.write_bytes(bytes(range(256)) * 4)
+    fs.publish_file(str(src), 'tok')
+    (tmp_path / 'static' / 'downloads' / 'secret.zip').write_bytes(b'secret')
+    client = TestClient(Starlette(routes=fs.get_routes()))
+
+    response = client.get('/api/downloads/tok/results.zip')
+    assert response.status_code == 200 and response.content == src.read_bytes()
+    response = client.get('/api/downloads/tok/results.zip', headers={'Range': 'bytes=256-511'})
+    assert response.status_code == 206 and response.content == bytes(range(256))
+
+    # Only published files can be downloaded
+    assert client.get('/api/downloads/tok/other.zip').status_code == 404
+    assert client.get('/api/downloads/../secret.zip').status_code == 404
+    assert client.get('/api/downloads/tok/results.zip.tmp').status_code == 404
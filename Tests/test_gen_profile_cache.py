@@ -0,0 +1,147 @@
+import os
+import sys
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.gen_profile_cache as gen_cache
+import utils.optics_store as store
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    import streamlit as st
+    st.session_state.clear()
+    shared = tmp_path / 'shared'
+    (shared / 'Data_nk').mkdir(parents=True)
+    (shared / 'Data_spectrum').mkdir()
+    (shared / 'Data_nk' / 'nk_Au.txt').write_text('lambda n k\n300E-9 1 2\n')
+    (shared / 'Data_nk' / 'nk_P3HT.txt').write_text('lambda n k\n300E-9 2 1\n')
+    (shared / 'Data_spectrum' / 'AM15G.txt').write_text('lambda I\n300E-9 1\n')
+    monkeypatch.setattr(store, 'SHARED_OPTICS_PATH', str(shared))
+    monkeypatch.setattr(gen_cache, 'GEN_PROFILE_CACHE_FOLDER', str(tmp_path / 'cache'))
+    session = tmp_path / 'session'
+    store.init_session_optics(str(session))
+    yield session
+    st.session_state.clear()
+
+
+def make_dev_par(genProfile='calc', L='1E-7', mu='1E-8'):
+    return {'setup.txt': [['Description'],
+                          ['Layers', ['par', 'l1', 'L1.txt', '']],
+                          ['Optics', ['par', 'G_frac', '0.5', ''], ['par', 'genProfile', genProfile, ''], ['par', 'nkBE', 'Data_nk/nk_Au.txt', ''],
+                           ['par', 'spectrum', 'Data_spectrum/AM15G.txt', ''], ['par', 'lambda_min', '3.5E-7', '']],
+                          ['User interface', ['par', 'varFile', 'Var.dat', ''], ['par', 'scParsFile', 'scPars.txt', '']]],
+            'L1.txt': [['Description'],
+                       ['General', ['par', 'L', L, '']],
+                       ['Mobilities', ['par', 'mu_n', mu, '']],
+                       ['Generation and recombination', ['par', 'layerGen', '1', ''], ['par', 'nkLayer', 'Data_nk/nk_P3HT.txt', '']]]}
+
+
+def write_var_file(path, G):
+    lines = ['x V Vext G_ehp']
+    for Vext in [0, 0.5]:
+        lines += [f'{x:.3e} 0 {Vext} {g:.3e}' for x, g in zip([0, 5e-8, 1e-7], G)]
+    path.write_text('\n'.join(lines) + '\n')
+
+
+def test_key_depends_only_on_the_optical_inputs(session):
+    key = gen_cache.get_optics_key(make_dev_par(), 'setup.txt', str(session))
+    assert key is not None and key == gen_cache.get_optics_key(make_dev_par(), 'setup.txt', str(session))
+    # An electrical parameter does not change the profile
+    assert gen_cache.get_optics_key(make_dev_par(mu='1E-6'), 'setup.txt', str(session)) == key
+    # The thickness of a layer does
+    assert gen_cache.get_optics_key(make_dev_par(L='2E-7'), 'setup.txt', str(session)) != key
+    # No key when the profile is not calculated
+    assert gen_cache.get_optics_key(make_dev_par(genProfile='none'), 'setup.txt', str(session)) is None
+    assert gen_cache.get_optics_key(None, 'setup.txt', str(session)) is None
+
+    # An uploaded nk file with the same name changes the key
+    (session / 'Data_nk' / 'nk_P3HT.txt').write_text('lambda n k\n300E-9 3 1\n')
+    assert gen_cache.get_optics_key(make_dev_par(), 'setup.txt', str(session)) != key
+
+
+def test_stored_profile_is_used_as_generation_profile_file(session):
+    key = gen_cache.get_optics_key(make_dev_par(), 'setup.txt', str(session))
+    assert gen_cache.use_cached_profile(str(session), key) is None
+
+    write_var_file(session / 'Var.dat', [2e27, 1e27, 5e26])
+    assert gen_cache.store_profile(key, str(session / 'Var.dat'), 0.5)
+
+    cmd_pars = gen_cache.use_cached_profile(str(session), key)
+    assert cmd_pars == [{'par': 'genProfile', 'val': gen_cache.CACHED_PROFILE_FILE}]
+    lines = (session / gen_cache.CACHED_PROFILE_FILE).read_text().splitlines()
+    # Only the first voltage, scaled to G_frac = 1
+    assert lines[0] == 'x G_ehp' and len(lines) == 4
+    assert float(lines[1].split()[1]) == pytest.approx(4e27)
+
+    # Nothing is stored without a generation or a profile
+    assert not gen_cache.store_profile(key, str(session / 'Var.dat'), 0)
+    assert not gen_cache.store_profile(key, str(session / 'missing.dat'), 1)
+
+
+def test_least_recently_used_profiles_are_removed(session):
+    write_var_file(session / 'Var.dat', [1, 1, 1])
+    for key in ['a', 'b', 'c']:
+        gen_cache.store_profile(key, str(session / 'Var.dat'), 1)
+        cache_path = gen_cache.get_cache_path(key)
+        os.utime(cache_path, ns=(os.stat(cache_path).st_mtime_ns, {'a': 3, 'b': 1, 'c': 2}[key]))
+
+    gen_cache.remove_old_profiles(max_profiles=2)
+    assert sorted(os.listdir(gen_cache.GEN_PROFILE_CACHE_FOLDER)) == ['a.txt', 'c.txt']
+
+
+def test_profile_is_stored_by_sessions_at_the_same_time(session, monkeypatch):
+    from concurrent.futures import ThreadPoolExecutor
+    write_var_file(session / 'Var.dat', [2e27, 1e27, 5e26])
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        stored = list(executor.map(lambda _: gen_cache.store_profile('a', str(session / 'Var.dat'), 1), range(32)))
+    assert all(stored)
+    assert os.listdir(gen_cache.GEN_PROFILE_CACHE_FOLDER) == ['a.txt']
+    with open(gen_cache.get_cache_path('a')) as fp:
+        assert len(fp.read().splitlines()) == 4
+
+    # A failure to write the cache is not raised
+    def fail(*args):
+        raise PermissionError('read-only file system')
+    monkeypatch.setattr(gen_cache.os, 'replace', fail)
+    assert not gen_cache.store_profile('b', str(session / 'Var.dat'), 1)
+    assert os.listdir(gen_cache.GEN_PROFILE_CACHE_FOLDER) == ['a.txt']
+
+def test_run_SS_JV_reuses_the_profile_of_a_previous_run(session, monkeypatch):
+    import streamlit as st
+    import utils.steady_state as ss
+
+    class DummyToast:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *a):
+            return False
+
+    calls = []
+
+    def fake_run(setup, session_path, **kwargs):
+        calls.append(kwargs.get('cmd_pars'))
+        write_var_file(session / 'Var.dat', [2e27, 1e27, 5e26])
+        return 0, 'OK'
+
+    monkeypatch.setattr(st, 'toast', lambda *a, **k: DummyToast())
+    monkeypatch.setattr(st, 'success', lambda *a, **k: None)
+    monkeypatch.setattr(ss.JV_exp, 'run_SS_JV', fake_run)
+    monkeypatch.setattr(ss.utils_devpar_UI, 'store_file_names', lambda *a, **k: None)
+    monkeypatch.setattr(ss.utils_gen_UI, 'start_results_package', lambda *a: None)
+    monkeypatch.setattr(ss.utils_gen_UI, 'get_SIMsalabim_log', lambda *a: None)
+    monkeypatch.chdir(session.parent)
+    os.makedirs('Statistics', exist_ok=True)
+
+    ss.run_SS_JV('setup.txt', str(session), make_dev_par(), [], 'ID1')
+    # Only an electrical parameter changed, the optics stage is skipped
+    ss.run_SS_JV('setup.txt', str(session), make_dev_par(mu='1E-6'), [], 'ID1')
+    # A new thickness calculates the profile again
+    ss.run_SS_JV('setup.txt', str(session), make_dev_par(L='2E-7'), [], 'ID1')
+
+    assert calls == [None, [{'par': 'genProfile', 'val': gen_cache.CACHED_PROFILE_FILE}], None]
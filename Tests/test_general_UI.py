@@ -1,7 +1,8 @@
 import os
+import io
 import sys
+import shutil
 import zipfile
-from types import SimpleNamespace
 import pytest
 
 # Ensure repo root on sys.path so top-level imports work
@@ -99,16 +100,19 @@ def test_upload_file_devpar_verify_failures(monkeypatch):
     monkeypatch.setattr(st, 'file_uploader', lambda *a, **k: DummyUpload('dev.txt', data))
 
     # simulate verify_devpar_file returning 1 -> error
-    monkeypatch.setattr(gen, 'utils_devpar', SimpleNamespace(verify_devpar_file=lambda d, t, a, s: (1, 'wrong')))
+    calls = []
+    monkeypatch.setattr(gen.utils_devpar_UI, 'verify_devpar_file', lambda d, t, a, s: calls.append(d) or (1, 'wrong'))
     errors = []
     monkeypatch.setattr(st, 'error', lambda m: errors.append(m))
 
     res = gen.upload_file('desc', [], r'^\w+$', check_devpar='simss')
     assert res is False
     assert errors
+    # The uploaded content is verified as is, not the lines used for the pattern check
+    assert calls == [data]
 
     # simulate verify returns 2 and missing files list -> warning and return uploaded_file
-    monkeypatch.setattr(gen, 'utils_devpar', SimpleNamespace(verify_devpar_file=lambda d, t, a, s: (2, ['nk1', 'spec1'])))
+    monkeypatch.setattr(gen.utils_devpar_UI, 'verify_devpar_file', lambda d, t, a, s: (2, ['nk1', 'spec1']))
     warnings = []
     monkeypatch.setattr(st, 'warning', lambda m: warnings.append(m))
 
@@ -143,11 +147,14 @@ def test_prepare_results_download_basic_and_calc(monkeypatch, tmp_path):
     for fname in ['a.txt', 'b.txt', 't1.txt', 't2.txt', 'L1.txt', 'dev.txt', 'tj.txt', 'tvg.txt']:
         (session / fname).write_text(fname)
 
-    # patch create_summary_and_cite
+    # patch get_summary_and_cite
     called = {}
-    monkeypatch.setattr(gen.utils_sum, 'create_summary_and_cite', lambda folder, flag: called.update({'flag': flag}))
+    def fake_summary(file_names, flag, nk_files=[], spectrum_files=[]):
+        called.update({'flag': flag, 'files': file_names, 'nk': nk_files})
+        return 'summary'
+    monkeypatch.setattr(gen.utils_sum, 'get_summary_and_cite', fake_summary)
 
-    # ensure operations happen in tmp_path as prepare_results_download writes the zip into the cwd
+    # ensure operations happen in tmp_path as prepare_results_download writes the zip into Simulations in the cwd
     monkeypatch.chdir(tmp_path)
     # call prepare_results_download for zimt and CV exp_type
     gen.prepare_results_download(str(session), 'ID1', 'zimt', 'CV')
@@ -156,6 +163,14 @@ def test_prepare_results_download_basic_and_calc(monkeypatch, tmp_path):
     zipname = tmp_path / 'Simulations' / 'simulation_results_ID1.zip'
     assert zipname.exists()
     assert called.get('flag') is False
+    # Files are added straight from the session folder, without a tmp copy
+    assert not (session / 'tmp').exists()
+    assert not list((tmp_path / 'Simulations').glob('*.tmp'))
+    with zipfile.ZipFile(zipname) as z:
+        assert z.read('a.txt') == b'a.txt'
+        assert z.read('SUMMARY_AND_HOW_TO_CITE.txt') == b'summary'
+        assert z.getinfo('a.txt').compress_type == zipfile.ZIP_DEFLATED
+    assert 'a.txt' in called['files'] and 'SUMMARY_AND_HOW_TO_CITE.txt' not in called['files']
 
     # Now test genProfile == 'calc' copies Data_nk/Data_spectrum files and calls summary True
     st.session_state['genProfile'] = 'calc'
@@ -170,8 +185,92 @@ def test_prepare_results_download_basic_and_calc(monkeypatch, tmp_path):
     gen.prepare_results_download(str(session), 'ID2', 'zimt', 'IMPS')
     assert (tmp_path / 'Simulations' / 'simulation_results_ID2.zip').exists()
     assert called.get('flag') is True
+    assert called['nk'] == ['nk1.txt']
+    with zipfile.ZipFile(tmp_path / 'Simulations' / 'simulation_results_ID2.zip') as z:
+        assert 'Data_nk/nk1.txt' in z.namelist() and 'Data_spectrum/sp1.txt' in z.namelist()
+
+    # Without compression, all files are stored as is
+    gen.prepare_results_download(str(session), 'ID3', 'zimt', 'IMPS', compression='store')
+    with zipfile.ZipFile(tmp_path / 'Simulations' / 'simulation_results_ID3.zip') as z:
+        assert {info.compress_type for info in z.infolist()} == {zipfile.ZIP_STORED}
+
+
+def test_get_zip_compression():
+    assert gen.get_zip_compression('freqZ.dat', 'deflate', 9) == (zipfile.ZIP_DEFLATED, 9)
+    assert gen.get_zip_compression('plot.PNG', 'deflate', 9) == (zipfile.ZIP_STORED, None)
+    assert gen.get_zip_compression('Var.dat', 'store') == (zipfile.ZIP_STORED, None)
+    # zstd falls back to deflate when zipfile does not support it
+    expected = zipfile.ZIP_ZSTANDARD if hasattr(zipfile, 'ZIP_ZSTANDARD') else zipfile.ZIP_DEFLATED
+    assert gen.get_zip_compression('Var.dat', 'zstd', 3) == (expected, 3)
+
+
+def test_write_results_archive_replaces_archive(tmp_path):
+    (tmp_path / 'Var.dat').write_text('x y\n' + '0 1\n' * 5000)
+    (tmp_path / 'JV.dat').write_text('Vext Jext\n0 1\n')
+    entries = [(str(tmp_path / 'Var.dat'), 'Var.dat'), (str(tmp_path / 'JV.dat'), 'JV.dat')]
+    zip_name = str(tmp_path / 'results.zip')
+    gen.write_results_archive(zip_name, entries, 'summary 1')
+
+    (tmp_path / 'JV.dat').write_text('Vext Jext\n0 2\n')
+    gen.write_results_archive(zip_name, entries, 'summary 2')
+
+    with zipfile.ZipFile(zip_name) as z:
+        assert z.testzip() is None
+        assert z.namelist() == ['Var.dat', 'JV.dat', 'SUMMARY_AND_HOW_TO_CITE.txt']
+        assert z.getinfo('Var.dat').compress_type == zipfile.ZIP_DEFLATED
+        assert z.read('Var.dat') == (tmp_path / 'Var.dat').read_bytes()
+        assert z.read('JV.dat') == b'Vext Jext\n0 2\n'
+        assert z.read('SUMMARY_AND_HOW_TO_CITE.txt') == b'summary 2'
+    assert not list(tmp_path.glob('*.tmp'))
+
+
+def test_start_results_package_writes_archive_in_background(monkeypatch, tmp_path):
+    import streamlit as st
+    (tmp_path / 'Simulations').mkdir()
+    (tmp_path / 'Var.dat').write_text('x y\n0 1\n')
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(gen, 'get_results_manifest', lambda *a: ([(str(tmp_path / 'Var.dat'), 'Var.dat')], 'summary'))
+    st.session_state['runSimulation'] = True
+
+    gen.start_results_package(str(tmp_path), 'ID1', 'simss', 'SS_JV')
+    first = st.session_state['resultsPackage']['future']
+    assert st.session_state['runSimulation'] is False
+
+    # A second package of the same session continues from the first one
+    gen.start_results_package(str(tmp_path), 'ID1', 'simss', 'SS_JV')
+    second = st.session_state['resultsPackage']['future']
+    assert second is not first
+    second.result(timeout=10)
+    assert first.done()
+    with zipfile.ZipFile(tmp_path / 'Simulations' / 'simulation_results_ID1.zip') as z:
+        assert z.read('Var.dat') == b'x y\n0 1\n'
 
 
+def test_results_download_stops_polling_when_the_package_is_ready(monkeypatch, tmp_path):
+    import streamlit as st
+    from concurrent.futures import Future
+    fragments, reruns, downloads = [], [], []
+    monkeypatch.setattr(st, 'fragment', lambda run_every=None: lambda func: (fragments.append((run_every, func)), func)[1])
+    monkeypatch.setattr(st, 'rerun', lambda **k: reruns.append(k))
+    monkeypatch.setattr(st, 'caption', lambda *a: None)
+    monkeypatch.setattr(gen.utils_file_serving, 'show_download', lambda *a, **k: downloads.append(a))
+    id_session = '1700000000000000'
+    future = Future()
+    st.session_state['runSimulation'] = False
+    st.session_state['resultsPackage'] = {'id': id_session, 'future': future, 'zip_file_name': str(tmp_path / 'results.zip')}
+
+    gen.show_results_download(str(tmp_path), id_session, 'simss', 'SS_JV')
+    run_every, fragment = fragments[-1]
+    assert run_every == gen.PACKAGE_POLL_INTERVAL and not reruns
+
+    # The polling fragment reruns the page once when the package is ready, the page then declares it without polling
+    future.set_result(None)
+    fragment()
+    assert reruns == [{}] and not downloads
+
+    gen.show_results_download(str(tmp_path), id_session, 'simss', 'SS_JV')
+    assert fragments[-1][0] is None and reruns == [{}] and len(downloads) == 1
+
 def test_prepare_results_download_invalid_inputs(monkeypatch, tmp_path):
     session = tmp_path / 'session'
     session.mkdir()
@@ -187,18 +286,48 @@ def test_prepare_results_download_invalid_inputs(monkeypatch, tmp_path):
     assert errors and 'Wrong experiment type' in errors[0]
 
 
-def test_exchangeDevPar_invokes_run(monkeypatch, tmp_path):
-    # simulate subprocess.run
-    class R:
-        def __init__(self, rc):
-            self.returncode = rc
+def test_exchangeDevPar_copies_shared_parameters(tmp_path):
+    resources = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Resources')
+    for name in ['simulation_setup_simss.txt', 'simulation_setup_zimt.txt']:
+        shutil.copy(os.path.join(resources, name), tmp_path)
 
-    monkeypatch.setattr(gen, 'run', lambda *a, **k: R(7))
-    rc = gen.exchangeDevPar(str(tmp_path), 'src.txt', 'tgt.txt')
-    assert rc == 7
+    # Once the files are in sync, there is nothing to exchange and the ZimT file is not written
+    with open(tmp_path / 'simulation_setup_simss.txt', encoding='utf-8') as fp:
+        simss = gen.utils_devpar.devpar_read_from_txt(fp)
+    assert gen.exchangeDevPar(str(tmp_path), 'simulation_setup_simss.txt', 'simulation_setup_zimt.txt', simss) != []
+    zimt_mtime = os.stat(tmp_path / 'simulation_setup_zimt.txt').st_mtime_ns
+    assert gen.exchangeDevPar(str(tmp_path), 'simulation_setup_simss.txt', 'simulation_setup_zimt.txt', simss) == []
+    assert os.stat(tmp_path / 'simulation_setup_zimt.txt').st_mtime_ns == zimt_mtime
 
+    # Change a shared parameter, a SimSS only parameter and add a layer
+    for section in simss:
+        for param in section[1:]:
+            if param[0] == 'par' and param[1] in ['T', 'G_frac']:
+                param[2] = '300'
+        if section[0] == 'Layers':
+            section.append(['par', 'l4', 'L4_parameters.txt', 'parameter file for layer 4'])
 
-def test_create_zip_creates_archive(tmp_path):
+    changes = gen.exchangeDevPar(str(tmp_path), 'simulation_setup_simss.txt', 'simulation_setup_zimt.txt', simss)
+
+    assert ['General', 'T', '295', '300'] in changes
+    assert ['Layers', 'l4', None, 'L4_parameters.txt'] in changes
+    assert not any(change[1] == 'G_frac' for change in changes)
+    with open(tmp_path / 'simulation_setup_zimt.txt', encoding='utf-8') as fp:
+        zimt = fp.read()
+    assert 'T = 300' in zimt and 'l4 = L4_parameters.txt' in zimt
+    assert 'G_frac' not in zimt and 'tVGFile' in zimt
+
+
+def test_exchangeDevPar_rejects_files_of_the_same_program(tmp_path):
+    resources = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'Resources')
+    shutil.copy(os.path.join(resources, 'simulation_setup_simss.txt'), tmp_path / 'a.txt')
+    shutil.copy(os.path.join(resources, 'simulation_setup_simss.txt'), tmp_path / 'b.txt')
+
+    with pytest.raises(ValueError):
+        gen.exchangeDevPar(str(tmp_path), 'a.txt', 'b.txt')
+
+
+def test_write_device_parameters_zip_creates_archive(tmp_path):
     session = tmp_path / 'session'
     session.mkdir()
 
@@ -207,12 +336,40 @@ def test_create_zip_creates_archive(tmp_path):
     (session / 'B.txt').write_text('b')
     layers = [['par', 'l0', 'A.txt'], ['par', 'l1', 'B.txt'], ['par', 'l2', 'A.txt']]
 
-    zipfile_path = gen.create_zip(str(session), layers)
+    zipfile_path = str(tmp_path / 'Device_parameters.zip')
+    gen.write_device_parameters_zip(zipfile_path, gen.get_layer_files(str(session), layers))
     assert os.path.isfile(zipfile_path)
-    # inspect contents
+    # inspect contents, a file used by several layers is added once
     with zipfile.ZipFile(zipfile_path) as z:
         names = z.namelist()
-    assert 'Device_parameters/A.txt' in names and 'Device_parameters/B.txt' in names
+    assert names == ['Device_parameters/', 'Device_parameters/A.txt', 'Device_parameters/B.txt']
+
+
+def test_get_device_parameters_zip_reuses_cached_archive(tmp_path, monkeypatch):
+    import streamlit as st
+    session = tmp_path / 'session'
+    session.mkdir()
+    (session / 'A.txt').write_text('a')
+    (session / 'B.txt').write_text('b')
+    layers = [['par', 'l0', 'A.txt'], ['par', 'l1', 'B.txt']]
+
+    built = []
+    write_zip = gen.write_device_parameters_zip
+    monkeypatch.setattr(gen, 'write_device_parameters_zip', lambda *a: built.append(1) or write_zip(*a))
+
+    data = gen.get_device_parameters_zip(str(session), layers)
+    assert gen.get_device_parameters_zip(str(session), layers) is data
+    assert len(built) == 1
+    # Nothing is written to the session folder
+    assert not (session / 'Device_parameters.zip').exists()
+
+    # Changing a file or the layers rebuilds the archive
+    (session / 'B.txt').write_text('b2')
+    data_2 = gen.get_device_parameters_zip(str(session), layers)
+    gen.get_device_parameters_zip(str(session), layers[:1])
+    assert len(built) == 3
+    with zipfile.ZipFile(io.BytesIO(data_2)) as z:
+        assert z.read('Device_parameters/B.txt') == b'b2'
 
 
 def test_safe_index_behaviour():
@@ -234,24 +391,36 @@ def test_save_parameters_writes_and_exchange_and_toast(monkeypatch, tmp_path):
     st.session_state['availableLayerFiles'] = ['one.txt']
 
     called = {}
-    monkeypatch.setattr(gen.utils_devpar_UI, 'write_pars_txt', lambda *a, **k: called.setdefault('written', True))
+    monkeypatch.setattr(gen.utils_devpar_UI, 'write_pars_txt', lambda *a, **k: called.setdefault('written', {'setup.txt': {('General', 'T')}}))
 
-    # exchangeDevPar should be called when exchange_target set; simulate raising and not raising
-    monkeypatch.setattr(gen, 'exchangeDevPar', lambda *a, **k: 0)
+    # exchangeDevPar should be called when exchange_target set and the setup file changed; simulate raising and not raising
+    monkeypatch.setattr(gen, 'exchangeDevPar', lambda *a, **k: called.setdefault('exchanged', [['General', 'T', '295', '300']]))
 
     # track toast called
     toasts = []
     monkeypatch.setattr(st, 'toast', lambda *a, **k: toasts.append(True))
 
     # Call with exchange_target
-    gen.save_parameters({'a':1}, [['par','l','one.txt']], str(session), 'setup.txt', exchange_target='other.txt', show_toast=True)
+    gen.save_parameters({'setup.txt':[]}, [['par','l','one.txt']], str(session), 'setup.txt', exchange_target='other.txt', show_toast=True)
     assert called.get('written', False)
+    assert called.get('exchanged', False)
     assert toasts
 
-    # Simulate exchange throwing
+    # Simulate exchange throwing, the error is shown as a warning
+    warnings = []
+    monkeypatch.setattr(st, 'warning', lambda msg, **k: warnings.append(msg))
     monkeypatch.setattr(gen, 'exchangeDevPar', lambda *a, **k: (_ for _ in ()).throw(Exception('boom')))
-    # Should swallow exception
-    gen.save_parameters({'a':1}, [['par','l','one.txt']], str(session), 'setup.txt', exchange_target='other.txt', show_toast=False)
+    gen.save_parameters({'setup.txt':[]}, [['par','l','one.txt']], str(session), 'setup.txt', exchange_target='other.txt', show_toast=False)
+    assert warnings and 'boom' in warnings[0]
+
+
+def test_save_parameters_skips_exchange_when_nothing_changed(monkeypatch, tmp_path):
+    import streamlit as st
+    st.session_state['availableLayerFiles'] = []
+    monkeypatch.setattr(gen.utils_devpar_UI, 'write_pars_txt', lambda *a, **k: {})
+    monkeypatch.setattr(gen, 'exchangeDevPar', lambda *a, **k: pytest.fail('exchange without changes'))
+
+    gen.save_parameters({}, [], str(tmp_path), 'setup.txt', exchange_target='other.txt')
 
 
 def test_format_func():
@@ -8,6 +8,7 @@ if here not in sys.path:
     sys.path.insert(0, here)
 
 import utils.impedance_func as imp_func
+import utils.run_metrics as utils_run_metrics
 
 
 class DummyToast:
@@ -21,6 +22,9 @@ class DummyToast:
         return False
 
 
+started_packages = []
+
+
 @pytest.fixture(autouse=True)
 def isolate_session_state(monkeypatch, tmp_path):
     import streamlit as st
@@ -29,6 +33,9 @@ def isolate_session_state(monkeypatch, tmp_path):
     repo_root = tmp_path
     (repo_root / 'Statistics').mkdir()
     monkeypatch.chdir(repo_root)
+    # Packaging the results is tested in test_general_UI, only record that it has been started
+    started_packages.clear()
+    monkeypatch.setattr(imp_func.utils_gen_UI, 'start_results_package', lambda *a: started_packages.append(a[2:]))
     yield
 
 
@@ -61,8 +68,8 @@ def test_run_Impedance_tvg_failure(monkeypatch, tmp_path):
 
     assert errors and 'tVG failed' in errors[0]
     # confirm log recorded the FAILED state
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'IMP1 Impedance FAILED' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('IMP1', 'Impedance', 'FAILED') in log
 
 
 @pytest.mark.parametrize('code', [0, 95])
@@ -99,8 +106,9 @@ def test_run_Impedance_success(monkeypatch, tmp_path, code):
     for k, v in imp_obj.items():
         assert f"{k} = {v}" in written
 
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'ID-SUCC Impedance SUCCESS' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID-SUCC', 'Impedance', 'SUCCESS') in log
+    assert started_packages == [('zimt', 'Impedance')]
 
 
 def test_run_Impedance_removes_existing_file(monkeypatch, tmp_path):
@@ -138,5 +146,5 @@ def test_run_Impedance_other_error(monkeypatch, tmp_path):
     imp_func.run_Impedance('devB', str(session), {'devB': {}}, [], 'ID-ERROR', {}, 'imp_out.txt')
 
     assert errors and 'crashed' in errors[0]
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'ID-ERROR Impedance ERROR' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID-ERROR', 'Impedance', 'ERROR') in log
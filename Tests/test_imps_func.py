@@ -8,6 +8,7 @@ if here not in sys.path:
     sys.path.insert(0, here)
 
 import utils.imps_func as imps_func
+import utils.run_metrics as utils_run_metrics
 
 
 class DummyToast:
@@ -21,6 +22,9 @@ class DummyToast:
         return False
 
 
+started_packages = []
+
+
 @pytest.fixture(autouse=True)
 def isolate_session_state(monkeypatch, tmp_path):
     import streamlit as st
@@ -28,6 +32,9 @@ def isolate_session_state(monkeypatch, tmp_path):
     monkeypatch.setattr(st, "toast", lambda *a, **k: DummyToast())
     (tmp_path / 'Statistics').mkdir()
     monkeypatch.chdir(tmp_path)
+    # Packaging the results is tested in test_general_UI, only record that it has been started
+    started_packages.clear()
+    monkeypatch.setattr(imps_func.utils_gen_UI, 'start_results_package', lambda *a: started_packages.append(a[2:]))
     yield
 
 
@@ -58,8 +65,8 @@ def test_run_IMPS_tvg_failure(monkeypatch, tmp_path):
     imps_func.run_IMPS('devX', str(session), {'devX': {}}, ['L1'], 'IMPS-ID', {}, 'imps_pars.txt')
 
     assert errors and 'tvG boom' in errors[0]
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'IMPS-ID IMPS FAILED' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('IMPS-ID', 'IMPS', 'FAILED') in log
 
 
 @pytest.mark.parametrize('code', [0, 95])
@@ -100,8 +107,9 @@ def test_run_IMPS_success(monkeypatch, tmp_path, code):
     for k, v in imps_obj.items():
         assert f"{k} = {v}" in written
 
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'ID-SUCCESS IMPS SUCCESS' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID-SUCCESS', 'IMPS', 'SUCCESS') in log
+    assert started_packages == [('zimt', 'IMPS')]
 
 
 def test_run_IMPS_removes_existing_file(monkeypatch, tmp_path):
@@ -145,5 +153,5 @@ def test_run_IMPS_other_error(monkeypatch, tmp_path):
     imps_func.run_IMPS('devB', str(session), {'devB': {}}, [], 'ID-ERROR', {}, 'imps_out.txt')
 
     assert errors and 'boom-other' in errors[0]
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'ID-ERROR IMPS ERROR' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID-ERROR', 'IMPS', 'ERROR') in log
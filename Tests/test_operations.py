@@ -0,0 +1,77 @@
+import os
+import sys
+import json
+import pandas as pd
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.operations as operations
+
+
+def write_records(folder, records, name='run_metrics.jsonl'):
+    folder.mkdir(exist_ok=True)
+    with open(folder / name, 'a') as fp:
+        for record in records:
+            fp.write(json.dumps(record) + '\n')
+
+
+def make_record(exp_type, timestamp, wall_time, status='SUCCESS', error_class=None, parameter_set='abc', queue_wait=0.0):
+    return {'id': '1', 'exp_type': exp_type, 'timestamp': timestamp, 'status': status, 'result_code': 0, 'error_class': error_class,
+            'queue_wait': queue_wait, 'wall_time': wall_time, 'cpu_time': None, 'peak_rss_kb': None, 'output_bytes': 10,
+            'grid_points': 250, 'parameter_set': parameter_set}
+
+
+def test_check_admin_token(monkeypatch):
+    monkeypatch.delenv(operations.ADMIN_TOKEN_VARIABLE, raising=False)
+    assert not operations.check_admin_token('')
+    monkeypatch.setenv(operations.ADMIN_TOKEN_VARIABLE, 'secret')
+    assert operations.check_admin_token('secret') and not operations.check_admin_token('wrong')
+
+
+def test_summary_of_the_runs(tmp_path):
+    stats = tmp_path / 'Statistics'
+    records = [make_record('CV', f'2026-01-01T10:00:{i:02d}', wall_time=float(i)) for i in range(1, 11)]
+    records += [make_record('Steady_State', '2026-01-01T11:00:00', 2.0, status='ERROR', error_class='exit_3', parameter_set='def'),
+                make_record('Steady_State', '2026-01-01T11:00:00', 50.0, parameter_set='def', queue_wait=1.0)]
+    # A record from before the parameter sets were recorded and a partly written line
+    write_records(stats, records[:1], 'run_metrics.jsonl.1')
+    write_records(stats, records[1:] + [{'id': '1', 'exp_type': 'CV'}])
+    with open(stats / 'run_metrics.jsonl', 'a') as fp:
+        fp.write('{"id": "2", "exp')
+
+    summary = operations.get_summary(freq='h', folder=str(stats))
+
+    assert summary['runs'] == 12
+    assert summary['throughput'].loc[pd.Timestamp('2026-01-01T10:00'), 'CV'] == 10
+    assert summary['latency'].loc['CV', 'Wall time p50 [s]'] == pytest.approx(5.5)
+    rates = summary['failure_rates']
+    assert rates.loc['Steady_State', 'Failure rate [%]'] == 50 and rates.loc['Steady_State', 'exit_3'] == 1 and rates.loc['CV', 'Failed'] == 0
+    # The CV runs overlap, the run of i s starts at i s. Both Steady_State runs are in progress at the same time.
+    assert list(summary['queue_depth']) == [5, 2]
+    assert list(summary['slowest']['Parameter set']) == ['def', 'abc']
+
+    # Only the records within the period are included
+    assert operations.get_summary(days=1, freq='h', folder=str(stats)) is None
+
+
+def test_queue_depth_of_idle_periods():
+    df = pd.DataFrame({'timestamp': pd.to_datetime(['2026-01-01T00:10', '2026-01-01T05:10', '2026-01-01T06:30']),
+                       'queue_wait': [0.0, 0.0, 0.0], 'wall_time': [60.0, 60.0, 7200.0]})
+
+    depth = operations.calc_queue_depth(df, 'h')
+
+    # No runs in progress between the first two runs, the last run is in progress during the hours after its start
+    assert list(depth) == [1, 0, 0, 0, 0, 1, 1, 1, 1]
+
+def test_disk_usage(tmp_path):
+    (tmp_path / '123').mkdir()
+    (tmp_path / '123' / 'JV.dat').write_bytes(b'x' * 2000)
+    (tmp_path / 'simulation_results_123.zip').write_bytes(b'x' * 1000)
+
+    usage = operations.get_disk_usage(str(tmp_path))
+    assert list(usage['Name']) == ['123', 'simulation_results_123.zip']
+    assert usage['Size [MB]'].sum() == pytest.approx(0.003) and usage['Files'][0] == 1
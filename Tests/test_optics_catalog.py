@@ -0,0 +1,67 @@
+import os
+import sys
+import shutil
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.optics_catalog as catalog
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    # no shared store, only the files in the session folder
+    monkeypatch.setattr(catalog.utils_optics_store, 'SHARED_OPTICS_PATH', str(tmp_path / 'shared'))
+    session = tmp_path / 'session'
+    shutil.copytree(os.path.join(here, 'Resources', 'Data_spectrum'), session / 'Data_spectrum')
+    (session / 'Data_nk').mkdir()
+    shutil.copy(os.path.join(here, 'Resources', 'Data_nk', 'nk_Au.txt'), session / 'Data_nk')
+    return session
+
+
+def test_list_optics_files_is_sorted_and_follows_the_folder(session):
+    (session / 'Data_nk' / 'nk_ag_upload.txt').write_text('lambda n k\n300E-9 1 1\n')
+
+    nk_list = catalog.list_optics_files(str(session), 'nk')
+    assert nk_list == ['--none--', 'Data_nk/nk_ag_upload.txt', 'Data_nk/nk_Au.txt']
+    assert catalog.list_optics_files(str(session), 'spectrum') == ['--none--', 'Data_spectrum/AM15G.txt']
+
+    # A removed file changes the modification time of the folder
+    os.remove(session / 'Data_nk' / 'nk_ag_upload.txt')
+    assert catalog.list_optics_files(str(session), 'nk') == ['--none--', 'Data_nk/nk_Au.txt']
+    assert catalog.list_optics_files(str(session / 'missing'), 'nk') == ['--none--']
+
+
+def test_optics_files_are_parsed_once(session, monkeypatch):
+    wavelength, n, k = catalog.load_nk(str(session), 'Data_nk/nk_Au.txt')
+    assert wavelength[0] == pytest.approx(300E-9) and n[0] == pytest.approx(1.80004) and k[0] == pytest.approx(1.9193)
+    assert len(wavelength) == len(n) == len(k)
+
+    # The parsed data is shared and read-only
+    reads = []
+    real_parse = catalog.parse_optics_data
+    monkeypatch.setattr(catalog, 'parse_optics_data', lambda *a: (reads.append(a), real_parse(*a))[1])
+    again = catalog.load_optics_data(str(session), 'Data_nk/nk_Au.txt', 'nk')
+    assert reads == [] and not again.flags.writeable
+
+    # A changed file is parsed again
+    (session / 'Data_nk' / 'nk_Au.txt').write_text('lambda n k\n400E-9 2 0.5\n500E-9 2.1 0.4\n')
+    wavelength, n, k = catalog.load_nk(str(session), 'Data_nk/nk_Au.txt')
+    assert len(reads) == 1 and list(n) == [2, 2.1]
+
+    wavelength, intensity = catalog.load_spectrum(str(session), 'Data_spectrum/AM15G.txt')
+    assert wavelength[0] == pytest.approx(280E-9)
+    assert catalog.load_nk(str(session), 'Data_nk/missing.txt') is None
+
+
+def test_parse_optics_data_rejects_invalid_files():
+    with pytest.raises(ValueError):
+        catalog.parse_optics_data('lambda n k\n300E-9 1\n', 'nk')
+    with pytest.raises(ValueError):
+        catalog.parse_optics_data('lambda I\n300E-9 abc\n', 'spectrum')
+    with pytest.raises(ValueError):
+        catalog.parse_optics_data('lambda I\n', 'spectrum')
+    assert catalog.parse_optics_data('lambda I\n300E-9 1.5\n', 'spectrum').shape == (1, 2)
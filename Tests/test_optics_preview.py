@@ -0,0 +1,92 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.optics_preview as preview
+import utils.optics_store as store
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    import streamlit as st
+    st.session_state.clear()
+    shared = tmp_path / 'shared'
+    (shared / 'Data_nk').mkdir(parents=True)
+    (shared / 'Data_spectrum').mkdir()
+    nk = {'nk_glass.txt': (1.5, 0), 'nk_TCO.txt': (1.9, 0.01), 'nk_abs.txt': (2.2, 0.5), 'nk_metal.txt': (0.2, 3.5)}
+    for name, (n, k) in nk.items():
+        (shared / 'Data_nk' / name).write_text(f'lambda n k\n300E-9 {n} {k}\n900E-9 {n} {k}\n')
+    (shared / 'Data_spectrum' / 'flat.txt').write_text('lambda I\n300E-9 1E9\n900E-9 1E9\n')
+    monkeypatch.setattr(store, 'SHARED_OPTICS_PATH', str(shared))
+    yield str(tmp_path / 'session')
+    st.session_state.clear()
+
+
+def make_dev_par(L_abs='1E-7', genProfile='calc'):
+    setup = [['Description'],
+             ['Optics', ['par', 'genProfile', genProfile, ''], ['par', 'L_TCO', '50E-9', ''], ['par', 'L_BE', '100E-9', ''],
+              ['par', 'nkSubstrate', 'Data_nk/nk_glass.txt', ''], ['par', 'nkTCO', 'Data_nk/nk_TCO.txt', ''], ['par', 'nkBE', 'Data_nk/nk_metal.txt', ''],
+              ['par', 'spectrum', 'Data_spectrum/flat.txt', ''], ['par', 'lambda_min', '4E-7', ''], ['par', 'lambda_max', '8E-7', '']]]
+    layer = [['Description'], ['General', ['par', 'L', L_abs, '']], ['Generation and recombination', ['par', 'nkLayer', 'Data_nk/nk_abs.txt', '']]]
+    dev_par = {'setup.txt': setup, 'L1.txt': layer}
+    layers = [['par', 'setup', 'setup.txt'], ['par', 'l1', 'L1.txt']]
+    return dev_par, layers
+
+
+def test_field_amplitudes_conserve_energy():
+    wavelengths = np.linspace(400e-9, 800e-9, 101)
+    n_layers = [np.full(wavelengths.shape, 2 + 0.3j), np.full(wavelengths.shape, 0.2 + 3j)]
+    amplitudes, r, t = preview.calc_field_amplitudes(wavelengths, 1.5, n_layers, [100e-9, 50e-9])
+    assert amplitudes.shape == (2, 101, 2)
+
+    absorbed = 0
+    for amplitude, n, d in zip(amplitudes, [2 + 0.3j, 0.2 + 3j], [100e-9, 50e-9]):
+        x = np.linspace(0, d, 2001)
+        phase = 2j * np.pi * n * x[None, :] / wavelengths[:, None]
+        field = amplitude[:, 0, None] * np.exp(phase) + amplitude[:, 1, None] * np.exp(-phase)
+        absorbed = absorbed + np.trapezoid(4 * np.pi * n.imag / wavelengths[:, None] * n.real / 1.5 * np.abs(field)**2, x, axis=1)
+
+    # Reflected, transmitted (into air) and absorbed light add up to the incident light
+    assert np.allclose(np.abs(r)**2 + np.abs(t)**2 / 1.5 + absorbed, 1, atol=1e-5)
+
+
+def test_optics_preview_of_the_layer_stack(session):
+    dev_par, layers = make_dev_par()
+    result, msg = preview.calc_optics_preview(dev_par, layers, 'setup.txt', session)
+    assert msg == '' and list(result['layers']['Layer']) == ['TCO', 'l1 (L1.txt)', 'Back electrode']
+
+    # The photons are reflected or absorbed, the metal transmits almost nothing
+    total = result['layers']['Absorbed photons [%]'].sum() + 100 * result['R']
+    assert 98 < total <= 100
+    # The generation profile covers the stack, the maximum Jsc follows from the generation in the layer
+    assert result['x'][0] == pytest.approx(-50e-9) and result['x'][-1] == pytest.approx(200e-9)
+    assert result['layers']['Max. Jsc [Am⁻²]'][1] > 0
+
+    # A thicker absorber absorbs more
+    thick, _ = preview.calc_optics_preview(*make_dev_par(L_abs='3E-7'), 'setup.txt', session)
+    assert thick['layers']['Max. Jsc [Am⁻²]'][1] > result['layers']['Max. Jsc [Am⁻²]'][1]
+
+
+def test_optics_preview_reports_missing_files(session):
+    dev_par, layers = make_dev_par()
+    dev_par['L1.txt'][2][1][2] = 'Data_nk/missing.txt'
+    result, msg = preview.calc_optics_preview(dev_par, layers, 'setup.txt', session)
+    assert result is None and 'l1 (L1.txt)' in msg
+
+
+def test_show_optics_preview_only_when_profile_is_calculated(session, monkeypatch):
+    import streamlit as st
+    calls = []
+    monkeypatch.setattr(preview, 'calc_optics_preview', lambda *a: (calls.append(a), (None, 'x'))[1])
+    monkeypatch.setattr(st, 'warning', lambda *a, **k: None)
+
+    preview.show_optics_preview(*make_dev_par(genProfile='none'), 'setup.txt', session)
+    assert calls == []
+    preview.show_optics_preview(*make_dev_par(), 'setup.txt', session)
+    assert len(calls) == 1
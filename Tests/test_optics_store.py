@@ -0,0 +1,64 @@
+import os
+import sys
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.optics_store as store
+import utils.optics_catalog as catalog
+
+
+@pytest.fixture
+def shared(tmp_path, monkeypatch):
+    shared = tmp_path / 'shared'
+    (shared / 'Data_nk').mkdir(parents=True)
+    (shared / 'Data_spectrum').mkdir()
+    (shared / 'Data_nk' / 'nk_Au.txt').write_text('lambda n k\n300E-9 1 2\n')
+    (shared / 'Data_nk' / 'nk_Ag.txt').write_text('lambda n k\n300E-9 3 4\n')
+    (shared / 'Data_spectrum' / 'AM15G.txt').write_text('lambda I\n300E-9 1\n')
+    monkeypatch.setattr(store, 'SHARED_OPTICS_PATH', str(shared))
+    return shared
+
+
+def test_session_overlay_is_resolved_before_shared_store(tmp_path, shared):
+    session = tmp_path / 'session'
+    store.init_session_optics(str(session))
+    assert os.listdir(session / 'Data_nk') == [] and os.listdir(session / 'Data_spectrum') == []
+
+    # Uploaded files are added to the shared files, an upload with the same name replaces the shared file
+    (session / 'Data_nk' / 'nk_Au.txt').write_text('lambda n k\n300E-9 5 6\n')
+    (session / 'Data_nk' / 'nk_upload.txt').write_text('lambda n k\n300E-9 7 8\n')
+
+    assert catalog.list_optics_files(str(session), 'nk') == ['--none--', 'Data_nk/nk_Ag.txt', 'Data_nk/nk_Au.txt', 'Data_nk/nk_upload.txt']
+    assert catalog.resolve_optics_file(str(session), 'Data_nk/nk_Au.txt') == os.path.join(str(session), 'Data_nk/nk_Au.txt')
+    assert catalog.resolve_optics_file(str(session), 'Data_nk/nk_Ag.txt') == os.path.join(str(shared), 'Data_nk/nk_Ag.txt')
+    assert list(catalog.load_nk(str(session), 'Data_nk/nk_Au.txt')[1]) == [5]
+    assert list(catalog.load_nk(str(session), 'Data_nk/nk_Ag.txt')[1]) == [3]
+
+
+def test_referenced_shared_files_are_linked_into_the_session(tmp_path, shared):
+    session = tmp_path / 'session'
+    store.init_session_optics(str(session))
+    dev_par = {'setup.txt': [['Description'], ['Optics', ['par', 'nkSubstrate', 'Data_nk/nk_Au.txt', ''], ['par', 'nkTCO', 'none', ''],
+                                                          ['par', 'spectrum', 'Data_spectrum/AM15G.txt', '']]],
+               'L1.txt': [['Description'], ['Generation and recombination', ['par', 'nkLayer', 'Data_nk/nk_Ag.txt', '']]]}
+
+    file_names = store.get_referenced_optics_files(dev_par)
+    assert file_names == ['Data_nk/nk_Ag.txt', 'Data_nk/nk_Au.txt', 'Data_spectrum/AM15G.txt']
+
+    # An uploaded file is kept, the others are linked
+    (session / 'Data_nk' / 'nk_Ag.txt').write_text('uploaded')
+    assert store.link_optics_files(str(session), file_names + ['Data_nk/missing.txt']) == ['Data_nk/nk_Au.txt', 'Data_spectrum/AM15G.txt']
+    assert (session / 'Data_nk' / 'nk_Ag.txt').read_text() == 'uploaded'
+    assert os.path.samefile(session / 'Data_nk' / 'nk_Au.txt', shared / 'Data_nk' / 'nk_Au.txt')
+    assert store.link_optics_files(str(session), file_names) == []
+
+    # An upload over a linked file never changes the shared file
+    target = str(session / 'Data_nk' / 'nk_Au.txt')
+    store.prepare_upload_target(target)
+    with open(target, 'w') as fp:
+        fp.write('new upload')
+    assert (shared / 'Data_nk' / 'nk_Au.txt').read_text() == 'lambda n k\n300E-9 1 2\n'
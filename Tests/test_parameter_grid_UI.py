@@ -0,0 +1,111 @@
+import os
+import sys
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.parameter_grid_UI as grid_ui
+
+
+class DummyCtx:
+    def __init__(self, open=None):
+        self.open = open
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *a):
+        return False
+
+
+@pytest.fixture(autouse=True)
+def clear_streamlit():
+    import streamlit as st
+    st.session_state.clear()
+    st.session_state['trapFiles'] = ['none', 'traps.txt']
+    yield
+
+
+def make_setup():
+    return [['Description', ['comm', 'SimSS Simulation Setup:']],
+            ['General', ['par', 'T', '295', 'temperature'], ['par', 'L', '1E-7', 'thickness'], ['comm', 'a comment'], ['par', 'eps_r', '3', 'permittivity']],
+            ['Layers', ['par', 'l1', 'L1.txt', 'layer 1']],
+            ['Optics', ['par', 'nkSubstrate', 'Data_nk/nk_SiO2.txt', 'substrate'], ['par', 'nkBE', 'Data_nk/missing.txt', 'back electrode'],
+             ['par', 'spectrum', 'Data_spectrum/AM15G.txt', 'spectrum'], ['par', 'lambda_min', '3.5E-7', 'minimum wavelength']],
+            ['User interface', ['par', 'pauseAtEnd', '1', 'pause'], ['par', 'bulkTrapFile', 'gone.txt', 'traps']]]
+
+
+def test_split_section_keeps_order_of_parameters_and_comments():
+    blocks = grid_ui.split_section(make_setup()[1])
+    assert [b[0] for b in blocks] == ['number', 'comm', 'number']
+    assert [p[1] for p in blocks[0][1]] == ['T', 'L'] and blocks[1][1] == 'a comment'
+
+    blocks = grid_ui.split_section(make_setup()[3])
+    assert [b[0] for b in blocks] == ['nk', 'spectrum', 'number']
+    assert len(blocks[0][1]) == 2
+
+
+def test_show_parameter_sections_applies_grid_edits(monkeypatch):
+    import streamlit as st
+    dev_par = {'setup.txt': make_setup()}
+    grids, expanders, toasts = {}, [], []
+
+    def fake_editor(data, key, column_config, **kwargs):
+        grids[key] = (data.copy(), column_config)
+        edited = data.copy()
+        if list(data['Parameter']) == ['T', 'L']:
+            edited.loc[0, 'Value'] = 300.0
+        return edited
+
+    monkeypatch.setattr(st, 'data_editor', fake_editor)
+    monkeypatch.setattr(st, 'expander', lambda title, expanded, **k: (expanders.append((title, expanded)), DummyCtx())[1])
+    monkeypatch.setattr(st, 'write', lambda *a, **k: None)
+    monkeypatch.setattr(st, 'toast', lambda msg, **k: toasts.append(msg))
+
+    grid_ui.show_parameter_sections(dev_par, 'setup.txt', ['--none--', 'Data_nk/nk_SiO2.txt'], ['--none--', 'Data_spectrum/AM15G.txt'])
+
+    setup = dev_par['setup.txt']
+    # Edits are applied to the device parameters
+    assert setup[1][1][2] == '300' and setup[1][2][2] == '1E-7'
+    # Unknown files are replaced, pauseAtEnd is forced to 0
+    assert setup[3][2][2] == '--none--'
+    assert setup[4][1][2] == '0' and setup[4][2][2] == 'none' and toasts
+    # One grid per block, no grid for the layers, dropdowns for the file references
+    assert len(grids) == 7
+    assert not any('Layers' in key for key in grids)
+    assert expanders[0] == ('General', True) and expanders[1][1] is False
+    nk_grid = next(grid for key, grid in grids.items() if 'Optics-0' in key)
+    assert nk_grid[1]['Value']['type_config']['type'] == 'selectbox'
+    # Numerical parameters are edited as numbers
+    general_grid = next(grid for key, grid in grids.items() if 'General-0' in key)
+    assert general_grid[1]['Value']['type_config']['type'] == 'number' and list(general_grid[0]['Value']) == [295.0, 1e-7]
+
+
+def test_format_number_keeps_notation_of_unchanged_values():
+    assert grid_ui.format_number(1e-7, '1E-7') == '1E-7'
+    assert grid_ui.format_number(300.0, '295') == '300'
+    assert grid_ui.format_number(2.5e-8, '1E-7') == '2.5E-08'
+    # Parameters that also accept a keyword are edited as text
+    assert grid_ui.get_editor_type('W_L', '4.05') == 'text' and grid_ui.get_editor_type('W_L', 'sfb') == 'text'
+    assert grid_ui.get_editor_type('NP', '400') == 'number' and grid_ui.get_editor_type('genProfile', 'calc') == 'text'
+
+
+def test_show_parameter_sections_skips_grids_of_closed_sections(monkeypatch):
+    import streamlit as st
+    dev_par = {'setup.txt': make_setup()}
+    keys = []
+    monkeypatch.setattr(st, 'data_editor', lambda data, key, **k: (keys.append(key), data)[1])
+    # Only the sections that are expanded by default are open
+    monkeypatch.setattr(st, 'expander', lambda title, expanded, **k: DummyCtx(open=expanded))
+    monkeypatch.setattr(st, 'write', lambda *a, **k: None)
+    monkeypatch.setattr(st, 'toast', lambda msg, **k: None)
+
+    grid_ui.show_parameter_sections(dev_par, 'setup.txt', ['--none--'], ['--none--'])
+
+    assert keys and all('General' in key for key in keys)
+    # The values of closed sections are still checked
+    setup = dev_par['setup.txt']
+    assert setup[4][1][2] == '0' and setup[4][2][2] == 'none' and setup[3][1][2] == '--none--'
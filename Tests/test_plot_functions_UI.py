@@ -373,3 +373,88 @@ def test_create_UI_component_plot_twinx_empty_selections(monkeypatch):
             show_yscale_2=False,
             show_errors=False
         )
+
+
+def test_show_UI_component_plot_submits_thread_safe_draw(monkeypatch):
+    df = pd.DataFrame({'Vext': [0.0, 0.0, 1.0], 'x': [0, 1, 0], 'p1': [1, 2, 3], 'p2': [0, 0, 5]})
+    pars = {'p1': 'label1', 'p2': 'label2'}
+    submitted = {}
+
+    def fake_submit(container, draw_func, plot_opts):
+        submitted['container'] = container
+        submitted['draw'] = draw_func
+        submitted['opts'] = plot_opts
+
+    monkeypatch.setattr(pui.utils_plot_render, 'submit_plot', fake_submit)
+    import streamlit as st
+    monkeypatch.setattr(st, 'columns', lambda sizes, **k: (None, 'middle', DummyCtx()) if len(sizes) == 3 else tuple(DummyCtx() for _ in sizes))
+
+    # Outside a script run a fragment does nothing, so call the wrapped function
+    pui.show_UI_component_plot.__wrapped__(df, pars.copy(), 'x', 'X', 'Y', 'Title', 1, plt.plot, [1, 6, 3], choice_voltage=0.0, source_type='Var',
+                                           show_plot_param=False, show_yscale=False)
+
+    opts = submitted['opts']
+    assert submitted['container'] == 'middle'
+    assert submitted['draw'] is pui.draw_component_plot
+    # Only data at the chosen voltage, zero parameters removed
+    assert list(opts['data']['p1']) == [1, 2]
+    assert opts['options'] == ['p1']
+    assert opts['xlim'] is not None and opts['ylim'] is not None
+
+    # Draw on a figure that is not managed by pyplot
+    fig = plt.Figure()
+    ax = fig.subplots()
+    n_figs = len(plt.get_fignums())
+    pui.draw_component_plot(fig, ax, opts)
+    assert len(ax.lines) == 1
+    assert ax.get_xlim() == pytest.approx(opts['xlim'])
+    assert len(plt.get_fignums()) == n_figs
+
+
+def test_draw_result_JV_log_does_not_change_data():
+    df = pd.DataFrame({'Vext': [0.0, 0.5, 1.0], 'Jext': [-1e-6, 0.0, 2e-6]})
+    df_exp = pd.DataFrame({'Vext': [0.0, 0.5, 1.0], 'Jext': [-3e-6, 0.0, 4e-6]})
+    fig = plt.Figure()
+    ax = fig.subplots()
+
+    pui.draw_result_JV(fig, ax, df, 0.5, df_exp, yscale='log', xlim=(0, 1), ylim=(1e-7, 1e-5))
+
+    assert list(df['Jext']) == [-1e-6, 0.0, 2e-6]
+    sim = [ln for ln in ax.lines if ln.get_label() == 'Simulated'][0]
+    assert all(y > 0 for y in sim.get_ydata())
+    assert ax.get_legend() is not None
+    assert ax.get_ylim() == pytest.approx((1e-7, 1e-5))
+
+
+def test_create_UI_plot_options_decimates_large_series():
+    n = 20000
+    df = pd.DataFrame({'t': range(n), 'p1': [float(i % 7) for i in range(n)]})
+    pars = {'p1': 'label1'}
+    cols = [None, DummyCtx(), DummyCtx()]
+
+    opts = pui.create_UI_plot_options(df, pars, 't', 'Title', 1, plt.plot, cols, show_plot_param=False, point_budget=1000)
+    assert len(opts['data']) <= 1000
+    # Axis limits are based on the full data set
+    assert opts['xlim'][1] > n - 1
+
+    small = pui.create_UI_plot_options(df.head(100), pars, 't', 'Title', 2, plt.plot, cols, show_plot_param=False, point_budget=1000)
+    assert len(small['data']) == 100
+
+
+def test_create_UI_plot_options_in_form_with_apply_button(monkeypatch):
+    import streamlit as st
+    forms, buttons = [], []
+
+    def fake_form(key, **k):
+        forms.append(key)
+        return DummyCtx()
+
+    monkeypatch.setattr(st, 'form', fake_form)
+    monkeypatch.setattr(st, 'form_submit_button', lambda label, **k: buttons.append(label))
+    df = pd.DataFrame({'x': [0, 1, 2], 'p1': [1, 2, 3]})
+    cols = [None, DummyCtx(), DummyCtx()]
+
+    pui.create_UI_plot_options(df, {'p1': 'label1'}, 'x', 'Title', 5, plt.plot, cols)
+
+    assert forms == ['5-figure-options']
+    assert buttons == ['Apply']
@@ -0,0 +1,82 @@
+import os
+import sys
+import threading
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.plot_render as render
+
+
+class FakePlaceholder:
+    def __init__(self):
+        self.images = []
+        self.errors = []
+
+    def image(self, data, **kwargs):
+        self.images.append(data)
+
+    def error(self, msg):
+        self.errors.append(msg)
+
+
+class FakeContainer:
+    def __init__(self):
+        self.placeholders = []
+
+    def empty(self):
+        ph = FakePlaceholder()
+        self.placeholders.append(ph)
+        return ph
+
+
+def draw_line(fig, ax, xs, ys):
+    ax.plot(xs, ys)
+
+
+def test_render_png_returns_png_bytes():
+    png = render.render_png(draw_line, [0, 1, 2], [1, 4, 9])
+    assert png.startswith(b'\x89PNG')
+
+
+def test_submit_plot_outside_batch_renders_directly():
+    container = FakeContainer()
+    render.submit_plot(container, draw_line, [0, 1], [0, 1])
+
+    assert len(container.placeholders) == 1
+    assert container.placeholders[0].images[0].startswith(b'\x89PNG')
+
+
+def test_render_batch_renders_on_worker_threads_and_places_all():
+    containers = [FakeContainer() for _ in range(3)]
+    threads = []
+
+    def draw_record_thread(fig, ax, xs, ys):
+        threads.append(threading.current_thread().name)
+        ax.plot(xs, ys)
+
+    with render.render_batch():
+        for container in containers:
+            render.submit_plot(container, draw_record_thread, [0, 1], [1, 0])
+
+    for container in containers:
+        assert container.placeholders[0].images[0].startswith(b'\x89PNG')
+    assert all(name.startswith('plot-render') for name in threads)
+    # After the batch, figures are rendered directly again
+    assert getattr(render._batch, 'jobs', None) is None
+
+
+def test_render_batch_shows_error_for_failing_figure():
+    ok, bad = FakeContainer(), FakeContainer()
+
+    def draw_fail(fig, ax):
+        raise ValueError('broken data')
+
+    with render.render_batch():
+        render.submit_plot(bad, draw_fail)
+        render.submit_plot(ok, draw_line, [0, 1], [0, 1])
+
+    assert 'broken data' in bad.placeholders[0].errors[0]
+    assert ok.placeholders[0].images
@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+from types import SimpleNamespace
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.profiling as profiling
+
+
+@pytest.fixture
+def session(monkeypatch):
+    import streamlit as st
+    st.session_state.clear()
+    # Pretend to run in the script thread of a session with profiling enabled
+    monkeypatch.setattr(profiling, 'get_script_run_ctx', lambda suppress_warning=False: object())
+    monkeypatch.setenv(profiling.PROFILE_VARIABLE, '1')
+    yield st.session_state
+    st.session_state.clear()
+
+
+def test_spans_are_nested_and_finished_per_rerun(session):
+    @profiling.profiled('Load')
+    def load():
+        time.sleep(0.01)
+        return 'loaded'
+
+    with profiling.span('Sidebar'):
+        assert load() == 'loaded'
+    with profiling.span('Plot'):
+        pass
+
+    rerun = profiling.finish_rerun(session['profiler'], 'Impedance')
+    assert [(item['name'], item['depth']) for item in rerun['spans']] == [('Sidebar', 0), ('Load', 1), ('Plot', 0)]
+    assert rerun['duration'] >= rerun['spans'][0]['duration'] >= rerun['spans'][1]['duration'] >= 0.01
+    assert session['profiler'].spans == []
+
+    breakdown = profiling.get_breakdown(rerun)
+    assert list(breakdown['Stage']) == ['Sidebar', '\u2003Load', 'Plot']
+    assert 0 < breakdown['Share [%]'][0] <= 100
+
+
+
+def test_chrome_trace(session):
+    with profiling.span('Sidebar'):
+        pass
+    profiling.finish_rerun(session['profiler'], 'CV')
+    trace = profiling.get_chrome_trace(session['profiler'].reruns)
+
+    events = trace['traceEvents']
+    assert [event['name'] for event in events] == ['Rerun CV', 'Sidebar']
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+    # The span lies within the rerun, the times are in µs
+    assert events[0]['ts'] <= events[1]['ts'] and events[1]['ts'] + events[1]['dur'] <= events[0]['ts'] + events[0]['dur'] + 1
+
+
+def test_fragment_reruns_and_unfinished_runs_are_not_carried_over(session, monkeypatch):
+    ctx = SimpleNamespace(fragment_ids_this_run=None, parallel_coordinator=object())
+    monkeypatch.setattr(profiling, 'get_script_run_ctx', lambda suppress_warning=False: ctx)
+
+    # A callback and the page of the same run
+    with profiling.span('Callback'):
+        pass
+    profiling.start_rerun()
+    with profiling.span('Sidebar'):
+        pass
+    rerun = profiling.finish_rerun(session['profiler'], 'CV')
+    assert [item['name'] for item in rerun['spans']] == ['Callback', 'Sidebar']
+
+    # A rerun of only a fragment is not recorded
+    ctx.fragment_ids_this_run = ['plot']
+    with profiling.span('Plot'):
+        pass
+    assert session['profiler'].spans == []
+
+    # A run stopped before show_profile, its spans are dropped when the next run starts
+    ctx.fragment_ids_this_run, ctx.parallel_coordinator = None, object()
+    with profiling.span('Stopped'):
+        pass
+    time.sleep(0.05)
+    ctx.parallel_coordinator = object()
+    profiling.start_rerun()
+    with profiling.span('Sidebar'):
+        pass
+    rerun = profiling.finish_rerun(session['profiler'], 'CV')
+    assert [item['name'] for item in rerun['spans']] == ['Sidebar'] and rerun['duration'] < 0.05
+
+def test_nothing_is_recorded_when_disabled(session, monkeypatch):
+    monkeypatch.delenv(profiling.PROFILE_VARIABLE)
+    with profiling.span('Sidebar'):
+        pass
+    assert 'profiler' not in session
+
+    # Enabled for the session with the query parameter
+    session['profilingEnabled'] = True
+    with profiling.span('Sidebar'):
+        pass
+    assert len(session['profiler'].spans) == 1
+
+    # Never in a worker thread
+    monkeypatch.setattr(profiling, 'get_script_run_ctx', lambda suppress_warning=False: None)
+    assert profiling.get_profiler() is None
@@ -0,0 +1,60 @@
+import os
+import sys
+import json
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.run_metrics as run_metrics
+
+
+@pytest.fixture
+def stats(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    return tmp_path / 'Statistics'
+
+
+def test_run_is_recorded_in_the_background(stats, tmp_path):
+    session = tmp_path / 'session'
+    session.mkdir()
+    (session / 'old.txt').write_text('x' * 10)
+    os.utime(session / 'old.txt', (0, 0))
+    dev_par = {'setup.txt': [['Description'], ['Numerical Parameters', ['par', 'NP', '250', '']]]}
+
+    metrics = run_metrics.start_run('ID1', 'Steady_State')
+    metrics.start_solver()
+    (session / 'JV.dat').write_text('x' * 100)
+    metrics.stop_solver()
+    metrics.finish('ERROR', 3, str(session), dev_par, 'setup.txt')
+
+    assert run_metrics.flush()
+    lines = (stats / 'run_metrics.jsonl').read_text().splitlines()
+    record = json.loads(lines[-1])
+    assert (record['id'], record['exp_type'], record['status'], record['error_class']) == ('ID1', 'Steady_State', 'ERROR', 'exit_3')
+    # Only the output of this run is counted
+    assert record['output_bytes'] == 100 and record['grid_points'] == 250
+    assert record['wall_time'] >= 0 and record['queue_wait'] >= 0
+    assert set(record) >= {'timestamp', 'cpu_time', 'peak_rss_kb', 'result_code'}
+    # The same device parameters give the same parameter set
+    assert record['parameter_set'] == run_metrics.get_parameter_set(dict(dev_par)) != run_metrics.get_parameter_set({})
+
+
+def test_error_classes():
+    assert run_metrics.get_error_class('SUCCESS', 95) is None
+    assert run_metrics.get_error_class('FAILED', 1) == 'input'
+    assert run_metrics.get_error_class('ERROR', 2) == 'exit_2'
+
+
+def test_files_are_rotated_and_read_in_order(stats, monkeypatch):
+    monkeypatch.setattr(run_metrics, 'MAX_FILE_SIZE', 50)
+    monkeypatch.setattr(run_metrics, 'MAX_ROTATED_FILES', 2)
+    file_path = str(stats / 'run_metrics.jsonl')
+    for i in range(5):
+        run_metrics.write_lines(file_path, [json.dumps({'id': str(i), 'pad': 'x' * 40})])
+
+    # The oldest records have been removed
+    assert sorted(os.listdir(stats)) == ['run_metrics.jsonl', 'run_metrics.jsonl.1', 'run_metrics.jsonl.2']
+    assert [record['id'] for record in run_metrics.read_records(str(stats))] == ['2', '3', '4']
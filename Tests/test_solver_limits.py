@@ -0,0 +1,110 @@
+import os
+import sys
+import signal
+import subprocess
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.solver_limits as solver_limits
+import utils.run_metrics as run_metrics
+
+pytestmark = pytest.mark.skipif(solver_limits.resource is None, reason='resource limits are not available on Windows')
+
+
+class Usage:
+    def __init__(self, cpu_time, maxrss=0):
+        self.ru_utime = cpu_time
+        self.ru_stime = 0.0
+        self.ru_maxrss = maxrss
+
+
+@pytest.fixture
+def solver(tmp_path):
+    """Fake solver in a session folder, runs the shell command in its first argument."""
+    script = tmp_path / 'simss'
+    script.write_text('#!/bin/sh\necho "nice $(nice) cpu $(ulimit -t)"\neval "$1"\n')
+    script.chmod(0o755)
+    return tmp_path
+
+
+def test_limited_command(monkeypatch):
+    monkeypatch.setattr(solver_limits, 'CPU_TIME_LIMIT', 60)
+    monkeypatch.setattr(solver_limits, 'MEMORY_LIMIT', 1024**3)
+    monkeypatch.setattr(solver_limits, 'NICE_LEVEL', 5)
+    assert solver_limits.get_limited_command('./simss setup.txt') == 'ulimit -t 60; ulimit -v 1048576; exec nice -n 5 ./simss setup.txt'
+
+    monkeypatch.setattr(solver_limits, 'CPU_TIME_LIMIT', 0)
+    monkeypatch.setattr(solver_limits, 'MEMORY_LIMIT', 0)
+    monkeypatch.setattr(solver_limits, 'NICE_LEVEL', 0)
+    assert solver_limits.get_limited_command('./simss setup.txt') == './simss setup.txt'
+
+
+def test_limits_are_read_from_the_environment():
+    # In a new process, as the limits are read when the module is imported
+    env = dict(os.environ, SIMSALABIM_WALL_TIMEOUT='60', SIMSALABIM_CPU_TIME_LIMIT='0', SIMSALABIM_MEMORY_LIMIT='512', SIMSALABIM_NICE_LEVEL='5')
+    code = 'from utils import solver_limits as s; print(s.WALL_TIMEOUT, s.CPU_TIME_LIMIT, s.MEMORY_LIMIT, s.NICE_LEVEL)'
+    result = subprocess.run([sys.executable, '-c', code], cwd=here, env=env, stdout=subprocess.PIPE, check=True)
+    assert result.stdout.decode().split() == ['60.0', '0.0', str(512 * 1024**2), '5']
+
+
+def test_limit_of_a_stopped_solver(monkeypatch):
+    monkeypatch.setattr(solver_limits, 'CPU_TIME_LIMIT', 60)
+    assert solver_limits.get_limit(-signal.SIGTERM, Usage(1.0), timed_out=True) == 'wall_time'
+    assert solver_limits.get_limit(-signal.SIGXCPU, Usage(59.5), timed_out=False) == 'cpu_time'
+    assert solver_limits.get_limit(-signal.SIGKILL, Usage(10.0), timed_out=False) is None
+    assert solver_limits.get_limit(solver_limits.HEAP_OVERFLOW_EXIT_CODE, Usage(1.0), timed_out=False) == 'memory'
+    assert solver_limits.get_limit(95, Usage(1.0), timed_out=False) is None
+
+    assert solver_limits.get_limit_message(None) == ''
+    assert '30 minutes' in solver_limits.get_limit_message('wall_time')
+
+
+def test_tracker_of_a_subfolder(tmp_path):
+    usage = solver_limits.start_tracking(str(tmp_path))
+    try:
+        (tmp_path / 'tmp_1').mkdir()
+        assert solver_limits.get_tracker(str(tmp_path / 'tmp_1')) is usage
+        assert solver_limits.get_tracker(str(tmp_path.parent)) is None
+    finally:
+        solver_limits.stop_tracking(usage)
+    assert solver_limits.get_tracker(str(tmp_path)) is None
+
+
+def test_solver_runs_with_limits(solver, monkeypatch):
+    monkeypatch.setattr(solver_limits, 'CPU_TIME_LIMIT', 60)
+    monkeypatch.setattr(solver_limits, 'NICE_LEVEL', 10)
+    usage = solver_limits.start_tracking(str(solver))
+    try:
+        result = solver_limits.run_limited(['./simss "exit 3"'], stdout=subprocess.PIPE, cwd=str(solver), shell=True)
+    finally:
+        solver_limits.stop_tracking(usage)
+
+    assert result.returncode == 3
+    assert result.stdout.decode().split() == ['nice', '10', 'cpu', '60']
+    assert usage.processes == 1 and usage.limit is None and usage.peak_rss_kb > 0
+
+
+def test_solver_is_stopped_at_the_wall_time_limit(solver, monkeypatch):
+    monkeypatch.setattr(solver_limits, 'WALL_TIMEOUT', 0.5)
+    monkeypatch.setattr(solver_limits, 'TERMINATE_GRACE', 0.5)
+    # The solver ignores SIGTERM, so it has to be killed
+    metrics = run_metrics.start_run('ID1', 'Steady_State')
+    monkeypatch.setattr(run_metrics, 'record_run', lambda record: None)
+    metrics.start_solver(str(solver))
+    result = solver_limits.run_limited(['./simss "trap \'\' TERM; sleep 10"'], stdout=subprocess.PIPE, cwd=str(solver), shell=True)
+    metrics.finish('ERROR', result.returncode)
+
+    assert result.returncode == -signal.SIGKILL
+    assert metrics.record['limit'] == 'wall_time' and metrics.record['error_class'] == 'limit_wall_time'
+    assert metrics.record['wall_time'] < 5
+
+
+def test_install_replaces_the_run_function_of_pysimsalabim():
+    from pySIMsalabim.utils import general as sim_general
+    assert sim_general.run is solver_limits.run_limited
+    solver_limits.install()
+    assert sim_general.run is solver_limits.run_limited
@@ -8,6 +8,7 @@ if here not in sys.path:
     sys.path.insert(0, here)
 
 import utils.steady_state as ss
+import utils.run_metrics as utils_run_metrics
 
 
 class DummyToast:
@@ -21,6 +22,9 @@ class DummyToast:
         return False
 
 
+started_packages = []
+
+
 @pytest.fixture(autouse=True)
 def isolate_state(monkeypatch, tmp_path):
     import streamlit as st
@@ -29,6 +33,9 @@ def isolate_state(monkeypatch, tmp_path):
     # Use tmp_path as cwd so statistics log is written to a disposable location
     (tmp_path / 'Statistics').mkdir()
     monkeypatch.chdir(tmp_path)
+    # Packaging the results is tested in test_general_UI, only record that it has been started
+    started_packages.clear()
+    monkeypatch.setattr(ss.utils_gen_UI, 'start_results_package', lambda *a: started_packages.append(a[2:]))
     yield
 
 
@@ -121,8 +128,9 @@ def test_run_SS_JV_success_and_scPars_removal(monkeypatch, tmp_path):
     assert called.get('stored', False)
 
     # log file should contain SUCCESS
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'ID1 Steady_State SUCCESS' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID1', 'Steady_State', 'SUCCESS') in log
+    assert started_packages == [('simss', 'SS_JV')]
 
 
 def test_run_SS_JV_error_path(monkeypatch, tmp_path):
@@ -144,8 +152,8 @@ def test_run_SS_JV_error_path(monkeypatch, tmp_path):
     ss.run_SS_JV('setup.txt', str(session), dev_par, [['par','l1','L1.txt']], 'ID-ERR')
 
     assert errors and 'FAIL' in errors[0]
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'ID-ERR Steady_State ERROR' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID-ERR', 'Steady_State', 'ERROR') in log
 
 
 def test_run_SS_JV_with_missing_devpar(monkeypatch, tmp_path):
@@ -160,8 +168,8 @@ def test_run_SS_JV_with_missing_devpar(monkeypatch, tmp_path):
     ss.run_SS_JV('setup.txt', str(session), {'setup.txt': [['Description']]}, [['par','l1','L1.txt']], 'ID-NODEV')
 
     # log should contain SUCCESS for 95
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'ID-NODEV Steady_State SUCCESS' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID-NODEV', 'Steady_State', 'SUCCESS') in log
 
 
 def test_split_line_scpars_malformed_line():
@@ -198,7 +206,6 @@ def test_run_SS_JV_multiple_UI_sections(monkeypatch, tmp_path):
 
     # Should have called store_file_names
     assert stored_calls.get('stored', False)
-    # Log file should exist and contain SUCCESS
-    log_file = stats_path / 'log_file.txt'
-    log_content = log_file.read_text()
-    assert 'ID-MULTI Steady_State SUCCESS' in log_content
+    # The metrics of the run should have been recorded as SUCCESS
+    records = utils_run_metrics.read_records(str(stats_path))
+    assert (records[-1]['id'], records[-1]['exp_type'], records[-1]['status']) == ('ID-MULTI', 'Steady_State', 'SUCCESS')
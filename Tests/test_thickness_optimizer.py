@@ -0,0 +1,112 @@
+import os
+import sys
+import numpy as np
+import pytest
+
+# ensure repo root on sys.path
+here = os.path.dirname(os.path.dirname(__file__))
+if here not in sys.path:
+    sys.path.insert(0, here)
+
+import utils.thickness_optimizer as optimizer
+import utils.optics_preview as preview
+import utils.optics_store as store
+
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    import streamlit as st
+    st.session_state.clear()
+    shared = tmp_path / 'shared'
+    (shared / 'Data_nk').mkdir(parents=True)
+    (shared / 'Data_spectrum').mkdir()
+    nk = {'nk_glass.txt': (1.5, 0), 'nk_TCO.txt': (1.9, 0.01), 'nk_abs.txt': (2.2, 0.2), 'nk_HTL.txt': (1.7, 0.05), 'nk_metal.txt': (0.2, 3.5)}
+    for name, (n, k) in nk.items():
+        (shared / 'Data_nk' / name).write_text(f'lambda n k\n300E-9 {n} {k}\n900E-9 {n} {k}\n')
+    (shared / 'Data_spectrum' / 'flat.txt').write_text('lambda I\n300E-9 1E9\n900E-9 1E9\n')
+    monkeypatch.setattr(store, 'SHARED_OPTICS_PATH', str(shared))
+    session = tmp_path / 'session'
+    session.mkdir()
+    yield str(session)
+    st.session_state.clear()
+
+
+def make_dev_par():
+    setup = [['Description'],
+             ['Optics', ['par', 'genProfile', 'calc', ''], ['par', 'L_TCO', '50E-9', ''], ['par', 'L_BE', '100E-9', ''],
+              ['par', 'nkSubstrate', 'Data_nk/nk_glass.txt', ''], ['par', 'nkTCO', 'Data_nk/nk_TCO.txt', ''], ['par', 'nkBE', 'Data_nk/nk_metal.txt', ''],
+              ['par', 'spectrum', 'Data_spectrum/flat.txt', ''], ['par', 'lambda_min', '4E-7', ''], ['par', 'lambda_max', '8E-7', '']]]
+    htl = [['Description'], ['General', ['par', 'L', '3E-8', '']],
+           ['Generation and recombination', ['par', 'layerGen', '0', ''], ['par', 'nkLayer', 'Data_nk/nk_HTL.txt', '']]]
+    absorber = [['Description'], ['General', ['par', 'L', '1E-7', '']],
+                ['Generation and recombination', ['par', 'layerGen', '1', ''], ['par', 'nkLayer', 'Data_nk/nk_abs.txt', '']]]
+    dev_par = {'setup.txt': setup, 'L1.txt': htl, 'L2.txt': absorber}
+    layers = [['par', 'setup', 'setup.txt'], ['par', 'l1', 'L1.txt'], ['par', 'l2', 'L2.txt']]
+    return dev_par, layers
+
+
+def test_make_thickness_grid():
+    grid = optimizer.make_thickness_grid({1: (10e-9, 30e-9, 3), 2: (100e-9, 100e-9, 1)})
+    assert grid.shape == (3, 2)
+    assert np.allclose(grid[:, 0], [10e-9, 20e-9, 30e-9]) and np.allclose(grid[:, 1], 100e-9)
+
+    with pytest.raises(ValueError):
+        optimizer.make_thickness_grid({1: (30e-9, 10e-9, 3)})
+    with pytest.raises(ValueError):
+        optimizer.make_thickness_grid({1: (1e-9, 2e-9, 200), 2: (1e-9, 2e-9, 200)})
+
+
+def test_analytical_absorption_matches_the_preview(session):
+    dev_par, layers = make_dev_par()
+    stack, msg = preview.load_optics_stack(dev_par, layers, 'setup.txt', session)
+    assert msg == '' and stack['layer_index'] == [None, 1, 2, None]
+
+    absorption, _ = preview.calc_layer_absorption(stack['wavelengths'], stack['n_substrate'], stack['n_layers'], stack['d_layers'])
+    result, _ = preview.calc_optics_preview(dev_par, layers, 'setup.txt', session)
+    assert np.allclose(absorption, result['absorption'], atol=1e-3)
+
+    # A batch of stacks gives the same result as the stacks one by one
+    d_layers = list(stack['d_layers'])
+    d_layers[2] = np.array([[50e-9], [100e-9]])
+    batch, _ = preview.calc_layer_absorption(stack['wavelengths'], stack['n_substrate'], stack['n_layers'], d_layers)
+    assert batch.shape == (4, 2, len(stack['wavelengths']))
+    assert np.allclose(batch[:, 1], absorption)
+
+
+def test_optimize_thicknesses_ranks_the_stacks(session, monkeypatch):
+    dev_par, layers = make_dev_par()
+    monkeypatch.setattr(optimizer, 'BATCH_SIZE', 7)
+    candidates, msg = optimizer.optimize_thicknesses(dev_par, layers, 'setup.txt', session, {1: (10e-9, 50e-9, 5), 2: (50e-9, 300e-9, 6)}, top_k=3)
+
+    assert msg == '' and list(candidates.columns) == ['l1 [nm]', 'l2 [nm]', 'Est. max. Jsc [Am⁻²]']
+    assert len(candidates) == 3
+    jsc = candidates['Est. max. Jsc [Am⁻²]']
+    assert jsc.is_monotonic_decreasing
+    # A thin parasitic layer and a thick absorber
+    assert candidates['l1 [nm]'][0] == 10 and candidates['l2 [nm]'][0] >= 200
+
+    # Without a generating layer there is nothing to optimize
+    dev_par['L2.txt'][2][1][2] = '0'
+    candidates, msg = optimizer.optimize_thicknesses(dev_par, layers, 'setup.txt', session, {2: (50e-9, 300e-9, 6)})
+    assert candidates is None and 'layerGen' in msg
+
+
+def test_run_candidates_sets_the_thicknesses_on_the_command_line(session, monkeypatch):
+    import pandas as pd
+    runs = []
+
+    def fake_run(setup, session_path, **kwargs):
+        runs.append(kwargs)
+        with open(os.path.join(session_path, 'scPars_' + kwargs['UUID'] + '.txt'), 'w') as fp:
+            fp.write('Jsc ErrJsc Voc ErrVoc FF ErrFF MPP ErrMPP\n-200 0 1.1 0 0.8 0 -180 0\n')
+        return (0, 'OK') if len(runs) == 1 else (1, 'FAIL')
+
+    monkeypatch.setattr(optimizer.JV_exp, 'run_SS_JV', fake_run)
+    dev_par, _ = make_dev_par()
+    candidates = pd.DataFrame({'l2 [nm]': [250.0, 300.0], 'Est. max. Jsc [Am⁻²]': [210.0, 205.0]})
+
+    results = optimizer.run_candidates('setup.txt', session, dev_par, candidates)
+
+    assert runs[0]['cmd_pars'] == [{'par': 'l2.L', 'val': '2.500000e-07'}] and runs[0]['UUID'] == 'thickness_1'
+    assert list(results['SimSS']) == ['SUCCESS', 'ERROR']
+    assert results['Voc [V]'][0] == 1.1 and pd.isna(results['Voc [V]'][1])
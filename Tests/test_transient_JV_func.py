@@ -8,6 +8,7 @@ if here not in sys.path:
     sys.path.insert(0, here)
 
 import utils.transient_JV_func as transient_func
+import utils.run_metrics as utils_run_metrics
 
 
 class DummyToast:
@@ -21,6 +22,9 @@ class DummyToast:
         return False
 
 
+started_packages = []
+
+
 @pytest.fixture(autouse=True)
 def isolate_session_state(monkeypatch, tmp_path):
     import streamlit as st
@@ -30,6 +34,9 @@ def isolate_session_state(monkeypatch, tmp_path):
     repo_root = tmp_path
     (repo_root / "Statistics").mkdir()
     monkeypatch.chdir(repo_root)
+    # Packaging the results is tested in test_general_UI, only record that it has been started
+    started_packages.clear()
+    monkeypatch.setattr(transient_func.utils_gen_UI, 'start_results_package', lambda *a: started_packages.append(a[2:]))
     yield
 
 
@@ -63,8 +70,8 @@ def test_run_Transient_JV_tvg_failure(monkeypatch, tmp_path):
     transient_func.run_Transient_JV('devX', str(session), {'devX': {}}, ['L1'], 'ID-1', {}, 'hyst.txt')
 
     assert errors and 'tVG failed' in errors[0]
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'ID-1 Transient FAILED' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID-1', 'Transient', 'FAILED') in log
 
 
 @pytest.mark.parametrize('result_code', [0, 95])
@@ -109,8 +116,9 @@ def test_run_Transient_JV_success_sets_state_and_writes_file(monkeypatch, tmp_pa
     for k, v in obj.items():
         assert f"{k} = {v}" in content
 
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'ID-SUCCESS Transient SUCCESS' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID-SUCCESS', 'Transient', 'SUCCESS') in log
+    assert started_packages == [('zimt', 'Transient_JV')]
 
 
 def test_run_Transient_JV_removes_existing_file(monkeypatch, tmp_path):
@@ -152,5 +160,5 @@ def test_run_Transient_JV_other_error(monkeypatch, tmp_path):
     transient_func.run_Transient_JV('devZ', str(session), {'devZ': {}}, ['L1'], 'ID-ERROR', {}, 'hyst_pars.txt')
 
     assert errors and 'sim error' in errors[0]
-    log = (tmp_path / 'Statistics' / 'log_file.txt').read_text()
-    assert 'ID-ERROR Transient ERROR' in log
+    log = [(r['id'], r['exp_type'], r['status']) for r in utils_run_metrics.read_records(str(tmp_path / 'Statistics'))]
+    assert ('ID-ERROR', 'Transient', 'ERROR') in log
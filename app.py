@@ -0,0 +1,9 @@
+"""Start The Shell with the streaming download endpoint of utils/file_serving.py, which serves large result archives: streamlit run app.py"""
+######### Package Imports #########################################################################
+
+import streamlit as st
+from utils import file_serving as utils_file_serving
+
+######### App #####################################################################################
+
+app = st.App('SIMsalabim.py', routes=utils_file_serving.get_routes())
@@ -4,18 +4,23 @@
 import os
 import streamlit as st
 from menu import menu
-from pySIMsalabim.utils import device_parameters as utils_devpar
 from utils import band_diagram as utils_bd
 from utils import device_parameters_UI as utils_devpar_UI
+from utils import device_model as utils_device_model
+from utils import parameter_grid_UI as utils_grid_UI
 from utils import general_UI as utils_gen_UI
 from utils import CV_func as utils_CV
 from utils import dialog_UI as utils_dialog_UI
+from utils import profiling as utils_profiling
 
 ######### Page configuration ######################################################################
 
 st.set_page_config(layout="wide", page_title="SIMsalabim CV",
                    page_icon='./Figures/SIMsalabim_logo_HAT.jpg')
 
+# Start the profiling of this rerun, before the query parameters are replaced by the session identifier
+utils_profiling.start_rerun()
+
 # Set the session identifier as query parameter in the URL
 st.query_params.from_dict({'session':st.session_state['id']})
 
@@ -135,7 +140,7 @@ else:
         """
         utils_gen_UI.save_parameters(dev_par, layers, session_path, zimt_device_parameters, simss_device_parameters, show_toast=True)
         # Draw the band diagram
-        utils_bd.get_param_band_diagram(dev_par, layers, zimt_device_parameters)
+        utils_bd.get_param_band_diagram(dev_par, layers, zimt_device_parameters, session_path=session_path)
 
         # Force scroll to top of the page when saving the parameters, so the user sees the plotted band diagram.
         st.markdown(
@@ -165,16 +170,13 @@ else:
 
     ######### UI layout ###############################################################################
 
-    # Create lists containing the names of available nk and spectrum files. Including user uploaded ones.
+    # Create lists containing the names of available nk and spectrum files, sorted alphabetically. Including user uploaded ones.
     nk_file_list, spectrum_file_list = utils_devpar_UI.create_nk_spectrum_file_array(session_path)
-    # Sort them alphabetically
-    nk_file_list.sort(key=str.casefold)
-    spectrum_file_list.sort(key=str.casefold)
 
     # Load the device_parameters file and create a List object.
-    dev_par, layers = utils_devpar.load_device_parameters(session_path, zimt_device_parameters, zimt_path, availLayers = st.session_state['availableLayerFiles'][:-3], run_mode=True)
+    dev_par, layers = utils_device_model.load_device_parameters(session_path, zimt_device_parameters, zimt_path, availLayers = st.session_state['availableLayerFiles'][:-3], run_mode=True)
 
-    with st.sidebar:
+    with st.sidebar, utils_profiling.span('Sidebar'):
         # Show custom menu
         menu()
 
@@ -188,12 +190,11 @@ else:
         if st.button('Upload a file'):
             uploadFileDialogWrapper(session_path, dev_par, layers, zimt_device_parameters, simss_device_parameters, st.session_state['pagename'])
 
-        # Prepare a ZIP archive to download the device parameters
-        zip_filename = utils_gen_UI.create_zip(session_path, layers)
+        # Prepare a ZIP archive to download the device parameters, it is only rebuilt when the files have changed
+        zip_data = utils_gen_UI.get_device_parameters_zip(session_path, layers)
 
         # Show a button to download the ZIP archive
-        with open(zip_filename, 'rb') as fp:
-            btn = st.download_button(label='Download device parameters', data = fp, file_name = os.path.basename(zip_filename), mime='application/zip')
+        btn = st.download_button(label='Download device parameters', data = zip_data, file_name = 'Device_parameters.zip', mime='application/zip')
 
         # Reset the device parameters to the default values.
         reset_device_parameters = st.button('Reset device parameters')
@@ -202,7 +203,7 @@ else:
     # When the reset button is pressed, empty the container and create a List object from the default .txt file. Next, save the default parameters to the parameter file.
     if reset_device_parameters:
         main_container_CV.empty()
-        dev_par, layers = utils_devpar.load_device_parameters(session_path, zimt_device_parameters, resource_path, True, availLayers=st.session_state['availableLayerFiles'][:-3],run_mode = True)
+        dev_par, layers = utils_device_model.load_device_parameters(session_path, zimt_device_parameters, resource_path, True, availLayers=st.session_state['availableLayerFiles'][:-3],run_mode = True)
         utils_gen_UI.save_parameters(dev_par, layers, session_path, zimt_device_parameters, simss_device_parameters)
 
     with main_container_CV.container():
@@ -260,7 +261,8 @@ else:
                 # Store the parameters in a session state to keep track of them and prevent them from being overwritten by the default ones
                 st.session_state['CV_par'] = CV_par
             
-            fragment_CV_pars()
+            with utils_profiling.span('Experiment parameters'):
+                fragment_CV_pars()
 
             st.markdown('<hr>', unsafe_allow_html=True)
 
@@ -296,7 +298,8 @@ else:
                     if st.button('Remove a layer'):
                         removeLayerDialogWrapper(dev_par, layers, session_path, zimt_device_parameters, simss_device_parameters)
             
-            fragment_CV_device()
+            with utils_profiling.span('Device setup'):
+                fragment_CV_device()
 
             st.markdown('<hr>', unsafe_allow_html=True)
 
@@ -311,76 +314,15 @@ else:
 
             @st.fragment # Fragment for parameters, this will not automatically reload the page
             def fragment_CV():
-                # Build the UI components for the various sections
-                for par_section in dev_par[selected_layer]:
-
-                    # Skip the first section, this is the description section and is already shown at the top of the page.
-                    # Skip the layers section, this is already shown in the layer container.
-                    if not par_section[0] == 'Layers' and not par_section[0] == 'Description':
-                        # Initialize expander components for each section
-                        if (par_section[0]== 'Optics'):
-                            # Do not expand the optics section by default and add a custom description string
-                            expand=False
-                            section_title = par_section[0] + ' (Optional, use only when calculating the generation profile i.e. genProfile=calc)'
-                        elif (par_section[0]== 'Numerical Parameters' or par_section[0]== 'Voltage range of simulation' or par_section[0]== 'User interface'):
-                            # Do not expand these sections by default but use the section name as section title
-                            expand = False
-                            section_title = par_section[0]
-                        else:
-                            # Expand all other sections and use the section name as section title
-                            expand = True
-                            section_title = par_section[0]
-                        
-                        # Fill the expanders/sections with the parameters
-                        with st.expander(section_title, expanded=expand):
-                            # Split component into three columns [name, value, description]
-                            col_par, col_val, col_desc = st.columns([2, 2, 8],)
-                            
-                            for item in par_section[1:]:
-                                if item[0] == 'comm': # Item is just a comment, do not use column layout for this.
-                                    st.write(item[1])
-                                    # Reset the column layout layout to force a break between the parameters to place the comment in the correct position. 
-                                    # Otherwise all comments will be placed at either the top or bottom of the components 
-                                    col_par, col_val, col_desc = st.columns([2, 2, 8]) 
-
-                                if item[0] == 'par': # Item contains a parameter, fill all three columns
-                                    # Parameter name
-                                    with col_par:
-                                        st.text_input(item[1], value=item[1], disabled=True, label_visibility="collapsed")
-
-                                    # Parameter value
-                                    with col_val:
-                                        # Handle exceptions/special cases.
-                                        if item[1].startswith('nk'): # nk file name, use a selectbox.
-                                            if item[2] not in nk_file_list:
-                                                item[2] = '--none--'
-                                            nk_idx = utils_gen_UI.safe_index(item[2], nk_file_list, default=0)
-                                            item[2] = st.selectbox(selected_layer + item[1] + '_val', options=nk_file_list, format_func=utils_gen_UI.format_func, index=nk_idx, label_visibility="collapsed")
-                                        elif item[1] == 'spectrum': # spectrum file name, use a selectbox.
-                                            if item[2] not in spectrum_file_list:
-                                                item[2] = '--none--'
-                                            spec_idx = utils_gen_UI.safe_index(item[2], spectrum_file_list, default=0)
-                                            item[2] = st.selectbox(selected_layer + item[1] + '_val', options=spectrum_file_list, format_func=utils_gen_UI.format_func, index=spec_idx, label_visibility="collapsed")
-                                        elif item[1]== 'pauseAtEnd':
-                                            # This parameter must not be editable and forced to 0, otherwise the program will not exit/complete and hang forever.
-                                            item[2] = 0
-                                            item[2] = st.text_input(selected_layer + item[1] + '_val', value=item[2], disabled=True, label_visibility="collapsed")
-                                        elif (item[1] == 'intTrapFile') or (item[1] == 'bulkTrapFile'):
-                                            # This could be uploaded trap files,so display a list of available ones. 
-                                            if item[2] not in st.session_state['trapFiles']:
-                                                # Value from file is not recognized, replace with none
-                                                st.toast(f'Could not find file "{item[2]}" for parameter {item[1]} and has been set to none. If you want to use this file, please upload it using the "Upload trap distribution" option and associate it with the {item[1]} parameter.')
-                                                item[2] = 'none'
-                                                trap_idx = utils_gen_UI.safe_index(item[2], st.session_state['trapFiles'], default=0)
-                                                item[2] = st.selectbox(selected_layer + item[1]+ '_val', options=st.session_state['trapFiles'], index=trap_idx, label_visibility="collapsed")
-                                        else:
-                                            item[2] = st.text_input(selected_layer + item[1] + '_val', value=item[2], label_visibility="collapsed")
-                                    
-                                    # Parameter description
-                                    with col_desc:
-                                       st.text_input(item[1] + '_desc', value=item[3], disabled=True, label_visibility="collapsed")
-            fragment_CV()
+                # Build the UI components for the various sections, the parameters of each section are edited in grids
+                utils_grid_UI.show_parameter_sections(dev_par, selected_layer, nk_file_list, spectrum_file_list)
+
+            with utils_profiling.span('Parameter editor'):
+                fragment_CV()
     #  Show the SIMsalabim logo in the sidebar
     with st.sidebar:
         st.markdown('<hr>', unsafe_allow_html=True)
         st.image('./Figures/SIMsalabim_logo_cut_trans.png')
+
+    # Show the timing breakdown of this rerun when profiling is enabled
+    utils_profiling.show_profile('CV')
@@ -0,0 +1,116 @@
+"""Operations page: throughput, latency, failures, queue depth and disk usage of the simulations. Only for administrators."""
+######### Package Imports #########################################################################
+
+import os
+import matplotlib.pyplot as plt
+import streamlit as st
+from menu import menu
+from utils import general_UI as utils_gen_UI
+from utils import operations as utils_operations
+
+######### Page configuration ######################################################################
+
+st.set_page_config(layout="wide", page_title="SIMsalabim operations", page_icon='./Figures/SIMsalabim_logo_HAT.jpg')
+
+# Load custom CSS
+utils_gen_UI.local_css('./utils/style.css')
+
+# Session states for page navigation
+st.session_state['pagename'] = 'Operations'
+
+######### Parameter Initialisation ################################################################
+
+# Time window of the page and the length of a period in the time series
+PERIODS = {'Last 24 hours': (1, 'h'), 'Last 7 days': (7, 'D'), 'Last 30 days': (30, 'D'), 'All': (None, 'D')}
+
+simulation_path = os.path.join(os.getcwd(), 'Simulations')
+
+######### Function Definitions ####################################################################
+
+def show_login():
+    """Show the form to enter the token of the operations page."""
+    with st.form('adminLogin'):
+        token = st.text_input('Token', type='password')
+        if st.form_submit_button('Log in'):
+            if utils_operations.check_admin_token(token):
+                st.session_state['adminAuthorized'] = True
+                st.rerun()
+            else:
+                st.error('The token is not correct.')
+
+def plot_time_series(data, ylabel, step = False):
+    """Plot a time series with a line per column.
+
+    Parameters
+    ----------
+    data : DataFrame or Series
+        Data with the time as index
+    ylabel : string
+        Label of the y-axis
+    step : bool, optional
+        Plot as steps, by default False
+    """
+    fig, ax = plt.subplots(figsize=(15, 4))
+    if step:
+        ax.step(data.index, data.to_numpy(), where='post', color='k')
+    else:
+        for column in data.columns:
+            ax.plot(data.index, data[column], marker='.', label=column)
+        ax.legend()
+    ax.set_xlabel('Time')
+    ax.set_ylabel(ylabel)
+    st.pyplot(fig)
+    plt.close(fig)
+
+######### UI ######################################################################################
+
+with st.sidebar:
+    # Show custom menu
+    menu()
+
+st.title('Operations')
+
+if not os.environ.get(utils_operations.ADMIN_TOKEN_VARIABLE):
+    st.error(f'The operations page is disabled. Set the environment variable {utils_operations.ADMIN_TOKEN_VARIABLE} to enable it.')
+elif not st.session_state.get('adminAuthorized', False):
+    show_login()
+else:
+    days, freq = PERIODS[st.selectbox('Period', list(PERIODS), index=1)]
+    summary = utils_operations.get_summary(days, freq)
+    disk_usage = utils_operations.get_disk_usage(simulation_path)
+
+    col1, col2, col3, col4 = st.columns(4)
+    col4.metric('Disk usage Simulations', f"{disk_usage['Size [MB]'].sum():.1f} MB")
+
+    if summary is None:
+        st.info('No simulations have been recorded in this period.')
+    else:
+        col1.metric('Runs', summary['runs'])
+        col2.metric('Failure rate', f"{summary['failure_rate']:.1f}%")
+        col3.metric('Wall time p95', f"{summary['wall_time_p95']:.2f} s" if summary['wall_time_p95'] == summary['wall_time_p95'] else '-')
+
+        st.subheader('Throughput')
+        plot_time_series(summary['throughput'], 'Runs per hour' if freq == 'h' else 'Runs per day')
+
+        st.subheader('Latency')
+        st.dataframe(summary['latency'], column_config={col: st.column_config.NumberColumn(format='%.2f') for col in summary['latency'].columns[1:]})
+
+        st.subheader('Failures')
+        st.dataframe(summary['failure_rates'], column_config={'Failure rate [%]': st.column_config.NumberColumn(format='%.1f')})
+
+        st.subheader('Queue depth')
+        st.markdown('Maximum number of runs in progress (waiting for or running the solver) per period')
+        plot_time_series(summary['queue_depth'], 'Runs in progress', step=True)
+
+        st.subheader('Slowest parameter sets')
+        st.markdown('Parameter sets with the highest median wall time, a parameter set is a digest of the device parameters of a run.')
+        st.dataframe(summary['slowest'], hide_index=True, column_config={'Median wall time [s]': st.column_config.NumberColumn(format='%.2f'),
+                                                                          'Max. wall time [s]': st.column_config.NumberColumn(format='%.2f')})
+
+    st.subheader('Disk usage')
+    st.markdown(f'Largest session folders and result archives in Simulations/, updated every {utils_operations.DISK_USAGE_REFRESH // 60} minutes')
+    st.dataframe(disk_usage.head(20), hide_index=True, column_config={'Size [MB]': st.column_config.NumberColumn(format='%.2f')})
+
+    if st.button('Log out'):
+        st.session_state['adminAuthorized'] = False
+        st.rerun()
@@ -5,6 +5,7 @@ import os
 import streamlit as st
 from menu import menu
 from utils import general_UI as utils_gen_UI
+from utils import profiling as utils_profiling
 from results_pages import result_Steady_State as result_simss
 from results_pages import result_Transient_JV as result_transient
 from results_pages import result_Impedance as result_imp
@@ -15,6 +16,9 @@ from results_pages import result_CV as result_CV
 
 st.set_page_config(layout="wide", page_title="SIMsalabim simulation results", page_icon='./Figures/SIMsalabim_logo_HAT.jpg')
 
+# Start the profiling of this rerun, before the query parameters are replaced by the session identifier
+utils_profiling.start_rerun()
+
 # Set the session identifier as query parameter in the URL
 st.query_params.from_dict({'session':st.session_state['id']})
 
@@ -40,24 +44,28 @@ else:
     # which has been filled with the correct value after running a (successfull) simulation.
     # The UI and functionality of a specific page is packaged into a single function, located in the 'results_pages' folder. 
     # The content is retrieved by making a call to that function with the session id. 
-    if st.session_state['simulation_results'] == 'Steady State JV':
-        # Steady State (SimSS) results
-        result_simss.show_results_Steady_State(session_path, id_session)
-    elif st.session_state['simulation_results'] == 'Transient JV':
-        # Transient JV results
-        result_transient.show_results_Transient_JV(session_path, id_session)
-    elif st.session_state['simulation_results'] == 'Impedance':
-        # Impedance results
-        result_imp.show_results_impedance(session_path, id_session)
-    elif st.session_state['simulation_results'] == 'IMPS':
-        # IMPS results
-        result_imps.show_results_imps(session_path, id_session)
-    elif st.session_state['simulation_results'] == 'CV':
-        # CV results
-        result_CV.show_results_CV(session_path, id_session)
-    else:
-        # No simulation has been run successfully, thus nothing to display.
-        st.error('No results to display, no simulation has been run yet.')
+    with utils_profiling.span('Results page'):
+        if st.session_state['simulation_results'] == 'Steady State JV':
+            # Steady State (SimSS) results
+            result_simss.show_results_Steady_State(session_path, id_session)
+        elif st.session_state['simulation_results'] == 'Transient JV':
+            # Transient JV results
+            result_transient.show_results_Transient_JV(session_path, id_session)
+        elif st.session_state['simulation_results'] == 'Impedance':
+            # Impedance results
+            result_imp.show_results_impedance(session_path, id_session)
+        elif st.session_state['simulation_results'] == 'IMPS':
+            # IMPS results
+            result_imps.show_results_imps(session_path, id_session)
+        elif st.session_state['simulation_results'] == 'CV':
+            # CV results
+            result_CV.show_results_CV(session_path, id_session)
+        else:
+            # No simulation has been run successfully, thus nothing to display.
+            st.error('No results to display, no simulation has been run yet.')
+
+    # Show the timing breakdown of this rerun when profiling is enabled
+    utils_profiling.show_profile('Simulation results')
 
 ######### Function Definitions ####################################################################
 
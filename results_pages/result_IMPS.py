@@ -5,10 +5,10 @@ import os
 import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
-from datetime import datetime
 from utils import plot_functions_UI as utils_plot_UI
 from utils import general_UI as utils_gen_UI
 from utils import plot_def
+from utils import profiling as utils_profiling
 
 ######### Page configuration ######################################################################
 
@@ -38,25 +38,17 @@ def show_results_imps(session_path, id_session):
             # Results data is present, or at least the files are there. 
 
             # Read the main files/data (tJFile)
-            data_freqY = pd.read_csv(os.path.join(session_path,st.session_state['freqYFile']), sep=r'\s+')
+            with utils_profiling.span('Read output files'):
+                data_freqY = pd.read_csv(os.path.join(session_path,st.session_state['freqYFile']), sep=r'\s+')
             data_freqY["ImZ"] = data_freqY["ImY"]*-1
 
             # Define plot type options
             plot_type = [plt.plot, plt.scatter]
 
             with st.sidebar:
-                # Before downloading, prepare the results package into a ZIP file. This is executed upon loading the page.
+                # The results package is prepared in the background when the simulation has finished. Show the download button when it is ready.
                 st.write('<strong>Download Simulation results</strong>', unsafe_allow_html=True)
-                if st.button("Prepare result package", key='prep_result'):
-                    # Create a ZIP file with all relevant files and folders. 
-                    utils_gen_UI.prepare_results(session_path, id_session, 'zimt', 'IMPS')
-
-                # Button to download the ZIP file. Only appears after the Prepare Result Package button has been pressed.
-                if not st.session_state['runSimulation']:
-                    with open('Simulations/simulation_results_' + id_session + '.zip', 'rb') as ff:
-                        id_to_time_string = datetime.fromtimestamp(float(id_session) / 1e6).strftime("%Y-%d-%mT%H-%M-%SZ")
-                        filename = 'simulation_result_' + id_to_time_string
-                        btn = st.download_button(label="Download Simulation Results (ZIP)", data=ff, file_name=filename, mime="application/zip")
+                utils_gen_UI.show_results_download(session_path, id_session, 'zimt', 'IMPS')
 
                 #  Show the SIMsalabim logo in the sidebar
                 st.markdown('<hr>', unsafe_allow_html=True)
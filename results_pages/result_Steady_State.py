@@ -5,10 +5,12 @@ import os
 import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
-from datetime import datetime
 from utils import plot_functions_UI as utils_plot_UI
+from utils import plot_render as utils_plot_render
+from utils import column_stats as utils_stats
 from utils import general_UI as utils_gen_UI
 from utils import plot_def
+from utils import profiling as utils_profiling
 from pySIMsalabim.aux_funcs import JV_funcs
 
 ######### Page configuration ######################################################################
@@ -39,23 +41,24 @@ def show_results_Steady_State(session_path, id_session):
             # Results data is present, or at least the files are there. 
 
             # Read the main files/data (Var, JV and optional ScPars)
-            data_var = pd.read_csv(os.path.join(session_path,st.session_state['varFile']), sep=r'\s+')
+            with utils_profiling.span('Read output files'):
+                data_var = pd.read_csv(os.path.join(session_path,st.session_state['varFile']), sep=r'\s+')
 
-            # In some very rare situations the JV file is empty. Check the size of the file first to prevent breaking the page
-            if os.path.getsize(os.path.join(session_path,st.session_state['JVFile'])) != 0:
-                data_jv = pd.read_csv(os.path.join(session_path,st.session_state['JVFile']), sep=r'\s+')
-                showJV = True
-            else:
-                # JV file is empty (can occur under certain specific conditions) initialize an empty dict to continue
-                showJV = False
+                # In some very rare situations the JV file is empty. Check the size of the file first to prevent breaking the page
+                if os.path.getsize(os.path.join(session_path,st.session_state['JVFile'])) != 0:
+                    data_jv = pd.read_csv(os.path.join(session_path,st.session_state['JVFile']), sep=r'\s+')
+                    showJV = True
+                else:
+                    # JV file is empty (can occur under certain specific conditions) initialize an empty dict to continue
+                    showJV = False
 
-            # If the scPars have been calculate by SimSS, read them from the file
-            if (st.session_state['scParsFile'] in os.listdir(session_path) )and (os.path.getsize(os.path.join(session_path,st.session_state['scParsFile'])) != 0):
-                data_scPars = pd.read_csv(os.path.join(session_path,st.session_state['scParsFile']), sep=r'\s+')
-                showscPars = True
-            else:
-                # scPars file is empty or does not exist
-                showscPars = False
+                # If the scPars have been calculate by SimSS, read them from the file
+                if (st.session_state['scParsFile'] in os.listdir(session_path) )and (os.path.getsize(os.path.join(session_path,st.session_state['scParsFile'])) != 0):
+                    data_scPars = pd.read_csv(os.path.join(session_path,st.session_state['scParsFile']), sep=r'\s+')
+                    showscPars = True
+                else:
+                    # scPars file is empty or does not exist
+                    showscPars = False
 
             # Define plot type options
             plot_type = [plt.plot, plt.scatter]
@@ -63,6 +66,11 @@ def show_results_Steady_State(session_path, id_session):
             # Convert all x positions in the Var object to nm. For display only!
             data_var['x'] = data_var['x']*1e9
 
+            # Column statistics of the output data, computed once per file. All initial axis ranges are based on these.
+            stats_var = utils_stats.get_file_column_stats(os.path.join(session_path,st.session_state['varFile']), data_var, 'Vext')
+            if showJV:
+                stats_jv = utils_stats.get_file_column_stats(os.path.join(session_path,st.session_state['JVFile']), data_jv)
+
             ######### Function Definitions ####################################################################
 
             ######### UI layout ###############################################################################
@@ -94,18 +102,9 @@ def show_results_Steady_State(session_path, id_session):
                     choice_voltage = st.select_slider('Voltage to plot variables at', voltages, label_visibility='collapsed')
 
                 st.markdown('<hr>', unsafe_allow_html=True)
-                # Before downloading, prepare the results package into a ZIP file. This is executed upon loading the page.
+                # The results package is prepared in the background when the simulation has finished. Show the download button when it is ready.
                 st.write('<strong>Download Simulation results</strong>', unsafe_allow_html=True)
-                if st.button("Prepare result package", key='prep_result'):
-                    # Create a ZIP file with all relevant files and folders. 
-                    utils_gen_UI.prepare_results(session_path, id_session, 'simss', 'SS_JV')
-
-                # Button to download the ZIP file. Only appears after the Prepare Result Package button has been pressed.
-                if not st.session_state['runSimulation']:
-                    with open('Simulations/simulation_results_' + id_session + '.zip', 'rb') as ff:
-                        id_to_time_string = datetime.fromtimestamp(float(id_session) / 1e6).strftime("%Y-%d-%mT%H-%M-%SZ")
-                        filename = 'simulation_result_' + id_to_time_string
-                        btn = st.download_button(label="Download Simulation Results (ZIP)", data=ff, file_name=filename, mime="application/zip")
+                utils_gen_UI.show_results_download(session_path, id_session, 'simss', 'SS_JV')
 
                 #  Show the SIMsalabim logo in the sidebar
                 st.markdown('<hr>', unsafe_allow_html=True)
@@ -117,6 +116,7 @@ def show_results_Steady_State(session_path, id_session):
                 # Experimental JV data file is present, so experimental data must have been used.
                 exp_jv = True
                 df_exp_jv = pd.read_csv(os.path.join(session_path, st.session_state['expJV']), sep=r'\s+')
+                stats_exp_jv = utils_stats.get_file_column_stats(os.path.join(session_path, st.session_state['expJV']), df_exp_jv)
                 scPars_exp_jv = JV_funcs.Find_Solar_Cell_Parameters(df_exp_jv['Vext'], df_exp_jv['Jext'])
             else:
                 exp_jv = False
@@ -165,266 +165,220 @@ def show_results_Steady_State(session_path, id_session):
             # Show the plots
             st.markdown('<hr>', unsafe_allow_html=True)
 
-            # JV curve [1]
-            col1_1, col1_2, col1_3 = st.columns([1, 6, 3])
-
-            with col1_3:
-                # Figure options
-                st.markdown('<br>', unsafe_allow_html=True)
-                st.markdown('<hr>', unsafe_allow_html=True)
-
-                # Show options to change scale and limits of the axis.
-                # Note: when changing the y-axis (Current density) to log scale, the absolute value of the current density is shown.
-                with st.expander('Figure options', expanded=True):
-                    scale_options = ['linear', 'log']
+            # Render all figures on the plot render pool, each figure is shown as soon as it is ready
+            with utils_plot_render.render_batch():
+                # JV curve [1]
+                @st.fragment # Fragment for the JV curve, applying its figure options only reruns this plot and not the whole page
+                def fragment_JV_curve():
+                    col1_1, col1_2, col1_3 = st.columns([1, 6, 3])
+
+                    with col1_3:
+                        # Figure options
+                        st.markdown('<br>', unsafe_allow_html=True)
+                        st.markdown('<hr>', unsafe_allow_html=True)
+
+                        # Show options to change scale and limits of the axis.
+                        # Note: when changing the y-axis (Current density) to log scale, the absolute value of the current density is shown.
+                        # Group the options in a form, so changing them only reruns the script once they are applied
+                        with st.expander('Figure options', expanded=True), st.form(key = 'JV-figure-options', border=False):
+                            scale_options = ['linear', 'log']
                     
-                    st.text('x-scale:')
-                    xscale = st.radio('x-scale', scale_options, index = 0, key = 'JV-x-scale', label_visibility='collapsed',horizontal=True)
-                    st.text('y-scale:')
-                    yscale = st.radio('y-scale', scale_options, index = 0, key = 'JV-y-scale', label_visibility='collapsed',horizontal=True)
+                            st.text('x-scale:')
+                            xscale = st.radio('x-scale', scale_options, index = 0, key = 'JV-x-scale', label_visibility='collapsed',horizontal=True)
+                            st.text('y-scale:')
+                            yscale = st.radio('y-scale', scale_options, index = 0, key = 'JV-y-scale', label_visibility='collapsed',horizontal=True)
   
-                    # Have input fields for the x and y axis range.
-                    st.text('Set the x-axis range:')
-                    col1_x, col2_x, = st.columns([1,1])
-                    with col1_x:
-                        # Initially add some margin around the curve to avoid the curve to be on the edge of the plot. We take 5% of the total interval of the data.
-                        xlow_init = min(data_jv['Vext']) - abs((max(data_jv['Vext']) - min(data_jv['Vext'])) * 0.05)
-                        xlow = st.number_input('X-range', value = xlow_init, key = 'JV-xrange_low',label_visibility="collapsed")
-                    with col2_x:
-                        # Initially add some margin around the curve to avoid the curve to be on the edge of the plot. We take 5% of the total interval of the data.
-                        xup_init = max(data_jv['Vext']) + abs((max(data_jv['Vext']) - min(data_jv['Vext'])) * 0.05)
-                        xup = st.number_input('X-range', value=xup_init, key = 'JV-xrange_up',label_visibility="collapsed")
-
-                    st.text('Set the y-axis range:')
-                    col1_y, col2_y, = st.columns([1,1])
+                            # Have input fields for the x and y axis range.
+                            # Initially add some margin around the curve to avoid the curve to be on the edge of the plot. We take 5% of the total interval of the data.
+                            vext_min = utils_stats.get_stat(stats_jv, 'min', ['Vext'])
+                            vext_max = utils_stats.get_stat(stats_jv, 'max', ['Vext'])
+
+                            # Take into account whether experimental data is present or not, adjust the initial limits accordingly.
+                            # When using a log scale, we show tha abs value of the current density, adjust the initial limits accordingly
+                            stats_curves = [stats_jv, stats_exp_jv] if exp_jv else [stats_jv]
+                            stat_low, stat_up = ('abs_min', 'abs_max') if yscale == 'log' else ('min', 'max')
+                            jext_min = min(utils_stats.get_stat(stats, stat_low, ['Jext']) for stats in stats_curves)
+                            jext_max = max(utils_stats.get_stat(stats, stat_up, ['Jext']) for stats in stats_curves)
+
+                            st.text('Set the x-axis range:')
+                            col1_x, col2_x, = st.columns([1,1])
+                            with col1_x:
+                                xlow_init = vext_min - abs((vext_max - vext_min) * 0.05)
+                                xlow = st.number_input('X-range', value = xlow_init, key = 'JV-xrange_low',label_visibility="collapsed")
+                            with col2_x:
+                                xup_init = vext_max + abs((vext_max - vext_min) * 0.05)
+                                xup = st.number_input('X-range', value=xup_init, key = 'JV-xrange_up',label_visibility="collapsed")
+
+                            st.text('Set the y-axis range:')
+                            col1_y, col2_y, = st.columns([1,1])
     
-                    with col1_y:
-                        # Take into account whether experimental data is present or not, adjust the initial limits accordingly. Still take 5% of the total interval of the data.
-                        if exp_jv:
-                            if yscale == 'log':
-                                # When using a log scale, we show tha abs value of the current density, adjust the initial lower limit accordingly
-                                ylow_init = min(min(abs(data_jv['Jext'])),min(abs(df_exp_jv['Jext']))) - abs((max(max(abs(data_jv['Jext'])),max(abs(df_exp_jv['Jext']))) - min(min(abs(data_jv['Jext'])),min(abs(df_exp_jv['Jext'])))) * 0.05)
-                            else:
-                                ylow_init = min(min(data_jv['Jext']),min(df_exp_jv['Jext'])) - abs((max(max(data_jv['Jext']),max(df_exp_jv['Jext'])) - min(min(data_jv['Jext']),min(df_exp_jv['Jext']))) * 0.05)
-                            ylow = st.number_input('Y-range', value=ylow_init, key = 'JV-yrange_low',label_visibility="collapsed")
-                        else:
-                            if yscale == 'log':
-                                # When using a log scale, we show tha abs value of the current density, adjust the initial lower limit accordingly
-                                ylow_init = min(abs(data_jv['Jext'])) - abs((max(abs(data_jv['Jext'])) - min(abs(data_jv['Jext']))) * 0.05)
-                            else:
-                                ylow_init = min(data_jv['Jext']) - abs((max(data_jv['Jext']) - min(data_jv['Jext'])) * 0.05)
-                            ylow = st.number_input('Y-range', value=ylow_init, key = 'JV-yrange_low',label_visibility="collapsed")
-                    with col2_y:
-                        if exp_jv:
-                            if yscale == 'log':
-                                yup_init = max(max(abs(data_jv['Jext'])),max(abs(df_exp_jv['Jext']))) + abs((max(max(abs(data_jv['Jext'])),max(abs(df_exp_jv['Jext']))) - min(min(abs(data_jv['Jext'])),min(abs(df_exp_jv['Jext'])))) * 0.05)
-                            else:
-                                yup_init = max(max(data_jv['Jext']),max(df_exp_jv['Jext'])) + abs((max(max(data_jv['Jext']),max(df_exp_jv['Jext'])) - min(min(data_jv['Jext']),min(df_exp_jv['Jext']))) * 0.05)
-                            yup = st.number_input('Y-range', value=yup_init, key = 'JV-yrange_up',label_visibility="collapsed")
+                            with col1_y:
+                                ylow_init = jext_min - abs((jext_max - jext_min) * 0.05)
+                                ylow = st.number_input('Y-range', value=ylow_init, key = 'JV-yrange_low',label_visibility="collapsed")
+                            with col2_y:
+                                yup_init = jext_max + abs((jext_max - jext_min) * 0.05)
+                                yup = st.number_input('Y-range', value=yup_init, key = 'JV-yrange_up',label_visibility="collapsed")
+
+                            # Reduce the number of points of long JV curves
+                            decimate_jv = utils_plot_UI.create_UI_decimation_option(len(data_jv), 'JV')
+
+                            st.form_submit_button('Apply')
+
+                    with col1_2:
+                        # Show the JV curve. Should always be visible, unless something went wrong.
+
+                        if not showJV:
+                            st.warning('No data to show for the JV curve, the JV file did not contain any data.')
                         else:
-                            if yscale == 'log':
-                                yup_init = max(abs(data_jv['Jext'])) + abs((max(abs(data_jv['Jext'])) - min(abs(data_jv['Jext']))) * 0.05)
-                            else:
-                                yup_init = max(data_jv['Jext']) + abs((max(data_jv['Jext']) - min(data_jv['Jext'])) * 0.05)
-                            yup = st.number_input('Y-range', value=yup_init, key = 'JV-yrange_up',label_visibility="collapsed")
+                            data_jv_plot = data_jv
+                            if decimate_jv:
+                                data_jv_plot = utils_plot_UI.decimate_data(data_jv, 'Vext', ['Jext'], xscale=xscale, yscale=yscale)
+
+                            # Render the JV curve on the plot render pool
+                            utils_plot_render.submit_plot(col1_2, utils_plot_UI.draw_result_JV, data_jv_plot, choice_voltage, df_exp_jv if exp_jv else None, 
+                                                          xscale, yscale, (xlow, xup), (ylow, yup))
+
+                fragment_JV_curve()
+
+                # Show these output plot when sidebar checkbox is checked
+                # Potential[2]
+                if chk_potential:
+                    # Init plot parameters
+                    pars_potential = {'V' : 'V'}
+                    par_x_potential = 'x'
+                    xlabel_potential = '$x$ [nm]'
+                    ylabel_potential = '$V$ [V]'
+                    title_potential = 'Potential'
 
-            with col1_2:
-                # Show the JV curve. Should always be visible, unless something went wrong.
+                    # Get the initial x,y range for the figure based on the min,max values of the selected data
+                    xrange_val, yrange_val = utils_plot_UI.get_xy_range(data_var, par_x_potential, pars_potential, stats_var)
+
+                    utils_plot_UI.show_UI_component_plot(data_var, pars_potential, par_x_potential, xlabel_potential, ylabel_potential, 
+                                    title_potential, 2, plot_type[0], choice_voltage=choice_voltage, source_type = 'Var', stats=stats_var, 
+                                    xrange_val=xrange_val, yrange_val=yrange_val, yrange_format="%.2e", show_plot_param=False)
+
+                if chk_QFLS:
+                    # Init plot parameters
+                    # Thisb data does not come from the Var file, but from the JV file.
+                    JV_cols = data_jv.columns.values
+                    # Only keep the columns that contain 'QFLS' in the name
+                    JV_cols = [col for col in JV_cols if 'QFLS' in col]
+
+                    # Put a space between QFLS and layer number for display purposes
+                    JV_cols = {col:col.replace('QFLS', 'QFLS ') for col in JV_cols}
+
+                    pars_QFLS = JV_cols
+                    par_x_QFLS = 'Vext'
+                    xlabel_QFLS = '$V_{ext}$ [V]'
+                    ylabel_QFLS = 'QFLS [eV]'
+                    title_QFLS = 'Quasi-Fermi Level Splitting'
+
+                    utils_plot_UI.show_UI_component_plot(data_jv, pars_QFLS, par_x_QFLS, xlabel_QFLS, ylabel_QFLS, 
+                                    title_QFLS, 22, plot_type[0],yrange_format="%.2f", show_yscale=False, stats=stats_jv)
+
+                # Energy [3]
+                if chk_energy:
+                    # Init plot parameters
+                    # Create a dictionary for all potential parameters to plot. Key matches the name in the dataFrame, value is the corresponding label. 
+                    pars_energy = {'Evac':'$E_{vac}$', 'Ec':'$E_{c}$', 'Ev':'$E_{v}$', 'phin':'$E_{Fn}$', 'phip':'$E_{Fp}$'}
+                    xlabel_energy =  '$x$ [nm]'
+                    par_x_energy = 'x' 
+                    ylabel_energy = 'Energy level [eV]'
+                    title_energy = 'Energy Band Diagram'
 
-                if not showJV:
-                    st.warning('No data to show for the JV curve, the JV file did not contain any data.')
-                else:
-                    fig1, ax1 = plt.subplots()
-                    if exp_jv is True:
-                        # Plot simulation and experimental curve. (Line and Scatter)
-                        ax1 = utils_plot_UI.plot_result_JV(data_jv, choice_voltage, plot_type[0], ax1, exp_jv, df_exp_jv, xscale = xscale, yscale = yscale)
-                        ax1 = utils_plot_UI.plot_result_JV(data_jv, choice_voltage, plot_type[1], ax1, exp_jv, df_exp_jv, xscale = xscale, yscale = yscale)
-                    else:
-                        # plot only the simulation curve (Line and Scatter)
-                        ax1 = utils_plot_UI.plot_result_JV(data_jv, choice_voltage, plot_type[0], ax1, exp_jv, xscale = xscale, yscale = yscale)
-                        ax1 = utils_plot_UI.plot_result_JV(data_jv, choice_voltage, plot_type[1], ax1, exp_jv, xscale = xscale, yscale = yscale)
-
-                    # Set the x,y range, independent of plot type and/or errorbars
-                    ax1.set_xlim(xlow, xup)
-                    ax1.set_ylim(ylow, yup)
-
-                    st.pyplot(fig1, format='png')
-
-            # Show these output plot when sidebar checkbox is checked
-            # Potential[2]
-            if chk_potential:
-                # Init plot parameters
-                pars_potential = {'V' : 'V'}
-                par_x_potential = 'x'
-                xlabel_potential = '$x$ [nm]'
-                ylabel_potential = '$V$ [V]'
-                title_potential = 'Potential'
-                fig2, ax2 = plt.subplots()
-                col2_1, col2_2, col2_3 = st.columns([1, 6, 3])
-
-                # Get the initial x,y range for the figure based on the min,max values of the selected data
-                xrange_val, yrange_val = utils_plot_UI.get_xy_range(data_var, par_x_potential, pars_potential)
-
-                fig2, ax2 = utils_plot_UI.create_UI_component_plot(data_var, pars_potential, par_x_potential, xlabel_potential, ylabel_potential, 
-                                title_potential, 2, fig2, ax2, plot_type[0], [col2_1, col2_2, col2_3], choice_voltage, source_type = 'Var', 
-                                xrange_val=xrange_val, yrange_val=yrange_val, yrange_format="%.2e", show_plot_param=False)
-                with col2_2:
-                    st.pyplot(fig2, format='png')
-
-            if chk_QFLS:
-                # Init plot parameters
-                # Thisb data does not come from the Var file, but from the JV file.
-                JV_cols = data_jv.columns.values
-                # Only keep the columns that contain 'QFLS' in the name
-                JV_cols = [col for col in JV_cols if 'QFLS' in col]
-
-                # Put a space between QFLS and layer number for display purposes
-                JV_cols = {col:col.replace('QFLS', 'QFLS ') for col in JV_cols}
-
-                pars_QFLS = JV_cols
-                par_x_QFLS = 'Vext'
-                xlabel_QFLS = '$V_{ext}$ [V]'
-                ylabel_QFLS = 'QFLS [eV]'
-                title_QFLS = 'Quasi-Fermi Level Splitting'
-                fig2a, ax2a = plt.subplots()
-                col2a_1, col2a_2, col2a_3 = st.columns([1, 6, 3])
-
-                fig2a, ax2a = utils_plot_UI.create_UI_component_plot(data_jv, pars_QFLS, par_x_QFLS, xlabel_QFLS, ylabel_QFLS, 
-                                title_QFLS, 22, fig2a, ax2a, plot_type[0], [col2a_1, col2a_2, col2a_3],yrange_format="%.2f", show_yscale=False)
-                with col2a_2:
-                    st.pyplot(fig2a, format='png')
-
-            # Energy [3]
-            if chk_energy:
-                # Init plot parameters
-                # Create a dictionary for all potential parameters to plot. Key matches the name in the dataFrame, value is the corresponding label. 
-                pars_energy = {'Evac':'$E_{vac}$', 'Ec':'$E_{c}$', 'Ev':'$E_{v}$', 'phin':'$E_{Fn}$', 'phip':'$E_{Fp}$'}
-                xlabel_energy =  '$x$ [nm]'
-                par_x_energy = 'x' 
-                ylabel_energy = 'Energy level [eV]'
-                title_energy = 'Energy Band Diagram'
-                fig3, ax3 = plt.subplots()
-                col3_1, col3_2, col3_3 = st.columns([1, 6, 3])
-
-                # Get the initial x,y range for the figure based on the min,max values of the selected data
-                xrange_val, yrange_val = utils_plot_UI.get_xy_range(data_var, par_x_energy, pars_energy)
-
-                fig3, ax3 = utils_plot_UI.create_UI_component_plot(data_var, pars_energy, par_x_energy, xlabel_energy, ylabel_energy, 
-                                title_energy, 3, fig3, ax3, plot_type[0], [col3_1, col3_2, col3_3],choice_voltage, source_type = 'Var',
-                                xrange_val=xrange_val, yrange_val=yrange_val, yrange_format="%.2f", show_yscale=False)
-                with col3_2:
-                    st.pyplot(fig3, format='png')
-
-            # Carrier Density [4]
-            if chk_density:
-                # Init plot parameters
-                pars_density = {'n':'$n$', 'p':'$p$','ND':'$N_{D}$','NA':'$N_{A}$', 'anion':'$n_{anion}$', 'cation':'$p_{cation}$'}
-                xlabel_density = '$x$ [nm]'
-                par_x_density = 'x'
-                ylabel_density = 'Carrier density [m$^{-3}$]'
-                title_density = 'Carrier Densities'
-                fig4, ax4 = plt.subplots()
-                col4_1, col4_2, col4_3 = st.columns([1, 6, 3])
-
-                fig4, ax4 = utils_plot_UI.create_UI_component_plot(data_var, pars_density,par_x_density, xlabel_density, ylabel_density, 
-                                title_density, 4, fig4, ax4, plot_type[0], [col4_1, col4_2, col4_3],choice_voltage, source_type = 'Var',yrange_format="%.2e", yscale_init=1)                
-                with col4_2:
-                    st.pyplot(fig4, format='png')
-
-            # Density of electrons trapped [5]
-            if chk_fill:
-                # Init plot parameters
-                pars_fill = {'ntb':'$n_{t,b}$', 'nti':'$n_{t,i}$'}
-                par_x_fill = 'x'
-                xlabel_fill = '$x$ [nm]'
-                ylabel_fill = 'Density of trapped electrons [m$^{-3}$,m$^{-2}$]'
-                title_fill = 'Electrons in traps'
-                fig5, ax5 = plt.subplots()
-                col5_1, col5_2, col5_3 = st.columns([1, 6, 3])
-
-                # Get the initial x,y range for the figure based on the min,max values of the selected data
-                xrange_val, yrange_val = utils_plot_UI.get_xy_range(data_var, par_x_fill, pars_fill)
-
-                fig5, ax5 = utils_plot_UI.create_UI_component_plot(data_var, pars_fill,par_x_fill, xlabel_fill, ylabel_fill, 
-                                title_fill, 5, fig5, ax5, plot_type[0], [col5_1, col5_2, col5_3], choice_voltage, source_type = 'Var',
-                                xrange_val=xrange_val, yrange_val=yrange_val, yrange_format="%.2e")
-                with col5_2:
-                    st.pyplot(fig5, format='png')
-
-            # Transport [6]
-            if chk_transport:
-                # Init plot parameters
-                pars_transport = {'mun':r'$\mu_{n}$', 'mup':r'$\mu_{p}$'}
-                par_x_transport = 'x'
-                xlabel_transport = '$x$ [nm]'
-                ylabel_transport = 'Mobility [m$^{-2}$V$^{-1}$s$^{-1}$]'
-                title_transport = 'Mobilities'
-                fig6, ax6 = plt.subplots()
-                col6_1, col6_2, col6_3 = st.columns([1, 6, 3])
-
-                # Get the initial x,y range for the figure based on the min,max values of the selected data
-                xrange_val, yrange_val = utils_plot_UI.get_xy_range(data_var, par_x_transport, pars_transport)
-
-                fig6, ax6 = utils_plot_UI.create_UI_component_plot(data_var, pars_transport,par_x_transport, xlabel_transport, ylabel_transport, 
-                               title_transport, 6, fig6, ax6, plot_type[0], [col6_1, col6_2, col6_3],choice_voltage, source_type = 'Var',
-                               xrange_val=xrange_val, yrange_val=yrange_val, yrange_format="%.2e", yscale_init=1)
-                with col6_2:
-                    st.pyplot(fig6, format='png')
-
-            # Generation and Recombination [7]
-            if chk_gen_recomb:
-                # Init plot parameters
-                pars_gen_recomb = {'G_ehp':'$G_{ehp}$', 'Gfree':'$G_{free}$', 'Rdir':'$R_{dir}$', 'BulkSRHn':'$BulkSRH_{n}$', 'BulkSRHp':'$BulkSRH_{p}$', 'IntSRHn':'$IntSRH_{n}$', 'IntSRHp':'$IntSRH_{p}$'}
-                par_x_gen_recomb = 'x'                
-                xlabel_gen_recomb = '$x$ [nm]'
-                ylabel_gen_recomb = 'Generation/Recombination Rate [m$^{-3}$s$^{-1}$]'
-                title_gen_recomb = 'Generation and Recombination Rates'
-                fig7, ax7 = plt.subplots()
-                col7_1, col7_2, col7_3 = st.columns([1, 6, 3])
-
-                fig7, ax7 = utils_plot_UI.create_UI_component_plot(data_var, pars_gen_recomb, par_x_gen_recomb, xlabel_gen_recomb, ylabel_gen_recomb, 
-                                title_gen_recomb, 7, fig7, ax7, plot_type[0], [col7_1, col7_2, col7_3], choice_voltage, source_type = 'Var',yrange_format="%.2e")
-                with col7_2:
-                    st.pyplot(fig7, format='png')
-
-            # Current [8]
-            if chk_current:
-                # Init plot parameters
-                pars_current = {'Jn':'$J_{n}$', 'Jp':'$J_{p}$', 'Jint':'$J_{int}$'}
-                par_x_current = 'x'                
-                xlabel_current = '$x$ [nm]'
-                ylabel_current = 'Current density [Am$^{-2}$]'
-                title_current = 'Current densities'
-                fig8, ax8 = plt.subplots()
-                col8_1, col8_2, col8_3 = st.columns([1, 6, 3])
+                    # Get the initial x,y range for the figure based on the min,max values of the selected data
+                    xrange_val, yrange_val = utils_plot_UI.get_xy_range(data_var, par_x_energy, pars_energy, stats_var)
+
+                    utils_plot_UI.show_UI_component_plot(data_var, pars_energy, par_x_energy, xlabel_energy, ylabel_energy, 
+                                    title_energy, 3, plot_type[0], choice_voltage=choice_voltage, source_type = 'Var', stats=stats_var,
+                                    xrange_val=xrange_val, yrange_val=yrange_val, yrange_format="%.2f", show_yscale=False)
+
+                # Carrier Density [4]
+                if chk_density:
+                    # Init plot parameters
+                    pars_density = {'n':'$n$', 'p':'$p$','ND':'$N_{D}$','NA':'$N_{A}$', 'anion':'$n_{anion}$', 'cation':'$p_{cation}$'}
+                    xlabel_density = '$x$ [nm]'
+                    par_x_density = 'x'
+                    ylabel_density = 'Carrier density [m$^{-3}$]'
+                    title_density = 'Carrier Densities'
+
+                    utils_plot_UI.show_UI_component_plot(data_var, pars_density,par_x_density, xlabel_density, ylabel_density, 
+                                    title_density, 4, plot_type[0], choice_voltage=choice_voltage, source_type = 'Var', stats=stats_var,yrange_format="%.2e", yscale_init=1)                
+
+                # Density of electrons trapped [5]
+                if chk_fill:
+                    # Init plot parameters
+                    pars_fill = {'ntb':'$n_{t,b}$', 'nti':'$n_{t,i}$'}
+                    par_x_fill = 'x'
+                    xlabel_fill = '$x$ [nm]'
+                    ylabel_fill = 'Density of trapped electrons [m$^{-3}$,m$^{-2}$]'
+                    title_fill = 'Electrons in traps'
+
+                    # Get the initial x,y range for the figure based on the min,max values of the selected data
+                    xrange_val, yrange_val = utils_plot_UI.get_xy_range(data_var, par_x_fill, pars_fill, stats_var)
+
+                    utils_plot_UI.show_UI_component_plot(data_var, pars_fill,par_x_fill, xlabel_fill, ylabel_fill, 
+                                    title_fill, 5, plot_type[0], choice_voltage=choice_voltage, source_type = 'Var', stats=stats_var,
+                                    xrange_val=xrange_val, yrange_val=yrange_val, yrange_format="%.2e")
+
+                # Transport [6]
+                if chk_transport:
+                    # Init plot parameters
+                    pars_transport = {'mun':r'$\mu_{n}$', 'mup':r'$\mu_{p}$'}
+                    par_x_transport = 'x'
+                    xlabel_transport = '$x$ [nm]'
+                    ylabel_transport = 'Mobility [m$^{-2}$V$^{-1}$s$^{-1}$]'
+                    title_transport = 'Mobilities'
 
                     # Get the initial x,y range for the figure based on the min,max values of the selected data
-                xrange_val, yrange_val = utils_plot_UI.get_xy_range(data_var, par_x_current, pars_current)
+                    xrange_val, yrange_val = utils_plot_UI.get_xy_range(data_var, par_x_transport, pars_transport, stats_var)
+
+                    utils_plot_UI.show_UI_component_plot(data_var, pars_transport,par_x_transport, xlabel_transport, ylabel_transport, 
+                                   title_transport, 6, plot_type[0], choice_voltage=choice_voltage, source_type = 'Var', stats=stats_var,
+                                   xrange_val=xrange_val, yrange_val=yrange_val, yrange_format="%.2e", yscale_init=1)
+
+                # Generation and Recombination [7]
+                if chk_gen_recomb:
+                    # Init plot parameters
+                    pars_gen_recomb = {'G_ehp':'$G_{ehp}$', 'Gfree':'$G_{free}$', 'Rdir':'$R_{dir}$', 'BulkSRHn':'$BulkSRH_{n}$', 'BulkSRHp':'$BulkSRH_{p}$', 'IntSRHn':'$IntSRH_{n}$', 'IntSRHp':'$IntSRH_{p}$'}
+                    par_x_gen_recomb = 'x'                
+                    xlabel_gen_recomb = '$x$ [nm]'
+                    ylabel_gen_recomb = 'Generation/Recombination Rate [m$^{-3}$s$^{-1}$]'
+                    title_gen_recomb = 'Generation and Recombination Rates'
+
+                    utils_plot_UI.show_UI_component_plot(data_var, pars_gen_recomb, par_x_gen_recomb, xlabel_gen_recomb, ylabel_gen_recomb, 
+                                    title_gen_recomb, 7, plot_type[0], choice_voltage=choice_voltage, source_type = 'Var', stats=stats_var,yrange_format="%.2e")
+
+                # Current [8]
+                if chk_current:
+                    # Init plot parameters
+                    pars_current = {'Jn':'$J_{n}$', 'Jp':'$J_{p}$', 'Jint':'$J_{int}$'}
+                    par_x_current = 'x'                
+                    xlabel_current = '$x$ [nm]'
+                    ylabel_current = 'Current density [Am$^{-2}$]'
+                    title_current = 'Current densities'
+
+                        # Get the initial x,y range for the figure based on the min,max values of the selected data
+                    xrange_val, yrange_val = utils_plot_UI.get_xy_range(data_var, par_x_current, pars_current, stats_var)
                 
-                fig8, ax8 = utils_plot_UI.create_UI_component_plot(data_var, pars_current, par_x_current, xlabel_current, ylabel_current, 
-                                title_current, 8, fig8, ax8, plot_type[0], [col8_1, col8_2, col8_3], choice_voltage, source_type = 'Var',
-                                xrange_val=xrange_val, yrange_val=yrange_val, yrange_format="%.2e")
-                with col8_2:
-                    st.pyplot(fig8, format='png')
-
-            # Recombination current densities [9]
-            if chk_JVrec:
-                # Init plot parameters
-                # Thisb data does not come from the Var file, but from the JV file.
-                JV_cols = data_jv.columns.values
-                # Only keep the columns that contain 'Jdir', 'Jbulk' or 'JintL' in the name
-                JV_cols = [col for col in JV_cols if ('Jdir' in col) or ('Jbulk' in col) or ('JintL' in col)]
-                # Put JV_cols in a dict with col:col
-                JV_cols = {col:col for col in JV_cols}
-                pars_JVrec = JV_cols
-                par_x_JVrec = 'Vext'
-                xlabel_JVrec = '$V_{ext}$ [V]'
-                ylabel_JVrec = 'Recombination current density [Am$^{-2}$]'
-                title_JVrec = 'Recombination current densities'
-                fig9, ax9 = plt.subplots()
-                col9_1, col9_2, col9_3 = st.columns([1, 6, 3])
-
-                fig9, ax9 = utils_plot_UI.create_UI_component_plot(data_jv, pars_JVrec, par_x_JVrec, xlabel_JVrec, ylabel_JVrec, 
-                                title_JVrec, 9, fig9, ax9, plot_type[0], [col9_1, col9_2, col9_3],yrange_format="%.2e", yscale_init=1)
-                with col9_2:
-                    st.pyplot(fig9, format='png')
\ No newline at end of file
+                    utils_plot_UI.show_UI_component_plot(data_var, pars_current, par_x_current, xlabel_current, ylabel_current, 
+                                    title_current, 8, plot_type[0], choice_voltage=choice_voltage, source_type = 'Var', stats=stats_var,
+                                    xrange_val=xrange_val, yrange_val=yrange_val, yrange_format="%.2e")
+
+                # Recombination current densities [9]
+                if chk_JVrec:
+                    # Init plot parameters
+                    # Thisb data does not come from the Var file, but from the JV file.
+                    JV_cols = data_jv.columns.values
+                    # Only keep the columns that contain 'Jdir', 'Jbulk' or 'JintL' in the name
+                    JV_cols = [col for col in JV_cols if ('Jdir' in col) or ('Jbulk' in col) or ('JintL' in col)]
+                    # Put JV_cols in a dict with col:col
+                    JV_cols = {col:col for col in JV_cols}
+                    pars_JVrec = JV_cols
+                    par_x_JVrec = 'Vext'
+                    xlabel_JVrec = '$V_{ext}$ [V]'
+                    ylabel_JVrec = 'Recombination current density [Am$^{-2}$]'
+                    title_JVrec = 'Recombination current densities'
+
+                    utils_plot_UI.show_UI_component_plot(data_jv, pars_JVrec, par_x_JVrec, xlabel_JVrec, ylabel_JVrec, 
+                                    title_JVrec, 9, plot_type[0],yrange_format="%.2e", yscale_init=1, stats=stats_jv)
\ No newline at end of file
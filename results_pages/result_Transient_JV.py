@@ -5,11 +5,12 @@ import os
 import pandas as pd
 import streamlit as st
 import matplotlib.pyplot as plt
-from datetime import datetime
 from pySIMsalabim.experiments import hysteresis as transient_exp
 from utils import plot_functions_UI as utils_plot_UI
 from utils import general_UI as utils_gen_UI
+from utils import column_stats as utils_stats
 from utils import plot_def
+from utils import profiling as utils_profiling
 
 ######### Page configuration ######################################################################
 
@@ -39,7 +40,10 @@ def show_results_Transient_JV(session_path, id_session):
             # Results data is present, or at least the files are there. 
 
             # Read the main files/data (tJFile)
-            data_tj = pd.read_csv(os.path.join(session_path,st.session_state['tJFile']), sep=r'\s+')
+            with utils_profiling.span('Read output files'):
+                data_tj = pd.read_csv(os.path.join(session_path,st.session_state['tJFile']), sep=r'\s+')
+            # Column statistics for the initial axis ranges, computed once per file
+            stats_tj = utils_stats.get_file_column_stats(os.path.join(session_path,st.session_state['tJFile']), data_tj)
 
             if st.session_state["expObject"]['UseExpData'] == 1:
                 data_JVExp = transient_exp.concatJVs(session_path, st.session_state["expObject"]['expJV_Vmin_Vmax'], st.session_state["expObject"]['expJV_Vmax_Vmin'], 
@@ -49,18 +53,9 @@ def show_results_Transient_JV(session_path, id_session):
             plot_type = [plt.plot, plt.scatter]
 
             with st.sidebar:
-                # Before downloading, prepare the results package into a ZIP file. This is executed upon loading the page.
+                # The results package is prepared in the background when the simulation has finished. Show the download button when it is ready.
                 st.write('<strong>Download Simulation results</strong>', unsafe_allow_html=True)
-                if st.button("Prepare result package", key='prep_result'):
-                    # Create a ZIP file with all relevant files and folders. 
-                    utils_gen_UI.prepare_results(session_path, id_session, 'zimt', 'Transient_JV')
-
-                # Button to download the ZIP file. Only appears after the Prepare Result Package button has been pressed.
-                if not st.session_state['runSimulation']:
-                    with open('Simulations/simulation_results_' + id_session + '.zip', 'rb') as ff:
-                        id_to_time_string = datetime.fromtimestamp(float(id_session) / 1e6).strftime("%Y-%d-%mT%H-%M-%SZ")
-                        filename = 'simulation_result_' + id_to_time_string
-                        btn = st.download_button(label="Download Simulation Results (ZIP)", data=ff, file_name=filename, mime="application/zip")
+                utils_gen_UI.show_results_download(session_path, id_session, 'zimt', 'Transient_JV')
 
                 #  Show the SIMsalabim logo in the sidebar
                 st.markdown('<hr>', unsafe_allow_html=True)
@@ -120,7 +115,7 @@ def show_results_Transient_JV(session_path, id_session):
                 # Create the plot
                 fig1,ax1 = utils_plot_UI.create_UI_component_plot(data_tj, pars_transient, par_x_transient, xlabel_transient, ylabel_transient, 
                                 title_transient, 1, fig1, ax1, plot_type[0], [col1_1, col1_2, col1_3], show_plot_param=False, show_yscale=False, 
-                                weight_key=par_weight_transient, weight_label=weightlabel_transient,yrange_format="%.2e")
+                                weight_key=par_weight_transient, weight_label=weightlabel_transient,yrange_format="%.2e", stats=stats_tj)
                 # Add the experimental data points to the plot
                 if st.session_state["expObject"]['UseExpData'] == 1:
                     # Plot the experimental data and move it behind the simulated curve.
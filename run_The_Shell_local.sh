@@ -78,7 +78,7 @@ if [ "$?" -eq 0 ] || [ "$?" -eq 1 ]; then
         fi 
     fi
     # Run a env shell and start streamlit app
-    streamlit run SIMsalabim.py
+    streamlit run app.py
 else
     if [ "$?" -eq 2 ]; then
         echo "Script Failed"
@@ -3,6 +3,9 @@
 import matplotlib.pyplot as plt
 import streamlit as st
 import numpy as np
+from utils import device_model as utils_device_model
+from utils import optics_preview as utils_optics_preview
+from utils import profiling as utils_profiling
 
 plt.rcParams.update({'font.size': 24})
 
@@ -33,7 +36,7 @@ def get_section(block, section_name):
     list or Nones
         The section as a list of lists, or None if not found.
     """
-    return next((s for s in block if s[0] == section_name), None)
+    return utils_device_model.get_section(block, section_name)
 
 
 def get_param(section, param_name, cast=float):
@@ -191,15 +194,9 @@ def get_work_function_sfb(layer, dev_par, dev_par_name):
     k = 1.3807e-23 # Boltzmann constant in J/K
 
     # Extract necessary parameters from the device parameters
-    gen_section = get_section(dev_par[dev_par_name], "General")
-    T = get_param(gen_section, "T")
+    T = utils_device_model.get_value(dev_par[dev_par_name], "T", "General", float)
 
-    layer_section = get_section(dev_par[layer[2]], "General")
-    E_c = get_param(layer_section, "E_c")
-    E_v = get_param(layer_section, "E_v")
-    N_c = get_param(layer_section, "N_c")
-    N_D = get_param(layer_section, "N_D")
-    N_A = get_param(layer_section, "N_A")
+    E_c, E_v, N_c, N_D, N_A = [utils_device_model.get_value(dev_par[layer[2]], name, "General", float) for name in ["E_c", "E_v", "N_c", "N_D", "N_A"]]
 
     net = N_A - N_D
 
@@ -214,7 +211,8 @@ def get_work_function_sfb(layer, dev_par, dev_par_name):
     return round(WF, 2)
 
 
-def get_param_band_diagram(dev_par, layers, dev_par_name, run_mode=True):
+@utils_profiling.profiled('Band diagram')
+def get_param_band_diagram(dev_par, layers, dev_par_name, run_mode=True, session_path=None):
     """ Construct and display the energy band diagram.
 
     Parameters
@@ -227,6 +225,8 @@ def get_param_band_diagram(dev_par, layers, dev_par_name, run_mode=True):
         The name of the device parameter file.
     run_mode : bool, optional
         Whether to run in UI mode (default is True).
+    session_path : str, optional
+        The path to the session folder. When given, the optics preview is shown below the band diagram in UI mode (default is None).
 
     Returns
     -------
@@ -236,15 +236,14 @@ def get_param_band_diagram(dev_par, layers, dev_par_name, run_mode=True):
     msg = ""
     
     # Extract electrode parameters
-    contacts = get_section(dev_par[dev_par_name], "Contacts")
-    leftElec = get_param(contacts, "leftElec", int)
+    leftElec = utils_device_model.get_value(dev_par[dev_par_name], "leftElec", "Contacts", int)
 
     # Left electrode WF
-    WL_raw = get_param(contacts, "W_L", str)
+    WL_raw = utils_device_model.get_value(dev_par[dev_par_name], "W_L", "Contacts")
     W_L = -get_work_function_sfb(layers[1], dev_par, dev_par_name) if WL_raw == "sfb" else -float(WL_raw)
 
     # Right electrode WF
-    WR_raw = get_param(contacts, "W_R", str)
+    WR_raw = utils_device_model.get_value(dev_par[dev_par_name], "W_R", "Contacts")
     W_R = -get_work_function_sfb(layers[-1], dev_par, dev_par_name) if WR_raw == "sfb" else -float(WR_raw)
 
     # Get layer widths and energy levels
@@ -253,10 +252,9 @@ def get_param_band_diagram(dev_par, layers, dev_par_name, run_mode=True):
     E_v = []
 
     for layer in layers[1:]:
-        sec = get_section(dev_par[layer[2]], "General")
-        L.append(get_param(sec, "L"))
-        E_c.append(-get_param(sec, "E_c"))
-        E_v.append(-get_param(sec, "E_v"))
+        L.append(utils_device_model.get_value(dev_par[layer[2]], "L", "General", float))
+        E_c.append(-utils_device_model.get_value(dev_par[layer[2]], "E_c", "General", float))
+        E_v.append(-utils_device_model.get_value(dev_par[layer[2]], "E_v", "General", float))
 
     # Copy original widths and get the total width
     L_real = L.copy()
@@ -307,6 +305,9 @@ def get_param_band_diagram(dev_par, layers, dev_par_name, run_mode=True):
     # UI wrapper
     if run_mode:
         create_UI_band_diagram(fig, msg)
+        if session_path is not None and not msg:
+            # Absorption and generation of the layer stack, calculated directly from the nk data
+            utils_optics_preview.show_optics_preview(dev_par, layers, dev_par_name, session_path)
     else:
         return msg if msg else fig
 
@@ -0,0 +1,121 @@
+"""Column statistics of simulation output, used to set the initial axis ranges of the plots"""
+######### Package Imports #########################################################################
+
+import os
+import numpy as np
+import streamlit as st
+from utils import profiling as utils_profiling
+
+######### Parameter Initialisation ################################################################
+
+# Statistics per column. The reduction used to combine several columns is the same as the one used per column.
+STAT_REDUCTIONS = {'min': np.fmin, 'max': np.fmax, 'min_pos': np.fmin, 'abs_min': np.fmin, 'abs_max': np.fmax, 'sum': np.add}
+
+######### Function Definitions ####################################################################
+
+def compute_column_stats(data, group_key = None):
+    """Compute the statistics of all numeric columns in a single pass with vectorized reductions.
+    NaN values are ignored. When there is no positive value in a column, its 'min_pos' is NaN.
+
+    Parameters
+    ----------
+    data : DataFrame
+        Data to compute the statistics for
+    group_key : string, optional
+        Key of the column to group the data by, e.g. 'Vext' for a 'Var' file, by default None
+
+    Returns
+    -------
+    dict
+        'columns': names of the columns, 'all': dict with per statistic an array with the value for each column.
+        When a group_key is given, also 'groups': the sorted group values and 'by_group': dict with per statistic a 2D array (group, column)
+    """
+    numeric = data.select_dtypes('number')
+    values = numeric.to_numpy(dtype=float)
+    columns = list(numeric.columns)
+
+    # The (transformed) values to reduce for each statistic
+    abs_values = np.abs(values)
+    inputs = {'min': values, 'max': values, 'min_pos': np.where(values > 0, values, np.nan), 'abs_min': abs_values, 'abs_max': abs_values,
+              'sum': np.nan_to_num(values)}
+
+    stats = {'columns': columns, 'index': {col: i for i, col in enumerate(columns)}}
+    stats['all'] = {stat: STAT_REDUCTIONS[stat].reduce(inputs[stat], axis=0) if len(values) > 0 else np.full(len(columns), np.nan)
+                    for stat in STAT_REDUCTIONS}
+
+    if group_key is not None and len(values) > 0:
+        # Sort the rows on the group column and reduce each block of rows with the same group value
+        group_values = numeric[group_key].to_numpy()
+        order = np.argsort(group_values, kind='stable')
+        sorted_groups = group_values[order]
+        starts = np.flatnonzero(np.r_[True, sorted_groups[1:] != sorted_groups[:-1]])
+
+        stats['groups'] = {group: i for i, group in enumerate(sorted_groups[starts])}
+        stats['by_group'] = {stat: STAT_REDUCTIONS[stat].reduceat(inputs[stat][order], starts, axis=0) for stat in STAT_REDUCTIONS}
+
+    return stats
+
+def get_stat(stats, stat, keys, group = None, default = np.nan):
+    """Get a statistic for one or more columns, combined in the same way as the statistic itself (e.g. the minimum of the minima).
+
+    Parameters
+    ----------
+    stats : dict
+        Column statistics from compute_column_stats
+    stat : string
+        Name of the statistic: 'min', 'max', 'min_pos', 'abs_min', 'abs_max' or 'sum'
+    keys : List
+        Names of the columns
+    group : float, optional
+        Value of the group column to get the statistic for, by default None (all rows)
+    default : float, optional
+        Value to return when the statistic is not defined (e.g. no positive values), by default NaN
+
+    Returns
+    -------
+    float
+        Value of the statistic
+    """
+    cols = [stats['index'][key] for key in keys]
+    if len(cols) == 0:
+        return default
+
+    if group is None:
+        values = stats['all'][stat][cols]
+    else:
+        values = stats['by_group'][stat][stats['groups'][group], cols]
+
+    value = STAT_REDUCTIONS[stat].reduce(values)
+    return default if np.isnan(value) else float(value)
+
+@utils_profiling.profiled('Column statistics')
+def get_file_column_stats(file_path, data, group_key = None):
+    """Get the column statistics for data read from a file. The statistics are computed once and stored in the session state,
+    until the file changes (size or modification time).
+
+    Parameters
+    ----------
+    file_path : string
+        Path to the file the data was read from
+    data : DataFrame
+        Data as read from the file (including any transformations that are always applied, e.g. unit conversions)
+    group_key : string, optional
+        Key of the column to group the data by, by default None
+
+    Returns
+    -------
+    dict
+        Column statistics from compute_column_stats
+    """
+    file_stat = os.stat(file_path)
+    signature = (file_stat.st_mtime_ns, file_stat.st_size, group_key)
+
+    if 'column_stats' not in st.session_state:
+        st.session_state['column_stats'] = {}
+
+    cached = st.session_state['column_stats'].get(file_path)
+    if cached is None or cached[0] != signature:
+        cached = (signature, compute_column_stats(data, group_key))
+        st.session_state['column_stats'][file_path] = cached
+
+    return cached[1]
@@ -0,0 +1,148 @@
+"""Reduce the number of points of large data series before plotting"""
+######### Package Imports #########################################################################
+
+import numpy as np
+
+######### Parameter Initialisation ################################################################
+
+# Maximum number of points per series that is plotted without decimation
+POINT_BUDGET = 5000
+
+######### Function Definitions ####################################################################
+
+def scale_values(values, scale):
+    """Transform values to the scale of the axis, so the decimation preserves the shape as it is shown.
+
+    Parameters
+    ----------
+    values : array_like
+        Values to transform
+    scale : string
+        Scale of the axis, 'linear' or 'log'
+
+    Returns
+    -------
+    ndarray
+        Transformed values
+    """
+    values = np.asarray(values, dtype=float)
+    if scale == 'log':
+        # Zero and negative values are not shown on a log axis, treat them as the smallest positive value
+        values = np.abs(values)
+        positive = values[values > 0]
+        values = np.log10(np.where(values > 0, values, positive.min() if positive.size > 0 else 1))
+    return values
+
+def lttb_indices(x, y, n_out):
+    """Select the points to plot with the largest-triangle-three-buckets algorithm.
+    The first and last point are always kept, from every bucket in between the point that forms the largest triangle
+    with the previously selected point and the average of the next bucket is kept.
+
+    Parameters
+    ----------
+    x : array_like
+        x values, sorted or in plotting order
+    y : array_like
+        y values
+    n_out : int
+        Number of points to keep
+
+    Returns
+    -------
+    ndarray
+        Indices of the selected points, in increasing order
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = len(x)
+
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    # Bucket edges for all points between the first and the last point
+    edges = np.linspace(1, n - 1, n_out - 1).astype(int)
+
+    # Average point of every bucket, from the cumulative sums
+    cum_x = np.concatenate(([0.0], np.cumsum(x)))
+    cum_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = edges[1:] - edges[:-1]
+    avg_x = (cum_x[edges[1:]] - cum_x[edges[:-1]]) / counts
+    avg_y = (cum_y[edges[1:]] - cum_y[edges[:-1]]) / counts
+
+    # The point to compare with is the average of the next bucket, for the last bucket it is the last point
+    next_x = np.append(avg_x[1:], x[-1])
+    next_y = np.append(avg_y[1:], y[-1])
+
+    indices = np.empty(n_out, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for i in range(n_out - 2):
+        low, up = edges[i], edges[i + 1]
+        area = np.abs((x[selected] - next_x[i]) * (y[low:up] - y[selected]) - (x[selected] - x[low:up]) * (next_y[i] - y[selected]))
+        selected = low + np.argmax(area)
+        indices[i + 1] = selected
+
+    return indices
+
+def minmax_indices(y, n_out):
+    """Select the points to plot by keeping the minimum and maximum of every bucket.
+
+    Parameters
+    ----------
+    y : array_like
+        y values
+    n_out : int
+        Number of points to keep, two per bucket
+
+    Returns
+    -------
+    ndarray
+        Indices of the selected points, in increasing order
+    """
+    y = np.asarray(y, dtype=float)
+    n = len(y)
+    n_buckets = n_out // 2
+
+    if n_out >= n or n_buckets < 1:
+        return np.arange(n)
+
+    # Sort on bucket first and value second, so the first and last entry of each bucket are its minimum and maximum
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+    order = np.lexsort((y, bucket))
+
+    return np.unique(np.concatenate(([0, n - 1], order[edges[:-1]], order[edges[1:] - 1])))
+
+def decimate_indices(x, ys, point_budget = POINT_BUDGET, method = 'lttb', xscale = 'linear', yscale = 'linear'):
+    """Get the rows to plot for one or more series that share the same x values.
+    Each series is decimated separately and the union of the selected rows is returned.
+
+    Parameters
+    ----------
+    x : array_like
+        x values
+    ys : List
+        List with the y values of each series
+    point_budget : int, optional
+        Maximum number of points per series, by default POINT_BUDGET
+    method : string, optional
+        'lttb' (largest-triangle-three-buckets) or 'minmax' (minimum and maximum per bucket), by default 'lttb'
+    xscale : string, optional
+        Scale of the x-axis, by default 'linear'
+    yscale : string, optional
+        Scale of the y-axis, by default 'linear'
+
+    Returns
+    -------
+    ndarray
+        Indices of the rows to plot, in increasing order
+    """
+    x_scaled = scale_values(x, xscale)
+    indices = [np.arange(0)]
+    for y in ys:
+        if method == 'minmax':
+            indices.append(minmax_indices(scale_values(y, yscale), point_budget))
+        else:
+            indices.append(lttb_indices(x_scaled, scale_values(y, yscale), point_budget))
+
+    return np.unique(np.concatenate(indices))
@@ -0,0 +1,261 @@
+"""In-memory model of the device parameters, with indexed access to the parameters by file, section and name"""
+######### Package Imports #########################################################################
+
+import os, itertools
+import streamlit as st
+from pySIMsalabim.utils import device_parameters as utils_devpar
+from utils import profiling as utils_profiling
+
+######### Parameter Initialisation ################################################################
+
+# Every load of the device parameters gets a new version number, e.g. to reset widgets that keep their own state
+_versions = itertools.count(1)
+
+######### Class Definitions #######################################################################
+
+class ParameterFile(list):
+    """Device parameters file as a List object, in the format of devpar_read_from_txt: the description followed by the sections,
+    each section being a list with its name and the ['par', name, value, description] and ['comm', comment] entries.
+    The order and comments are kept, so the file can be written again with devpar_write_to_txt.
+
+    On top of the list, the sections and parameters are indexed by name. The index references the section and parameter lists,
+    so changing a value in place is directly visible. The index is rebuilt when sections or parameters are added or removed.
+    """
+    def __init__(self, sections = ()):
+        super().__init__(sections)
+        self._index = None
+        self._index_key = None
+
+    def _get_index(self):
+        """Get the index of the sections and parameters, (re)build it when the structure has changed.
+
+        Returns
+        -------
+        dict
+            'sections': section name -> section, 'params': (section name, parameter name) -> parameter,
+            'names': parameter name -> parameter (first occurrence)
+        """
+        # The length of every section changes when a parameter or comment is added or removed
+        index_key = tuple(len(section) for section in self)
+        if self._index is None or index_key != self._index_key:
+            sections, params, names = {}, {}, {}
+            for section in self:
+                sections.setdefault(section[0], section)
+                for param in section[1:]:
+                    if param[0] == 'par':
+                        params.setdefault((section[0], param[1]), param)
+                        names.setdefault(param[1], param)
+            self._index = {'sections': sections, 'params': params, 'names': names}
+            self._index_key = index_key
+        return self._index
+
+    def section(self, section_name):
+        """Get a section by name.
+
+        Parameters
+        ----------
+        section_name : string
+            Name of the section
+
+        Returns
+        -------
+        List
+            The section, None if not found
+        """
+        return self._get_index()['sections'].get(section_name)
+
+    def param(self, name, section = None):
+        """Get a parameter by name.
+
+        Parameters
+        ----------
+        name : string
+            Name of the parameter
+        section : string, optional
+            Name of the section, by default None (any section)
+
+        Returns
+        -------
+        List
+            The parameter as ['par', name, value, description], None if not found
+        """
+        if section is None:
+            return self._get_index()['names'].get(name)
+        return self._get_index()['params'].get((section, name))
+
+class DeviceParameters(dict):
+    """Device parameters of all files, with the file name as key and a ParameterFile as value.
+    Drop-in replacement for the dict returned by load_device_parameters. The version is set when the parameters are loaded from the files.
+    """
+    def __init__(self, dev_par = (), version = 0):
+        super().__init__()
+        self.version = version
+        for file_name, dev_par_file in dict(dev_par).items():
+            self[file_name] = dev_par_file
+
+    def __setitem__(self, file_name, dev_par_file):
+        if not isinstance(dev_par_file, ParameterFile):
+            dev_par_file = ParameterFile(dev_par_file)
+        super().__setitem__(file_name, dev_par_file)
+
+    def param(self, file_name, name, section = None):
+        """Get a parameter by file, section and name.
+
+        Parameters
+        ----------
+        file_name : string
+            Name of the device parameters file
+        name : string
+            Name of the parameter
+        section : string, optional
+            Name of the section, by default None (any section)
+
+        Returns
+        -------
+        List
+            The parameter as ['par', name, value, description], None if not found
+        """
+        if file_name not in self:
+            return None
+        return self[file_name].param(name, section)
+
+######### Function Definitions ####################################################################
+
+def get_files_signature(file_paths):
+    """Get the modification time and size of files, to detect changes on disk.
+
+    Parameters
+    ----------
+    file_paths : List
+        Paths to the files
+
+    Returns
+    -------
+    tuple
+        (modification time, size) for every file, None for a file that does not exist
+    """
+    signature = []
+    for file_path in file_paths:
+        try:
+            file_stat = os.stat(file_path)
+            signature.append((file_stat.st_mtime_ns, file_stat.st_size))
+        except FileNotFoundError:
+            signature.append(None)
+    return tuple(signature)
+
+@utils_profiling.profiled('Load device parameters')
+def load_device_parameters(session_path, dev_par_file_name, default_path, reset = False, availLayers = [], run_mode = False):
+    """Load the device parameters with load_device_parameters of pySIMsalabim and index them. 
+    The result is stored in the session state and reused on the next rerun, as long as the setup and layer files did not change on disk 
+    (modification time and size) and the available layers are the same. 
+
+    Parameters
+    ----------
+    session_path : string
+        Folder path of the current simulation session
+    dev_par_file_name : string
+        Name of the device parameters file
+    default_path : string
+        Path name where the default/standard device parameters file is located
+    reset : boolean
+        If True, the default device parameters are copied to the session folder
+    availLayers : List
+        List with all the available layer files
+    run_mode : bool, optional
+        indicate whether the script is in 'web' mode (True) or standalone mode (False), by default False
+
+    Returns
+    -------
+    DeviceParameters
+        Device parameters of all files
+    List
+        List with all the layers
+    """
+    if 'devParCache' not in st.session_state:
+        st.session_state['devParCache'] = {}
+    cache = st.session_state['devParCache']
+    key = (session_path, dev_par_file_name)
+
+    cached = cache.get(key)
+    if not reset and cached is not None and cached['availLayers'] == list(availLayers) \
+            and get_files_signature(cached['files']) == cached['signature']:
+        return cached['dev_par'], cached['layers']
+
+    dev_par, layers = utils_devpar.load_device_parameters(session_path, dev_par_file_name, default_path, reset, availLayers=availLayers, run_mode=run_mode)
+    dev_par = DeviceParameters(dev_par, next(_versions))
+
+    # The setup file is always one of the files in dev_par
+    files = [os.path.join(session_path, file_name) for file_name in dev_par]
+    cache[key] = {'dev_par': dev_par, 'layers': layers, 'availLayers': list(availLayers), 'files': files, 'signature': get_files_signature(files)}
+    return dev_par, layers
+
+def get_section(dev_par_file, section_name):
+    """Get a section of a device parameters file by name. Uses the index for a ParameterFile, otherwise the sections are searched.
+
+    Parameters
+    ----------
+    dev_par_file : List
+        List object with all parameters and comments of a single file
+    section_name : string
+        Name of the section
+
+    Returns
+    -------
+    List
+        The section, None if not found
+    """
+    if isinstance(dev_par_file, ParameterFile):
+        return dev_par_file.section(section_name)
+    return next((section for section in dev_par_file if section[0] == section_name), None)
+
+def get_param(dev_par_file, name, section = None):
+    """Get a parameter of a device parameters file by name. Uses the index for a ParameterFile, otherwise the sections are searched.
+
+    Parameters
+    ----------
+    dev_par_file : List
+        List object with all parameters and comments of a single file
+    name : string
+        Name of the parameter
+    section : string, optional
+        Name of the section, by default None (any section)
+
+    Returns
+    -------
+    List
+        The parameter as ['par', name, value, description], None if not found
+    """
+    if isinstance(dev_par_file, ParameterFile):
+        return dev_par_file.param(name, section)
+    for sect in dev_par_file:
+        if section is None or sect[0] == section:
+            for param in sect[1:]:
+                if param[0] == 'par' and param[1] == name:
+                    return param
+    return None
+
+def get_value(dev_par_file, name, section = None, cast = None, default = None):
+    """Get the value of a parameter of a device parameters file.
+
+    Parameters
+    ----------
+    dev_par_file : List
+        List object with all parameters and comments of a single file
+    name : string
+        Name of the parameter
+    section : string, optional
+        Name of the section, by default None (any section)
+    cast : type, optional
+        Type to cast the value to, by default None (string)
+    default : optional
+        Value to return when the parameter is not found, by default None
+
+    Returns
+    -------
+    string or cast type
+        Value of the parameter
+    """
+    param = get_param(dev_par_file, name, section)
+    if param is None:
+        return default
+    return param[2] if cast is None else cast(param[2])
@@ -1,21 +1,25 @@
 """Functions for processing the device parameters"""
 ######### Package Imports #########################################################################
 
-import os, random
+import os, io, copy, tempfile
 import streamlit as st
 from pySIMsalabim.utils import device_parameters as utils_devpar
+from utils import device_model as utils_device_model
+from utils import devpar_schema as utils_devpar_schema
+from utils import optics_catalog as utils_optics_catalog
+from utils import profiling as utils_profiling
 
 ######### Function Definitions ####################################################################
 
 def verify_devpar_file(data_devpar, check_devpar, nk_file_list, spectrum_file_list):
-    """Verify the uploaded device parameters file. Compare it with the standard device parameter file. If it does not match, reject the upload.
+    """Verify the uploaded device parameters file against the schema of the standard device parameter file. If it does not match, reject the upload.
     
     Parameters
     ----------
-    data_devpar : List
-        List object with all parameters and comments.
+    data_devpar : string | bytes
+        Content of the uploaded file
     check_devpar : string
-        Indicate which type of device parameters file needs to be checked, simss or zimt
+        Indicate which type of device parameters file needs to be checked, simss, zimt or layer
     nk_file_list : List
         List with the available nk files
     spectrum_file_list : List
@@ -23,110 +27,32 @@ def verify_devpar_file(data_devpar, check_devpar, nk_file_list, spectrum_file_li
     Returns
     -------
     integer
-        0 if file is valid. 1 if file is invalid
-    string
-        Message which, when file is invalid, states the reason including line numbers
+        0 if file is valid. 1 if file is invalid. 2 if referenced nk/spectrum files are not available
+    string | List
+        Message which, when file is invalid, states all the reasons including line numbers. List with the missing files when these are not available.
     """   
-
     res_path = st.session_state['resource_path'] # Path to default device parameters
-    line_min = []
-    line_min_default = []
-    valid_upload = 1
-    msg = ''
-    potLayers = [f'l{i}' for i in range(1,1000)] # List with all possible layer names
-
-
-    ## Store the uploaded file with a random id in a temporary directory. 
-    tmp_id = random.randint(0, int(1e10))
-    destination_file_devpar = open('Simulations/tmp/devpar_' + str(tmp_id) + '.txt', "w", encoding='utf-8')
-    destination_file_devpar.write(data_devpar)
-    destination_file_devpar.close()
-
-    # Read the uploaded file line by line. Keep a record of the line number to eventually create a clear error message.
-    with open('Simulations/tmp/devpar_' + str(tmp_id) + '.txt', encoding='utf-8') as fpp:
-        count = 1
-        for line in fpp:
-            line = line.strip()
-            # Empty lines and lines containing comments must be ignored
-
-            line_split = line.split('=')
-
-            if not line.startswith('*') and not line.startswith('\n') and not line == '' and not (line_split[0].strip() in potLayers):
-                line_min.append([line, count])
-            count += 1
-
-    # File content has been stored in an object. Remove the tmp file.
-    for item_dir_list in os.listdir('Simulations/tmp'):
-        if str(tmp_id) in item_dir_list:
-            os.remove('Simulations/tmp/devpar_' + str(tmp_id) + '.txt')
 
     if check_devpar == 'simss':
         std_par_file = os.path.join(res_path, st.session_state['simss_devpar_file'])
     elif check_devpar == 'zimt':
         std_par_file = os.path.join(res_path, st.session_state['zimt_devpar_file'])
+    elif check_devpar == 'layer':
+        std_par_file = os.path.join(res_path, utils_devpar_schema.LAYER_REFERENCE_FILE)
     else:
-        valid_upload = 1
-        msg = 'Something went wrong, upload failed'
-        return valid_upload, msg
+        return 1, 'Something went wrong, upload failed'
 
-    # Open and read the standard device parameters file
-    with open(std_par_file, encoding='utf-8') as fp:
-        count = 1
-        for line in fp:
-            line = line.strip()
-            # Empty lines and lines containing comments must be ignored
+    schema = utils_devpar_schema.get_schema(std_par_file)
+    errors, missing_files, _ = utils_devpar_schema.validate_devpar(decode_upload(data_devpar), schema, {'nk': nk_file_list, 'spectrum': spectrum_file_list})
 
-            line_split = line.split('=')
-            if not line.startswith('*') and not line.startswith('\n') and not line == '' and not (line_split[0].strip() in potLayers):
-                line_min_default.append([line, count])
-            count += 1
-    
-    # Loop simultaneously over both Lists and check whether each entry matches. If not, return an error message with the relevant lines.
-    for a, b in zip(line_min, line_min_default):
-        a_par = a[0].split('=')
-        b_par = b[0].split('=')
-
-        if len(a[0]) < 2:
-            valid_upload = 1
-            msg = ('Upload failed, file not formatted correctly.\n\n Line ' + str(a[1]) + ': " ' + a + '" is not according to the format.')
-            return valid_upload, msg
-        elif a_par[0] != b_par[0]:
-            valid_upload = 1
-            msg = ('Upload failed, expected parameter: "' + b_par[0] + '" (line ' + str(b[1]) + ') and received parameter "' + a_par[0] + '" (line ' + str(a[1]) + ')')
-            return valid_upload, msg
-        else:
-            valid_upload = 0
-
-    if valid_upload == 0:
-        # Extra check, verify whether the nk/spectrum files exist
-        for item in line_min:
-            item_par = item[0].split('=')
-            if item_par[0].startswith('nk'):
-                # Found a nk_file
-                item_par_split = item_par[1].split('*')
-                if item_par_split[0].strip() not in nk_file_list and item_par_split[0].strip() != 'none':
-                    # Check if the file is in the list or labelled as none
-                    if msg == '':
-                        msg = [item_par_split[0].strip()]
-                    else:
-                        msg.append(item_par_split[0].strip())
-                    valid_upload = 2
-            elif item_par[0].startswith('spectrum'):
-                # Found the spectrum
-                item_par_split = item_par[1].split('*')
-                if item_par_split[0].strip() not in spectrum_file_list and item_par_split[0].strip() != 'none':
-                    # Check if the file is in the list or labelled as none
-                    if msg == '':
-                        msg = [item_par_split[0].strip()]
-                    else:
-                        msg.append(item_par_split[0].strip())
-                    valid_upload = 2
-        
-        if valid_upload == 2:
-            # One or more files were not found, a list of the missing files is returned in the message.
-            msg = ['Warning, File(s) not found. \n These files will be replaced by --none--. If you want to calculate the generation profile, select files from the list or upload them.\n'] + msg
-
-    return valid_upload, msg
+    if errors:
+        return 1, 'Upload failed, file not formatted correctly.\n\n' + '\n\n'.join(errors)
+
+    if missing_files:
+        # One or more files were not found, a list of the missing files is returned in the message.
+        return 2, ['Warning, File(s) not found. \n These files will be replaced by --none--. If you want to calculate the generation profile, select files from the list or upload them.\n'] + missing_files
+
+    return 0, ''
 
 def store_file_names(dev_par, sim, dev_par_name, layers):
     """Read the relevant file names from the device parameters and store the file name in a session state. 
@@ -163,8 +89,72 @@ def store_file_names(dev_par, sim, dev_par_name, layers):
     for key, idx in zip(sim_keys, sim_indices):
         st.session_state[key] = retval[idx]
 
+def get_parameter_values(dev_par_file):
+    """Get the value and description of all parameters in a device parameters file, by section and name.
+
+    Parameters
+    ----------
+    dev_par_file : List
+        List object with all parameters and comments of a single file.
+
+    Returns
+    -------
+    dict
+        (section, name) as key, [value, description] as value
+    """
+    values = {}
+    for section in dev_par_file[1:]:
+        for param in section[1:]:
+            if param[0] == 'par':
+                values[(section[0], param[1])] = param[2:]
+    return values
+
+def get_changed_parameters(old, new):
+    """Compare two versions of a device parameters file and get the parameters that were added, removed or changed (value or description).
+
+    Parameters
+    ----------
+    old : List
+        Previous version of the file as a List object, None if there is no previous version
+    new : List
+        Current version of the file as a List object
+
+    Returns
+    -------
+    set
+        (section, name) of the changed parameters
+    """
+    new_values = get_parameter_values(new)
+    if old is None:
+        return set(new_values)
+    old_values = get_parameter_values(old)
+    return {key for key in old_values.keys() | new_values.keys() if old_values.get(key) != new_values.get(key)}
+
+def write_file_atomic(file_path, content):
+    """Write a text file atomically: the content is written to a temporary file in the same folder, which then replaces the file.
+    Other processes (e.g. a running simulation) never read a partially written file.
+
+    Parameters
+    ----------
+    file_path : string
+        Path to the file
+    content : string
+        Content of the file
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(file_path) or '.', prefix='.' + os.path.basename(file_path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as fp:
+            fp.write(content)
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
 def write_pars_txt(dev_par, layers, session_path, dev_par_file):
-    """Write device parameters to the txt file.
+    """Write device parameters to the txt file. 
+    A snapshot of each written file is kept in the session state, together with the modification time and size of the file on disk.
+    Only files that changed since the last write (in the UI or on disk, e.g. after an upload or reset) are written again.
 
     Parameters
     ----------
@@ -176,37 +166,177 @@ def write_pars_txt(dev_par, layers, session_path, dev_par_file):
         Folder path of the current simulation session
     defv_par_file : string
         name of the device parameters file
+
+    Returns
+    -------
+    dict
+        Name of each written file as key, with the (section, name) of its changed parameters. Empty when nothing changed.
     """
-    # Write the device parameter List object to a txt string.
-    i = 0 # Index for the different layers, 0 is always the simulation setup file
     # First check what the most recent names of the layers are from the UI. Update the names in the dev_par object first
     for layer in layers:
-        for section in dev_par[dev_par_file]:
-            if section[0] == 'Layers':
-                for param in section[1:]:
-                    if param[1] == layer[1]:
-                        param[2] = layer[2]
-                        
+        param = utils_device_model.get_param(dev_par[dev_par_file], layer[1], 'Layers')
+        if param is not None:
+            param[2] = layer[2]
+
+    if 'devParWritten' not in st.session_state:
+        st.session_state['devParWritten'] = {}
+    written = st.session_state['devParWritten']
+
+    changed = {}
     for layer in layers:
-        par_file = utils_devpar.devpar_write_to_txt(dev_par[layer[2]])
         # Check if the layer is the simulation setup file or a layer file and set the name accordingly
         if layer[1]=='setup':
             file_name = dev_par_file
         else:
             file_name = layer[2]
-        # Open the device_parameters file (in the id folder) and write content of par_file to it.
+        file_path = os.path.join(session_path, file_name)
+        dev_par_layer = dev_par[layer[2]]
+
+        snapshot, signature = written.get(file_path, (None, None))
+        file_stat = os.stat(file_path) if os.path.isfile(file_path) else None
+        if file_stat is None or signature != (file_stat.st_mtime_ns, file_stat.st_size):
+            # The file has changed on disk since it was last written (or was never written in this session), the snapshot is not valid
+            snapshot = None
+
+        if snapshot == dev_par_layer:
+            # Nothing changed (this includes layer files that are used more than once)
+            continue
+
+        # Write the device parameter List object to a txt string
+        par_file = utils_devpar.devpar_write_to_txt(dev_par_layer)
+        if snapshot is None and file_stat is not None:
+            # No valid snapshot, compare with the content of the file instead
+            with open(file_path, encoding='utf-8') as fp:
+                unchanged = fp.read() == par_file
+            if unchanged:
+                written[file_path] = (copy.deepcopy(dev_par_layer), (file_stat.st_mtime_ns, file_stat.st_size))
+                continue
+
+        # Write content of par_file to the device_parameters file (in the id folder).
+        write_file_atomic(file_path, par_file)
+        file_stat = os.stat(file_path)
+        changed[file_name] = get_changed_parameters(snapshot, dev_par_layer)
+        written[file_path] = (copy.deepcopy(dev_par_layer), (file_stat.st_mtime_ns, file_stat.st_size))
+
+    return changed
+
+def get_devpar_header(dev_par_file):
+    """Get the program (SimSS or ZimT) and version from the description at the top of a simulation setup file.
+
+    Parameters
+    ----------
+    dev_par_file : List
+        List object with all parameters and comments of the simulation setup file.
+
+    Returns
+    -------
+    string, string
+        Program and version, None when not found
+    """
+    program, version = None, None
+    for item in dev_par_file[0][1:]:
+        if item[0] != 'comm':
+            continue
+        if item[1].lower().startswith('version:'):
+            version = item[1].split(':', 1)[1].strip()
+        elif program is None:
+            for name in ['SimSS', 'ZimT']:
+                if name in item[1]:
+                    program = name
+    return program, version
+
+def exchange_parameters(source, target):
+    """Copy the values of the parameters that a SimSS and ZimT simulation setup file have in common from source to target.
+    The Layers section of the target is replaced by the one of the source, so both files use the same layers.
+    Parameters that only exist in the target and all descriptions and comments of the target are kept.
+
+    Parameters
+    ----------
+    source : List
+        List object of the simulation setup file to copy the parameters from
+    target : List
+        List object of the simulation setup file to update, changed in place
+
+    Returns
+    -------
+    List
+        [section, name, old value, new value] for every changed parameter of the target. Empty when nothing changed.
+    """
+    source_program, source_version = get_devpar_header(source)
+    target_program, target_version = get_devpar_header(target)
+    if source_program is None or target_program is None:
+        raise ValueError('Could not find the program (SimSS or ZimT) of the simulation setup files')
+    if source_program == target_program:
+        raise ValueError(f'Both files are {source_program} simulation setup files')
+    if source_version != target_version:
+        raise ValueError(f'The simulation setup files have different versions ({source_version}, {target_version})')
+
+    changes = []
+    source_values = {}
+    source_layers = None
+    for section in source[1:]:
+        if section[0] == 'Layers':
+            source_layers = section
+            continue
+        for param in section[1:]:
+            if param[0] == 'par':
+                source_values[param[1]] = param[2]
 
-        with open(os.path.join(session_path, file_name), 'w', encoding='utf-8') as fp_device_parameters:
-            fp_device_parameters.write(par_file)
-            fp_device_parameters.close()
-        i+=1
+    for section in target[1:]:
+        if section[0] == 'Layers':
+            if source_layers is not None:
+                old_layers = {param[1]: param[2] for param in section[1:] if param[0] == 'par'}
+                new_layers = {param[1]: param[2] for param in source_layers[1:] if param[0] == 'par'}
+                for name in old_layers.keys() | new_layers.keys():
+                    if old_layers.get(name) != new_layers.get(name):
+                        changes.append(['Layers', name, old_layers.get(name), new_layers.get(name)])
+                section[1:] = copy.deepcopy(source_layers[1:])
+            continue
+        for param in section[1:]:
+            if param[0] == 'par' and param[1] in source_values and param[2] != source_values[param[1]]:
+                changes.append([section[0], param[1], param[2], source_values[param[1]]])
+                param[2] = source_values[param[1]]
+
+    return changes
+
+def decode_upload(data):
+    """Decode the content of an uploaded file, when it is not decoded yet.
+
+    Parameters
+    ----------
+    data : string | bytes
+        Content of the uploaded file
+
+    Returns
+    -------
+    string
+        Content of the file as text
+    """
+    if isinstance(data, (bytes, bytearray)):
+        return data.decode('utf-8')
+    return data
+
+def devpar_read_from_upload(data):
+    """Parse the content of an uploaded device parameters file in memory, with the same parser as the files in the session folder (devpar_read_from_txt).
+
+    Parameters
+    ----------
+    data : string | bytes
+        Content of the uploaded file
+
+    Returns
+    -------
+    List
+        List with nested lists for all parameters in all sections.
+    """
+    return utils_devpar.devpar_read_from_txt(io.StringIO(decode_upload(data)))
 
 def getLayersFromSetup(data):
     """Retrieve the layers from the setup file
 
     Parameters
     ----------
-    data : string
+    data : string | bytes
         Content of the setup file
 
     Returns
@@ -214,22 +344,9 @@ def getLayersFromSetup(data):
     List
         List with all the layers
     """
-    # Write the uploaded file to a tmp file. This is necessary to read the file line by line.
-    tmp_id = random.randint(0, int(1e10))
-    destination_file_devpar = open('Simulations/tmp/devpar_' + str(tmp_id) + '.txt', "w", encoding='utf-8')
-    destination_file_devpar.write(data)
-    destination_file_devpar.close()
-
-    # Read the uploaded file line by line. Keep a record of the line number to eventually create a clear error message.
-    with open('Simulations/tmp/devpar_' + str(tmp_id) + '.txt', encoding='utf-8') as fp:
-        tmp_devpar = utils_devpar.devpar_read_from_txt(fp)
-
-    # File content has been stored in an object. Remove the tmp file.
-    for item_dir_list in os.listdir('Simulations/tmp'):
-        if str(tmp_id) in item_dir_list:
-            os.remove('Simulations/tmp/devpar_' + str(tmp_id) + '.txt')
+    tmp_devpar = devpar_read_from_upload(data)
     
-    # Extract the layers from the tmp object
+    # Extract the layers from the parsed setup file
     tmp_layers = []
     for section in tmp_devpar:
         if section[0] == 'Layers':
@@ -238,8 +355,10 @@ def getLayersFromSetup(data):
     
     return tmp_layers
 
+@utils_profiling.profiled('nk and spectrum listing')
 def create_nk_spectrum_file_array(session_path):
-    """Create lists containing the names of the available nk and spectrum files.
+    """Create lists containing the names of the available nk and spectrum files, sorted alphabetically. 
+    The listing of the folders is cached by the optics catalog and only created again when the content of a folder changed (modification time).
 
     Parameters
     ----------
@@ -251,18 +370,7 @@ def create_nk_spectrum_file_array(session_path):
     List,List
         Lists with nk file names and spectrum file names
     """
-    nk_file_list = []
-    spectrum_file_list = []
-    # Placeholder item when nk/spectrum file is not found
-    nk_file_list.append('--none--')
-    spectrum_file_list.append('--none--')
-    for dirpath, dirnames, filenames in os.walk(os.path.join(session_path,'Data_nk')):
-        for filename in filenames:
-            nk_file_list.append(os.path.join('Data_nk',filename))
-    for dirpath, dirnames, filenames in os.walk(os.path.join(session_path,'Data_spectrum')):
-        for filename in filenames:
-            spectrum_file_list.append(os.path.join('Data_spectrum',filename))
-    return nk_file_list,spectrum_file_list
+    return utils_optics_catalog.list_optics_files(session_path, 'nk'), utils_optics_catalog.list_optics_files(session_path, 'spectrum')
 
 def read_exp_parameters(exp_par, dev_par_list, param_keys, extract_keys):
     """Read the parameters from the device parameters needed for the experiments and return them as a dictionary.
@@ -286,11 +394,11 @@ def read_exp_parameters(exp_par, dev_par_list, param_keys, extract_keys):
     # Construct dictionary with parameters
     exp_par_obj = {name: row[1] for row, name in zip(exp_par, param_keys)}
 
-    # Find the "User interface" section
-    ui_section = next((section for section in dev_par_list if section[0] == "User interface"), [])
-
-    # # Extract parameters and update
-    exp_par_obj.update({name: value for _, name, value,_ in ui_section[1:] if name in extract_keys})
+    # Extract parameters from the "User interface" section and update
+    for name in extract_keys:
+        param = utils_device_model.get_param(dev_par_list, name, "User interface")
+        if param is not None:
+            exp_par_obj[name] = param[2]
 
     return exp_par_obj
 
@@ -0,0 +1,346 @@
+"""Schema of the device parameters files, compiled from the standard files in the resources, to validate uploaded files in a single pass"""
+######### Package Imports #########################################################################
+
+import os, re, functools
+
+######### Parameter Initialisation ################################################################
+
+# Standard file used as reference for uploaded layer parameter files
+LAYER_REFERENCE_FILE = 'L1_parameters.txt'
+
+# Sections of the device parameters files, as recognized by devpar_read_from_txt
+SECTIONS = ['General', 'Layers', 'Contacts', 'Optics', 'Numerical Parameters', 'Voltage range of simulation', 'User interface', 'Mobilities',
+            'Interface-layer-to-right', 'Ions', 'Generation and recombination', 'Bulk trapping']
+
+# Values besides a number that are allowed for a numerical parameter
+KEYWORD_VALUES = {'W_L': ['sfb'], 'W_R': ['sfb']}
+
+# The allowed range of a numerical parameter is read from its description in the standard file, e.g. '>= 0', 'integer 1-4', '0<=P0<1'
+# or the options '0: stop, 1: ignore, 2: skip', so it follows the version of SIMsalabim. Numbers are matched with NUMBER.
+NUMBER = r'-?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?'
+BETWEEN_PATTERN = re.compile(rf'({NUMBER})\s*<=?\s*[A-Za-z_]\w*\s*<=?\s*({NUMBER})')
+INTEGER_RANGE_PATTERN = re.compile(r'integer\s+(-?\d+)\s*-\s*(-?\d+)')
+LOW_PATTERN = re.compile(rf'(?:(?<!<)>=?|at least)\s*({NUMBER})')
+HIGH_PATTERN = re.compile(rf'<(?!>)=?\s*({NUMBER})')
+OPTION_PATTERN = re.compile(r'\(\s*(-?\d+)\s*\)|(?<![\w.^])(-?\d+)\s*(?::|for\b)')
+
+# Bounds that follow from the physics or the numerics but are not stated in the descriptions, as (minimum, maximum, integer)
+IMPLICIT_RANGES = {'T': (0, None, False), 'L': (0, None, False), 'L_TCO': (0, None, False), 'eps_r': (0, None, False),
+                   'G_frac': (0, None, False), 'maxItPois': (1, None, True), 'maxItSS': (1, None, True), 'maxItTrans': (1, None, True),
+                   'NJV': (1, None, True), 'outputRatio': (1, None, True)}
+
+# Pattern of the version in the header of a file, e.g. '** version: 5.36'
+VERSION_PATTERN = re.compile(r'^\*\*\s*version:\s*(\S+)')
+
+# Pattern of a layer in the Layers section, e.g. 'l1'
+LAYER_PATTERN = re.compile(r'^l\d+$')
+
+######### Class Definitions #######################################################################
+
+class ParameterRule:
+    """Expected parameter of a device parameters file: the name, section and line in the standard file, with the type of value.
+    The kind of value is 'number', 'nk', 'spectrum' or 'trap' (reference to a file) or 'text'.
+    """
+    __slots__ = ('name', 'section', 'line', 'kind', 'low', 'high', 'integer', 'keywords')
+
+    def __init__(self, name, section, line, kind, low = None, high = None, integer = False, keywords = ()):
+        self.name = name
+        self.section = section
+        self.line = line
+        self.kind = kind
+        self.low = low
+        self.high = high
+        self.integer = integer
+        self.keywords = keywords
+
+class DevparSchema:
+    """Schema of a device parameters file: the expected parameters in order and the version of SIMsalabim of the standard file.
+    """
+    def __init__(self, rules, version = None):
+        self.rules = rules
+        self.version = version
+        # Position of every parameter in the expected order, to recover after a missing or unexpected parameter
+        self.positions = {}
+        for position, rule in enumerate(rules):
+            self.positions.setdefault(rule.name, position)
+
+######### Function Definitions ####################################################################
+
+def get_value_kind(name, value):
+    """Get the kind of value of a parameter, based on its name and the value in the standard file.
+
+    Parameters
+    ----------
+    name : string
+        Name of the parameter
+    value : string
+        Value of the parameter in the standard file
+
+    Returns
+    -------
+    string
+        'nk', 'spectrum' or 'trap' for a reference to a file, 'number' for a numerical value and 'text' otherwise
+    """
+    if name.startswith('nk'):
+        return 'nk'
+    if name.startswith('spectrum'):
+        return 'spectrum'
+    if name in ['intTrapFile', 'bulkTrapFile']:
+        return 'trap'
+    try:
+        float(value)
+        return 'number'
+    except ValueError:
+        return 'text'
+
+def to_number(text):
+    """Convert a number in a description to an int when it is a whole number, so it is shown as such in the error messages.
+
+    Parameters
+    ----------
+    text : string
+        Number, e.g. '5', '0.5' or '1E-3'
+
+    Returns
+    -------
+    int or float
+        The number
+    """
+    number = float(text)
+    return int(number) if number.is_integer() else number
+
+def get_parameter_range(name, value, description):
+    """Get the allowed range of a numerical parameter from its description in the standard file.
+
+    Parameters
+    ----------
+    name : string
+        Name of the parameter
+    value : string
+        Value of the parameter in the standard file
+    description : string
+        Description of the parameter in the standard file
+
+    Returns
+    -------
+    tuple
+        (minimum, maximum, integer), the minimum and maximum are None when not bounded
+    """
+    low, high, integer = IMPLICIT_RANGES.get(name, (None, None, False))
+    integer = integer or re.search(r'\binteger\b', description) is not None
+
+    between = BETWEEN_PATTERN.search(description) or INTEGER_RANGE_PATTERN.search(description)
+    if between:
+        return to_number(between.group(1)), to_number(between.group(2)), integer
+
+    low_match, high_match = LOW_PATTERN.search(description), HIGH_PATTERN.search(description)
+    if low_match or high_match:
+        return (to_number(low_match.group(1)) if low_match else low), (to_number(high_match.group(1)) if high_match else high), integer
+
+    # A list of options, e.g. 'yes(1) or no (0)'. Not when any other value is allowed as well, e.g. 'whether(1) or not(<>1)'.
+    if re.fullmatch(r'-?\d+', value) and '<>' not in description:
+        options = {int(a or b) for a, b in OPTION_PATTERN.findall(description)}
+        if len(options) > 1:
+            return min(options), max(options), True
+
+    return low, high, integer
+
+def iter_parameter_lines(text):
+    """Iterate over the lines of a device parameters file with the section they are in.
+
+    Parameters
+    ----------
+    text : string
+        Content of the file
+
+    Yields
+    ------
+    tuple
+        (line number, section, kind of line, content). The kind of line is 'version' (content is the version), 'par' (content is
+        the name, value and description) or 'invalid' (content is the line). Comments and empty lines are skipped.
+    """
+    section = None
+    for line_nr, line in enumerate(text.splitlines(), 1):
+        line = line.strip()
+        if line == '':
+            continue
+        if line.startswith('**'):
+            version = VERSION_PATTERN.match(line)
+            if version:
+                yield line_nr, section, 'version', version.group(1)
+            else:
+                section_name = line.replace('*', '').strip()
+                if section_name in SECTIONS:
+                    section = section_name
+            continue
+        if line.startswith('*'):
+            continue
+
+        par, _, description = line.partition('*')
+        if '=' not in par:
+            yield line_nr, section, 'invalid', line
+            continue
+        name, value = par.split('=', 1)
+        yield line_nr, section, 'par', (name.strip(), value.strip(), description.strip())
+
+@functools.lru_cache(maxsize=16)
+def _compile_schema(reference_path, signature):
+    """Compile the schema of a standard device parameters file. Cached on the path and the modification time and size of the file.
+
+    Parameters
+    ----------
+    reference_path : string
+        Path to the standard file
+    signature : tuple
+        Modification time and size of the file
+
+    Returns
+    -------
+    DevparSchema
+        Schema of the file
+    """
+    with open(reference_path, encoding='utf-8') as fp:
+        text = fp.read()
+
+    rules = []
+    version = None
+    for line_nr, section, line_kind, content in iter_parameter_lines(text):
+        if line_kind == 'version':
+            version = content
+        elif line_kind == 'par':
+            name, value, description = content
+            if section == 'Layers' and LAYER_PATTERN.match(name):
+                # The number of layers is free, these are checked separately
+                continue
+            kind = get_value_kind(name, value)
+            low, high, integer = get_parameter_range(name, value, description) if kind == 'number' else (None, None, False)
+            rules.append(ParameterRule(name, section, line_nr, kind, low, high, integer, tuple(KEYWORD_VALUES.get(name, ()))))
+    return DevparSchema(rules, version)
+
+def get_schema(reference_path):
+    """Get the schema of a standard device parameters file. The schema is compiled once for every version of the standard file
+    and compiled again when the file changes (e.g. a new version of SIMsalabim).
+
+    Parameters
+    ----------
+    reference_path : string
+        Path to the standard file
+
+    Returns
+    -------
+    DevparSchema
+        Schema of the file
+    """
+    file_stat = os.stat(reference_path)
+    return _compile_schema(os.path.abspath(reference_path), (file_stat.st_mtime_ns, file_stat.st_size))
+
+def check_value(rule, value):
+    """Check the value of a parameter against its rule.
+
+    Parameters
+    ----------
+    rule : ParameterRule
+        Expected parameter
+    value : string
+        Value of the parameter
+
+    Returns
+    -------
+    string
+        Reason why the value is invalid, empty when the value is valid
+    """
+    if value == '':
+        return 'has no value'
+    if rule.kind != 'number' or value in rule.keywords:
+        return ''
+    try:
+        number = float(value)
+    except ValueError:
+        return f'must be a number, received "{value}"'
+    if rule.integer and not number.is_integer():
+        return f'must be an integer, received "{value}"'
+    if rule.low is not None and number < rule.low:
+        return f'must be at least {rule.low}, received "{value}"'
+    if rule.high is not None and number > rule.high:
+        return f'must be at most {rule.high}, received "{value}"'
+    return ''
+
+def validate_devpar(text, schema, file_lists = None):
+    """Validate the content of a device parameters file against a schema in a single pass. All errors are collected, not only the first one.
+    A file for another version of SIMsalabim is valid when it has the same parameters. Otherwise the version is reported before the errors.
+
+    Parameters
+    ----------
+    text : string
+        Content of the file
+    schema : DevparSchema
+        Schema of the expected file
+    file_lists : dict, optional
+        Available files for each kind of file reference ('nk', 'spectrum', 'trap'), by default None (not checked)
+
+    Returns
+    -------
+    List
+        Error messages, with the line numbers
+    List
+        Referenced files that are not available
+    List
+        Layer files in the Layers section
+    """
+    file_lists = file_lists or {}
+    errors, missing_files, layers = [], [], []
+    rules = schema.rules
+    position = 0
+    # Position of an expected parameter that was taken to be replaced by an unexpected parameter
+    replaced = None
+    version_note = None
+
+    for line_nr, section, line_kind, content in iter_parameter_lines(text):
+        if line_kind == 'version':
+            if schema.version is not None and content != schema.version:
+                version_note = f'Line {line_nr}: file is for version {content}, expected version {schema.version}. The parameters may have changed.'
+            continue
+        if line_kind == 'invalid':
+            errors.append(f'Line {line_nr}: "{content}" is not according to the format')
+            if position < len(rules) and content.split()[0] == rules[position].name:
+                # The expected parameter, only without a value
+                position += 1
+            continue
+
+        name, value, _ = content
+        if section == 'Layers' and LAYER_PATTERN.match(name):
+            layers.append(value)
+            continue
+
+        expected = schema.positions.get(name)
+        if expected is not None and expected == replaced:
+            # The unexpected parameter before was added, not a replacement of this one
+            position = expected
+        if expected is None or expected < position:
+            if position < len(rules):
+                rule = rules[position]
+                errors.append(f'Line {line_nr}: expected parameter "{rule.name}" (line {rule.line}) and received parameter "{name}"')
+                replaced = position
+                position += 1
+            else:
+                errors.append(f'Line {line_nr}: unexpected parameter "{name}"')
+            continue
+        replaced = None
+        for rule in rules[position:expected]:
+            errors.append(f'Line {line_nr}: expected parameter "{rule.name}" (line {rule.line}) and received parameter "{name}"')
+
+        rule = rules[expected]
+        position = expected + 1
+        reason = check_value(rule, value)
+        if reason:
+            errors.append(f'Line {line_nr}: parameter "{name}" {reason}')
+        elif rule.kind in file_lists and value != 'none' and value not in file_lists[rule.kind]:
+            missing_files.append(value)
+
+    for rule in rules[position:]:
+        errors.append(f'End of file: missing parameter "{rule.name}" (line {rule.line})')
+
+    if errors and version_note is not None:
+        errors.insert(0, version_note)
+
+    return errors, missing_files, layers
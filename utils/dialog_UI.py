@@ -3,6 +3,54 @@ import shutil, os
 from utils import general_UI as utils_gen_UI
 from utils import upload_UI as utils_upload_UI
 from utils import device_parameters_UI as utils_devpar_UI
+from utils import device_model as utils_device_model
+from utils import devpar_schema as utils_devpar_schema
+from utils import optics_catalog as utils_optics_catalog
+
+def verifyUploadedDevPar(uploadedFile, referenceFile):
+    """
+    Validate an uploaded simulation setup or layer parameter file against the schema of the standard file and show all errors.
+
+    Parameters
+    ----------
+    uploadedFile: UploadedFile
+        the uploaded file
+    referenceFile: str
+        name of the standard file in the resource folder to validate against
+
+    Returns
+    -------
+    bool
+        True when the file is valid
+    """
+    schema = utils_devpar_schema.get_schema(os.path.join(st.session_state['resource_path'], referenceFile))
+    errors, _, _ = utils_devpar_schema.validate_devpar(utils_devpar_UI.decode_upload(uploadedFile.getvalue()), schema)
+    if errors:
+        st.error(f'{uploadedFile.name} is not a valid file:\n\n' + '\n\n'.join(errors))
+    return not errors
+
+def verifyUploadedOptics(uploadedFile, kind):
+    """
+    Check that an uploaded nk or spectrum file can be parsed and show the error.
+
+    Parameters
+    ----------
+    uploadedFile: UploadedFile
+        the uploaded file
+    kind: str
+        'nk' or 'spectrum'
+
+    Returns
+    -------
+    bool
+        True when the file is valid
+    """
+    try:
+        utils_optics_catalog.parse_optics_data(utils_devpar_UI.decode_upload(uploadedFile.getvalue()), kind)
+    except ValueError as error:
+        st.error(f'{uploadedFile.name} is not a valid file: {error}')
+        return False
+    return True
 
 def uploadFileDialog(session_path, dev_par, layers, device_parameters_current, device_parameters_alt, simtype):
     """
@@ -30,6 +78,7 @@ def uploadFileDialog(session_path, dev_par, layers, device_parameters_current, d
     """
     # Select the type of file the user wants to upload. A fixed list of options based on SIMsalabim v5.11
     allFilesUploaded = True # Boolean to disable submit button in case of uploading simulation setup
+    validUpload = True # Boolean to disable submit button when an uploaded simulation setup, layer, nk or spectrum file is not valid
 
     st.write('Which type of file do you want to upload?')
     if simtype == 'Steady State JV':
@@ -49,24 +98,31 @@ def uploadFileDialog(session_path, dev_par, layers, device_parameters_current, d
     fileDesc = f'Select {uploadChoice}:'
     if (uploadChoice == 'Experimental JV') or (uploadChoice == 'Generation profile') or(uploadChoice == 'Trap distribution') or(uploadChoice == 'Spectrum'):
         uploadedFile = utils_gen_UI.upload_file(fileDesc, ['=', '@', '0x09', '0x0D'], '', False)
+        if uploadChoice == 'Spectrum' and uploadedFile:
+            validUpload = verifyUploadedOptics(uploadedFile, 'spectrum')
     elif uploadChoice == 'Experimental JVs':
         uploadedFiles = st.file_uploader("Select experimental current voltage characteristics",type=['txt'], accept_multiple_files=True, label_visibility='visible')
     elif uploadChoice == 'n,k values':
         # Special to allow multiple files to be uploaded.
         uploadedFile = None
         uploadedFiles = st.file_uploader("Select one or more files with n,k values",type=['txt'], accept_multiple_files=True, label_visibility='visible')
+        for item in uploadedFiles or []:
+            validUpload = verifyUploadedOptics(item, 'nk') and validUpload
     elif uploadChoice == 'Simulation setup':
         st.warning('Note: You can only upload a Simulation setup file in combination with the associated layer parameter files!')
         # Implement checks on devpar files
         uploadedFile = st.file_uploader(fileDesc, type=['txt'], accept_multiple_files=False, label_visibility='visible')
         if (uploadedFile != None and uploadedFile != False):
-            data = uploadedFile.getvalue().decode('utf-8')
-            tmp_layers = utils_devpar_UI.getLayersFromSetup(data)
+            # Parse the uploaded setup directly from memory
+            tmp_layers = utils_devpar_UI.getLayersFromSetup(uploadedFile.getvalue())
+            validUpload = verifyUploadedDevPar(uploadedFile, device_parameters_current)
             
             uploadedFiles = st.file_uploader("Select all the layer parameter files associated with the simulation setup",type=['txt'], accept_multiple_files=True, label_visibility='visible')
             layerNames = []
             for item in uploadedFiles:
                 layerNames.append(item.name)
+                # Validate every layer file, all against the same compiled schema
+                validUpload = verifyUploadedDevPar(item, utils_devpar_schema.LAYER_REFERENCE_FILE) and validUpload
 
             allFilesUploaded = all(item in layerNames for item in tmp_layers) # Check if all the required parameter files have been uploaded
             if not allFilesUploaded:
@@ -78,10 +134,11 @@ def uploadFileDialog(session_path, dev_par, layers, device_parameters_current, d
     elif uploadChoice == 'Layer parameters':
         uploadedFile = st.file_uploader(fileDesc, type=['txt'], accept_multiple_files=False, label_visibility='visible')
         if (uploadedFile != None and uploadedFile != False):
+            validUpload = verifyUploadedDevPar(uploadedFile, utils_devpar_schema.LAYER_REFERENCE_FILE)
             if uploadedFile.name in st.session_state['availableLayerFiles']:
                 st.warning('A layer parameter file with this name already exists, it will be overwritten. Consider changing the name of the to be uploaded file if you want to keep both files.')
 
-    if st.button("Submit", disabled = not allFilesUploaded):
+    if st.button("Submit", disabled = not (allFilesUploaded and validUpload)):
         # Depending on the type of uploaded file, call the corresponding function to process the upload
         if (uploadedFile != None and uploadedFile != False) or (uploadedFiles != None and uploadedFiles != False):
             if uploadChoice == 'Experimental JV':
@@ -202,9 +259,7 @@ def addLayerDialog(session_path, dev_par, layers, resource_path, device_paramete
 
         layers.append(new_layer)
         # Update the simulation_setup file with the new layer
-        for section in dev_par[device_parameters_current]:
-            if section[0] == 'Layers':
-                section.append(new_layer)
+        utils_device_model.get_section(dev_par[device_parameters_current], 'Layers').append(new_layer)
 
         # Save the files
         utils_gen_UI.save_parameters(dev_par, layers, session_path, device_parameters_current, device_parameters_alt)
@@ -0,0 +1,212 @@
+"""Serve large files for download through a streaming endpoint or the static file endpoint of Streamlit, instead of sending them through the websocket"""
+######### Package Imports #########################################################################
+
+import os, time, shutil, secrets, mimetypes
+import streamlit as st
+from starlette.routing import Route
+from starlette.responses import FileResponse, PlainTextResponse
+
+######### Parameter Initialisation ################################################################
+
+# Folder from which Streamlit serves static files (server.enableStaticServing), relative to SIMsalabim.py. Files are available at app/static/...
+STATIC_FOLDER = 'static'
+DOWNLOAD_FOLDER = 'downloads'
+
+# Files up to this size are sent with st.download_button, larger files are linked to the static file endpoint
+LINK_THRESHOLD = 5 * 1024 * 1024
+
+# Streamlit does not serve static files larger than 200 MB
+MAX_STATIC_FILE_SIZE = 200 * 1024 * 1024
+
+# Route of the streaming endpoint, which has no size limit. Only available when The Shell is started with app.py (streamlit run app.py),
+# which sets the environment variable. The variable is used instead of a module variable, as Streamlit reloads modules that have changed.
+STREAM_ROUTE = '/api/downloads'
+STREAM_VARIABLE = 'SIMSALABIM_STREAM_DOWNLOADS'
+
+# Published files are removed after this number of seconds
+PUBLISH_TTL = 24 * 3600
+
+######### Function Definitions ####################################################################
+
+def get_download_token():
+    """Get the random token of the session, used as the folder name of its published files, so they cannot be guessed by other users.
+
+    Returns
+    -------
+    string
+        Token of the session
+    """
+    if 'downloadToken' not in st.session_state:
+        st.session_state['downloadToken'] = secrets.token_urlsafe(16)
+    return st.session_state['downloadToken']
+
+def publish_file(file_path, token, file_name = None):
+    """Make a file available on the static file endpoint, by hard linking it into the static download folder.
+    Falls back to a copy when a hard link is not possible. The file is replaced atomically when it has changed.
+
+    Parameters
+    ----------
+    file_path : string
+        Path to the file
+    token : string
+        Token of the session, see get_download_token
+    file_name : string, optional
+        Name of the published file, by default the name of the file
+
+    Returns
+    -------
+    string
+        URL of the file, relative to the app
+    """
+    if file_name is None:
+        file_name = os.path.basename(file_path)
+
+    publish_dir = os.path.join(STATIC_FOLDER, DOWNLOAD_FOLDER, token)
+    os.makedirs(publish_dir, exist_ok=True)
+    publish_path = os.path.join(publish_dir, file_name)
+
+    # Nothing to do when the published file is still a link to the same file
+    if not (os.path.isfile(publish_path) and os.path.samefile(file_path, publish_path)):
+        tmp_path = publish_path + '.tmp'
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        try:
+            os.link(file_path, tmp_path)
+        except OSError:
+            # E.g. the static folder is on another file system
+            shutil.copyfile(file_path, tmp_path)
+        os.replace(tmp_path, publish_path)
+
+    # Keep the folder timestamp up to date, so the files are not removed while in use
+    os.utime(publish_dir)
+    remove_expired_files()
+
+    return '/'.join(['app', STATIC_FOLDER, DOWNLOAD_FOLDER, token, file_name])
+
+def get_routes():
+    """Get the routes of the streaming endpoint, to pass to st.App. Marks the endpoint as available for show_download.
+
+    Returns
+    -------
+    List
+        Starlette routes
+    """
+    os.environ[STREAM_VARIABLE] = '1'
+    return [Route(STREAM_ROUTE + '/{token}/{file_name}', stream_file, methods=['GET', 'HEAD'])]
+
+def is_streaming_enabled():
+    """Check if the streaming endpoint is available.
+
+    Returns
+    -------
+    bool
+        True when The Shell has been started with the routes of get_routes
+    """
+    return os.environ.get(STREAM_VARIABLE) == '1'
+
+def get_stream_url(token, file_name):
+    """Get the URL of a published file on the streaming endpoint.
+
+    Parameters
+    ----------
+    token : string
+        Token of the session, see get_download_token
+    file_name : string
+        Name of the published file
+
+    Returns
+    -------
+    string
+        URL of the file, relative to the app
+    """
+    return '/'.join([STREAM_ROUTE.strip('/'), token, file_name])
+
+async def stream_file(request):
+    """Streaming endpoint: send a published file in chunks, with support for range requests (resume). Only the files in the download folder
+    can be requested, the file is never loaded into memory.
+
+    Parameters
+    ----------
+    request : starlette.requests.Request
+        Request with the token and the file name as path parameters
+
+    Returns
+    -------
+    starlette.responses.Response
+        The file, or 404 when it has not been published
+    """
+    token, file_name = request.path_params['token'], request.path_params['file_name']
+    file_path = os.path.join(os.path.abspath(STATIC_FOLDER), DOWNLOAD_FOLDER, token, file_name)
+    # Names starting with a dot cover '..' and the temporary files of publish_file are not served either
+    if any(name.startswith('.') or os.sep in name or name.endswith('.tmp') for name in (token, file_name)) or not os.path.isfile(file_path):
+        return PlainTextResponse('Not found', status_code=404)
+    media_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+    return FileResponse(file_path, media_type=media_type, headers={'Cache-Control': 'no-store'})
+
+def remove_expired_files(max_age = PUBLISH_TTL):
+    """Remove the published files of sessions that have not published a file for a while.
+
+    Parameters
+    ----------
+    max_age : float, optional
+        Maximum age in seconds, by default PUBLISH_TTL
+    """
+    download_dir = os.path.join(STATIC_FOLDER, DOWNLOAD_FOLDER)
+    now = time.time()
+    for entry in os.scandir(download_dir):
+        if entry.is_dir() and now - entry.stat().st_mtime > max_age:
+            shutil.rmtree(entry.path, ignore_errors=True)
+
+def show_download(label, file_path, file_name, mime = None, key = None):
+    """Show a download button for a file. Large files are not sent through the websocket, but linked to the streaming endpoint
+    (see get_routes) or, when that is not available, to the static file endpoint. Both stream the file and support range requests (resume).
+    Files that are too large for the static file endpoint are only offered on the streaming endpoint, they are never loaded into memory.
+
+    Parameters
+    ----------
+    label : string
+        Label of the button
+    file_path : string
+        Path to the file
+    file_name : string
+        Name of the downloaded file
+    mime : string, optional
+        MIME type of the file, by default None
+    key : string, optional
+        Key of the download button, by default None
+    """
+    file_size = os.path.getsize(file_path)
+
+    if file_size > LINK_THRESHOLD and is_streaming_enabled():
+        token = get_download_token()
+        publish_file(file_path, token, os.path.basename(file_path))
+        url = get_stream_url(token, os.path.basename(file_path))
+    elif file_size > LINK_THRESHOLD and st.get_option('server.enableStaticServing') and file_size <= MAX_STATIC_FILE_SIZE:
+        url = publish_file(file_path, get_download_token(), os.path.basename(file_path))
+    elif file_size > MAX_STATIC_FILE_SIZE:
+        st.warning(f'{label}: the file is too large ({file_size / 1024**2:.0f} MB) to download from this server, the limit is '
+                   f'{MAX_STATIC_FILE_SIZE / 1024**2:.0f} MB. Start The Shell with "streamlit run app.py" to download large files.')
+        return
+    else:
+        # The file is only read when the button is clicked
+        st.download_button(label=label, data=lambda: read_file_bytes(file_path), file_name=file_name, mime=mime, key=key)
+        return
+
+    # The download attribute sets the file name and makes the browser save the file, regardless of the served content type
+    st.markdown(f'<a href="{url}" download="{file_name}" class="download-link">{label}</a>', unsafe_allow_html=True)
+
+def read_file_bytes(file_name):
+    """Read a file as bytes
+
+    Parameters
+    ----------
+    file_name : string
+        Path to the file
+
+    Returns
+    -------
+    bytes
+        Content of the file
+    """
+    with open(file_name, 'rb') as fp:
+        return fp.read()
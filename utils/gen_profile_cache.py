@@ -0,0 +1,244 @@
+"""Cache of the generation profiles calculated by SIMsalabim (genProfile = calc), keyed by the optical inputs of the device.
+A cached profile is passed to SIMsalabim as a generation profile file, so a run in which only electrical parameters changed skips the optics stage."""
+######### Package Imports #########################################################################
+
+import os, json, hashlib, tempfile, functools
+import numpy as np
+import pandas as pd
+from utils import device_model as utils_device_model
+from utils import optics_catalog as utils_optics_catalog
+from utils import optics_store as utils_optics_store
+
+######### Parameter Initialisation ################################################################
+
+# Folder with the cached profiles, shared by all sessions. Relative to SIMsalabim.py, like the Simulations folder.
+GEN_PROFILE_CACHE_FOLDER = os.path.join('Cache', 'gen_profiles')
+
+# Number of cached profiles, the least recently used profiles are removed first
+MAX_CACHED_PROFILES = 256
+
+# Name of the generation profile file in the session folder when a cached profile is used
+CACHED_PROFILE_FILE = 'genProfile_cached.txt'
+
+# Parameters of the simulation setup that determine the generation profile
+SETUP_OPTICS_PARAMETERS = [('Optics', 'L_TCO'), ('Optics', 'L_BE'), ('Optics', 'nkSubstrate'), ('Optics', 'nkTCO'), ('Optics', 'nkBE'),
+                           ('Optics', 'spectrum'), ('Optics', 'lambda_min'), ('Optics', 'lambda_max'),
+                           ('Numerical Parameters', 'NP'), ('Numerical Parameters', 'grad')]
+
+# Parameters of a layer that determine the generation profile
+LAYER_OPTICS_PARAMETERS = ['L', 'nkLayer', 'layerGen', 'G_ehp']
+
+######### Function Definitions ####################################################################
+
+@functools.lru_cache(maxsize=utils_optics_catalog.MAX_PARSED_FILES)
+def _file_digest(file_path, signature):
+    """Get the hash of the content of a file. Cached on the path, modification time and size of the file.
+
+    Parameters
+    ----------
+    file_path : string
+        Path of the file
+    signature : tuple
+        Modification time and size of the file
+
+    Returns
+    -------
+    string
+        SHA-256 hash of the content
+    """
+    with open(file_path, 'rb') as fp:
+        return hashlib.sha256(fp.read()).hexdigest()
+
+def get_file_digest(session_path, file_name):
+    """Get the hash of the content of a nk or spectrum file, so an uploaded file with the same name as a previous one changes the key.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+    file_name : string
+        File name as used in the device parameters, e.g. 'Data_nk/nk_Au.txt'
+
+    Returns
+    -------
+    string
+        Hash of the content, None if the file does not exist
+    """
+    file_path = utils_optics_catalog.resolve_optics_file(session_path, file_name)
+    if file_path is None:
+        return None
+    file_stat = os.stat(file_path)
+    return _file_digest(os.path.abspath(file_path), (file_stat.st_mtime_ns, file_stat.st_size))
+
+def get_optics_key(dev_par, dev_par_file_name, session_path):
+    """Get the key of the generation profile of a device: a hash of the optical parameters of the setup and the layers and
+    of the content of the nk and spectrum files. The key is the same for a SimSS and ZimT setup with the same optics.
+
+    Parameters
+    ----------
+    dev_par : dict
+        Device parameters of all files
+    dev_par_file_name : string
+        Name of the simulation setup file
+    session_path : string
+        Path of the current simulation session
+
+    Returns
+    -------
+    string
+        Key of the generation profile, None when the profile is not calculated by SIMsalabim (genProfile is not 'calc')
+    """
+    if dev_par is None or dev_par_file_name not in dev_par:
+        return None
+    setup = dev_par[dev_par_file_name]
+    if utils_device_model.get_value(setup, 'genProfile', 'Optics') != 'calc':
+        return None
+
+    inputs = [[section, name, utils_device_model.get_value(setup, name, section)] for section, name in SETUP_OPTICS_PARAMETERS]
+
+    layers_section = utils_device_model.get_section(setup, 'Layers') or []
+    for param in layers_section[1:]:
+        if param[0] != 'par':
+            continue
+        if param[2] not in dev_par:
+            # A layer that is not loaded, the profile cannot be identified
+            return None
+        inputs.extend([param[1], name, utils_device_model.get_value(dev_par[param[2]], name)] for name in LAYER_OPTICS_PARAMETERS)
+
+    # The content of the files, not only the names
+    file_names = sorted({value for _, _, value in inputs if isinstance(value, str) and utils_optics_store.is_optics_file_name(value)})
+    inputs.extend(['file', file_name, get_file_digest(session_path, file_name)] for file_name in file_names)
+
+    return hashlib.sha256(json.dumps(inputs).encode('utf-8')).hexdigest()
+
+def get_cache_path(key):
+    """Get the path of a cached generation profile.
+
+    Parameters
+    ----------
+    key : string
+        Key of the generation profile, see get_optics_key
+
+    Returns
+    -------
+    string
+        Path of the file
+    """
+    return os.path.join(GEN_PROFILE_CACHE_FOLDER, key + '.txt')
+
+def use_cached_profile(session_path, key):
+    """Copy a cached generation profile into the session folder, to be used by SIMsalabim instead of calculating the profile.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+    key : string
+        Key of the generation profile, see get_optics_key
+
+    Returns
+    -------
+    List
+        Command line parameters ([{'par': 'genProfile', 'val': file name}]) for the pySIMsalabim run functions, None when no profile is cached
+    """
+    if key is None:
+        return None
+    cache_path = get_cache_path(key)
+    target_path = os.path.join(session_path, CACHED_PROFILE_FILE)
+    try:
+        tmp_path = target_path + '.tmp'
+        with open(cache_path, 'rb') as fp_in, open(tmp_path, 'wb') as fp_out:
+            fp_out.write(fp_in.read())
+        os.replace(tmp_path, target_path)
+        # Mark the profile as recently used
+        os.utime(cache_path)
+    except FileNotFoundError:
+        return None
+    return [{'par': 'genProfile', 'val': CACHED_PROFILE_FILE}]
+
+def read_profile(var_file_path):
+    """Read the generation profile from a variables file of SIMsalabim, the profile of the first voltage is used.
+
+    Parameters
+    ----------
+    var_file_path : string
+        Path of the variables file
+
+    Returns
+    -------
+    tuple
+        Arrays with the position x (m) and the generation rate G_ehp (m^-3 s^-1), None when the file does not contain the profile
+    """
+    try:
+        data = pd.read_csv(var_file_path, sep=r'\s+', usecols=['x', 'Vext', 'G_ehp'])
+    except (FileNotFoundError, ValueError, pd.errors.EmptyDataError):
+        return None
+    if data.empty:
+        return None
+    data = data[data['Vext'] == data['Vext'].iloc[0]]
+    return data['x'].to_numpy(dtype=float), data['G_ehp'].to_numpy(dtype=float)
+
+def store_profile(key, var_file_path, G_frac):
+    """Store the generation profile of a SimSS run in the cache. The profile is stored for G_frac = 1, as SIMsalabim scales
+    a generation profile file with G_frac.
+
+    Parameters
+    ----------
+    key : string
+        Key of the generation profile, see get_optics_key
+    var_file_path : string
+        Path of the variables file of the run
+    G_frac : float
+        Fraction of the generation used in the run
+
+    Returns
+    -------
+    bool
+        True when the profile has been stored, False when there is no profile or it could not be written
+    """
+    if key is None or not G_frac:
+        return False
+    profile = read_profile(var_file_path)
+    if profile is None:
+        return False
+    x, G_ehp = profile
+    if not np.all(np.isfinite(G_ehp)):
+        return False
+
+    try:
+        os.makedirs(GEN_PROFILE_CACHE_FOLDER, exist_ok=True)
+        # A unique temporary file, as sessions in the same process can store the same profile at the same time
+        fd, tmp_path = tempfile.mkstemp(dir=GEN_PROFILE_CACHE_FOLDER, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as fp:
+                np.savetxt(fp, np.column_stack((x, G_ehp / G_frac)), header='x G_ehp', comments='', fmt='%.6e')
+            os.replace(tmp_path, get_cache_path(key))
+        finally:
+            if os.path.isfile(tmp_path):
+                os.remove(tmp_path)
+        remove_old_profiles()
+    except OSError:
+        # The cache only saves time, failing to write it must not fail the simulation
+        return False
+    return True
+
+def remove_old_profiles(max_profiles = MAX_CACHED_PROFILES):
+    """Remove the least recently used profiles when the cache holds more than the maximum number of profiles.
+
+    Parameters
+    ----------
+    max_profiles : int, optional
+        Number of profiles to keep, by default MAX_CACHED_PROFILES
+    """
+    try:
+        with os.scandir(GEN_PROFILE_CACHE_FOLDER) as entries:
+            profiles = [(entry.stat().st_mtime_ns, entry.path) for entry in entries if entry.name.endswith('.txt') and entry.is_file()]
+    except FileNotFoundError:
+        return
+    profiles.sort(reverse=True)
+    for _, file_path in profiles[max_profiles:]:
+        try:
+            os.remove(file_path)
+        except FileNotFoundError:
+            # Removed by another session
+            pass
@@ -1,13 +1,33 @@
 """Functions for general use, WEB only!"""
 ######### Package Imports #########################################################################
 
-import os, re, shutil, zipfile
+import os, re, io, hashlib, tempfile, zipfile
 import streamlit as st
 from datetime import datetime
-from subprocess import run, PIPE
+from concurrent.futures import ThreadPoolExecutor
 from pySIMsalabim.utils import device_parameters as utils_devpar
 from utils import device_parameters_UI as utils_devpar_UI
+from utils import device_model as utils_device_model
 from utils import summary_and_citation as utils_sum
+from utils import file_serving as utils_file_serving
+from utils import optics_catalog as utils_optics_catalog
+from utils import profiling as utils_profiling
+
+######### Parameter Initialisation ################################################################
+
+# Compression of the text files in the results archive: 'store', 'deflate' or 'zstd'
+RESULTS_COMPRESSION = 'deflate'
+RESULTS_COMPRESSLEVEL = 6
+
+# Files that are already compressed, these are stored in the results archive as is
+COMPRESSED_EXTENSIONS = {'.zip', '.gz', '.bz2', '.xz', '.zst', '.npz', '.png', '.jpg', '.jpeg', '.pdf'}
+
+# Results archives are written in the background on this pool, shared by all sessions
+MAX_PACKAGE_WORKERS = 2
+_package_executor = ThreadPoolExecutor(max_workers=MAX_PACKAGE_WORKERS, thread_name_prefix='result-package')
+
+# Seconds between checks whether the results archive is ready
+PACKAGE_POLL_INTERVAL = 2
 
 ######### Function Definitions ####################################################################
 
@@ -87,7 +107,7 @@ def upload_file(file_desc, ill_chars, pattern, check_devpar='', nk_file_list = [
             msg_filename = 'Filename is too long. Max 50 characters'
 
         if check_devpar == 'simss' or check_devpar == 'zimt':  # Check if a device parameters file has the correct structure. Only when uploading a device parameters file.
-            chk_devpar_file, msg_devpar = utils_devpar.verify_devpar_file(data, check_devpar, nk_file_list, spectrum_file_list)
+            chk_devpar_file, msg_devpar = utils_devpar_UI.verify_devpar_file(uploaded_file.getvalue(), check_devpar, nk_file_list, spectrum_file_list)
 
         if chk_chars + chk_pattern + chk_filename == 0:
             if chk_devpar_file ==1:
@@ -112,9 +132,10 @@ def upload_file(file_desc, ill_chars, pattern, check_devpar='', nk_file_list = [
             st.markdown('<hr>', unsafe_allow_html=True)
             return False
 
-def prepare_results_download(session_path, id_session, sim_type, exp_type):
-    """Gather all the relevant files for the simulation and store them into a tmp directory to ZIP them. 
-    Whether a file is needed is determined btVG.txtased on the state parameter, which has been set when running a simulation.
+def prepare_results_download(session_path, id_session, sim_type, exp_type, compression = RESULTS_COMPRESSION, compresslevel = RESULTS_COMPRESSLEVEL):
+    """Gather all the relevant files for the simulation and write them directly from the session folder into a ZIP archive in the Simulations folder. 
+    Whether a file is needed is determined based on the state parameter, which has been set when running a simulation. 
+    The summary and citation file is created in memory.
 
     Parameters
     ----------
@@ -126,6 +147,11 @@ def prepare_results_download(session_path, id_session, sim_type, exp_type):
         which simulation has been run, either 'simss' or 'zimt'
     exp_type : str, optional
         state the type of experiment run, to collect additional files, must be SS_JV, Transient_JV, Impedance, IMPS, or CV
+    compression : string, optional
+        Compression of the text files, 'store', 'deflate' or 'zstd', by default RESULTS_COMPRESSION. 
+        'zstd' requires a Python version with Zstandard support in zipfile, otherwise deflate is used.
+    compresslevel : int, optional
+        Compression level for deflate (0-9) or zstd, by default RESULTS_COMPRESSLEVEL
     """
 
     if sim_type not in ('simss', 'zimt'):
@@ -136,15 +162,29 @@ def prepare_results_download(session_path, id_session, sim_type, exp_type):
         st.error('Wrong experiment type provided, must be SS_JV, Transient_JV, Impedance, IMPS, or CV')
         return
     
-    tmp_folder_path = os.path.join(session_path, 'tmp')
-    # When a previous temp folder already exists remove it first.
-    if os.path.exists(tmp_folder_path):
-        shutil.rmtree(tmp_folder_path)
-    # Create the temp folder inside the session folder
-    os.makedirs(tmp_folder_path)
+    entries, summary = get_results_manifest(session_path, sim_type, exp_type)
+    write_results_archive(os.path.join('Simulations', f'simulation_results_{id_session}.zip'), entries, summary, compression, compresslevel)
+
+def get_results_manifest(session_path, sim_type, exp_type):
+    """Get the files to include in the results archive and the text of the summary and citation file. 
+    Reads the session state, so it must be called from the script thread.
+
+    Parameters
+    ----------
+    session_path : string
+        File path of the current simulation, including id
+    sim_type : string
+        which simulation has been run, either 'simss' or 'zimt'
+    exp_type : str
+        state the type of experiment run, to collect additional files, must be SS_JV, Transient_JV, Impedance, IMPS, or CV
 
+    Returns
+    -------
+    List, string
+        List with the path and the name in the archive of each file, and the text of the summary and citation file
+    """
     # The relevant files for the simulation are selected by reading their corresponding session state variable. 
-    # If not 'none' the file must be copied to the temp folder to be downloaded.
+    # If not 'none' the file must be added to the archive to be downloaded.
     state = st.session_state
 
     # Files to copy based on conditions
@@ -190,40 +230,92 @@ def prepare_results_download(session_path, id_session, sim_type, exp_type):
                 state["expObject"].get('expJV_Vmin_Vmax'),
                 state["expObject"].get('expJV_Vmax_Vmin')])
 
-    # Copy main files
+    # Main files, stored in the root of the archive
+    entries = []
     for file in files_to_copy:
         src = os.path.join(session_path, file)
         if os.path.isfile(src):
-            shutil.copy(src, tmp_folder_path)
+            entries.append((src, os.path.basename(src)))
+    entries.sort(key=lambda entry: entry[1])
+    file_names = [arcname for src, arcname in entries]
 
     # When a calculated generation profile is used, retrieve the used nk data and spectrum files as well
-    if state['genProfile'] == 'calc':
-        for subdir in ['Data_nk', 'Data_spectrum']:
-            src_dir = os.path.join(session_path, subdir)
-            dst_dir = os.path.join(tmp_folder_path, subdir)
-            os.makedirs(dst_dir, exist_ok=True)
-            for file in os.listdir(src_dir):
-                if os.path.join(subdir, file) in state['opticsFiles']:
-                    shutil.copy(os.path.join(src_dir, file), dst_dir)
-
-        # Create the summary and citation file
-        utils_sum.create_summary_and_cite(tmp_folder_path, True)
-    else:
-        utils_sum.create_summary_and_cite(tmp_folder_path, False)
-
-    # Create a ZIP file from the tmp results folder
-    shutil.make_archive(f'simulation_results_{id_session}','zip', tmp_folder_path)
-    zip_file_name = f'simulation_results_{id_session}.zip'
-
-    # If the ZIP archive already exists for this id in the Simulations folder, remove it first.
-    if os.path.isfile(os.path.join('Simulations', zip_file_name)):
-        os.remove(os.path.join('Simulations', zip_file_name))
-
-    # Copy the ZIP file to the 'main' simulations folder
-    shutil.move(zip_file_name, 'Simulations/')
-
-def exchangeDevPar(session_path, source , target):
-    """Exchanges the device parameters (SimSS, ZimT) of source to target using the exchangeDevPar executable.
+    used_optics = state['genProfile'] == 'calc'
+    optics_names = {'Data_nk': [], 'Data_spectrum': []}
+    if used_optics:
+        # The files are in the overlay of the session (uploads) or in the shared store
+        for file_name in sorted(set(state['opticsFiles'])):
+            subdir, file = os.path.split(os.path.normpath(file_name))
+            src = utils_optics_catalog.resolve_optics_file(session_path, file_name)
+            if subdir in optics_names and src is not None:
+                entries.append((src, os.path.join(subdir, file)))
+                optics_names[subdir].append(file)
+
+    # Create the summary and citation file
+    summary = utils_sum.get_summary_and_cite(file_names, used_optics, optics_names['Data_nk'], optics_names['Data_spectrum'])
+
+    return entries, summary
+
+def write_results_archive(zip_file_name, entries, summary, compression = RESULTS_COMPRESSION, compresslevel = RESULTS_COMPRESSLEVEL):
+    """Write the results archive. The files are written directly from their location into the archive. 
+    The archive is written next to its final location and moved in place when complete, so a download never gets a partial archive.
+
+    Parameters
+    ----------
+    zip_file_name : string
+        Filename of the ZIP archive
+    entries : List
+        List with the path and the name in the archive of each file
+    summary : string
+        Text of the summary and citation file
+    compression : string, optional
+        Compression of the text files, 'store', 'deflate' or 'zstd', by default RESULTS_COMPRESSION
+    compresslevel : int, optional
+        Compression level, by default RESULTS_COMPRESSLEVEL
+    """
+    fd, tmp_zip_file_name = tempfile.mkstemp(suffix='.tmp', prefix=os.path.basename(zip_file_name), dir=os.path.dirname(zip_file_name) or '.')
+    os.close(fd)
+    try:
+        with zipfile.ZipFile(tmp_zip_file_name, 'w') as zipf:
+            for src, arcname in entries:
+                compress_type, level = get_zip_compression(arcname, compression, compresslevel)
+                # Files are read in chunks by zipfile, they are not copied or loaded into memory first
+                zipf.write(src, arcname=arcname, compress_type=compress_type, compresslevel=level)
+
+            compress_type, level = get_zip_compression(utils_sum.summary_file_name, compression, compresslevel)
+            info = zipfile.ZipInfo(utils_sum.summary_file_name, date_time=datetime.now().timetuple()[:6])
+            zipf.writestr(info, summary, compress_type=compress_type, compresslevel=level)
+        os.replace(tmp_zip_file_name, zip_file_name)
+    finally:
+        if os.path.isfile(tmp_zip_file_name):
+            os.remove(tmp_zip_file_name)
+
+def get_zip_compression(file_name, compression = RESULTS_COMPRESSION, compresslevel = RESULTS_COMPRESSLEVEL):
+    """Get the zipfile compression method and level for a file. Files that are already compressed are stored without compression.
+
+    Parameters
+    ----------
+    file_name : string
+        Name of the file in the archive
+    compression : string, optional
+        Compression of the other files, 'store', 'deflate' or 'zstd', by default RESULTS_COMPRESSION
+    compresslevel : int, optional
+        Compression level, by default RESULTS_COMPRESSLEVEL
+
+    Returns
+    -------
+    int, int
+        Compression method (zipfile constant) and compression level (None when not applicable)
+    """
+    if compression == 'store' or os.path.splitext(file_name)[1].lower() in COMPRESSED_EXTENSIONS:
+        return zipfile.ZIP_STORED, None
+    if compression == 'zstd' and hasattr(zipfile, 'ZIP_ZSTANDARD'):
+        return zipfile.ZIP_ZSTANDARD, compresslevel
+    return zipfile.ZIP_DEFLATED, compresslevel
+
+def exchangeDevPar(session_path, source, target, source_par=None):
+    """Exchanges the device parameters (SimSS, ZimT) of source to target. The parameters both files have in common are copied from source to target.
+    The target is only written when a parameter has changed.
 
     Parameters
     ----------
@@ -233,46 +325,61 @@ def exchangeDevPar(session_path, source , target):
         source file name
     target : string
         target file name
+    source_par : List, optional
+        Parsed source file (List object), by default None (read from the file)
 
     Returns
     -------
-    integer
-        the returncode of the exchangedevpar executable
-    """   
-    
-    result = run(['./exchangeDevPar', source, target], cwd=session_path, stdout=PIPE, check=False)
-    return result.returncode
+    List
+        [section, name, old value, new value] for every changed parameter of the target
+    """
+    if source_par is None:
+        with open(os.path.join(session_path, source), encoding='utf-8') as fp:
+            source_par = utils_devpar.devpar_read_from_txt(fp)
+    with open(os.path.join(session_path, target), encoding='utf-8') as fp:
+        target_par = utils_devpar.devpar_read_from_txt(fp)
+
+    changes = utils_devpar_UI.exchange_parameters(source_par, target_par)
+    if changes:
+        utils_devpar_UI.write_file_atomic(os.path.join(session_path, target), utils_devpar.devpar_write_to_txt(target_par))
+    return changes
 
-def create_zip(session_path, layers):
-    """ Create a ZIP archive from a list of filenames
+def get_layer_files(session_path, layers):
+    """Get the paths of all unique layer files
 
     Parameters
     ----------
     session_path : string
         path to the current session folder, where device parameter files are located
     layers : List
-        List with all filenames/paths to be zipped, to be extracted from the layer object
+        List with all layers, the filename of a layer is the third element
 
     Returns
     -------
-    string
-        Filename of the ZIP archive
+    List
+        Paths of the layer files, in the order of the layers
     """
-
-    # Read all the file names to be zipped
     files = []
     for layer in layers:
         # Check if a layer file is already added, as they can be reused for different layers. If so, there is no need in including it twice in the ZIP archive
         if not os.path.join(session_path,layer[2]) in files:
             files.append(os.path.join(session_path,layer[2]))
+    return files
 
-    # Fixed name for the ZIP archive
-    zip_filename = os.path.join(session_path, 'Device_parameters.zip')
+def write_device_parameters_zip(target, files):
+    """Write the device parameter files into a ZIP archive, in the subfolder 'Device_parameters'
 
+    Parameters
+    ----------
+    target : string or file-like
+        Filename of the ZIP archive or a file-like object to write the archive to
+    files : List
+        Paths of the files to add to the archive
+    """
     # Store the current date & time for the archive
     current_datetime = datetime.now().timetuple()[:6]
 
-    with zipfile.ZipFile(zip_filename, 'w') as zipf:
+    with zipfile.ZipFile(target, 'w') as zipf:
         dir_name = 'Device_parameters' #Name of the subfolder in ZIP archive
         # get the current date and time to set the correct modified date for the subfolder, would otherwise be 01-01-1970 00:00
         info = zipfile.ZipInfo(f'{dir_name}/')
@@ -282,8 +389,41 @@ def create_zip(session_path, layers):
         for file in files:
             zipf.write(file, arcname=os.path.join(dir_name,os.path.basename(file)))
 
-    return zip_filename
+@utils_profiling.profiled('Device parameters ZIP')
+def get_device_parameters_zip(session_path, layers):
+    """Get the ZIP archive with the device parameter files as bytes, for the download button. 
+    The archive is built in memory and stored in the session state, together with the content hashes of the files. 
+    It is only rebuilt when a file has changed (save, upload) or the list of layer files has changed.
 
+    Parameters
+    ----------
+    session_path : string
+        path to the current session folder, where device parameter files are located
+    layers : List
+        List with all layers, the filename of a layer is the third element
+
+    Returns
+    -------
+    bytes
+        The ZIP archive
+    """
+    files = get_layer_files(session_path, layers)
+
+    # The files are small text files, hashing them is much cheaper than rebuilding the archive
+    zip_key = []
+    for file in files:
+        with open(file, 'rb') as fp:
+            zip_key.append((file, hashlib.sha1(fp.read()).hexdigest()))
+    zip_key = tuple(zip_key)
+
+    cached = st.session_state.get('devParZip')
+    if cached is None or cached[0] != zip_key:
+        buffer = io.BytesIO()
+        write_device_parameters_zip(buffer, files)
+        cached = (zip_key, buffer.getvalue())
+        st.session_state['devParZip'] = cached
+
+    return cached[1]
 
 def safe_index(value, options, default=0, strip_prefixes=('../',)):
     """Return a safe index of value in options.
@@ -334,8 +474,10 @@ def safe_index(value, options, default=0, strip_prefixes=('../',)):
     return default
 
 
+@utils_profiling.profiled('Save device parameters')
 def save_parameters(dev_par, layers, session_path, dev_par_file, exchange_target=None, show_toast=False):
-    """Save device parameters and update the other devpar file.
+    """Save device parameters and update the other devpar file. Only the files that changed are written, 
+    when nothing changed this is a no-op.
 
     Parameters
     ----------
@@ -359,19 +501,24 @@ def save_parameters(dev_par, layers, session_path, dev_par_file, exchange_target
 
     layersAvail = [dev_par_file]
     layersAvail.extend(st.session_state['availableLayerFiles'])
-    # Delegate to the existing device-parameters writer
-    utils_devpar_UI.write_pars_txt(dev_par, layers, session_path, dev_par_file)
+    # Delegate to the existing device-parameters writer, which only writes the files that changed
+    changed = utils_devpar_UI.write_pars_txt(dev_par, layers, session_path, dev_par_file)
 
-    # Keep the paired device-parameters file in sync when requested
-    if exchange_target:
+    # Keep the paired device-parameters file in sync when requested. The layer files are shared, 
+    # so this is only needed when the simulation setup file has changed.
+    exchanged = []
+    if exchange_target and dev_par_file in changed:
         try:
-            exchangeDevPar(session_path, dev_par_file, exchange_target)
-        except Exception:
-            # Non-fatal; the exchange step is best-effort
-            pass
+            exchanged = exchangeDevPar(session_path, dev_par_file, exchange_target, dev_par[dev_par_file])
+        except Exception as e:
+            # Non-fatal, the parameters have been saved. Let the user know the other file is not up to date.
+            st.warning(f'Could not update {exchange_target}: {e}')
 
     if show_toast:
-        st.toast('Saved device parameters', icon='✔️')
+        if exchanged:
+            st.toast(f'Saved device parameters, updated {len(exchanged)} parameter(s) in {exchange_target}', icon='✔️')
+        else:
+            st.toast('Saved device parameters', icon='✔️')
 
 def format_func(option):
     """Format function to split a string containing a /
@@ -406,17 +553,109 @@ def prepare_results(session_path, id_session, sim_type, exp_type):
             prepare_results_download(session_path, id_session, sim_type, exp_type) # Will check whether sim_type and exp_type are part of the defined list
     st.session_state['runSimulation'] = False
 
+def start_results_package(session_path, id_session, sim_type, exp_type):
+    """Start creating the results archive in the background, directly after a simulation has finished. 
+    The files to include are determined here from the session state, the archive is written on the result package pool.
+
+    Parameters
+    ----------
+    session_path : string
+        Path to folder with the simulation results
+    id_session : string
+        Current session id
+    sim_type : string
+        Type of simulation, either 'simss' or 'zimt'
+    exp_type : str
+        Type of experiment, must be SS_JV, Transient_JV, Impedance, IMPS, or CV
+    """
+    entries, summary = get_results_manifest(session_path, sim_type, exp_type)
+    zip_file_name = os.path.join('Simulations', f'simulation_results_{id_session}.zip')
+
+    # Continue after the previous package of this session, both write the same archive
+    previous = st.session_state.get('resultsPackage')
+    previous_future = previous['future'] if previous is not None and previous['id'] == id_session else None
+
+    future = _package_executor.submit(package_results, zip_file_name, entries, summary, previous_future)
+    st.session_state['resultsPackage'] = {'id': id_session, 'future': future, 'zip_file_name': zip_file_name}
+    st.session_state['runSimulation'] = False
+
+def package_results(zip_file_name, entries, summary, previous_future = None):
+    """Write the results archive, after the previous package of the session has been written. Runs on the result package pool.
+
+    Parameters
+    ----------
+    zip_file_name : string
+        Filename of the ZIP archive
+    entries : List
+        List with the path and the name in the archive of each file
+    summary : string
+        Text of the summary and citation file
+    previous_future : Future, optional
+        Previous package of the session, by default None
+    """
+    if previous_future is not None:
+        try:
+            previous_future.result()
+        except Exception:
+            # The previous package failed, this one replaces it
+            pass
+
+    write_results_archive(zip_file_name, entries, summary)
+
+@utils_profiling.profiled('Results download')
+def show_results_download(session_path, id_session, sim_type, exp_type):
+    """Show the download button for the results archive when it is ready. While the archive is being prepared, 
+    a fragment checks every few seconds whether it is ready, without reloading the page.
+
+    Parameters
+    ----------
+    session_path : string
+        Path to folder with the simulation results
+    id_session : string
+        Current session id
+    sim_type : string
+        Type of simulation, either 'simss' or 'zimt'
+    exp_type : str
+        Type of experiment, must be SS_JV, Transient_JV, Impedance, IMPS, or CV
+    """
+    package = st.session_state.get('resultsPackage')
+    if st.session_state['runSimulation'] or package is None or package['id'] != id_session:
+        # No package has been started for the latest simulation, e.g. when the results of an earlier session are shown
+        start_results_package(session_path, id_session, sim_type, exp_type)
+
+    polling = not st.session_state['resultsPackage']['future'].done()
+
+    @st.fragment(run_every = PACKAGE_POLL_INTERVAL if polling else None) # Fragment for the download button, this will not automatically reload the page
+    def fragment_results_download():
+        package = st.session_state['resultsPackage']
+        future = package['future']
+        if not future.done():
+            st.caption('Preparing the result package...')
+        elif polling:
+            # run_every is only read when the fragment is declared, rerun the page once to declare it again without polling
+            st.rerun()
+        elif future.exception() is not None:
+            st.error('Could not prepare the result package: ' + str(future.exception()))
+            if st.button('Prepare result package', key='prep_result'):
+                start_results_package(session_path, id_session, sim_type, exp_type)
+                # Rerun the page, so the fragment is declared again and polls the new package
+                st.rerun()
+        else:
+            id_to_time_string = datetime.fromtimestamp(float(id_session) / 1e6).strftime("%Y-%d-%mT%H-%M-%SZ")
+            filename = 'simulation_result_' + id_to_time_string
+            # Large archives are linked to the static file endpoint instead of being sent through the websocket
+            utils_file_serving.show_download("Download Simulation Results (ZIP)", package['zip_file_name'], filename, mime="application/zip")
+
+    fragment_results_download()
+
 def get_SIMsalabim_log(simss_device_parameters, session_path, dev_par, exp_type):
 
     if dev_par is not None and simss_device_parameters in dev_par:
         dev_par_data = dev_par[simss_device_parameters]
         # Only process if dev_par_data is a list (expected structure)
         if isinstance(dev_par_data, list) and len(dev_par_data) > 0:
-            # Find the "User interface" section
-            ui_section = next((s for s in dev_par_data[1:] if s[0] == 'User interface'), [])
-            
-            # Find the logFile parameter
-            logFile = next((param[2] for param in ui_section if param[1] == 'logFile'), None)
+            # Find the logFile parameter in the "User interface" section
+            logFile = utils_device_model.get_value(dev_par_data, 'logFile', 'User interface')
         
             if logFile:
                 logFile_path = os.path.join(session_path, logFile)
@@ -2,11 +2,14 @@
 ######### Package Imports #########################################################################
 
 import os
-from datetime import datetime
 import streamlit as st
 from pySIMsalabim.experiments import impedance as imp_exp
 from utils import device_parameters_UI as utils_devpar_UI
 from utils import general_UI as utils_gen_UI
+from utils import optics_store as utils_optics_store
+from utils import gen_profile_cache as utils_gen_profile_cache
+from utils import run_metrics as utils_run_metrics
+from utils import solver_limits as utils_solver_limits
 
 ######### Function Definitions ####################################################################    
 
@@ -40,6 +43,15 @@ def run_Impedance(zimt_device_parameters, session_path, dev_par, layers, id_sess
     """
     exp_type = 'Impedance'
 
+    # Metrics of the run, the time until the solver starts is the queue wait time
+    metrics = utils_run_metrics.start_run(id_session, 'Impedance')
+
+    # Make the shared nk and spectrum files used by the device available in the session folder
+    utils_optics_store.link_optics_files(session_path, utils_optics_store.get_referenced_optics_files(dev_par))
+
+    # Use the generation profile cached by a previous run with the same optics, instead of calculating it again
+    cmd_pars = utils_gen_profile_cache.use_cached_profile(session_path, utils_gen_profile_cache.get_optics_key(dev_par, zimt_device_parameters, session_path))
+
     with st.toast('Simulation started'):
         # Store all impedance specific parameters into a single object.
         impedance_keys = ["fmin", "fmax", "fstep", "V0", "delV", "G_frac"]
@@ -47,11 +59,14 @@ def run_Impedance(zimt_device_parameters, session_path, dev_par, layers, id_sess
         impedance_par_obj = utils_devpar_UI.read_exp_parameters(impedance_par, dev_par[zimt_device_parameters], impedance_keys, impedance_keys_extract)
 
         # Run the impedance script
+        metrics.start_solver(session_path)
         result, message = imp_exp.run_impedance_simu(zimt_device_parameters, session_path, impedance_par_obj["fmin"], impedance_par_obj["fmax"],
                                                             impedance_par_obj["fstep"],impedance_par_obj["V0"], impedance_par_obj["G_frac"],
                                                             impedance_par_obj["delV"],True, tVG_name = impedance_par_obj["tVGFile"], 
-                                                            tj_name=impedance_par_obj['tJFile'])
+                                                            tj_name=impedance_par_obj['tJFile'], cmd_pars=cmd_pars)
     
+    metrics.stop_solver()
+
     if result == 1:
         # Creating the tVG file for the impedance failed                
         st.error(message)
@@ -79,17 +94,19 @@ def run_Impedance(zimt_device_parameters, session_path, dev_par, layers, id_sess
             # Store the assigned file names from the saved device parameters in session state variables.
             utils_devpar_UI.store_file_names(dev_par, 'zimt', zimt_device_parameters, layers)
 
+            # Start preparing the result package in the background, so it is ready by the time the results have been viewed
+            utils_gen_UI.start_results_package(session_path, id_session, 'zimt', 'Impedance')
+
             res = 'SUCCESS'
 
         else:
-            # Simulation failed, show the error message
-            st.error(message)
+            # Simulation failed, show the error message. When the solver was stopped at a resource limit, show which limit instead.
+            st.error(utils_solver_limits.get_limit_message(metrics.record['limit']) or message)
 
             res = 'ERROR'
 
     # Get the SIMsalabim log file and store in session state for display
     utils_gen_UI.get_SIMsalabim_log(zimt_device_parameters, session_path, dev_par, exp_type)
 
-    # Log the simulation result in the log file
-    with open(os.path.join('Statistics', 'log_file.txt'), 'a') as f:
-        f.write(id_session + ' Impedance ' + res + ' ' + str(datetime.now()) + '\n')
\ No newline at end of file
+    # Record the metrics of the run, written in the background
+    metrics.finish(res, result, session_path, dev_par, zimt_device_parameters)
\ No newline at end of file
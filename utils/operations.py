@@ -0,0 +1,360 @@
+"""Aggregations of the run metrics and the disk usage for the operations page. The aggregations are computed with vectorized
+pandas operations and cached on the modification times of the metrics files, so they are only recomputed after new runs"""
+######### Package Imports #########################################################################
+
+import os, io, hmac, json, time, functools
+import numpy as np
+import pandas as pd
+from utils import run_metrics as utils_run_metrics
+
+######### Parameter Initialisation ################################################################
+
+# Environment variable with the token of the operations page. The page is disabled when it is not set.
+ADMIN_TOKEN_VARIABLE = 'SIMSALABIM_ADMIN_TOKEN'
+
+# Columns of a run record, older records can miss some of these
+RECORD_COLUMNS = ['id', 'exp_type', 'timestamp', 'status', 'result_code', 'error_class', 'queue_wait', 'wall_time',
+                  'cpu_time', 'peak_rss_kb', 'output_bytes', 'grid_points', 'parameter_set', 'limit']
+
+# Latency percentiles
+PERCENTILES = [0.5, 0.95, 0.99]
+
+# The disk usage of the Simulations folder is determined at most once per this many seconds
+DISK_USAGE_REFRESH = 300
+
+######### Function Definitions ####################################################################
+
+def check_admin_token(token):
+    """Check the token of the operations page against the environment variable ADMIN_TOKEN_VARIABLE.
+
+    Parameters
+    ----------
+    token : string
+        Token entered by the user
+
+    Returns
+    -------
+    bool
+        True when the token is correct, always False when no token has been configured
+    """
+    admin_token = os.environ.get(ADMIN_TOKEN_VARIABLE, '')
+    if not admin_token or not token:
+        return False
+    return hmac.compare_digest(token.encode(), admin_token.encode())
+
+def get_metrics_signature(folder = None):
+    """Get the signature of the metrics files: their path, modification time and size. Queued records are written first.
+
+    Parameters
+    ----------
+    folder : string, optional
+        Folder with the metrics, by default run_metrics.METRICS_FOLDER
+
+    Returns
+    -------
+    tuple
+        (path, modification time in ns, size) of every metrics file, oldest first
+    """
+    utils_run_metrics.flush()
+    signature = []
+    for file_path in utils_run_metrics.get_metrics_files(folder):
+        try:
+            file_stat = os.stat(file_path)
+        except FileNotFoundError:
+            # Rotated in the meantime
+            continue
+        signature.append((file_path, file_stat.st_mtime_ns, file_stat.st_size))
+    return tuple(signature)
+
+@functools.lru_cache(maxsize=utils_run_metrics.MAX_ROTATED_FILES + 1)
+def _read_metrics_file(file_path, mtime_ns, size):
+    """Read a metrics file into a DataFrame. Cached on the path, modification time and size of the file,
+    so the rotated files are only read once. Do not modify the returned DataFrame.
+
+    Parameters
+    ----------
+    file_path : string
+        Path of the metrics file
+    mtime_ns : int
+        Modification time of the file
+    size : int
+        Size of the file
+
+    Returns
+    -------
+    DataFrame
+        The records in the file
+    """
+    try:
+        with open(file_path, encoding='utf-8') as fp:
+            content = fp.read()
+    except FileNotFoundError:
+        return pd.DataFrame(columns=RECORD_COLUMNS)
+    # Ignore a partly written last line
+    content = content[:content.rfind('\n') + 1]
+    if not content:
+        return pd.DataFrame(columns=RECORD_COLUMNS)
+    try:
+        records = pd.read_json(io.StringIO(content), lines=True, dtype=False)
+    except ValueError:
+        # A corrupt line, parse the lines one by one and skip the lines that cannot be parsed
+        rows = []
+        for line in content.splitlines():
+            try:
+                rows.append(json.loads(line))
+            except ValueError:
+                continue
+        records = pd.DataFrame(rows)
+    return records.reindex(columns=RECORD_COLUMNS)
+
+def load_metrics(signature):
+    """Load all records of the metrics files in the signature into one DataFrame.
+
+    Parameters
+    ----------
+    signature : tuple
+        Signature of the metrics files, see get_metrics_signature
+
+    Returns
+    -------
+    DataFrame
+        The records, with the timestamp as datetime and the numbers as float
+    """
+    frames = [_read_metrics_file(*entry) for entry in signature]
+    frames = [frame for frame in frames if not frame.empty]
+    if not frames:
+        return pd.DataFrame(columns=RECORD_COLUMNS)
+    df = pd.concat(frames, ignore_index=True)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format='ISO8601', errors='coerce')
+    for column in ['queue_wait', 'wall_time', 'cpu_time', 'peak_rss_kb', 'output_bytes', 'grid_points']:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    return df.dropna(subset=['timestamp'])
+
+def calc_throughput(df, freq):
+    """Number of runs per experiment type per period.
+
+    Parameters
+    ----------
+    df : DataFrame
+        The records
+    freq : string
+        Length of a period, e.g. 'h' or 'D'
+
+    Returns
+    -------
+    DataFrame
+        Number of runs with the start of the period as index and a column per experiment type
+    """
+    return df.groupby([pd.Grouper(key='timestamp', freq=freq), 'exp_type']).size().unstack(fill_value=0)
+
+def calc_latency(df):
+    """Latency percentiles of the solver wall time and the queue wait time per experiment type.
+
+    Parameters
+    ----------
+    df : DataFrame
+        The records
+
+    Returns
+    -------
+    DataFrame
+        Number of runs and the percentiles of the wall time and queue wait, in s, per experiment type
+    """
+    grouped = df.groupby('exp_type')
+    latency = grouped['wall_time'].quantile(PERCENTILES).unstack()
+    latency.columns = [f'Wall time p{round(p * 100)} [s]' for p in PERCENTILES]
+    queue_wait = grouped['queue_wait'].quantile(PERCENTILES).unstack()
+    queue_wait.columns = [f'Queue wait p{round(p * 100)} [s]' for p in PERCENTILES]
+    return pd.concat([grouped.size().rename('Runs'), latency, queue_wait], axis=1)
+
+def calc_failure_rates(df):
+    """Failure rate per experiment type and the number of failures per error class.
+
+    Parameters
+    ----------
+    df : DataFrame
+        The records
+
+    Returns
+    -------
+    DataFrame
+        Runs, failed runs and failure rate (%) per experiment type, followed by a column per error class
+    """
+    failed = df['status'].ne('SUCCESS')
+    rates = failed.groupby(df['exp_type']).agg(['size', 'sum'])
+    rates.columns = ['Runs', 'Failed']
+    rates['Failure rate [%]'] = 100 * rates['Failed'] / rates['Runs']
+    error_classes = df[failed].groupby(['exp_type', 'error_class']).size().unstack(fill_value=0)
+    return rates.join(error_classes).fillna(0)
+
+def calc_queue_depth(df, freq):
+    """Maximum number of runs in progress (waiting for or running the solver) per period. A run is in progress from
+    its request (timestamp) until the end of the solver (timestamp + queue wait + wall time).
+
+    Parameters
+    ----------
+    df : DataFrame
+        The records
+    freq : string
+        Length of a period, e.g. 'h' or 'D'
+
+    Returns
+    -------
+    Series
+        Maximum number of runs in progress, with the start of the period as index
+    """
+    if df.empty:
+        return pd.Series(dtype=float)
+    start = df['timestamp']
+    end = start + pd.to_timedelta(df['queue_wait'].fillna(0) + df['wall_time'].fillna(0), unit='s')
+    events = pd.DataFrame({'time': pd.concat([start, end], ignore_index=True),
+                           'change': np.concatenate([np.ones(len(df), dtype=int), -np.ones(len(df), dtype=int)])})
+    # At the same time, the end of a run is processed before the start of the next run
+    events = events.sort_values(['time', 'change'], kind='stable')
+    depth = pd.Series(events['change'].cumsum().to_numpy(), index=events['time'].to_numpy())
+    # The depth at the start of a period is the last depth of the periods before, also for a period without events
+    carried = depth.resample(freq).last().ffill().shift(1)
+    return pd.concat([depth.resample(freq).max(), carried], axis=1).max(axis=1).fillna(0)
+
+def calc_slowest_parameter_sets(df, n = 10):
+    """The parameter sets with the highest median wall time of the solver.
+
+    Parameters
+    ----------
+    df : DataFrame
+        The records
+    n : int, optional
+        Number of parameter sets, by default 10
+
+    Returns
+    -------
+    DataFrame
+        Parameter set, experiment types, runs, median and maximum wall time, grid points and the last session
+    """
+    slowest = df.dropna(subset=['parameter_set', 'wall_time']).sort_values('timestamp').groupby('parameter_set').agg(
+        **{'Experiment': ('exp_type', lambda types: ', '.join(sorted(types.unique()))), 'Runs': ('wall_time', 'size'),
+           'Median wall time [s]': ('wall_time', 'median'), 'Max. wall time [s]': ('wall_time', 'max'),
+           'Grid points': ('grid_points', 'last'), 'Last session': ('id', 'last')})
+    return slowest.sort_values('Median wall time [s]', ascending=False).head(n).reset_index().rename(columns={'parameter_set': 'Parameter set'})
+
+@functools.lru_cache(maxsize=8)
+def _get_summary(signature, days, freq, now):
+    """Compute all aggregations of the operations page, cached on the signature of the metrics files and the period.
+
+    Parameters
+    ----------
+    signature : tuple
+        Signature of the metrics files, see get_metrics_signature
+    days : int
+        Number of days before now to include, None for all records
+    freq : string
+        Length of a period for the time series, e.g. 'h' or 'D'
+    now : pd.Timestamp
+        Current time, rounded to the period so the cache is reused within a period
+
+    Returns
+    -------
+    dict
+        The aggregations, None when there are no records in the period
+    """
+    df = load_metrics(signature)
+    if days is not None:
+        df = df[df['timestamp'] >= now - pd.Timedelta(days=days)]
+    if df.empty:
+        return None
+    return {'runs': len(df), 'failure_rate': 100 * df['status'].ne('SUCCESS').mean(), 'wall_time_p95': df['wall_time'].quantile(0.95),
+            'throughput': calc_throughput(df, freq), 'latency': calc_latency(df), 'failure_rates': calc_failure_rates(df),
+            'queue_depth': calc_queue_depth(df, freq), 'slowest': calc_slowest_parameter_sets(df)}
+
+def get_summary(days = None, freq = 'D', folder = None):
+    """Get the aggregations of the run metrics for the operations page. Do not modify the returned DataFrames, they are cached.
+
+    Parameters
+    ----------
+    days : int, optional
+        Number of days before now to include, by default None (all records)
+    freq : string, optional
+        Length of a period for the time series, by default 'D'
+    folder : string, optional
+        Folder with the metrics, by default run_metrics.METRICS_FOLDER
+
+    Returns
+    -------
+    dict
+        runs, failure_rate, wall_time_p95, throughput, latency, failure_rates, queue_depth and slowest, None when there are no records
+    """
+    return _get_summary(get_metrics_signature(folder), days, freq, pd.Timestamp.now().floor(freq))
+
+def get_folder_size(path):
+    """Get the total size and number of files of a folder, including the subfolders. Symbolic links are not followed.
+
+    Parameters
+    ----------
+    path : string
+        Path of the folder
+
+    Returns
+    -------
+    tuple
+        (size in bytes, number of files)
+    """
+    size, n_files = 0, 0
+    for root, _, files in os.walk(path):
+        for file in files:
+            try:
+                size += os.lstat(os.path.join(root, file)).st_size
+                n_files += 1
+            except FileNotFoundError:
+                # Removed in the meantime
+                continue
+    return size, n_files
+
+@functools.lru_cache(maxsize=2)
+def _get_disk_usage(simulation_path, refresh):
+    """Get the disk usage of every entry in the Simulations folder, cached for DISK_USAGE_REFRESH seconds.
+
+    Parameters
+    ----------
+    simulation_path : string
+        Path of the Simulations folder
+    refresh : int
+        Number of the refresh interval, changes every DISK_USAGE_REFRESH seconds
+
+    Returns
+    -------
+    DataFrame
+        Name, Size [MB], Files and Last modified of every session folder and result archive, largest first
+    """
+    rows = []
+    try:
+        with os.scandir(simulation_path) as entries:
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        size, n_files = get_folder_size(entry.path)
+                    else:
+                        size, n_files = entry.stat(follow_symlinks=False).st_size, 1
+                    modified = entry.stat(follow_symlinks=False).st_mtime
+                except FileNotFoundError:
+                    continue
+                rows.append({'Name': entry.name, 'Size [MB]': size / 1e6, 'Files': n_files, 'Last modified': pd.Timestamp(modified, unit='s')})
+    except FileNotFoundError:
+        pass
+    usage = pd.DataFrame(rows, columns=['Name', 'Size [MB]', 'Files', 'Last modified'])
+    return usage.sort_values('Size [MB]', ascending=False, ignore_index=True)
+
+def get_disk_usage(simulation_path):
+    """Get the disk usage of the Simulations folder, determined at most once per DISK_USAGE_REFRESH seconds.
+    Do not modify the returned DataFrame, it is cached.
+
+    Parameters
+    ----------
+    simulation_path : string
+        Path of the Simulations folder
+
+    Returns
+    -------
+    DataFrame
+        Name, Size [MB], Files and Last modified of every session folder and result archive, largest first
+    """
+    return _get_disk_usage(simulation_path, int(time.time() // DISK_USAGE_REFRESH))
@@ -0,0 +1,229 @@
+"""Catalog of the optical data (nk and spectrum files), with the listing of the folders and the parsed files cached for the whole process"""
+######### Package Imports #########################################################################
+
+import os, io, functools
+import numpy as np
+from utils import optics_store as utils_optics_store
+
+######### Parameter Initialisation ################################################################
+
+# Folder of each kind of optical data, also used as prefix of the file names in the device parameters
+OPTICS_FOLDERS = {'nk': 'Data_nk', 'spectrum': 'Data_spectrum'}
+
+# Number of columns in a file: wavelength, n and k for an nk file and wavelength and intensity for a spectrum
+OPTICS_COLUMNS = {'nk': 3, 'spectrum': 2}
+
+# Placeholder item when a nk/spectrum file is not found
+NONE_ITEM = '--none--'
+
+# Number of parsed files kept in memory, shared by all sessions
+MAX_PARSED_FILES = 128
+
+######### Function Definitions ####################################################################
+
+def get_optics_roots(session_path):
+    """Get the folders that contain the Data_nk and Data_spectrum folders, in the order in which a file name is resolved.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+
+    Returns
+    -------
+    List
+        Paths of the folders
+    """
+    return utils_optics_store.get_optics_roots(session_path)
+
+@functools.lru_cache(maxsize=256)
+def _list_folder(folder, mtime_ns):
+    """List the files in a folder. Cached on the path and modification time of the folder, which changes when a file is added or removed.
+
+    Parameters
+    ----------
+    folder : string
+        Path of the folder
+    mtime_ns : int
+        Modification time of the folder
+
+    Returns
+    -------
+    tuple
+        Names of the files
+    """
+    with os.scandir(folder) as entries:
+        return tuple(entry.name for entry in entries if entry.is_file())
+
+def list_folder(folder):
+    """List the files in a folder, an empty list when the folder does not exist.
+
+    Parameters
+    ----------
+    folder : string
+        Path of the folder
+
+    Returns
+    -------
+    tuple
+        Names of the files
+    """
+    try:
+        mtime_ns = os.stat(folder).st_mtime_ns
+    except FileNotFoundError:
+        return ()
+    return _list_folder(folder, mtime_ns)
+
+def list_optics_files(session_path, kind):
+    """List the available nk or spectrum files of a session, sorted alphabetically and preceded by the placeholder '--none--'.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+    kind : string
+        'nk' or 'spectrum'
+
+    Returns
+    -------
+    List
+        File names as used in the device parameters, e.g. 'Data_nk/nk_Au.txt'
+    """
+    folder_name = OPTICS_FOLDERS[kind]
+    names = set()
+    for root in get_optics_roots(session_path):
+        names.update(list_folder(os.path.join(root, folder_name)))
+    return [NONE_ITEM] + sorted((os.path.join(folder_name, name) for name in names), key=str.casefold)
+
+def resolve_optics_file(session_path, file_name):
+    """Get the path of a nk or spectrum file, the first folder in which the file exists is used.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+    file_name : string
+        File name as used in the device parameters, e.g. 'Data_nk/nk_Au.txt'
+
+    Returns
+    -------
+    string
+        Path of the file, None if the file does not exist
+    """
+    for root in get_optics_roots(session_path):
+        file_path = os.path.join(root, file_name)
+        if os.path.isfile(file_path):
+            return file_path
+    return None
+
+def parse_optics_data(text, kind):
+    """Parse the content of a nk or spectrum file: a header line followed by the columns with the wavelength (m) and the values.
+
+    Parameters
+    ----------
+    text : string
+        Content of the file
+    kind : string
+        'nk' or 'spectrum'
+
+    Returns
+    -------
+    np.ndarray
+        Array with a row for each wavelength
+
+    Raises
+    ------
+    ValueError
+        When the file does not contain the expected numerical columns
+    """
+    if not any(line.strip() for line in text.splitlines()[1:]):
+        raise ValueError('file contains no data after the header line')
+    data = np.loadtxt(io.StringIO(text), skiprows=1, ndmin=2)
+    if data.shape[1] != OPTICS_COLUMNS[kind]:
+        raise ValueError(f'expected {OPTICS_COLUMNS[kind]} columns of numbers after the header line')
+    if not np.all(np.isfinite(data)):
+        raise ValueError('file contains values that are not a number')
+    return data
+
+@functools.lru_cache(maxsize=MAX_PARSED_FILES)
+def _read_optics_file(file_path, kind, signature):
+    """Read and parse a nk or spectrum file. Cached on the path, modification time and size of the file.
+    The returned array is shared, it is made read-only.
+
+    Parameters
+    ----------
+    file_path : string
+        Path of the file
+    kind : string
+        'nk' or 'spectrum'
+    signature : tuple
+        Modification time and size of the file
+
+    Returns
+    -------
+    np.ndarray
+        Array with a row for each wavelength
+    """
+    with open(file_path, encoding='utf-8') as fp:
+        data = parse_optics_data(fp.read(), kind)
+    data.flags.writeable = False
+    return data
+
+def load_optics_data(session_path, file_name, kind):
+    """Get the parsed data of a nk or spectrum file, the file is only read again when it changed.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+    file_name : string
+        File name as used in the device parameters, e.g. 'Data_nk/nk_Au.txt'
+    kind : string
+        'nk' or 'spectrum'
+
+    Returns
+    -------
+    np.ndarray
+        Read-only array with a row for each wavelength, None if the file does not exist
+    """
+    file_path = resolve_optics_file(session_path, file_name)
+    if file_path is None:
+        return None
+    file_stat = os.stat(file_path)
+    return _read_optics_file(os.path.abspath(file_path), kind, (file_stat.st_mtime_ns, file_stat.st_size))
+
+def load_nk(session_path, file_name):
+    """Get the wavelength, n and k of a nk file.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+    file_name : string
+        File name as used in the device parameters, e.g. 'Data_nk/nk_Au.txt'
+
+    Returns
+    -------
+    tuple
+        Arrays with the wavelength (m), n and k, None if the file does not exist
+    """
+    data = load_optics_data(session_path, file_name, 'nk')
+    return None if data is None else (data[:, 0], data[:, 1], data[:, 2])
+
+def load_spectrum(session_path, file_name):
+    """Get the wavelength and intensity of a spectrum file.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+    file_name : string
+        File name as used in the device parameters, e.g. 'Data_spectrum/AM15G.txt'
+
+    Returns
+    -------
+    tuple
+        Arrays with the wavelength (m) and intensity, None if the file does not exist
+    """
+    data = load_optics_data(session_path, file_name, 'spectrum')
+    return None if data is None else (data[:, 0], data[:, 1])
@@ -0,0 +1,295 @@
+"""Fast preview of the optics of the device: absorption and generation profile of the layer stack with the transfer-matrix method,
+calculated for all wavelengths at once with NumPy, without running SIMsalabim"""
+######### Package Imports #########################################################################
+
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import streamlit as st
+from utils import device_model as utils_device_model
+from utils import optics_catalog as utils_optics_catalog
+from utils import profiling as utils_profiling
+
+######### Parameter Initialisation ################################################################
+
+q = 1.6022e-19 # Elementary charge in C
+h = 6.6261e-34 # Planck constant in Js
+c = 2.9979e8 # Speed of light in m/s
+
+# Wavelength step of the preview, in m
+PREVIEW_WAVELENGTH_STEP = 2e-9
+
+# Position step within a layer, in m, with a minimum number of points per layer
+PREVIEW_POSITION_STEP = 1e-9
+MIN_POINTS_PER_LAYER = 20
+
+######### Function Definitions ####################################################################
+
+def get_refractive_index(session_path, file_name, wavelengths):
+    """Get the complex refractive index n + ik of a nk file at the wavelengths, interpolated linearly.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+    file_name : string
+        File name as used in the device parameters, e.g. 'Data_nk/nk_Au.txt'
+    wavelengths : np.ndarray
+        Wavelengths in m
+
+    Returns
+    -------
+    np.ndarray
+        Complex refractive index for every wavelength, None if the file does not exist
+    """
+    nk = utils_optics_catalog.load_nk(session_path, file_name)
+    if nk is None:
+        return None
+    wavelength, n, k = nk
+    return np.interp(wavelengths, wavelength, n) + 1j * np.interp(wavelengths, wavelength, k)
+
+def calc_field_amplitudes(wavelengths, n_incident, n_layers, d_layers, n_exit = 1.0):
+    """Calculate the amplitudes of the forward and backward electric field at the left side of every layer of a coherent stack,
+    for a wave with amplitude 1 coming from the incident medium. All wavelengths are calculated at once. The thicknesses can be
+    arrays as well (e.g. shape (stacks, 1) with the wavelengths of shape (wavelengths,)), to calculate a batch of stacks at once.
+
+    Parameters
+    ----------
+    wavelengths : np.ndarray
+        Wavelengths in m
+    n_incident : np.ndarray
+        Complex refractive index of the incident medium (semi-infinite) for every wavelength
+    n_layers : List
+        Complex refractive index of every layer for every wavelength
+    d_layers : List
+        Thickness of every layer in m, a number or an array that broadcasts with the wavelengths
+    n_exit : np.ndarray or float, optional
+        Complex refractive index of the exit medium (semi-infinite), by default 1.0 (air)
+
+    Returns
+    -------
+    np.ndarray
+        Amplitudes with shape (number of layers, ..., number of wavelengths, 2), forward and backward
+    np.ndarray
+        Reflection coefficient of the stack for every wavelength
+    np.ndarray
+        Transmission coefficient of the stack for every wavelength
+    """
+    n_all = [np.asarray(n, dtype=complex) for n in [n_incident] + list(n_layers) + [n_exit]]
+
+    def fresnel(n_a, n_b):
+        # Reflection and transmission coefficient of the interface from medium a to b at normal incidence
+        return (n_a - n_b) / (n_a + n_b), 2 * n_a / (n_a + n_b)
+
+    # Go through the stack from the exit medium backwards, the field in the exit medium is (t, 0) for an unknown t.
+    # Only this field is propagated, so the 2x2 matrix products reduce to products of the forward and backward amplitude.
+    r_ab, t_ab = fresnel(n_all[-2], n_all[-1])
+    forward, backward = 1 / t_ab, r_ab / t_ab
+    left_fields = [None] * len(n_layers)
+    for j in range(len(n_layers) - 1, -1, -1):
+        phase = np.exp(1j * 2 * np.pi * n_all[j + 1] * np.asarray(d_layers[j]) / wavelengths)
+        forward, backward = forward / phase, backward * phase
+        # Field at the left side of layer j, for a unit field in the exit medium
+        left_fields[j] = (forward, backward)
+        r_ab, t_ab = fresnel(n_all[j], n_all[j + 1])
+        forward, backward = (forward + r_ab * backward) / t_ab, (r_ab * forward + backward) / t_ab
+
+    t = 1 / forward
+    r = backward * t
+    amplitudes = np.array([np.stack([field[0] * t, field[1] * t], axis=-1) for field in left_fields])
+    return amplitudes, r, t
+
+def calc_layer_absorption(wavelengths, n_incident, n_layers, d_layers):
+    """Calculate the absorbed fraction of the incident light in every layer of a coherent stack in air. The field is integrated
+    analytically over the thickness of the layers, so no grid of positions is needed. Batches of stacks are supported, see calc_field_amplitudes.
+
+    Parameters
+    ----------
+    wavelengths : np.ndarray
+        Wavelengths in m
+    n_incident : np.ndarray
+        Complex refractive index of the incident medium (semi-infinite) for every wavelength
+    n_layers : List
+        Complex refractive index of every layer for every wavelength
+    d_layers : List
+        Thickness of every layer in m, a number or an array that broadcasts with the wavelengths
+
+    Returns
+    -------
+    np.ndarray
+        Absorbed fraction with shape (number of layers, ..., number of wavelengths)
+    np.ndarray
+        Reflected fraction for every wavelength
+    """
+    amplitudes, r, _ = calc_field_amplitudes(wavelengths, n_incident, n_layers, d_layers)
+    absorption = []
+    for n_layer, d, amplitude in zip(n_layers, d_layers, amplitudes):
+        xi = 2 * np.pi * n_layer / wavelengths
+        forward, backward = amplitude[..., 0], amplitude[..., 1]
+        # Integral of alpha * |E|^2 over the layer, with alpha = 2 * Im(xi)
+        decay = 2 * xi.imag * d
+        interference = 2 * np.real(forward * np.conj(backward) * np.expm1(2j * xi.real * d) / (2j * xi.real)) * 2 * xi.imag
+        absorbed = np.abs(forward)**2 * -np.expm1(-decay) + np.abs(backward)**2 * np.expm1(decay) + interference
+        absorption.append(absorbed * n_layer.real / np.real(n_incident))
+    return np.array(absorption), np.abs(r)**2
+
+def load_optics_stack(dev_par, layers, dev_par_name, session_path):
+    """Load the optical stack of the device from the device parameters and the (cached) nk and spectrum data. The light enters through
+    the substrate (incoherent, only the reflection at the air/substrate interface is taken into account), followed by the TCO,
+    the layers and the back electrode as a coherent stack in air.
+
+    Parameters
+    ----------
+    dev_par : dict
+        Device parameters of all files
+    layers : List
+        List with all layers in the device, the first item is the simulation setup
+    dev_par_name : string
+        Name of the simulation setup file
+    session_path : string
+        Path of the current simulation session
+
+    Returns
+    -------
+    dict
+        'wavelengths', 'photon_flux' (photons entering the substrate, m^-2 s^-1 per m), 'n_substrate' and for every part of the stack:
+        'names', 'n_layers', 'd_layers' and 'layer_index' (index in layers, None for the TCO and back electrode). None when the stack cannot be loaded.
+    string
+        Reason why the stack cannot be loaded, empty on success
+    """
+    setup = dev_par[dev_par_name]
+    lambda_min = utils_device_model.get_value(setup, 'lambda_min', 'Optics', float)
+    lambda_max = utils_device_model.get_value(setup, 'lambda_max', 'Optics', float)
+    if lambda_min is None or lambda_max is None or lambda_max <= lambda_min:
+        return None, 'The wavelength range (lambda_min, lambda_max) is not valid.'
+    wavelengths = np.arange(lambda_min, lambda_max + PREVIEW_WAVELENGTH_STEP / 2, PREVIEW_WAVELENGTH_STEP)
+
+    spectrum_file = utils_device_model.get_value(setup, 'spectrum', 'Optics')
+    spectrum = utils_optics_catalog.load_spectrum(session_path, spectrum_file) if spectrum_file else None
+    if spectrum is None:
+        return None, f'Spectrum file "{spectrum_file}" not found.'
+    intensity = np.interp(wavelengths, spectrum[0], spectrum[1], left=0, right=0)
+
+    # Name, file with n,k, thickness and index in layers of every part of the stack
+    stack = []
+    L_TCO = utils_device_model.get_value(setup, 'L_TCO', 'Optics', float, 0)
+    if L_TCO > 0:
+        stack.append(('TCO', utils_device_model.get_value(setup, 'nkTCO', 'Optics'), L_TCO, None))
+    for i, layer in enumerate(layers[1:], 1):
+        stack.append((layer[1] + ' (' + layer[2] + ')', utils_device_model.get_value(dev_par[layer[2]], 'nkLayer'),
+                      utils_device_model.get_value(dev_par[layer[2]], 'L', 'General', float), i))
+    stack.append(('Back electrode', utils_device_model.get_value(setup, 'nkBE', 'Optics'), utils_device_model.get_value(setup, 'L_BE', 'Optics', float), None))
+
+    n_substrate = get_refractive_index(session_path, utils_device_model.get_value(setup, 'nkSubstrate', 'Optics'), wavelengths)
+    if n_substrate is None:
+        return None, 'The n,k file of the substrate is not found.'
+    n_layers = []
+    for name, nk_file, _, _ in stack:
+        n_layer = get_refractive_index(session_path, nk_file, wavelengths)
+        if n_layer is None:
+            return None, f'The n,k file of {name} is not found.'
+        n_layers.append(n_layer)
+
+    # Intensity entering the substrate and the number of incident photons per wavelength
+    T_substrate = 1 - np.abs((1 - n_substrate) / (1 + n_substrate))**2
+    photon_flux = T_substrate * intensity * wavelengths / (h * c)
+
+    return {'wavelengths': wavelengths, 'photon_flux': photon_flux, 'n_substrate': n_substrate, 'names': [part[0] for part in stack],
+            'n_layers': n_layers, 'd_layers': [part[2] for part in stack], 'layer_index': [part[3] for part in stack]}, ''
+
+def calc_optics_preview(dev_par, layers, dev_par_name, session_path):
+    """Calculate the absorption and generation profile of the device with the transfer-matrix method, see load_optics_stack for the stack.
+
+    Parameters
+    ----------
+    dev_par : dict
+        Device parameters of all files
+    layers : List
+        List with all layers in the device, the first item is the simulation setup
+    dev_par_name : string
+        Name of the simulation setup file
+    session_path : string
+        Path of the current simulation session
+
+    Returns
+    -------
+    dict
+        'x': positions (m) from the left side of the first layer, 'G': generation rate (m^-3 s^-1), 'layers': DataFrame with the absorption
+        and maximum Jsc per layer, 'R': reflected fraction of the photons, 'wavelengths', 'absorption': absorbed fraction per layer and wavelength.
+        None when the optics cannot be calculated.
+    string
+        Reason why the optics cannot be calculated, empty on success
+    """
+    stack, msg = load_optics_stack(dev_par, layers, dev_par_name, session_path)
+    if stack is None:
+        return None, msg
+    wavelengths, photon_flux, n_substrate = stack['wavelengths'], stack['photon_flux'], stack['n_substrate']
+
+    amplitudes, r, _ = calc_field_amplitudes(wavelengths, n_substrate, stack['n_layers'], stack['d_layers'])
+
+    x_all, G_all, rows, absorption = [], [], [], []
+    x_offset = -stack['d_layers'][0] if stack['names'][0] == 'TCO' else 0.0
+    for name, n_layer, d, amplitude in zip(stack['names'], stack['n_layers'], stack['d_layers'], amplitudes):
+        x = np.linspace(0, d, max(MIN_POINTS_PER_LAYER, int(np.ceil(d / PREVIEW_POSITION_STEP)) + 1))
+        phase = 2j * np.pi * n_layer[:, None] * x[None, :] / wavelengths[:, None]
+        field = amplitude[:, 0, None] * np.exp(phase) + amplitude[:, 1, None] * np.exp(-phase)
+        # Absorbed fraction of the incident photons per unit length, for every wavelength and position
+        alpha = 4 * np.pi * n_layer.imag / wavelengths
+        absorbed = (alpha * n_layer.real / n_substrate.real)[:, None] * np.abs(field)**2
+        absorption.append(np.trapezoid(absorbed, x, axis=1))
+
+        G = np.trapezoid(absorbed * photon_flux[:, None], wavelengths, axis=0)
+        x_all.append(x + x_offset)
+        G_all.append(G)
+        rows.append({'Layer': name, 'Thickness [nm]': round(d * 1e9, 1),
+                     'Absorbed photons [%]': 100 * np.trapezoid(absorption[-1] * photon_flux, wavelengths) / np.trapezoid(photon_flux, wavelengths),
+                     'Max. Jsc [Am⁻²]': q * np.trapezoid(G, x)})
+        x_offset += d
+
+    R = np.trapezoid(np.abs(r)**2 * photon_flux, wavelengths) / np.trapezoid(photon_flux, wavelengths)
+    return {'x': np.concatenate(x_all), 'G': np.concatenate(G_all), 'layers': pd.DataFrame(rows), 'R': R,
+            'wavelengths': wavelengths, 'absorption': np.array(absorption)}, ''
+
+@utils_profiling.profiled('Optics preview')
+def show_optics_preview(dev_par, layers, dev_par_name, session_path):
+    """Show the optics preview below the band diagram: the generation profile and the absorption and maximum Jsc per layer.
+    Nothing is shown when the generation profile is not calculated (genProfile is not 'calc').
+
+    Parameters
+    ----------
+    dev_par : dict
+        Device parameters of all files
+    layers : List
+        List with all layers in the device, the first item is the simulation setup
+    dev_par_name : string
+        Name of the simulation setup file
+    session_path : string
+        Path of the current simulation session
+    """
+    if utils_device_model.get_value(dev_par[dev_par_name], 'genProfile', 'Optics') != 'calc':
+        return
+
+    start = time.perf_counter()
+    preview, msg = calc_optics_preview(dev_par, layers, dev_par_name, session_path)
+    duration = time.perf_counter() - start
+
+    _, c2, c3 = st.columns([2, 4, 2])
+    with c2:
+        st.markdown("<h3><u>Optics preview</u></h3>", unsafe_allow_html=True)
+        if preview is None:
+            st.warning('Optics preview not available. ' + msg)
+            return
+
+        fig, ax = plt.subplots(figsize=(15, 5))
+        ax.plot(preview['x'] * 1e9, preview['G'], color='k')
+        ax.set_xlabel('x [nm]')
+        ax.set_ylabel('G [m$^{-3}$s$^{-1}$]')
+        st.pyplot(fig)
+        plt.close(fig)
+
+        st.dataframe(preview['layers'], hide_index=True, column_config={'Absorbed photons [%]': st.column_config.NumberColumn(format='%.1f'),
+                                                                        'Max. Jsc [Am⁻²]': st.column_config.NumberColumn(format='%.1f')})
+    with c3:
+        st.markdown(f"<em>Note: Transfer-matrix estimate, every absorbed photon is taken to generate an electron-hole pair. "
+                    f"Reflected: {100 * preview['R']:.1f}% of the photons. Calculated in {duration * 1e3:.0f} ms.</em>", unsafe_allow_html=True)
@@ -0,0 +1,122 @@
+"""Shared read-only store of the built-in optical data (nk and spectrum files), with a per-session overlay folder for the uploaded files"""
+######### Package Imports #########################################################################
+
+import os, shutil
+
+######### Parameter Initialisation ################################################################
+
+# Folder with the built-in Data_nk and Data_spectrum folders, shared by all sessions. Never written by a session.
+SHARED_OPTICS_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'Resources')
+
+# Folders with the optical data, in the shared store and in the overlay of a session
+OPTICS_FOLDER_NAMES = ['Data_nk', 'Data_spectrum']
+
+######### Function Definitions ####################################################################
+
+def init_session_optics(session_path):
+    """Create the (empty) overlay folders of a session, in which the uploaded nk and spectrum files are stored.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+    """
+    for folder_name in OPTICS_FOLDER_NAMES:
+        os.makedirs(os.path.join(session_path, folder_name), exist_ok=True)
+
+def get_optics_roots(session_path):
+    """Get the folders that contain the Data_nk and Data_spectrum folders, in the order in which a file name is resolved:
+    the overlay of the session first, then the shared store.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+
+    Returns
+    -------
+    List
+        Paths of the folders
+    """
+    return [session_path, SHARED_OPTICS_PATH]
+
+def is_optics_file_name(file_name):
+    """Check whether a file name from the device parameters refers to a nk or spectrum file.
+
+    Parameters
+    ----------
+    file_name : string
+        File name as used in the device parameters, e.g. 'Data_nk/nk_Au.txt'
+
+    Returns
+    -------
+    bool
+        True when the file is in one of the optics folders
+    """
+    return os.path.dirname(os.path.normpath(file_name)) in OPTICS_FOLDER_NAMES
+
+def get_referenced_optics_files(dev_par):
+    """Get the nk and spectrum files referenced in the device parameters of all files (simulation setup and layers).
+
+    Parameters
+    ----------
+    dev_par : dict
+        Device parameters of all files
+
+    Returns
+    -------
+    List
+        File names as used in the device parameters, sorted
+    """
+    if dev_par is None:
+        return []
+    file_names = set()
+    for dev_par_file in dev_par.values():
+        for section in dev_par_file:
+            for param in section[1:]:
+                if param[0] == 'par' and (param[1].startswith('nk') or param[1] == 'spectrum') and is_optics_file_name(param[2]):
+                    file_names.add(param[2])
+    return sorted(file_names)
+
+def link_optics_files(session_path, file_names):
+    """Make the shared nk and spectrum files available in the overlay of a session, so SIMsalabim finds them relative to the session folder.
+    A symbolic link to the shared file is created, or a copy when links are not supported. Uploaded files in the overlay are kept.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the current simulation session
+    file_names : List
+        File names as used in the device parameters, e.g. 'Data_nk/nk_Au.txt'
+
+    Returns
+    -------
+    List
+        File names that have been linked
+    """
+    linked = []
+    for file_name in file_names:
+        if not is_optics_file_name(file_name):
+            continue
+        target = os.path.join(session_path, file_name)
+        source = os.path.join(SHARED_OPTICS_PATH, file_name)
+        if os.path.lexists(target) or not os.path.isfile(source):
+            continue
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        try:
+            os.symlink(source, target)
+        except OSError:
+            shutil.copyfile(source, target)
+        linked.append(file_name)
+    return linked
+
+def prepare_upload_target(target_path):
+    """Remove a link to the shared store before an uploaded file is written, so the upload never overwrites a shared file.
+
+    Parameters
+    ----------
+    target_path : string
+        Path in the session folder to which the uploaded file is written
+    """
+    if os.path.islink(target_path):
+        os.remove(target_path)
@@ -0,0 +1,242 @@
+"""Edit the device parameters of a file in data grids, one grid per block of parameters instead of a widget per parameter"""
+######### Package Imports #########################################################################
+
+import pandas as pd
+import streamlit as st
+from utils import general_UI as utils_gen_UI
+from utils import devpar_schema as utils_devpar_schema
+from utils import profiling as utils_profiling
+
+######### Parameter Initialisation ################################################################
+
+# Sections that are collapsed by default
+COLLAPSED_SECTIONS = ['Optics', 'Numerical Parameters', 'Voltage range of simulation', 'User interface']
+
+# Sections that are not edited in the grid: the description is shown at the top of the page, the layers in the layer container
+SKIPPED_SECTIONS = ['Description', 'Layers']
+
+######### Function Definitions ####################################################################
+
+def get_editor_type(name, value = ''):
+    """Get the type of editor for the value of a parameter.
+
+    Parameters
+    ----------
+    name : string
+        Name of the parameter
+    value : string, optional
+        Value of the parameter, by default ''
+
+    Returns
+    -------
+    string
+        'nk', 'spectrum' or 'trap' for a file reference (dropdown), 'fixed' for a value that cannot be changed, 
+        'number' for a numerical value, 'text' otherwise
+    """
+    if name.startswith('nk'):
+        return 'nk'
+    if name == 'spectrum':
+        return 'spectrum'
+    if name in ['intTrapFile', 'bulkTrapFile']:
+        return 'trap'
+    if name == 'pauseAtEnd':
+        # This parameter must not be editable and forced to 0, otherwise the program will not exit/complete and hang forever.
+        return 'fixed'
+    if name not in utils_devpar_schema.KEYWORD_VALUES and is_number(value):
+        # Parameters that also accept a keyword (e.g. W_L = sfb) are edited as text
+        return 'number'
+    return 'text'
+
+def is_number(value):
+    """Check if a value is a number.
+
+    Parameters
+    ----------
+    value : string
+        Value of a parameter
+
+    Returns
+    -------
+    bool
+        True when the value can be converted to a float
+    """
+    try:
+        float(value)
+    except (TypeError, ValueError):
+        return False
+    return True
+
+def format_number(value, original):
+    """Format an edited numerical value for the device parameters file. An unchanged value keeps the notation of the file.
+
+    Parameters
+    ----------
+    value : float
+        Edited value
+    original : string
+        Value before the edit
+
+    Returns
+    -------
+    string
+        The value, e.g. '250' or '1E-07'
+    """
+    if is_number(original) and float(original) == value:
+        return original
+    return f'{value:.15G}'
+
+def split_section(section):
+    """Split a section into blocks: the comments and the runs of consecutive parameters with the same type of editor.
+    Each run of parameters is shown as one grid, so the order of the parameters and comments in the file is kept.
+
+    Parameters
+    ----------
+    section : List
+        Section of a device parameters file, the name followed by the parameters and comments
+
+    Returns
+    -------
+    List
+        ('comm', comment) or (editor type, List of parameters) for each block
+    """
+    blocks = []
+    for item in section[1:]:
+        if item[0] == 'comm':
+            blocks.append(('comm', item[1]))
+        elif item[0] == 'par':
+            editor_type = get_editor_type(item[1], item[2])
+            if blocks and blocks[-1][0] == editor_type:
+                blocks[-1][1].append(item)
+            else:
+                blocks.append((editor_type, [item]))
+    return blocks
+
+def check_file_references(params, editor_type, options):
+    """Replace references to files that are not available by the placeholder, '--none--' for nk and spectrum files and 'none' for trap files.
+
+    Parameters
+    ----------
+    params : List
+        Parameters referring to a file
+    editor_type : string
+        'nk', 'spectrum' or 'trap'
+    options : List
+        Names of the available files
+    """
+    for param in params:
+        if param[2] in options:
+            continue
+        if editor_type == 'trap':
+            # Value from file is not recognized, replace with none
+            st.toast(f'Could not find file "{param[2]}" for parameter {param[1]} and has been set to none. If you want to use this file, please upload it using the "Upload trap distribution" option and associate it with the {param[1]} parameter.')
+            param[2] = 'none'
+        else:
+            param[2] = '--none--'
+
+def prepare_block(params, editor_type, options):
+    """Force the fixed values and replace unknown file references of a block of parameters. 
+    This is done for all sections, also the ones that are collapsed and not shown.
+
+    Parameters
+    ----------
+    params : List
+        Parameters (['par', name, value, description]) of the block, updated in place
+    editor_type : string
+        Type of editor for the values, see get_editor_type
+    options : List
+        Available files for a file reference editor, None otherwise
+    """
+    if editor_type == 'fixed':
+        for param in params:
+            param[2] = '0'
+    elif options is not None:
+        check_file_references(params, editor_type, options)
+
+def show_parameter_grid(params, editor_type, options, key):
+    """Show a block of parameters as an editable grid with the name, value and description and apply the edited values to the parameters.
+
+    Parameters
+    ----------
+    params : List
+        Parameters (['par', name, value, description]) to show, the values are updated in place
+    editor_type : string
+        Type of editor for the values, see get_editor_type
+    options : List
+        Available files for a file reference editor, None otherwise
+    key : string
+        Key of the grid
+    """
+    grid = pd.DataFrame({'Parameter': [param[1] for param in params],
+                         'Value': [float(param[2]) if editor_type == 'number' else str(param[2]) for param in params],
+                         # Multi-line descriptions are separated by a '*'
+                         'Description': [param[3].replace('*', ' ') for param in params]})
+
+    if options is not None:
+        value_column = st.column_config.SelectboxColumn('Value', options=options, required=True, width='medium',
+                                                        format_func=utils_gen_UI.format_func if editor_type != 'trap' else None)
+    elif editor_type == 'number':
+        # %g shows both small (1E-7) and large (250) values in a short notation, the full value is shown when editing
+        value_column = st.column_config.NumberColumn('Value', required=True, width='medium', format='%g')
+    else:
+        value_column = st.column_config.TextColumn('Value', required=True, width='medium', disabled=editor_type == 'fixed')
+
+    edited = st.data_editor(grid, key=key, hide_index=True, num_rows='fixed', disabled=['Parameter', 'Description'],
+                            column_config={'Parameter': st.column_config.TextColumn('Parameter', width='small'),
+                                           'Value': value_column,
+                                           'Description': st.column_config.TextColumn('Description', width='large')})
+
+    # Apply the edits to the device parameters in one go
+    for param, value in zip(params, edited['Value']):
+        if value is None or value != value:
+            # Empty cell
+            continue
+        param[2] = format_number(float(value), param[2]) if editor_type == 'number' else value
+
+@utils_profiling.profiled('Parameter grids')
+def show_parameter_sections(dev_par, file_name, nk_file_list, spectrum_file_list):
+    """Show the sections of a device parameters file in expanders, with the parameters in grids. 
+    The grids of a section are only built when its expander is open, opening or closing an expander reruns the (fragment) script.
+
+    Parameters
+    ----------
+    dev_par : dict
+        Device parameters of all files
+    file_name : string
+        Name of the file to edit
+    nk_file_list : List
+        Names of the available nk files
+    spectrum_file_list : List
+        Names of the available spectrum files
+    """
+    options = {'nk': nk_file_list, 'spectrum': spectrum_file_list, 'trap': st.session_state['trapFiles']}
+
+    # The grids keep their edits under their key. Include the version of the model, so the edits are not applied again
+    # after the files have been loaded again (e.g. after a reset or upload).
+    key_prefix = f"{getattr(dev_par, 'version', 0)}-{file_name}-"
+
+    for par_section in dev_par[file_name]:
+        if par_section[0] in SKIPPED_SECTIONS:
+            continue
+
+        # Initialize expander components for each section
+        section_title = par_section[0]
+        if par_section[0] == 'Optics':
+            # Add a custom description string
+            section_title = par_section[0] + ' (Optional, use only when calculating the generation profile i.e. genProfile=calc)'
+
+        blocks = split_section(par_section)
+        for editor_type, block in blocks:
+            if editor_type != 'comm':
+                prepare_block(block, editor_type, options.get(editor_type))
+
+        expander = st.expander(section_title, expanded=par_section[0] not in COLLAPSED_SECTIONS, key=file_name + '-' + par_section[0] + '-expander', on_change='rerun')
+        if expander.open is False:
+            # Nothing to build for a closed section, the values remain in the device parameters
+            continue
+
+        with expander:
+            for i, (editor_type, block) in enumerate(blocks):
+                if editor_type == 'comm':
+                    st.write(block)
+                else:
+                    show_parameter_grid(block, editor_type, options.get(editor_type), key_prefix + par_section[0] + '-' + str(i))
@@ -4,6 +4,11 @@
 import matplotlib.pyplot as plt
 import streamlit as st
 from pySIMsalabim.plots import plot_functions as utils_plot
+from utils import plot_render as utils_plot_render
+from utils import decimation as utils_decimation
+from utils import column_stats as utils_stats
+from utils import plot_def
+from utils import profiling as utils_profiling
 
 ######### Function Definitions ####################################################################   
 
@@ -85,7 +90,70 @@ def plot_result_JV(data, choice_voltage, plot_funcs, ax, exp, data_exp='', xscal
 
     return ax
 
-def get_nonzero_parameters(pars, data, choice_voltage):
+def draw_result_JV(fig, ax, data, choice_voltage, data_exp=None, xscale = 'linear', yscale = 'linear', xlim = None, ylim = None):
+    """Draw the JV curve (line and markers) in the same way as plot_result_JV.
+    Only uses the figure and axes objects and does not change the data, so it can run on any thread.
+
+    Parameters
+    ----------
+    fig : Figure
+        The figure object
+    ax : axes
+        Axes object for the plot
+    data : DataFrame
+        All output data from the JV.dat file
+    choice_voltage : float
+        The Vext potential for which the data in Var.dat is shown
+    data_exp : DataFrame, optional
+        Experimental JV curve, by default None
+    xscale : string, optional
+        Scale of the x-axis, by default 'linear'
+    yscale : string, optional
+        Scale of the y-axis, by default 'linear'
+    xlim : tuple, optional
+        Limits of the x-axis, by default None
+    ylim : tuple, optional
+        Limits of the y-axis, by default None
+    """
+    curves = {'Simulated': data}
+    if data_exp is not None:
+        curves['Experimental'] = data_exp
+
+    # If the yscale is log, we need to take the absolute value of the current to not lose the negative part of the curve.
+    jext = {}
+    for label, curve in curves.items():
+        jext[label] = curve['Jext'].abs().replace(0, 1e-20) if yscale == 'log' else curve['Jext']
+
+    # Lines first, then the markers. Both use their own color cycle, so the line and markers of a curve get the same color.
+    for label, curve in curves.items():
+        ax.plot(curve['Vext'], jext[label], label=label)
+    for label, curve in curves.items():
+        ax.scatter(curve['Vext'], jext[label])
+
+    # Vertical line to show the selected voltage (Vext)
+    ax.axvline(choice_voltage, color='k', linestyle='--')
+
+    # Configure plot
+    ax.set_xscale(xscale)
+    ax.set_yscale(yscale)
+    ax.set_xlabel('$V_{ext}$ [V]')
+    ax.set_ylabel('$J_{ext}$ [Am$^{-2}$]')
+    ax.set_title('Current-voltage characteristic')
+
+    # Only add a legend when there are two different curves
+    if data_exp is not None:
+        ax.legend()
+
+    # Indicate the x,y axis
+    ax.axhline(y=0, color='gray', linewidth=0.5)
+    ax.axvline(x=0, color='gray', linewidth=0.5)
+
+    if xlim is not None:
+        ax.set_xlim(xlim)
+    if ylim is not None:
+        ax.set_ylim(ylim)
+
+def get_nonzero_parameters(pars, data, choice_voltage, stats = None):
     """Check if a parameter is not equal to zero for a certain voltage. 
     If so, remove it from the options to plot, because it will not show up anyway.
 
@@ -97,24 +165,85 @@ def get_nonzero_parameters(pars, data, choice_voltage):
         All output data from the 'Var' file
     choice_voltage : float
         The Vext potential for which to show the data
+    stats : dict, optional
+        Column statistics of the data grouped by 'Vext' (see column_stats), computed when not provided
 
     Returns
     -------
     dict
         Updtaed dictionary with parameter names and labels
     """
+    if stats is None:
+        stats = utils_stats.compute_column_stats(data, 'Vext')
+
     for par in list(pars.keys()):
-        if sum(data[data['Vext'] == choice_voltage][par]) == 0:
+        # No data at all for this voltage counts as zero as well
+        if choice_voltage not in stats.get('groups', {}) or utils_stats.get_stat(stats, 'sum', [par], choice_voltage) == 0:
             pars.pop(par)
     
     return pars
 
-def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_no, fig, ax, plot_type,
-                             cols, choice_voltage = 0, source_type = '', show_plot_param=True, show_yscale=True, yscale_init=0, xscale_init=0, 
-                             show_xscale=False, show_xrange = True, show_yrange = True, xrange_format = "%f", yrange_format = "%e", xrange_val = None, yrange_val = None, weight_key = '', weight_label = '', weight_norm = 'linear', error_x = '', error_y='', show_legend=True,error_fmt='-'):
-    """Create a plot for the provided data and place it into a column structure. 
-    Add the plot options to the right of the plot when needed. 
-    When plotting a 'Var' type file, plot only for the selected voltage
+def create_UI_decimation_option(n_points, plot_no, point_budget = utils_decimation.POINT_BUDGET):
+    """Show a toggle to reduce the number of plotted points, when a series has more points than the point budget.
+    Indicate when the decimation is active.
+
+    Parameters
+    ----------
+    n_points : int
+        Number of points in the series
+    plot_no : integer
+        Plot number, used as unique identifier
+    point_budget : int, optional
+        Maximum number of points per series before the data is decimated, by default utils_decimation.POINT_BUDGET
+
+    Returns
+    -------
+    bool
+        True if the data must be decimated
+    """
+    if n_points <= point_budget:
+        return False
+
+    decimate = st.toggle('Reduce number of points', value=True, key = str(plot_no) + '-decimate', 
+                         help='Curves with many points are reduced to the points that determine their shape. Disable to plot every point.')
+    if decimate:
+        st.caption(f'Decimation active: at most {point_budget} of the {n_points} points per curve are shown.')
+    return decimate
+
+def decimate_data(data, x_key, y_keys, point_budget = utils_decimation.POINT_BUDGET, xscale = 'linear', yscale = 'linear'):
+    """Keep only the rows of the data that are needed to preserve the shape of the curves.
+
+    Parameters
+    ----------
+    data : DataFrame
+        Data to plot
+    x_key : string
+        Key in the dataframe for the 'x' axis data
+    y_keys : List
+        Keys in the dataframe of the curves to plot
+    point_budget : int, optional
+        Maximum number of points per curve, by default utils_decimation.POINT_BUDGET
+    xscale : string, optional
+        Scale of the x-axis, by default 'linear'
+    yscale : string, optional
+        Scale of the y-axis, by default 'linear'
+
+    Returns
+    -------
+    DataFrame
+        Decimated data
+    """
+    rows = utils_decimation.decimate_indices(data[x_key], [data[key] for key in y_keys], point_budget, xscale=xscale, yscale=yscale)
+    return data.iloc[rows]
+
+@utils_profiling.profiled('Plot options')
+def create_UI_plot_options(data_org, pars, x_key, title, plot_no, plot_type, cols, choice_voltage = 0, source_type = '', show_plot_param=True, 
+                           show_yscale=True, yscale_init=0, xscale_init=0, show_xscale=False, show_xrange = True, show_yrange = True, 
+                           xrange_format = "%f", yrange_format = "%e", xrange_val = None, yrange_val = None, point_budget = utils_decimation.POINT_BUDGET, 
+                           stats = None):
+    """Create the figure options for a plot in the right column and return the chosen settings.
+    When plotting a 'Var' type file, only the data for the selected voltage is returned. 
+    Series with more points than the point budget are decimated, unless this is disabled in the figure options.
 
     Parameters
     ----------
@@ -124,18 +253,10 @@ def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_
         Dict with all potential parameters to plot. Keys represent the names in the dataFrama, values are the corresponding labels
     x_key : string
         Key in the dataframe for the 'x' axis data
-    xlabel : string
-        Label for the x-axis. Format: parameter [unit]
-    ylabel : string
-        Label for the y-axis. Format: parameter [unit]
     title : string
         Title of the plot
     plot_no : integer
         Plot number, used as unique identifier
-    fig : Figure
-        The figure object
-    ax : axes
-        Axes object for the plot
     plot_type : Any
         Type of plot, e.g. standard plot or scatter
     cols : List
@@ -166,27 +287,16 @@ def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_
         Initial values for the x-range input fields, by default [None, None] in which case the min,max values of the data are used as limits
     yrange_val : List, optional
         Initial values for the y-range input fields, by default [None, None] in which case the min,max values of the data are used as limits
-    weight_key : string, optional
-        Key in the dataframe for the colorbar data, ignored if empty string, by default ''
-    weight_label : string, optional
-        Label for the colorbar. Format: parameter [unit]
-    weight_norm : string, optional
-        Scale of the colorbar, 'linear' or 'log', by defailt 'linear'
-    error_x : string, optional
-        Dataframe key of the column with the error in x, by default ''
-    error_y : string, optional
-        Dataframe key of the column with the error in y, by default ''
-    show_legend : bool, optional
-        Toggle between showing the legend in the plot, by default True
-    error_fmt : str, optional
-        Format of the errorbars, by default '-'
+    point_budget : int, optional
+        Maximum number of points per series before the data is decimated, by default utils_decimation.POINT_BUDGET
+    stats : dict, optional
+        Column statistics of data_org (see column_stats), grouped by 'Vext' for a 'Var' file. Computed when not provided.
 
     Returns
     -------
-    Figure
-        Updated Figure object
-    Axes
-        Updated Axes object 
+    dict
+        The data to plot and the chosen figure options: pars, options, xscale, yscale, xlim, ylim and xyerror. 
+        xlim and ylim are None when the range is not shown.
     """
 
     # Remove the +/- toggles on number inputs
@@ -199,12 +309,18 @@ def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_
     scale_options = ['linear', 'log']
     error_options = [True, False]
 
+    # Column statistics of the data, all initial axis ranges are based on these
+    if stats is None:
+        stats = utils_stats.compute_column_stats(data_org, 'Vext' if source_type == 'Var' else None)
+
     if source_type == 'Var':
         # Remove parameters that are 'zero' over the full 'x' range
-        pars = get_nonzero_parameters(pars, data_org, choice_voltage)
+        pars = get_nonzero_parameters(pars, data_org, choice_voltage, stats)
         data = data_org[data_org['Vext'] == choice_voltage] # Plot the data for the chosen voltage
+        group = choice_voltage
     else:
         data = data_org
+        group = None
 
     with cols[2]:
         if show_plot_param or show_yscale or show_xscale:
@@ -212,7 +328,8 @@ def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_
             st.markdown('<br>', unsafe_allow_html=True)
             st.markdown('<hr>', unsafe_allow_html=True)
 
-        with st.expander('Figure options', expanded=True):
+        # Group the options in a form, so changing them only reruns the script once they are applied
+        with st.expander('Figure options', expanded=True), st.form(key = str(plot_no) + '-figure-options', border=False):
             # Select which parameters to plot
             if show_plot_param:
                 options = st.multiselect('Parameters to plot:', list(pars.keys()), list(pars.keys()), key = str(plot_no) + '-par-options')
@@ -239,8 +356,8 @@ def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_
             if show_xrange:
                 if xrange_val is None:
                     # Use the min and max values of the selected parameter as limits with a margin of 5% of the range to prevent the data from merging with the axis
-                    xlow_init = data[x_key].min()
-                    xup_init = data[x_key].max()
+                    xlow_init = utils_stats.get_stat(stats, 'min', [x_key], group)
+                    xup_init = utils_stats.get_stat(stats, 'max', [x_key], group)
                 else:
                     # Use the provided limits as initial values
                     xlow_init = xrange_val[0]
@@ -253,7 +370,7 @@ def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_
                 # In case of a log plot, the lower limit should be above zero, so only subtract if this does not result in a negative value. 
                 # Otherwise, set the lower limit to the lowest value in the data that is above zero.
                 if xscale == 'log' and xlow_init - x_5p <= 0:
-                    xlow_init = min(num for num in data[x_key] if num > 0) if any(num > 0 for num in data[x_key]) else 0
+                    xlow_init = utils_stats.get_stat(stats, 'min_pos', [x_key], group, default=0)
                 else:
                     xlow_init -= x_5p
 
@@ -275,11 +392,8 @@ def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_
             if show_yrange:
                 if yrange_val is None and not len(options) == 0:
                     # Get the lowest and highest value of the selected parameters
-                    ylow_init = data[options[0]].min()
-                    yup_init = data[options[0]].max()
-                    for par in options:
-                        ylow_init = min(ylow_init, data[par].min())
-                        yup_init = max(yup_init, data[par].max())
+                    ylow_init = utils_stats.get_stat(stats, 'min', options, group)
+                    yup_init = utils_stats.get_stat(stats, 'max', options, group)
                 else:
                     ylow_init = yrange_val[0]
                     yup_init = yrange_val[1]
@@ -295,11 +409,8 @@ def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_
 
                 if not title == 'Carrier Densities':
                     if yscale == 'log' and ylow_init - y_5p <= 0:
-                        ylow_init = min(num for num in data[options[0]] if num > 0) if any(num > 0 for num in data[options[0]]) else 0
-                        for par in options:
-                            smallest_pos_value = min(num for num in data[par] if num > 0) if any(num > 0 for num in  data[par]) else 1
-
-                            ylow_init = min(ylow_init, smallest_pos_value)
+                        # Lowest value above zero of all selected parameters
+                        ylow_init = utils_stats.get_stat(stats, 'min_pos', options, group, default=0)
                     else:
                         # Subtract this value from the lower limit
                         ylow_init -= y_5p
@@ -322,6 +433,106 @@ def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_
             else:
                 xyerror = error_options[0]
 
+            # Reduce the number of points of large series
+            decimate = create_UI_decimation_option(len(data), plot_no, point_budget)
+
+            st.form_submit_button('Apply')
+
+    if decimate and len(options) > 0:
+        data = decimate_data(data, x_key, options, point_budget, xscale, yscale)
+
+    return {'data': data, 'pars': pars, 'options': options, 'xscale': xscale, 'yscale': yscale, 
+            'xlim': (xlow, xup) if show_xrange else None, 'ylim': (ylow, yup) if show_yrange else None, 'xyerror': xyerror}
+
+@utils_profiling.profiled('Plot')
+def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_no, fig, ax, plot_type,
+                             cols, choice_voltage = 0, source_type = '', show_plot_param=True, show_yscale=True, yscale_init=0, xscale_init=0, 
+                             show_xscale=False, show_xrange = True, show_yrange = True, xrange_format = "%f", yrange_format = "%e", xrange_val = None, yrange_val = None, weight_key = '', weight_label = '', weight_norm = 'linear', error_x = '', error_y='', show_legend=True,error_fmt='-', stats = None):
+    """Create a plot for the provided data and place it into a column structure. 
+    Add the plot options to the right of the plot when needed. 
+    When plotting a 'Var' type file, plot only for the selected voltage
+
+    Parameters
+    ----------
+    data_org : DataFrame
+        Unfiltered data to plot
+    pars : dict
+        Dict with all potential parameters to plot. Keys represent the names in the dataFrama, values are the corresponding labels
+    x_key : string
+        Key in the dataframe for the 'x' axis data
+    xlabel : string
+        Label for the x-axis. Format: parameter [unit]
+    ylabel : string
+        Label for the y-axis. Format: parameter [unit]
+    title : string
+        Title of the plot
+    plot_no : integer
+        Plot number, used as unique identifier
+    fig : Figure
+        The figure object
+    ax : axes
+        Axes object for the plot
+    plot_type : Any
+        Type of plot, e.g. standard plot or scatter
+    cols : List
+        List with columns to plot figure in (Streamlit specific)
+    choice_voltage : float, optional
+        The Vext potential for which to show the data. Only relevant when plotting from a 'Var' file
+    source_type : string, optional
+        From what file type originates the data. Only relevant when equal to 'Var'
+    show_plot_param : bool, optional
+        Show the multiselectbox to select which parameters to plot, by default True
+    show_yscale : bool, optional
+        Show a radio toggle to switch between a linear or log y scale, by default true
+    yscale_init : int, optional
+        Initial scale of the y-axis, used in yscale_options, by default 0
+    xscale_init : int, optional
+        Initial scale of the x-axis, used in xscale_options, by default 0
+    show_xscale : bool, optional
+        Show a radio toggle to switch between a linear or log x scale, by default true
+    show_xrange : bool, optional
+        Show input fields to set the x-range, by default True
+    show_yrange : bool, optional
+        Show input fields to set the y-range, by default True
+    xrange_format : string, optional
+        Format of the x-range input fields, by default "%f"
+    yrange_format : string, optional
+        Format of the y-range input fields, by default "%e"
+    xrange_val : List, optional
+        Initial values for the x-range input fields, by default [None, None] in which case the min,max values of the data are used as limits
+    yrange_val : List, optional
+        Initial values for the y-range input fields, by default [None, None] in which case the min,max values of the data are used as limits
+    weight_key : string, optional
+        Key in the dataframe for the colorbar data, ignored if empty string, by default ''
+    weight_label : string, optional
+        Label for the colorbar. Format: parameter [unit]
+    weight_norm : string, optional
+        Scale of the colorbar, 'linear' or 'log', by defailt 'linear'
+    error_x : string, optional
+        Dataframe key of the column with the error in x, by default ''
+    error_y : string, optional
+        Dataframe key of the column with the error in y, by default ''
+    show_legend : bool, optional
+        Toggle between showing the legend in the plot, by default True
+    error_fmt : str, optional
+        Format of the errorbars, by default '-'
+    stats : dict, optional
+        Column statistics of data_org (see column_stats), grouped by 'Vext' for a 'Var' file. Computed when not provided.
+
+    Returns
+    -------
+    Figure
+        Updated Figure object
+    Axes
+        Updated Axes object 
+    """
+
+    plot_opts = create_UI_plot_options(data_org, pars, x_key, title, plot_no, plot_type, cols, choice_voltage, source_type, show_plot_param, 
+                                       show_yscale, yscale_init, xscale_init, show_xscale, show_xrange, show_yrange, xrange_format, yrange_format, 
+                                       xrange_val, yrange_val, stats=stats)
+    data, pars, options = plot_opts['data'], plot_opts['pars'], plot_opts['options']
+    xscale, yscale, xyerror = plot_opts['xscale'], plot_opts['yscale'], plot_opts['xyerror']
+
     with cols[1]:
         # Create plot
         fig, ax = plt.subplots()
@@ -348,12 +559,112 @@ def create_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_
         
         # Set the x,y range, independent of plot type and/or errorbars
         if show_xrange:
-            ax.set_xlim(xlow, xup)
+            ax.set_xlim(plot_opts['xlim'])
         if show_yrange:
-            ax.set_ylim(ylow, yup)
+            ax.set_ylim(plot_opts['ylim'])
 
         return fig,ax
 
+@st.fragment # Fragment for a single plot, applying its figure options only reruns this plot and not the whole page
+@utils_profiling.profiled('Plot')
+def show_UI_component_plot(data_org, pars, x_key, xlabel, ylabel, title, plot_no, plot_type, col_widths = [1, 6, 3], weight_key = '', weight_label = '', 
+                           weight_norm = 'linear', error_x = '', error_y='', show_legend=True, error_fmt='-', **plot_options):
+    """Same as create_UI_component_plot, but the figure is rendered on the plot render pool (see plot_render) and placed into the middle column 
+    of its own column structure. Inside a render batch, this function returns directly and the figure is placed when the batch is closed.
+    When the figure options are applied, only this plot is rerun and rendered again.
+
+    Parameters
+    ----------
+    data_org : DataFrame
+        Unfiltered data to plot
+    pars : dict
+        Dict with all potential parameters to plot. Keys represent the names in the dataFrama, values are the corresponding labels
+    x_key : string
+        Key in the dataframe for the 'x' axis data
+    xlabel : string
+        Label for the x-axis. Format: parameter [unit]
+    ylabel : string
+        Label for the y-axis. Format: parameter [unit]
+    title : string
+        Title of the plot
+    plot_no : integer
+        Plot number, used as unique identifier
+    plot_type : Any
+        Type of plot, e.g. standard plot or scatter
+    col_widths : List, optional
+        Relative widths of the columns for the margin, the plot and the figure options, by default [1, 6, 3]
+    weight_key : string, optional
+        Key in the dataframe for the colorbar data, ignored if empty string, by default ''
+    weight_label : string, optional
+        Label for the colorbar. Format: parameter [unit]
+    weight_norm : string, optional
+        Scale of the colorbar, 'linear' or 'log', by defailt 'linear'
+    error_x : string, optional
+        Dataframe key of the column with the error in x, by default ''
+    error_y : string, optional
+        Dataframe key of the column with the error in y, by default ''
+    show_legend : bool, optional
+        Toggle between showing the legend in the plot, by default True
+    error_fmt : str, optional
+        Format of the errorbars, by default '-'
+    plot_options : Any, optional
+        Figure options as accepted by create_UI_plot_options, e.g. choice_voltage, source_type, show_yscale or yrange_val
+    """
+    # A fragment can only write to containers it created itself, so the columns are created here
+    cols = st.columns(col_widths)
+    plot_opts = create_UI_plot_options(data_org, pars, x_key, title, plot_no, plot_type, cols, **plot_options)
+    plot_opts.update({'x_key': x_key, 'xlabel': xlabel, 'ylabel': ylabel, 'title': title, 'plot_type': plot_type, 'weight_key': weight_key, 
+                      'weight_label': weight_label, 'weight_norm': weight_norm, 'error_x': error_x, 'error_y': error_y, 
+                      'show_legend': show_legend, 'error_fmt': error_fmt})
+
+    utils_plot_render.submit_plot(cols[1], draw_component_plot, plot_opts)
+
+def draw_component_plot(fig, ax, plot_opts):
+    """Draw a plot with the figure options from show_UI_component_plot. 
+    Only uses the figure and axes objects, so it can run on any thread.
+
+    Parameters
+    ----------
+    fig : Figure
+        The figure object
+    ax : axes
+        Axes object for the plot
+    plot_opts : dict
+        The data to plot, the figure options and the plot settings
+    """
+    data, pars, options = plot_opts['data'], plot_opts['pars'], plot_opts['options']
+    x_key, plot_type = plot_opts['x_key'], plot_opts['plot_type']
+
+    if plot_opts['weight_key'] != '':
+        utils_plot.plot_result_colorbar_single(data[x_key], data[options[0]], data[plot_opts['weight_key']], ax, fig, plot_opts['xlabel'], 
+                                               plot_opts['ylabel'], plot_opts['weight_label'], plot_opts['weight_norm'], plot_opts['title'], 
+                                               plot_opts['xscale'], plot_opts['yscale'])
+    elif plot_opts['xyerror'] and plot_type == plt.errorbar:
+        # Same as plot_result, but with the errorbar method of the axes instead of the pyplot state machine
+        xerr = data[plot_opts['error_x']] if plot_opts['error_x'] != '' else None
+        yerr = data[plot_opts['error_y']] if plot_opts['error_y'] != '' else None
+        for i, y_var in enumerate(options):
+            if sum(data[y_var]) != 0:
+                ax.errorbar(data[x_key], data[y_var], label=pars[y_var], xerr=xerr, yerr=yerr, color=plot_def.color[i], fmt=plot_opts['error_fmt'])
+        if plot_opts['show_legend']:
+            ax.legend()
+        ax.set_xlabel(plot_opts['xlabel'])
+        ax.set_ylabel(plot_opts['ylabel'])
+        ax.set_xscale(plot_opts['xscale'])
+        ax.set_yscale(plot_opts['yscale'])
+        ax.set_title(plot_opts['title'])
+    else:
+        # Pass the plot method of the axes, so plot_result does not draw on the current pyplot figure
+        utils_plot.plot_result(data, pars, options, x_key, plot_opts['xlabel'], plot_opts['ylabel'], plot_opts['xscale'], plot_opts['yscale'], 
+                               plot_opts['title'], ax, ax.plot, legend=plot_opts['show_legend'])
+
+    # Set the x,y range, independent of plot type and/or errorbars
+    if plot_opts['xlim'] is not None:
+        ax.set_xlim(plot_opts['xlim'])
+    if plot_opts['ylim'] is not None:
+        ax.set_ylim(plot_opts['ylim'])
+
+@utils_profiling.profiled('Plot')
 def create_UI_component_plot_twinx(data_org, pars, selected_1, selected_2, x_key, xlabel, ylabel_1, ylabel_2, title, fig, ax_1, ax_2, 
                              cols, show_plot_param=True, show_yscale_1=True, show_yscale_2 = True, 
                               yscale_init_1 = 0, yscale_init_2 = 0, show_errors=True, yerror_1 = [], yerror_2 = []):
@@ -409,13 +720,17 @@ def create_UI_component_plot_twinx(data_org, pars, selected_1, selected_2, x_key
     scale_options = ['linear', 'log']
     error_options = [True, False]
 
+    # Column statistics of the data, the initial axis ranges are based on these
+    stats = utils_stats.compute_column_stats(data_org)
+
     with cols[2]:
         if show_plot_param or show_yscale_1 or show_yscale_2:
             # Figure options
             st.markdown('<br>', unsafe_allow_html=True)
             st.markdown('<hr>', unsafe_allow_html=True)
 
-        with st.expander('Figure options', expanded=True):
+        # Group the options in a form, so changing them only reruns the script once they are applied
+        with st.expander('Figure options', expanded=True), st.form(key = 'Bode-figure-options-' + str(selected_1), border=False):
             # Select which parameters to plot
             if show_plot_param:
                 options = st.multiselect('Parameters to plot:', list(pars.keys()), list(pars.keys()), key = str(1) + '-par-options' + str(selected_1))
@@ -447,8 +762,8 @@ def create_UI_component_plot_twinx(data_org, pars, selected_1, selected_2, x_key
 
             # Set the x range
             # Use the min and max values of the selected parameter as limits with a margin of 5% of the range to prevent the data from merging with the axis
-            xlow_init = data_org[x_key].min()
-            xup_init = data_org[x_key].max()
+            xlow_init = utils_stats.get_stat(stats, 'min', [x_key])
+            xup_init = utils_stats.get_stat(stats, 'max', [x_key])
 
             # Use 5% of the interval
             x_5p = abs((xup_init - xlow_init) * 0.05)
@@ -473,8 +788,8 @@ def create_UI_component_plot_twinx(data_org, pars, selected_1, selected_2, x_key
 
             # Set the y (Left) range
             # Get the lowest and highest value of the selected parameters
-            ylow_init_left = data_org[selected_1].min().iloc[0]
-            yup_init_left = data_org[selected_1].max().iloc[0]
+            ylow_init_left = utils_stats.get_stat(stats, 'min', [selected_1[0]])
+            yup_init_left = utils_stats.get_stat(stats, 'max', [selected_1[0]])
 
             # Use 5% of the interval
             y_5p_left = abs((yup_init_left - ylow_init_left) * 0.05)
@@ -498,8 +813,8 @@ def create_UI_component_plot_twinx(data_org, pars, selected_1, selected_2, x_key
 
             # Set the y (Right) range
             # Get the lowest and highest value of the selected parameters
-            ylow_init_right = data_org[selected_2].min().iloc[0]
-            yup_init_right = data_org[selected_2].max().iloc[0]
+            ylow_init_right = utils_stats.get_stat(stats, 'min', [selected_2[0]])
+            yup_init_right = utils_stats.get_stat(stats, 'max', [selected_2[0]])
 
             # Use 5% of the interval
             y_5p_right = abs((yup_init_right - ylow_init_right) * 0.05)
@@ -521,6 +836,8 @@ def create_UI_component_plot_twinx(data_org, pars, selected_1, selected_2, x_key
             with col2_y_right:
                 yup_right = st.number_input('Y-range', value=yup_init_right, key = 'Bode-right-yrange_up-' + str(selected_2),label_visibility="collapsed", format="%.2e")
 
+            st.form_submit_button('Apply')
+
     with cols[1]:
         # Create plot
         if yerror:
@@ -536,7 +853,7 @@ def create_UI_component_plot_twinx(data_org, pars, selected_1, selected_2, x_key
             
         st.pyplot(fig, format='png')
 
-def get_xy_range(data_var, par_x, pars_y):
+def get_xy_range(data_var, par_x, pars_y, stats = None):
     '''Get the x and y range for the parameters in the 'Var' file from the min/max values in the data.
         
     Parameters
@@ -547,18 +864,19 @@ def get_xy_range(data_var, par_x, pars_y):
         Key in the dataframe for the 'x' axis data
     pars_y : dict
         Dict with all potential parameters to plot on the y axis. Keys represent the column names in the dataframe
+    stats : dict, optional
+        Column statistics of data_var (see column_stats), computed when not provided
     
     Returns
     -------
     List, List
         x and y range for the plot, in the format [min, max]
     '''
+    if stats is None:
+        stats = utils_stats.compute_column_stats(data_var)
+
     # Get the x range from the data_var using the par_x_potential
-    xrange_val = [data_var[par_x].min(), data_var[par_x].max()]
+    xrange_val = [utils_stats.get_stat(stats, 'min', [par_x]), utils_stats.get_stat(stats, 'max', [par_x])]
     # Get the y range from the data_var using the pars_potential keys
-    yrange_val = []
-    for key in pars_y.keys():
-        yrange_val.append(data_var[key].min())
-        yrange_val.append(data_var[key].max())
-    yrange_val = [min(yrange_val), max(yrange_val)]
+    yrange_val = [utils_stats.get_stat(stats, 'min', list(pars_y.keys())), utils_stats.get_stat(stats, 'max', list(pars_y.keys()))]
     return xrange_val, yrange_val
\ No newline at end of file
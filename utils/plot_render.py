@@ -0,0 +1,91 @@
+"""Render figures on a worker pool and place them into the page"""
+######### Package Imports #########################################################################
+
+import io, os, threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+######### Parameter Initialisation ################################################################
+
+# Number of figures that can be rendered at the same time. The pool is shared by all sessions.
+MAX_PLOT_WORKERS = min(4, os.cpu_count() or 1)
+
+# Same savefig settings as st.pyplot, so figures look identical to the ones rendered on the script thread.
+SAVEFIG_OPTIONS = {'bbox_inches': 'tight', 'dpi': 200, 'format': 'png'}
+
+_executor = ThreadPoolExecutor(max_workers=MAX_PLOT_WORKERS, thread_name_prefix='plot-render')
+
+# Render batch of the script run on the current thread. Every session runs its script on its own thread.
+_batch = threading.local()
+
+######### Function Definitions ####################################################################
+
+def render_png(draw_func, *args):
+    """Create a figure with its own Agg canvas, draw it and return it as a PNG image.
+    Does not use the pyplot state machine, so it can be called from any thread.
+
+    Parameters
+    ----------
+    draw_func : function
+        Function that draws the figure. Called as draw_func(fig, ax, *args)
+    args : Any
+        Arguments passed on to draw_func
+
+    Returns
+    -------
+    bytes
+        The rendered figure in PNG format
+    """
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    draw_func(fig, ax, *args)
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, **SAVEFIG_OPTIONS)
+    return buffer.getvalue()
+
+def submit_plot(container, draw_func, *args):
+    """Reserve a spot for a figure in the container and render the figure.
+    Inside a render batch the figure is rendered on the worker pool and placed when the batch is closed,
+    otherwise it is rendered and placed directly.
+
+    Parameters
+    ----------
+    container : DeltaGenerator
+        Streamlit container (e.g. a column) to place the figure in
+    draw_func : function
+        Function that draws the figure. Called as draw_func(fig, ax, *args)
+    args : Any
+        Arguments passed on to draw_func
+    """
+    placeholder = container.empty()
+    jobs = getattr(_batch, 'jobs', None)
+
+    if jobs is not None:
+        # Start rendering right away, the script continues with building the rest of the page
+        jobs.append((placeholder, _executor.submit(render_png, draw_func, *args)))
+    else:
+        placeholder.image(render_png(draw_func, *args), width='stretch')
+
+@contextmanager
+def render_batch():
+    """Render all figures submitted within the context on the worker pool.
+    When leaving the context, each figure is placed into its spot as soon as it has been rendered.
+    """
+    _batch.jobs = []
+    try:
+        yield
+        jobs = _batch.jobs
+    finally:
+        _batch.jobs = None
+
+    placeholders = {future: placeholder for placeholder, future in jobs}
+    for future in as_completed(placeholders):
+        try:
+            placeholders[future].image(future.result(), width='stretch')
+        except Exception as err:
+            placeholders[future].error('Could not create the figure: ' + str(err))
@@ -0,0 +1,207 @@
+"""Lightweight profiling of the page reruns: the time spent in the main stages of a page is recorded as spans,
+shown in the sidebar and can be downloaded in the Chrome trace format (chrome://tracing or https://ui.perfetto.dev)"""
+######### Package Imports #########################################################################
+
+import os, json, time, functools, contextlib, collections
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+######### Parameter Initialisation ################################################################
+
+# Profiling is enabled for all sessions with the environment variable (e.g. SIMSALABIM_PROFILE=1)
+# or for a single session with the query parameter, e.g. http://localhost:8501/Impedance?profile=1 (profile=0 disables it again)
+PROFILE_VARIABLE = 'SIMSALABIM_PROFILE'
+PROFILE_QUERY_PARAMETER = 'profile'
+
+# Number of reruns kept for the Chrome trace
+MAX_TRACED_RERUNS = 20
+
+######### Class Definitions #######################################################################
+
+class Profiler:
+    """Spans of the current rerun of a session and the finished reruns. Spans that are recorded before the page script starts,
+    e.g. in a widget callback, are part of the rerun that follows."""
+    def __init__(self):
+        self.spans = []
+        self.depth = 0
+        self.rerun_start = None
+        self.reruns = collections.deque(maxlen=MAX_TRACED_RERUNS)
+        # Script run of the spans, see get_profiler
+        self.run = None
+
+######### Function Definitions ####################################################################
+
+def is_enabled():
+    """Check if profiling is enabled for the current session.
+
+    Returns
+    -------
+    bool
+        True when enabled by the environment variable or the query parameter
+    """
+    if os.environ.get(PROFILE_VARIABLE, '').lower() in ('1', 'true', 'yes'):
+        return True
+    return st.session_state.get('profilingEnabled', False)
+
+def get_profiler():
+    """Get the profiler of the current session.
+
+    Returns
+    -------
+    Profiler
+        Profiler of the session, None when profiling is disabled, when not called from the script thread (e.g. a worker thread)
+        or in a rerun of only a fragment, as such a rerun is not finished with show_profile
+    """
+    ctx = get_script_run_ctx(suppress_warning=True)
+    if ctx is None or getattr(ctx, 'fragment_ids_this_run', None) or not is_enabled():
+        return None
+    if 'profiler' not in st.session_state:
+        st.session_state['profiler'] = Profiler()
+    profiler = st.session_state['profiler']
+
+    # Streamlit creates a new coordinator for every script run, it identifies the run. The widget callbacks are part of the run they start.
+    run = getattr(ctx, 'parallel_coordinator', None)
+    if run is not profiler.run:
+        # Drop the spans of an earlier run that was not finished, e.g. stopped by st.rerun
+        profiler.spans = []
+        profiler.depth = 0
+        profiler.rerun_start = None
+        profiler.run = run
+    return profiler
+
+def start_rerun():
+    """Start the profiling of a page rerun. Call at the top of the page, before the query parameters are replaced by the session ID,
+    so the query parameter to enable profiling is read first."""
+    if PROFILE_QUERY_PARAMETER in st.query_params:
+        st.session_state['profilingEnabled'] = st.query_params[PROFILE_QUERY_PARAMETER].lower() not in ('0', 'false', 'no')
+    profiler = get_profiler()
+    if profiler is not None:
+        profiler.rerun_start = time.perf_counter()
+
+@contextlib.contextmanager
+def span(name):
+    """Record the time spent in a block as a span, e.g. with span('Load device parameters'): ... Spans can be nested.
+    Nothing is recorded when profiling is disabled.
+
+    Parameters
+    ----------
+    name : string
+        Name of the stage
+    """
+    profiler = get_profiler()
+    if profiler is None:
+        yield
+        return
+    depth = profiler.depth
+    profiler.depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        profiler.depth = depth
+        profiler.spans.append({'name': name, 'start': start, 'duration': time.perf_counter() - start, 'depth': depth})
+
+def profiled(name = None):
+    """Decorator to record every call of a function as a span.
+
+    Parameters
+    ----------
+    name : string, optional
+        Name of the stage, by default the name of the function
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name or func.__name__):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def finish_rerun(profiler, page):
+    """Finish the current rerun: move its spans to the finished reruns.
+
+    Parameters
+    ----------
+    profiler : Profiler
+        Profiler of the session
+    page : string
+        Name of the page
+
+    Returns
+    -------
+    dict
+        The finished rerun: page, start, duration and spans (sorted on the start time)
+    """
+    end = time.perf_counter()
+    spans = sorted(profiler.spans, key=lambda item: item['start'])
+    start = min([item['start'] for item in spans] + [profiler.rerun_start or end])
+    rerun = {'page': page, 'start': start, 'duration': end - start, 'spans': spans}
+    profiler.reruns.append(rerun)
+    profiler.spans = []
+    profiler.depth = 0
+    profiler.rerun_start = None
+    return rerun
+
+def get_breakdown(rerun):
+    """Get the timing breakdown of a rerun, with the names of nested spans indented.
+
+    Parameters
+    ----------
+    rerun : dict
+        Finished rerun, see finish_rerun
+
+    Returns
+    -------
+    DataFrame
+        Stage, Time [ms] and Share [%] of the rerun
+    """
+    # Indent with em spaces, leading spaces are not shown in a table
+    return pd.DataFrame({'Stage': ['\u2003' * item['depth'] + item['name'] for item in rerun['spans']],
+                         'Time [ms]': [1e3 * item['duration'] for item in rerun['spans']],
+                         'Share [%]': [100 * item['duration'] / rerun['duration'] if rerun['duration'] > 0 else 0 for item in rerun['spans']]},
+                        columns=['Stage', 'Time [ms]', 'Share [%]'])
+
+def get_chrome_trace(reruns):
+    """Convert reruns to the Chrome trace event format, with every rerun and span as a complete ('X') event.
+
+    Parameters
+    ----------
+    reruns : List
+        Finished reruns, see finish_rerun
+
+    Returns
+    -------
+    dict
+        Trace with the events, the times in µs
+    """
+    events = []
+    pid = os.getpid()
+    for i, rerun in enumerate(reruns):
+        events.append({'name': 'Rerun ' + rerun['page'], 'cat': 'rerun', 'ph': 'X', 'ts': rerun['start'] * 1e6,
+                       'dur': rerun['duration'] * 1e6, 'pid': pid, 'tid': 1, 'args': {'rerun': i}})
+        for item in rerun['spans']:
+            events.append({'name': item['name'], 'cat': 'stage', 'ph': 'X', 'ts': item['start'] * 1e6, 'dur': item['duration'] * 1e6,
+                           'pid': pid, 'tid': 1, 'args': {'rerun': i}})
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+def show_profile(page):
+    """Finish the profiling of the page rerun and show the timing breakdown in the sidebar, with a download of the Chrome trace
+    of the last reruns. Call at the end of the page. Nothing is shown when profiling is disabled.
+
+    Parameters
+    ----------
+    page : string
+        Name of the page
+    """
+    profiler = get_profiler()
+    if profiler is None:
+        return
+    rerun = finish_rerun(profiler, page)
+    with st.sidebar:
+        st.markdown('<hr>', unsafe_allow_html=True)
+        with st.expander(f"Profile: {1e3 * rerun['duration']:.0f} ms"):
+            st.dataframe(get_breakdown(rerun), hide_index=True, column_config={'Time [ms]': st.column_config.NumberColumn(format='%.1f'),
+                                                                                'Share [%]': st.column_config.NumberColumn(format='%.0f')})
+            st.download_button('Download Chrome trace', data=json.dumps(get_chrome_trace(profiler.reruns)), file_name='profile_trace.json',
+                               mime='application/json', help=f'The last {len(profiler.reruns)} reruns, open in chrome://tracing or ui.perfetto.dev')
@@ -0,0 +1,356 @@
+"""Structured metrics of every simulation run, appended as JSON lines to a rotating file by a background writer thread"""
+######### Package Imports #########################################################################
+
+import os, json, time, queue, atexit, hashlib, threading
+from datetime import datetime
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the CPU time and memory use are then not recorded
+    resource = None
+from utils import device_model as utils_device_model
+from utils import solver_limits as utils_solver_limits
+
+######### Parameter Initialisation ################################################################
+
+# File with the metrics, relative to SIMsalabim.py. Rotated files get a suffix: run_metrics.jsonl.1 (newest) to run_metrics.jsonl.<MAX_ROTATED_FILES>
+METRICS_FOLDER = 'Statistics'
+METRICS_FILE = 'run_metrics.jsonl'
+
+# The file is rotated when it exceeds this size, the oldest rotated file is removed
+MAX_FILE_SIZE = 10 * 1024 * 1024
+MAX_ROTATED_FILES = 20
+
+# Records waiting to be written by the background writer, as (path of the file, JSON line)
+_pending = queue.Queue()
+_writer_lock = threading.Lock()
+_writer = None
+
+######### Class Definitions #######################################################################
+
+class RunMetrics:
+    """Metrics of a single simulation run. Created when the run is requested, the solver stage is marked with
+    start_solver and stop_solver and the record is queued for writing with finish.
+
+    The CPU time and peak memory of the solver are collected per solver process when start_solver gets the session folder,
+    see solver_limits. Otherwise they are taken from the resource usage of the child processes of the app. As other sessions can
+    run simulations at the same time, these are an upper bound. The peak memory is then only known when this run raised the
+    highest peak of all child processes so far, otherwise it is None.
+    """
+    def __init__(self, id_session, exp_type):
+        self.record = {'id': str(id_session), 'exp_type': exp_type, 'timestamp': datetime.now().isoformat(timespec='seconds'),
+                       'status': None, 'result_code': None, 'error_class': None, 'queue_wait': None, 'wall_time': None,
+                       'cpu_time': None, 'peak_rss_kb': None, 'output_bytes': None, 'grid_points': None, 'parameter_set': None, 'limit': None}
+        self._requested = time.perf_counter()
+        self._started_at = time.time()
+        self._solver_start = None
+        self._usage_start = None
+        self._solver_usage = None
+
+    def start_solver(self, session_path = None):
+        """Mark the start of the solver, the time since the run was requested is the queue wait time.
+
+        Parameters
+        ----------
+        session_path : string, optional
+            Path of the session folder, to collect the resource usage of the solvers that run in it, by default None
+        """
+        self._solver_start = time.perf_counter()
+        self.record['queue_wait'] = self._solver_start - self._requested
+        self._usage_start = get_children_usage()
+        if session_path is not None:
+            self._solver_usage = utils_solver_limits.start_tracking(session_path)
+
+    def stop_solver(self):
+        """Mark the end of the solver and record its wall time, CPU time, peak memory and the resource limit that stopped it."""
+        if self._solver_start is None:
+            return
+        self.record['wall_time'] = time.perf_counter() - self._solver_start
+        if self._solver_usage is not None:
+            utils_solver_limits.stop_tracking(self._solver_usage)
+            if self._solver_usage.processes > 0:
+                self.record.update({'cpu_time': self._solver_usage.cpu_time, 'peak_rss_kb': self._solver_usage.peak_rss_kb,
+                                    'limit': self._solver_usage.limit})
+                return
+        usage = get_children_usage()
+        if usage is not None and self._usage_start is not None:
+            self.record['cpu_time'] = usage[0] - self._usage_start[0]
+            if usage[1] > self._usage_start[1]:
+                self.record['peak_rss_kb'] = usage[1]
+
+    def set(self, **values):
+        """Set additional values of the record, e.g. set(peak_rss_kb = 1024)."""
+        self.record.update(values)
+
+    def finish(self, status, result_code = None, session_path = None, dev_par = None, dev_par_name = None):
+        """Complete the record and queue it for writing.
+
+        Parameters
+        ----------
+        status : string
+            'SUCCESS', 'FAILED' (the input files could not be created) or 'ERROR' (the solver failed)
+        result_code : int, optional
+            Exit code of the solver, by default None
+        session_path : string, optional
+            Path of the session folder, to determine the size of the output files, by default None
+        dev_par : dict, optional
+            Device parameters of all files, to determine the number of grid points and the parameter set, by default None
+        dev_par_name : string, optional
+            Name of the simulation setup file, by default None
+        """
+        if self.record['wall_time'] is None:
+            self.stop_solver()
+        self.record['status'] = status
+        self.record['result_code'] = result_code
+        self.record['error_class'] = get_error_class(status, result_code, self.record['limit'])
+        if session_path is not None:
+            self.record['output_bytes'] = get_output_size(session_path, self._started_at)
+        if dev_par is not None:
+            self.record['parameter_set'] = get_parameter_set(dev_par)
+        if dev_par is not None and dev_par_name in dev_par:
+            try:
+                self.record['grid_points'] = utils_device_model.get_value(dev_par[dev_par_name], 'NP', 'Numerical Parameters', int)
+            except ValueError:
+                pass
+        record_run(self.record)
+
+######### Function Definitions ####################################################################
+
+def get_children_usage():
+    """Get the resource usage of the terminated child processes (the solvers) of the app.
+
+    Returns
+    -------
+    tuple
+        (CPU time in s (user + system), highest peak memory in kB), None when not available
+    """
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime, usage.ru_maxrss
+
+def get_error_class(status, result_code, limit = None):
+    """Classify a failed run, to count the failures by cause.
+
+    Parameters
+    ----------
+    status : string
+        'SUCCESS', 'FAILED' or 'ERROR'
+    result_code : int
+        Exit code of the solver
+    limit : string, optional
+        Resource limit that stopped the solver, see solver_limits, by default None
+
+    Returns
+    -------
+    string
+        None for a successful run, 'input' when the input files could not be created, 'limit_<limit>' when the solver was stopped
+        at a resource limit, 'exit_<code>' for other solver errors
+    """
+    if status == 'SUCCESS':
+        return None
+    if status == 'FAILED':
+        return 'input'
+    if limit is not None:
+        return 'limit_' + limit
+    return 'exit_' + str(result_code)
+
+def get_output_size(session_path, since):
+    """Get the total size of the files in the session folder that have been written since the start of the run.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the session folder
+    since : float
+        Start of the run, as time.time()
+
+    Returns
+    -------
+    int
+        Size in bytes
+    """
+    total = 0
+    try:
+        with os.scandir(session_path) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    file_stat = entry.stat(follow_symlinks=False)
+                    if file_stat.st_mtime >= since:
+                        total += file_stat.st_size
+    except FileNotFoundError:
+        pass
+    return total
+
+def get_parameter_set(dev_par):
+    """Get a short identifier of the device parameters, runs with the same parameters in all files get the same identifier.
+
+    Parameters
+    ----------
+    dev_par : dict
+        Device parameters of all files
+
+    Returns
+    -------
+    string
+        First 12 characters of the SHA-256 digest of the device parameters
+    """
+    return hashlib.sha256(json.dumps(dev_par, sort_keys=True).encode()).hexdigest()[:12]
+
+def start_run(id_session, exp_type):
+    """Start the metrics of a simulation run.
+
+    Parameters
+    ----------
+    id_session : string
+        Session ID
+    exp_type : string
+        Type of experiment, e.g. 'Steady_State' or 'CV'
+
+    Returns
+    -------
+    RunMetrics
+        Metrics of the run
+    """
+    return RunMetrics(id_session, exp_type)
+
+def record_run(record):
+    """Queue a record for writing by the background writer. The path of the file is fixed now, so the record is written to the
+    metrics of the app even when the working directory changes.
+
+    Parameters
+    ----------
+    record : dict
+        Metrics of the run
+    """
+    _pending.put((os.path.abspath(os.path.join(METRICS_FOLDER, METRICS_FILE)), json.dumps(record)))
+    _start_writer()
+
+def _start_writer():
+    """Start the background writer thread, once per process."""
+    global _writer
+    with _writer_lock:
+        if _writer is None or not _writer.is_alive():
+            _writer = threading.Thread(target=_write_pending, name='run-metrics-writer', daemon=True)
+            _writer.start()
+
+def _write_pending():
+    """Write the queued records, the records that are queued at the same time are written in one go."""
+    while True:
+        items = [_pending.get()]
+        while True:
+            try:
+                items.append(_pending.get_nowait())
+            except queue.Empty:
+                break
+        lines = {}
+        for file_path, line in items:
+            lines.setdefault(file_path, []).append(line)
+        for file_path, file_lines in lines.items():
+            try:
+                write_lines(file_path, file_lines)
+            except OSError:
+                # The metrics must never break the app, the records are lost
+                pass
+        for _ in items:
+            _pending.task_done()
+
+def write_lines(file_path, lines):
+    """Append lines to the metrics file, rotate the file first when it is too large.
+
+    Parameters
+    ----------
+    file_path : string
+        Path of the metrics file
+    lines : List
+        JSON lines to append
+    """
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    if os.path.isfile(file_path) and os.path.getsize(file_path) >= MAX_FILE_SIZE:
+        rotate_file(file_path)
+    with open(file_path, 'a', encoding='utf-8') as fp:
+        fp.write('\n'.join(lines) + '\n')
+
+def rotate_file(file_path, max_rotated = None):
+    """Rotate the metrics file: file.1 becomes file.2 etc. and the file becomes file.1. The oldest file is removed.
+
+    Parameters
+    ----------
+    file_path : string
+        Path of the metrics file
+    max_rotated : int, optional
+        Number of rotated files to keep, by default MAX_ROTATED_FILES
+    """
+    max_rotated = max_rotated or MAX_ROTATED_FILES
+    oldest = f'{file_path}.{max_rotated}'
+    if os.path.isfile(oldest):
+        os.remove(oldest)
+    for i in range(max_rotated - 1, 0, -1):
+        if os.path.isfile(f'{file_path}.{i}'):
+            os.replace(f'{file_path}.{i}', f'{file_path}.{i + 1}')
+    os.replace(file_path, file_path + '.1')
+
+def get_metrics_files(folder = None):
+    """Get the metrics file and the rotated files, oldest first.
+
+    Parameters
+    ----------
+    folder : string, optional
+        Folder with the metrics, by default METRICS_FOLDER
+
+    Returns
+    -------
+    List
+        Paths of the files that exist
+    """
+    file_path = os.path.join(folder or METRICS_FOLDER, METRICS_FILE)
+    files = [f'{file_path}.{i}' for i in range(MAX_ROTATED_FILES, 0, -1)] + [file_path]
+    return [path for path in files if os.path.isfile(path)]
+
+def read_records(folder = None):
+    """Read the records of all metrics files, oldest first. The queued records are written first.
+
+    Parameters
+    ----------
+    folder : string, optional
+        Folder with the metrics, by default METRICS_FOLDER
+
+    Returns
+    -------
+    List
+        Records as dicts, lines that cannot be parsed are skipped
+    """
+    flush()
+    records = []
+    for file_path in get_metrics_files(folder):
+        with open(file_path, encoding='utf-8') as fp:
+            for line in fp:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    # E.g. a partly written line
+                    continue
+    return records
+
+def flush(timeout = 5.0):
+    """Wait until all queued records have been written.
+
+    Parameters
+    ----------
+    timeout : float, optional
+        Maximum time to wait in s, by default 5.0
+
+    Returns
+    -------
+    bool
+        True when all records have been written
+    """
+    end = time.monotonic() + timeout
+    while _pending.unfinished_tasks:
+        if time.monotonic() > end:
+            return False
+        time.sleep(0.01)
+    return True
+
+# Write the remaining records when the app stops
+atexit.register(flush)
@@ -0,0 +1,279 @@
+"""Resource limits and accounting of the SIMsalabim solvers (simss and zimt). pySIMsalabim starts the solvers with subprocess.run in a shell,
+this module replaces that function in pySIMsalabim with one that applies the limits to the shell and the solver, stops the solver cleanly
+when the wall-clock time limit is reached and collects the resource usage of every solver process"""
+######### Package Imports #########################################################################
+
+import os, signal, tempfile, threading, subprocess
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, the solvers then run without limits
+    resource = None
+from pySIMsalabim.utils import general as sim_general
+from pySIMsalabim.utils import parallel_sim as sim_parallel
+
+######### Parameter Initialisation ################################################################
+
+# Limits of a single solver process, 0 disables a limit. Set with the environment variables when starting The Shell,
+# e.g. SIMSALABIM_WALL_TIMEOUT=3600 SIMSALABIM_MEMORY_LIMIT=4096 streamlit run app.py
+WALL_TIMEOUT = float(os.environ.get('SIMSALABIM_WALL_TIMEOUT', 1800)) # Wall-clock time in s
+CPU_TIME_LIMIT = float(os.environ.get('SIMSALABIM_CPU_TIME_LIMIT', 1800)) # CPU time in s (RLIMIT_CPU)
+MEMORY_LIMIT = int(float(os.environ.get('SIMSALABIM_MEMORY_LIMIT', 2048)) * 1024**2) # Address space in bytes (RLIMIT_AS), the variable in MB
+NICE_LEVEL = int(os.environ.get('SIMSALABIM_NICE_LEVEL', 10)) # Lower priority than the app itself, so the UI stays responsive
+
+# Time in s between stopping a solver (SIGTERM) and killing it (SIGKILL) when the wall-clock time limit is reached
+TERMINATE_GRACE = 5
+
+# Exit code of a SIMsalabim (Free Pascal) program that cannot allocate memory (runtime error 203, heap overflow)
+HEAP_OVERFLOW_EXIT_CODE = 203
+
+# Message per limit, shown on the UI when a solver has been stopped
+LIMIT_MESSAGES = {'wall_time': 'The simulation was stopped because it took longer than the time limit of {:.0f} minutes.',
+                  'cpu_time': 'The simulation was stopped because it used more than the CPU time limit of {:.0f} minutes.',
+                  'memory': 'The simulation was stopped because it needed more than the memory limit of {:.1f} GB.'}
+
+# Active runs by absolute path of the session folder, the solvers started in this folder or a subfolder are counted for the run
+_trackers = {}
+_trackers_lock = threading.Lock()
+
+######### Class Definitions #######################################################################
+
+class SolverUsage:
+    """Resource usage of the solver processes of a run, with the first limit that has been hit. Solvers can run in parallel threads."""
+    def __init__(self, session_path):
+        self.session_path = os.path.abspath(session_path)
+        self.processes = 0
+        self.cpu_time = 0.0
+        self.peak_rss_kb = 0
+        self.limit = None
+        self._lock = threading.Lock()
+
+    def add(self, usage, limit):
+        """Add the resource usage of a finished solver process.
+
+        Parameters
+        ----------
+        usage : resource.struct_rusage
+            Resource usage of the process, as returned by os.wait4
+        limit : string
+            Limit that stopped the process, None when no limit was hit
+        """
+        with self._lock:
+            self.processes += 1
+            self.cpu_time += usage.ru_utime + usage.ru_stime
+            self.peak_rss_kb = max(self.peak_rss_kb, usage.ru_maxrss)
+            if self.limit is None:
+                self.limit = limit
+
+######### Function Definitions ####################################################################
+
+def start_tracking(session_path):
+    """Start collecting the resource usage of the solvers that run in the session folder.
+
+    Parameters
+    ----------
+    session_path : string
+        Path of the session folder
+
+    Returns
+    -------
+    SolverUsage
+        Resource usage of the solvers, updated when a solver finishes
+    """
+    usage = SolverUsage(session_path)
+    with _trackers_lock:
+        _trackers[usage.session_path] = usage
+    return usage
+
+def stop_tracking(usage):
+    """Stop collecting the resource usage of the solvers.
+
+    Parameters
+    ----------
+    usage : SolverUsage
+        Resource usage returned by start_tracking
+    """
+    with _trackers_lock:
+        if _trackers.get(usage.session_path) is usage:
+            del _trackers[usage.session_path]
+
+def get_tracker(cwd):
+    """Get the resource usage of the run that a solver belongs to, from the folder in which it runs.
+    pySIMsalabim runs some solvers in a temporary subfolder of the session folder.
+
+    Parameters
+    ----------
+    cwd : string
+        Folder in which the solver runs
+
+    Returns
+    -------
+    SolverUsage
+        Resource usage of the run, None when no run is tracked for the folder
+    """
+    path = os.path.abspath(cwd or os.getcwd())
+    with _trackers_lock:
+        while True:
+            if path in _trackers:
+                return _trackers[path]
+            parent = os.path.dirname(path)
+            if parent == path:
+                return None
+            path = parent
+
+def get_limited_command(cmd_line):
+    """Prefix a shell command with the resource limits and the nice level. The limits are set in the shell and inherited by the solver.
+
+    Parameters
+    ----------
+    cmd_line : string
+        Shell command to run the solver, e.g. './simss simulation_setup.txt'
+
+    Returns
+    -------
+    string
+        Shell command with the limits
+    """
+    prefix = ''
+    if CPU_TIME_LIMIT:
+        prefix += f'ulimit -t {int(CPU_TIME_LIMIT)}; '
+    if MEMORY_LIMIT:
+        # In kB
+        prefix += f'ulimit -v {int(MEMORY_LIMIT // 1024)}; '
+    if NICE_LEVEL:
+        prefix += f'exec nice -n {int(NICE_LEVEL)} '
+    return prefix + cmd_line
+
+def get_limit(returncode, usage, timed_out):
+    """Determine which limit stopped a solver.
+
+    Parameters
+    ----------
+    returncode : int
+        Exit code of the process, negative when it was stopped by a signal
+    usage : resource.struct_rusage
+        Resource usage of the process
+    timed_out : bool
+        True when the process was stopped at the wall-clock time limit
+
+    Returns
+    -------
+    string
+        'wall_time', 'cpu_time' or 'memory', None when no limit was hit
+    """
+    if timed_out:
+        return 'wall_time'
+    # The CPU time is enforced with a resolution of 1 s
+    if CPU_TIME_LIMIT and returncode in (-signal.SIGXCPU, -signal.SIGKILL) and usage.ru_utime + usage.ru_stime >= CPU_TIME_LIMIT - 1:
+        return 'cpu_time'
+    if MEMORY_LIMIT and returncode == HEAP_OVERFLOW_EXIT_CODE:
+        return 'memory'
+    return None
+
+def get_limit_message(limit):
+    """Get the message to show on the UI when a solver has been stopped at a limit.
+
+    Parameters
+    ----------
+    limit : string
+        'wall_time', 'cpu_time' or 'memory', or None
+
+    Returns
+    -------
+    string
+        Message, empty when no limit was hit
+    """
+    if limit is None:
+        return ''
+    value = {'wall_time': WALL_TIMEOUT / 60, 'cpu_time': CPU_TIME_LIMIT / 60, 'memory': MEMORY_LIMIT / 1e9}[limit]
+    return (LIMIT_MESSAGES[limit].format(value) + ' Reduce for example the number of grid points (NP) or the number of steps of the experiment '
+            'and run the simulation again, or run SIMsalabim on your own machine.')
+
+def stop_process_group(pid, stopped, finished):
+    """Stop a solver and its shell at the wall-clock time limit: first SIGTERM, then SIGKILL when it is still running after TERMINATE_GRACE seconds.
+
+    Parameters
+    ----------
+    pid : int
+        Process ID of the shell, which leads the process group
+    stopped : threading.Event
+        Set here, to mark that the process has been stopped at the limit
+    finished : threading.Event
+        Set when the process has finished
+    """
+    if finished.is_set():
+        return
+    stopped.set()
+    try:
+        os.killpg(pid, signal.SIGTERM)
+        if not finished.wait(TERMINATE_GRACE):
+            os.killpg(pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # Finished in the meantime
+        pass
+
+def run_limited(args, stdout = None, stderr = None, cwd = None, shell = False, check = False, **kwargs):
+    """Replacement of subprocess.run for pySIMsalabim: run a solver with the resource limits and collect its resource usage with os.wait4.
+
+    Parameters
+    ----------
+    args : string or List
+        Command, as passed to subprocess.run
+    stdout : int, optional
+        subprocess.PIPE to capture the output, by default None
+    stderr : int, optional
+        As for subprocess.run, by default None
+    cwd : string, optional
+        Folder in which to run the command, by default None
+    shell : bool, optional
+        Run the command in a shell, by default False
+    check : bool, optional
+        Raise CalledProcessError when the exit code is not 0, by default False
+    kwargs : Any
+        Other arguments for subprocess.run
+
+    Returns
+    -------
+    subprocess.CompletedProcess
+        The finished process, with the captured output
+    """
+    if resource is None or not shell or kwargs:
+        # Only the shell commands of pySIMsalabim are limited
+        return subprocess.run(args, stdout=stdout, stderr=stderr, cwd=cwd, shell=shell, check=check, **kwargs)
+
+    cmd_line = args[0] if isinstance(args, (list, tuple)) else args
+    # The output is written to a temporary file instead of a pipe, so the process can be waited for with os.wait4 to get its resource usage
+    with tempfile.TemporaryFile() as output:
+        process = subprocess.Popen(get_limited_command(cmd_line), stdout=output if stdout == subprocess.PIPE else stdout, stderr=stderr,
+                                   cwd=cwd, shell=True, start_new_session=True)
+        stopped, finished = threading.Event(), threading.Event()
+        timer = threading.Timer(WALL_TIMEOUT, stop_process_group, args=(process.pid, stopped, finished)) if WALL_TIMEOUT else None
+        if timer is not None:
+            timer.daemon = True
+            timer.start()
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+        finally:
+            finished.set()
+            if timer is not None:
+                timer.cancel()
+        process.returncode = os.waitstatus_to_exitcode(status)
+        output.seek(0)
+        captured = output.read() if stdout == subprocess.PIPE else None
+
+    tracker = get_tracker(cwd)
+    if tracker is not None:
+        tracker.add(usage, get_limit(process.returncode, usage, stopped.is_set()))
+
+    if check and process.returncode != 0:
+        raise subprocess.CalledProcessError(process.returncode, args, output=captured)
+    return subprocess.CompletedProcess(args, process.returncode, stdout=captured)
+
+def install():
+    """Run the solvers started by pySIMsalabim with run_limited. Only replaces subprocess.run, so it can be called more than once."""
+    for module in (sim_general, sim_parallel):
+        if getattr(module, 'run', None) is subprocess.run:
+            module.run = run_limited
+
+# Apply the limits to all solvers started by the app
+install()
@@ -4,9 +4,13 @@
 import streamlit as st
 from pySIMsalabim.experiments import JV_steady_state as JV_exp
 import os
-from datetime import datetime
 from utils import device_parameters_UI as utils_devpar_UI
 from utils import general_UI as utils_gen_UI
+from utils import optics_store as utils_optics_store
+from utils import device_model as utils_device_model
+from utils import gen_profile_cache as utils_gen_profile_cache
+from utils import run_metrics as utils_run_metrics
+from utils import solver_limits as utils_solver_limits
 
 ######### Function Definitions ####################################################################
 
@@ -124,11 +128,9 @@ def store_scPar_state(sc_par, solar_cell, dev_par, dev_par_name):
     """
     # Find and store the experimental JV file name parameter from the device parameters in a state. 
     # When not simulating a solar cell, this parameter will later be forced to 'none' again
-    for section in dev_par[dev_par_name][1:]:
-        if section[0] == 'User interface':
-            for param in section:
-                if param[1] == 'expJV':
-                    st.session_state['expJV'] = param[2]
+    expJV = utils_device_model.get_value(dev_par[dev_par_name], 'expJV', 'User interface')
+    if expJV is not None:
+        st.session_state['expJV'] = expJV
 
     if solar_cell is False:
         # Simulation was not for a solar cell. Empty the experimental JV object.
@@ -208,28 +210,24 @@ def run_SS_JV(simss_device_parameters, session_path, dev_par, layers, id_session
     """
     exp_type = 'Steady State JV'
 
+    # Metrics of the run, the time until the solver starts is the queue wait time
+    metrics = utils_run_metrics.start_run(id_session, 'Steady_State')
+
+    # Make the shared nk and spectrum files used by the device available in the session folder
+    utils_optics_store.link_optics_files(session_path, utils_optics_store.get_referenced_optics_files(dev_par))
+
     # We need to ge the varFile name to prevent it from being init as none
     if varFile is None and dev_par is not None:
         try:
-            for section in dev_par[simss_device_parameters][1:]:
-                if section[0] == 'User interface':
-                    for param in section:
-                        if param[1] == 'varFile':
-                            varFile = param[2]
-                            break
-                    if varFile is not None:
-                        break
+            varFile = utils_device_model.get_value(dev_par[simss_device_parameters], 'varFile', 'User interface')
         except Exception:
             # If dev_par is malformed, keep varFile_local as None, this will never be reached
             varFile = None
 
     # Check if there is an old scPars file, and if so, remove it to correctly update the result page
     if dev_par is not None:
-        # Find the "User interface" section
-        ui_section = next((s for s in dev_par[simss_device_parameters][1:] if s[0] == 'User interface'), [])
-        
-        # Find the scParsFile parameter
-        scParsFile = next((param[2] for param in ui_section if param[1] == 'scParsFile'), None)
+        # Find the scParsFile parameter in the "User interface" section
+        scParsFile = utils_device_model.get_value(dev_par[simss_device_parameters], 'scParsFile', 'User interface')
     
     # Remove old scParsFile if it exists
     if scParsFile:
@@ -237,10 +235,17 @@ def run_SS_JV(simss_device_parameters, session_path, dev_par, layers, id_session
         if os.path.isfile(scPars_path):
             os.remove(scPars_path)
 
+    # Use the cached generation profile when the optical inputs have not changed, SIMsalabim then skips the optics stage
+    optics_key = utils_gen_profile_cache.get_optics_key(dev_par, simss_device_parameters, session_path)
+    cmd_pars = utils_gen_profile_cache.use_cached_profile(session_path, optics_key)
+
     with st.toast('Simulation started'):
 
         # Call the SS simulation
-        result, message = JV_exp.run_SS_JV(simss_device_parameters, session_path, G_fracs=G_fracs, varFile=varFile)
+        metrics.start_solver(session_path)
+        result, message = JV_exp.run_SS_JV(simss_device_parameters, session_path, G_fracs=G_fracs, varFile=varFile, cmd_pars=cmd_pars)
+
+    metrics.stop_solver()
 
     if result == 0 or result == 95:
         # Simulation succeeded, continue with the process
@@ -250,18 +255,25 @@ def run_SS_JV(simss_device_parameters, session_path, dev_par, layers, id_session
         # Set the state variable to true to indicate that a new simulation has been run and a new ZIP file with results must be created
         st.session_state['runSimulation'] = True
 
+        if cmd_pars is None and not G_fracs and varFile not in (None, 'none'):
+            # Store the calculated generation profile for the next runs with the same optics
+            G_frac = utils_device_model.get_value(dev_par[simss_device_parameters], 'G_frac', 'Optics', cast=float, default=0)
+            utils_gen_profile_cache.store_profile(optics_key, os.path.join(session_path, varFile), G_frac)
+
         # Store the assigned file names from the saved device parameters in session state variables.
         utils_devpar_UI.store_file_names(dev_par, 'simss', simss_device_parameters, layers)
 
+        # Start preparing the result package in the background, so it is ready by the time the results have been viewed
+        utils_gen_UI.start_results_package(session_path, id_session, 'simss', 'SS_JV')
+
         res = 'SUCCESS'
     else:
-        # Simulation failed, show the error message
-        st.error(message)
+        # Simulation failed, show the error message. When the solver was stopped at a resource limit, show which limit instead.
+        st.error(utils_solver_limits.get_limit_message(metrics.record['limit']) or message)
         res = 'ERROR'
 
     # Get the SIMsalabim log file and store in session state for display
     utils_gen_UI.get_SIMsalabim_log(simss_device_parameters, session_path, dev_par, exp_type)
 
-    # Log the simulation result in the log file
-    with open(os.path.join('Statistics', 'log_file.txt'), 'a') as f:
-        f.write(str(id_session) + ' Steady_State ' + res + ' ' + str(datetime.now()) + '\n')
+    # Record the metrics of the run, written in the background
+    metrics.finish(res, result, session_path, dev_par, simss_device_parameters)
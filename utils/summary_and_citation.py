@@ -1,10 +1,11 @@
 """ Functions to create the summary and citation file"""
 ######### Package Imports #########################################################################
 
-import os
+import os, io
 import streamlit as st
 from datetime import datetime
 from utils.ref_optics import nk_ref_dict, spectrum_ref_dict
+from utils import optics_catalog as utils_optics_catalog
 
 ######### Function Definitions ####################################################################    
 
@@ -30,8 +31,45 @@ def create_summary_and_cite(session_path, used_optics):
     used_optics : boolean
         Indicate whether the transfer matrix script has been used.
     """
-    # Create the file
-    fp = open(os.path.join(session_path, summary_file_name),'w')
+    # List all included files (input and output) in the session folder
+    file_names = [filename for filename in os.listdir(session_path) 
+                  if os.path.isfile(os.path.join(session_path, filename)) and not filename == summary_file_name]
+
+    # The nk and spectrum files used by the transfer matrix method. These are in the overlay of the session or in the shared store, 
+    # use the files of the simulation when known, otherwise the files in the session folder.
+    optics_files = st.session_state.get('opticsFiles')
+    if optics_files is not None:
+        optics_files = [os.path.normpath(file_name) for file_name in sorted(set(optics_files)) 
+                        if utils_optics_catalog.resolve_optics_file(session_path, file_name) is not None]
+    else:
+        optics_files = [os.path.join(folder_name, file_name) for folder_name in ['Data_nk', 'Data_spectrum'] 
+                        for file_name in utils_optics_catalog.list_folder(os.path.join(session_path, folder_name))]
+    nk_files = [os.path.basename(file_name) for file_name in optics_files if os.path.dirname(file_name) == 'Data_nk']
+    spectrum_files = [os.path.basename(file_name) for file_name in optics_files if os.path.dirname(file_name) == 'Data_spectrum']
+
+    with open(os.path.join(session_path, summary_file_name),'w') as fp:
+        fp.write(get_summary_and_cite(file_names, used_optics, nk_files, spectrum_files))
+
+def get_summary_and_cite(file_names, used_optics, nk_files = [], spectrum_files = []):
+    """Create the text of the summary and citation file, including the relevant files, description of the experiments and citations.
+
+    Parameters
+    ----------
+    file_names : List
+        Names of the included files (input and output)
+    used_optics : boolean
+        Indicate whether the transfer matrix script has been used.
+    nk_files : List, optional
+        Names of the used nk files, only relevant when used_optics is True, by default []
+    spectrum_files : List, optional
+        Names of the used spectrum files, only relevant when used_optics is True, by default []
+
+    Returns
+    -------
+    string
+        Content of the summary and citation file
+    """
+    fp = io.StringIO()
 
     # SIMsalabim and The Shell version + repository
     fp.write('SIMsalabim drift-diffusion simulations\n\n')
@@ -52,21 +90,16 @@ def create_summary_and_cite(session_path, used_optics):
 
     # List all included files (input and output) in the session folder
     fp.write('Included files:\n')
-    for filename in os.listdir(session_path):
-        if os.path.isfile(os.path.join(session_path, filename)) and not filename == summary_file_name:
-            fp.write('- ' + filename + '\n')
+    for filename in file_names:
+        fp.write('- ' + filename + '\n')
 
     fp.write('\n')
 
     # When the transfer matrix script has been used, list the nk and spectrum files as well
     if used_optics:
         fp.write('nk/spectrum_files (Used to calculate the generation profile)\n')
-        for dirpath, dirnames, filenames in os.walk(os.path.join(session_path,'Data_nk')):
-            for filename in filenames:
-                fp.write('- ' + filename + '\n')
-        for dirpath, dirnames, filenames in os.walk(os.path.join(session_path,'Data_spectrum')):
-            for filename in filenames:
-                fp.write('- ' + filename + '\n')
+        for filename in nk_files + spectrum_files:
+            fp.write('- ' + filename + '\n')
         fp.write('\n')
     
     # Which simulation has been run
@@ -140,21 +173,18 @@ def create_summary_and_cite(session_path, used_optics):
     # If the reference is not known, e.g. when the user uploads a file, indicate that no reference has been provided
     if used_optics:
         fp.write('References for nk and spectrum files used in the transfer matrix method:\n')
-        for dirpath, dirnames, filenames in os.walk(os.path.join(session_path,'Data_nk')):
-                # nk files
-                for filename in filenames:
-                    file_name = os.path.splitext(filename)
-                    file_ref = get_reference(file_name[0], nk_ref_dict)
-                    fp.write('* ' + file_name[0] + ': ' + file_ref + '\n')
-        for dirpath, dirnames, filenames in os.walk(os.path.join(session_path,'Data_spectrum')):
-                # spectrum files
-                for filename in filenames:
-                    file_name = os.path.splitext(filename)
-                    file_ref = get_reference(file_name[0], spectrum_ref_dict)
-                    fp.write('* ' + file_name[0] + ': ' + file_ref + '\n')
-    
-    # Close the file
-    fp.close()
+        # nk files
+        for filename in nk_files:
+            file_name = os.path.splitext(filename)
+            file_ref = get_reference(file_name[0], nk_ref_dict)
+            fp.write('* ' + file_name[0] + ': ' + file_ref + '\n')
+        # spectrum files
+        for filename in spectrum_files:
+            file_name = os.path.splitext(filename)
+            file_ref = get_reference(file_name[0], spectrum_ref_dict)
+            fp.write('* ' + file_name[0] + ': ' + file_ref + '\n')
+
+    return fp.getvalue()
 
 def create_description(type):
     """Return a custom description for the performed simulation/experiment
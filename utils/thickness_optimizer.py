@@ -0,0 +1,190 @@
+"""Optimize the thicknesses of the layers on the optics alone, as a pre-screen for the (expensive) drift-diffusion simulations.
+All candidate stacks are evaluated with the transfer-matrix method in batches, only the best stacks are simulated with SimSS."""
+######### Package Imports #########################################################################
+
+import os, itertools
+import numpy as np
+import pandas as pd
+from pySIMsalabim.experiments import JV_steady_state as JV_exp
+from utils import device_model as utils_device_model
+from utils import optics_preview as utils_optics_preview
+from utils import optics_store as utils_optics_store
+
+######### Parameter Initialisation ################################################################
+
+# Maximum number of candidate stacks in a grid
+MAX_CANDIDATES = 20000
+
+# Number of candidate stacks calculated at once, limits the memory use to ~ batch size x wavelengths x 2 x 2 complex numbers
+BATCH_SIZE = 256
+
+# Prefix of the UUID of the SimSS runs of the candidates, the output files are e.g. JV_thickness_1.dat and scPars_thickness_1.txt
+RUN_UUID_PREFIX = 'thickness_'
+
+######### Function Definitions ####################################################################
+
+def make_thickness_grid(ranges):
+    """Make the grid of candidate thicknesses from the range of every layer.
+
+    Parameters
+    ----------
+    ranges : dict
+        Index of the layer in layers -> (minimum thickness, maximum thickness, number of steps), in m
+
+    Returns
+    -------
+    np.ndarray
+        Thicknesses with shape (candidates, layers in ranges), in the order of ranges
+
+    Raises
+    ------
+    ValueError
+        When a range is not valid or the grid has more than MAX_CANDIDATES candidates
+    """
+    axes = []
+    for index, (d_min, d_max, steps) in ranges.items():
+        steps = int(steps)
+        if d_min <= 0 or d_max < d_min or steps < 1:
+            raise ValueError(f'The thickness range of layer {index} is not valid.')
+        axes.append(np.linspace(d_min, d_max, steps) if steps > 1 else np.array([d_min]))
+    n_candidates = int(np.prod([len(axis) for axis in axes]))
+    if n_candidates > MAX_CANDIDATES:
+        raise ValueError(f'The grid has {n_candidates} stacks, reduce the number of steps to at most {MAX_CANDIDATES} stacks.')
+    return np.array(list(itertools.product(*axes))).reshape(n_candidates, len(axes))
+
+def estimate_jsc(stack, generating, thicknesses, layer_positions):
+    """Estimate the maximum Jsc of candidate stacks: all photons absorbed in the generating layers yield an electron-hole pair.
+
+    Parameters
+    ----------
+    stack : dict
+        Optical stack, see optics_preview.load_optics_stack
+    generating : List
+        Positions in the stack of the layers that generate electron-hole pairs
+    thicknesses : np.ndarray
+        Thicknesses with shape (candidates, varied layers), in m
+    layer_positions : List
+        Positions in the stack of the varied layers, in the order of the columns of thicknesses
+
+    Returns
+    -------
+    np.ndarray
+        Maximum Jsc of every candidate, in A/m2
+    """
+    wavelengths, photon_flux = stack['wavelengths'], stack['photon_flux']
+    jsc = np.empty(len(thicknesses))
+    for start in range(0, len(thicknesses), BATCH_SIZE):
+        batch = thicknesses[start:start + BATCH_SIZE]
+        d_layers = list(stack['d_layers'])
+        for column, position in enumerate(layer_positions):
+            # Shape (batch, 1) to broadcast with the wavelengths
+            d_layers[position] = batch[:, column, None]
+        absorption, _ = utils_optics_preview.calc_layer_absorption(wavelengths, stack['n_substrate'], stack['n_layers'], d_layers)
+        absorbed = absorption[generating].sum(axis=0)
+        jsc[start:start + BATCH_SIZE] = utils_optics_preview.q * np.trapezoid(absorbed * photon_flux, wavelengths, axis=-1)
+    return jsc
+
+def optimize_thicknesses(dev_par, layers, dev_par_name, session_path, ranges, top_k = 5):
+    """Evaluate a grid of layer thicknesses on the optics alone and return the best stacks, ranked by the estimated maximum Jsc
+    of the layers that generate electron-hole pairs (layerGen = 1).
+
+    Parameters
+    ----------
+    dev_par : dict
+        Device parameters of all files
+    layers : List
+        List with all layers in the device, the first item is the simulation setup
+    dev_par_name : string
+        Name of the simulation setup file
+    session_path : string
+        Path of the current simulation session
+    ranges : dict
+        Index of the layer in layers -> (minimum thickness, maximum thickness, number of steps), in m
+    top_k : int, optional
+        Number of stacks to return, by default 5
+
+    Returns
+    -------
+    DataFrame
+        The best stacks: the thickness (nm) of every varied layer, named after the layer (e.g. 'l2'), and the estimated Jsc.
+        None when the optics cannot be calculated.
+    string
+        Reason why the optics cannot be calculated, empty on success
+    """
+    stack, msg = utils_optics_preview.load_optics_stack(dev_par, layers, dev_par_name, session_path)
+    if stack is None:
+        return None, msg
+
+    generating = [position for position, index in enumerate(stack['layer_index'])
+                  if index is not None and utils_device_model.get_value(dev_par[layers[index][2]], 'layerGen', cast=float, default=0) == 1]
+    if not generating:
+        return None, 'None of the layers generates electron-hole pairs (layerGen = 1).'
+
+    try:
+        thicknesses = make_thickness_grid(ranges)
+    except ValueError as e:
+        return None, str(e)
+    layer_positions = [stack['layer_index'].index(index) for index in ranges]
+
+    jsc = estimate_jsc(stack, generating, thicknesses, layer_positions)
+    best = np.argsort(-jsc, kind='stable')[:top_k]
+
+    candidates = pd.DataFrame({layers[index][1] + ' [nm]': np.round(thicknesses[best, column] * 1e9, 2) for column, index in enumerate(ranges)})
+    candidates['Est. max. Jsc [Am⁻²]'] = jsc[best]
+    return candidates.reset_index(drop=True), ''
+
+def get_candidate_cmd_pars(candidate):
+    """Get the command line parameters to simulate a candidate stack, e.g. [{'par': 'l2.L', 'val': '3.000000e-07'}].
+
+    Parameters
+    ----------
+    candidate : Series
+        Row of the DataFrame returned by optimize_thicknesses
+
+    Returns
+    -------
+    List
+        Command line parameters for the pySIMsalabim run functions
+    """
+    cmd_pars = []
+    for column, value in candidate.items():
+        if column.endswith(' [nm]'):
+            cmd_pars.append({'par': column[:-len(' [nm]')] + '.L', 'val': f'{value * 1e-9:.6e}'})
+    return cmd_pars
+
+def run_candidates(simss_device_parameters, session_path, dev_par, candidates):
+    """Run a SimSS simulation for every candidate stack, with the thicknesses set on the command line. The device parameters
+    files are not changed. The output files get the UUID of the candidate, e.g. JV_thickness_1.dat and scPars_thickness_1.txt.
+
+    Parameters
+    ----------
+    simss_device_parameters : string
+        Name of the simulation setup file
+    session_path : string
+        Path of the current simulation session
+    dev_par : dict
+        Device parameters of all files
+    candidates : DataFrame
+        The stacks to simulate, see optimize_thicknesses
+
+    Returns
+    -------
+    DataFrame
+        The candidates with the result of SimSS and the simulated solar cell parameters (Jsc, Voc, FF, MPP) when available
+    """
+    # Make the shared nk and spectrum files used by the device available in the session folder
+    utils_optics_store.link_optics_files(session_path, utils_optics_store.get_referenced_optics_files(dev_par))
+
+    results = []
+    for i, candidate in candidates.iterrows():
+        uuid = RUN_UUID_PREFIX + str(i + 1)
+        result, message = JV_exp.run_SS_JV(simss_device_parameters, session_path, G_fracs=None, UUID=uuid, cmd_pars=get_candidate_cmd_pars(candidate))
+        row = {'SimSS': 'SUCCESS' if result in (0, 95) else 'ERROR'}
+        scPars_file = os.path.join(session_path, 'scPars_' + uuid + '.txt')
+        if row['SimSS'] == 'SUCCESS' and os.path.isfile(scPars_file) and os.path.getsize(scPars_file) != 0:
+            scPars = pd.read_csv(scPars_file, sep=r'\s+')
+            for par, label in [('Jsc', 'Jsc [Am⁻²]'), ('Voc', 'Voc [V]'), ('FF', 'FF'), ('MPP', 'MPP [Wm⁻²]')]:
+                if par in scPars:
+                    row[label] = scPars[par][0]
+        results.append(row)
+    return pd.concat([candidates.reset_index(drop=True), pd.DataFrame(results)], axis=1)
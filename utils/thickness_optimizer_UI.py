@@ -0,0 +1,111 @@
+"""UI of the optics-only thickness optimization, shown on the Steady State JV page"""
+######### Package Imports #########################################################################
+
+import pandas as pd
+import streamlit as st
+from utils import device_model as utils_device_model
+from utils import thickness_optimizer as utils_thickness_optimizer
+
+######### Parameter Initialisation ################################################################
+
+# Default range around the current thickness of a layer and the number of steps
+DEFAULT_RANGE = (0.5, 1.5)
+DEFAULT_STEPS = 11
+
+# Maximum number of stacks that can be simulated with SimSS
+MAX_TOP_K = 20
+
+######### Function Definitions ####################################################################
+
+def get_default_ranges(dev_par, layers):
+    """Get the table with the default thickness range of every layer. Only the layers that generate electron-hole pairs are varied by default.
+
+    Parameters
+    ----------
+    dev_par : dict
+        Device parameters of all files
+    layers : List
+        List with all layers in the device, the first item is the simulation setup
+
+    Returns
+    -------
+    DataFrame
+        Layer, Vary, Min [nm], Max [nm] and Steps for every layer
+    """
+    rows = []
+    for layer in layers[1:]:
+        L = utils_device_model.get_value(dev_par[layer[2]], 'L', 'General', float) * 1e9
+        rows.append({'Layer': layer[1] + ' (' + layer[2] + ')',
+                     'Vary': utils_device_model.get_value(dev_par[layer[2]], 'layerGen', cast=float, default=0) == 1,
+                     'Min [nm]': round(DEFAULT_RANGE[0] * L, 2), 'Max [nm]': round(DEFAULT_RANGE[1] * L, 2), 'Steps': DEFAULT_STEPS})
+    return pd.DataFrame(rows)
+
+def get_ranges(table):
+    """Get the ranges of the varied layers from the edited table.
+
+    Parameters
+    ----------
+    table : DataFrame
+        Edited table, see get_default_ranges
+
+    Returns
+    -------
+    dict
+        Index of the layer in layers -> (minimum thickness, maximum thickness, number of steps), in m
+    """
+    return {i + 1: (row['Min [nm]'] * 1e-9, row['Max [nm]'] * 1e-9, row['Steps']) for i, row in table.iterrows() if row['Vary']}
+
+def show_thickness_optimizer(dev_par, layers, simss_device_parameters, session_path):
+    """Show the thickness optimization: the thickness ranges of the layers, the best stacks on the optics alone and
+    the option to simulate these stacks with SimSS.
+
+    Parameters
+    ----------
+    dev_par : dict
+        Device parameters of all files
+    layers : List
+        List with all layers in the device, the first item is the simulation setup
+    simss_device_parameters : string
+        Name of the simulation setup file
+    session_path : string
+        Path of the current simulation session
+    """
+    st.header("Thickness optimization")
+    st.subheader("Find the layer thicknesses with the highest generation, on the optics alone")
+
+    if utils_device_model.get_value(dev_par[simss_device_parameters], 'genProfile', 'Optics') != 'calc':
+        st.info('The thickness optimization uses the optics of the device. Set genProfile to calc to use it.')
+        return
+
+    # Include the version of the device parameters, so the table is reset after the files have been loaded again
+    table = st.data_editor(get_default_ranges(dev_par, layers), key=f"thicknessRanges-{getattr(dev_par, 'version', 0)}", hide_index=True, num_rows='fixed',
+                           disabled=['Layer'], column_config={'Min [nm]': st.column_config.NumberColumn(min_value=0.1),
+                                                              'Max [nm]': st.column_config.NumberColumn(min_value=0.1),
+                                                              'Steps': st.column_config.NumberColumn(min_value=1, step=1)})
+    top_k = st.number_input('Number of stacks to simulate with SimSS', min_value=1, max_value=MAX_TOP_K, value=5)
+
+    if st.button('Optimize thicknesses'):
+        ranges = get_ranges(table)
+        if not ranges:
+            st.error('Select at least one layer to vary.')
+        else:
+            candidates, msg = utils_thickness_optimizer.optimize_thicknesses(dev_par, layers, simss_device_parameters, session_path, ranges, top_k)
+            if candidates is None:
+                st.error(msg)
+            st.session_state['thicknessCandidates'] = candidates
+            st.session_state.pop('thicknessResults', None)
+
+    candidates = st.session_state.get('thicknessCandidates')
+    if candidates is None:
+        return
+
+    st.markdown('Best stacks, ranked by the estimated maximum Jsc (every photon absorbed in a layer with layerGen = 1 yields an electron-hole pair)')
+    st.dataframe(candidates, hide_index=True)
+
+    if st.button('Simulate the best stacks with SimSS'):
+        with st.spinner('Simulating the best stacks...'):
+            st.session_state['thicknessResults'] = utils_thickness_optimizer.run_candidates(simss_device_parameters, session_path, dev_par, candidates)
+
+    if 'thicknessResults' in st.session_state:
+        st.markdown('SimSS results of the best stacks. The device parameters files have not been changed.')
+        st.dataframe(st.session_state['thicknessResults'], hide_index=True)
@@ -1,5 +1,8 @@
 import streamlit as st
 import utils.general_UI as utils_gen_UI
+import utils.device_model as utils_device_model
+import utils.device_parameters_UI as utils_devpar_UI
+import utils.optics_store as utils_optics_store
 import os
 
 def upload_single_file_to_folder(uploaded_file, session_path, is_dev_par = False, dev_par_name = ''):
@@ -21,7 +24,7 @@ def upload_single_file_to_folder(uploaded_file, session_path, is_dev_par = False
     None
     """
     # Decode the uploaded file (utf-8)
-    data = uploaded_file.getvalue().decode('utf-8')
+    data = utils_devpar_UI.decode_upload(uploaded_file.getvalue())
 
     # Setup the write directory. When a device parameters file is uplaoded, use the fixed/pre-set name, otherwise use the name of the uploaded file.
     if is_dev_par == True:
@@ -29,7 +32,8 @@ def upload_single_file_to_folder(uploaded_file, session_path, is_dev_par = False
     else:
         target_path = os.path.join(session_path, uploaded_file.name)
 
-    # Write the contents of the uploaded file to a file in the SimSS folder
+    # Write the contents of the uploaded file to a file in the SimSS folder. An upload replaces a link to a shared nk/spectrum file.
+    utils_optics_store.prepare_upload_target(target_path)
     destination_file = open(target_path, "w", encoding='utf-8')
     destination_file.write(data)
     destination_file.close()
@@ -51,12 +55,13 @@ def upload_multiple_files_to_folder(uploaded_files, session_path):
             
     for i in range(len(uploaded_files)):
         # Decode the uploaded file (utf-8)
-        data = uploaded_files[i].getvalue().decode('utf-8')
+        data = utils_devpar_UI.decode_upload(uploaded_files[i].getvalue())
 
         # Setup the write directory
         target_path = os.path.join(session_path, uploaded_files[i].name)
 
-        # Write the contents of the uploaded file to a file in the SimSS folder
+        # Write the contents of the uploaded file to a file in the SimSS folder. An upload replaces a link to a shared nk file.
+        utils_optics_store.prepare_upload_target(target_path)
         destination_file_nk = open(target_path, "w", encoding='utf-8')
         destination_file_nk.write(data)
         destination_file_nk.close()
@@ -87,13 +92,10 @@ def upload_exp_jv_file(uploaded_file, session_path, dev_par, layers, device_para
     upload_single_file_to_folder(uploaded_file, session_path)
 
     # Update the UseExpData to 1 and change the ExpJV file name to the name of the just uploaded file.
-    for section in dev_par[device_parameters_current][1:]:
-        if section[0] == 'User interface':
-            for item_output_par in section:
-                if 'useExpData' in item_output_par[1]:
-                    item_output_par[2] = '1'
-                if 'expJV' in item_output_par[1]:
-                    item_output_par[2] = uploaded_file.name
+    for name, value in [('useExpData', '1'), ('expJV', uploaded_file.name)]:
+        param = utils_device_model.get_param(dev_par[device_parameters_current], name, 'User interface')
+        if param is not None:
+            param[2] = value
 
     utils_gen_UI.save_parameters(dev_par, layers, session_path, device_parameters_current, device_parameters_alt)
 
@@ -154,11 +156,9 @@ def upload_gen_prof_file(uploaded_file, session_path, dev_par, layers, device_pa
     upload_single_file_to_folder(uploaded_file, session_path)
 
     # Update the Gen_profile name with the name of the just uploaded file.
-    for section in dev_par[device_parameters_current][1:]:
-        if section[0] == 'Optics':
-            for item_output_par in section:
-                if 'genProfile' in item_output_par[1]:
-                    item_output_par[2] = uploaded_file.name
+    param = utils_device_model.get_param(dev_par[device_parameters_current], 'genProfile', 'Optics')
+    if param is not None:
+        param[2] = uploaded_file.name
     utils_gen_UI.save_parameters(dev_par, layers, session_path, device_parameters_current, device_parameters_alt)
 
     return st.success('File upload complete')